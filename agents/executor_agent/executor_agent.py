@@ -13,6 +13,7 @@ from messages.agent_messages.executor_agent_message import ExecutorAgentMessage
 from messages.convert_message_utils import cast_action_to_command
 from messages.message import Message
 from resources.model_resource.model_resource import ModelResponseFailure
+from resources.model_resource.response_cache import ResponseCacheMiss
 from resources.resource_type import ResourceType
 from utils.logger import get_main_logger
 
@@ -60,9 +61,7 @@ class ExecutorAgent(BaseAgent):
         if len(messages) == 0:
             prev_agent_message = None
         else:
-            prev_agent_message = messages[0]
-            while prev_agent_message.version_next:
-                prev_agent_message = prev_agent_message.version_next
+            prev_agent_message = messages[0].get_latest_version()
 
         self.last_executor_agent_message = ExecutorAgentMessage(
             agent_id=self.agent_id, prev=prev_agent_message
@@ -148,14 +147,14 @@ class ExecutorAgent(BaseAgent):
 
         try:
             lm_input_message = self.resources.executor_agent_memory.get_memory(
-                lm_input_message
+                lm_input_message,
+                token_budget=self.resources.model.get_memory_token_budget(),
             )
 
             while iterations < MAX_RETRIES:
                 try:
                     logger.info(f"Getting response from LM")
-                    model_output: ActionMessage = await asyncio.to_thread(
-                        self.resources.model.run,
+                    model_output: ActionMessage = await self.resources.model.run_async(
                         input_message=lm_input_message,
                     )
 
@@ -203,6 +202,11 @@ class ExecutorAgent(BaseAgent):
                         # Log associated input with invalid prompt failures
                         error_entry["input"] = e.input
 
+                    # A replay miss will not resolve itself on retry
+                    if isinstance(e, ResponseCacheMiss):
+                        error_history.append(error_entry)
+                        raise
+
                     # Also don't retry quota errors
                     if "No quota" in error_msg or "InsufficientQuotaError" in error_msg:
                         error_history.append(error_entry)
@@ -212,7 +216,14 @@ class ExecutorAgent(BaseAgent):
 
                     # # Wait if receieved a rate limit error
                     if status_code and status_code == 429:
-                        await self._backoff_delay(iterations)
+                        if getattr(e, "retry_after", None) is not None:
+                            # The model's shared rate limiter holds the next
+                            # request until the server's retry hint has passed
+                            logger.info(
+                                f"Provider asked to retry after {e.retry_after:.1f}s"
+                            )
+                        else:
+                            await self._backoff_delay(iterations)
                         error_history.append(error_entry)
                         logger.warning(
                             f"Retrying {iterations + 1}/{MAX_RETRIES} after rate limit exceeded: {e}"
@@ -196,3 +196,16 @@ class ExecutionBackend(ABC):
             Dict[str, Any]: A dictionary containing message (success message content).
         """
         pass
+
+    @abstractmethod
+    async def get_memory_stats(self) -> Dict[str, Any]:
+        """
+        Report how much the backend keeps in memory.
+
+        Returns:
+            Dict[str, Any]: A dictionary containing workflows (counts of active
+            workflows by status), message_counts (message registry counts),
+            resource_counts (resource registry counts), websockets (connection
+            stats) and max_rss_bytes (peak resident memory).
+        """
+        pass
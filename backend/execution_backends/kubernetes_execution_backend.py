@@ -90,3 +90,7 @@ class KubernetesExecutionBackend(ExecutionBackend):
     async def save_config(self, filename: str, config_content: str) -> Dict[str, Any]:
         """Save configuration to appropriate storage."""
         raise NotImplementedError
+
+    async def get_memory_stats(self) -> Dict[str, Any]:
+        """Report how much the backend keeps in memory."""
+        raise NotImplementedError
@@ -1,11 +1,14 @@
 import asyncio
 import os
+import resource
+import sys
 import traceback
+from collections import Counter
 from pathlib import Path
 from typing import Any, Callable, Dict, List
 
 from fastapi import HTTPException
-from fastapi.websockets import WebSocketState
+from fastapi.websockets import WebSocketDisconnect
 
 from backend.execution_backends import ExecutionBackend
 from backend.schema import (
@@ -14,7 +17,10 @@ from backend.schema import (
     StartWorkflowInput,
     UpdateInteractiveModeInput,
 )
+from messages.message_delta import catch_up
+from messages.message_dict import message_dict
 from resources.model_resource.services.api_key_service import check_api_key_validity
+from resources.resource_dict import resource_dict
 
 
 class LocalExecutionBackend(ExecutionBackend):
@@ -26,6 +32,10 @@ class LocalExecutionBackend(ExecutionBackend):
         self.active_workflows = (
             {}
         )  # Store active workflows in memory; this would be app.state.active_workflows in the prev implementation
+        # Set when the status of a workflow changes, see _set_status
+        self._status_changed: Dict[str, asyncio.Event] = {}
+        # Archived workflows are loaded from disk when a client connects
+        message_dict.add_eviction_listener(self._on_workflow_archived)
 
     async def start_workflow(self, workflow_data: StartWorkflowInput) -> Dict[str, Any]:
         """
@@ -96,7 +106,7 @@ class LocalExecutionBackend(ExecutionBackend):
             await workflow.stop()
 
             # Update workflow status
-            self.active_workflows[workflow_id]["status"] = "stopped"
+            self._set_status(workflow_id, "stopped")
 
             print(
                 f"AFTER STOP - Workflow {workflow_id} status: {self.active_workflows[workflow_id]['status']}"
@@ -117,6 +127,7 @@ class LocalExecutionBackend(ExecutionBackend):
                 workflow_id, {"message_type": "workflow_status", "status": "stopped"}
             )
 
+            self._close_workflow(workflow_id, workflow)
             return {"workflow_id": workflow_id, "status": "stopped"}
 
         except Exception as e:
@@ -143,7 +154,7 @@ class LocalExecutionBackend(ExecutionBackend):
         try:
             print(f"Restarting workflow {workflow_id}")
             await workflow.restart()
-            active_workflows[workflow_id]["status"] = "restarting"
+            self._set_status(workflow_id, "restarting")
 
             # Notify WebSocket clients about the stop
             websocket_manager = self.app.state.websocket_manager
@@ -328,12 +339,14 @@ class LocalExecutionBackend(ExecutionBackend):
             await websocket_manager.connect(workflow_id, websocket)
             print(f"WebSocket connected for workflow {workflow_id}")
 
-            await websocket.send_json(
+            await websocket_manager.send(
+                workflow_id,
+                websocket,
                 {
                     "message_type": "connection_established",
                     "workflow_id": workflow_id,
                     "status": "connected",
-                }
+                },
             )
 
             if workflow_id in self.active_workflows:
@@ -342,8 +355,11 @@ class LocalExecutionBackend(ExecutionBackend):
 
                 workflow_message = workflow_data.get("workflow_message")
                 if workflow_message and hasattr(workflow_message, "phase_messages"):
-                    for phase_message in workflow_message.phase_messages:
-                        await websocket.send_json(phase_message.to_broadcast_dict())
+                    # Only what changed since the last update the client saw
+                    since = _since_query_param(websocket)
+                    frame = catch_up(workflow_message.phase_messages, since)
+                    if frame["nodes"]:
+                        await websocket_manager.send(workflow_id, websocket, frame)
 
                 if current_status not in ["running", "completed", "stopped"]:
                     if current_status == "restarting":
@@ -362,62 +378,55 @@ class LocalExecutionBackend(ExecutionBackend):
                             )
                         )
                         self.active_workflows[workflow_id]["task"] = task
-                        await websocket.send_json(
+                        await websocket_manager.send(
+                            workflow_id,
+                            websocket,
                             {
                                 "message_type": "workflow_status",
                                 "status": "starting",
                                 "can_execute": False,
-                            }
+                            },
                         )
                 else:
-                    await websocket.send_json(
+                    await websocket_manager.send(
+                        workflow_id,
+                        websocket,
                         {
                             "message_type": "workflow_status",
                             "status": current_status,
                             "can_execute": False,
-                        }
+                        },
                     )
 
+            elif message_dict.is_archived(workflow_id):
+                await self._send_archived_workflow(
+                    workflow_id, websocket, websocket_manager
+                )
+                return
+
             else:
                 # If workflow_id has no associated active workflow, raise error
                 raise ValueError(f"Workflow {workflow_id} doesn't exist")
 
-            # Handle incoming messages
-            while not should_exit:
-                # Check if workflow is still active and not stopped
-                if (
-                    workflow_id not in self.active_workflows
-                    or self.active_workflows[workflow_id].get("status") == "stopped"
-                ):
+            # Runs until the client disconnects or the workflow is stopped,
+            # without waking up in between
+            if not should_exit:
+                receiving = asyncio.create_task(
+                    self._receive_messages(workflow_id, websocket)
+                )
+                stopped = asyncio.create_task(self._wait_until_stopped(workflow_id))
+                try:
+                    await asyncio.wait(
+                        {receiving, stopped}, return_when=asyncio.FIRST_COMPLETED
+                    )
+                finally:
+                    receiving.cancel()
+                    stopped.cancel()
+                    await asyncio.gather(receiving, stopped, return_exceptions=True)
+                if stopped.done() and not stopped.cancelled():
                     print(
-                        f"Breaking WebSocket loop - workflow {workflow_id} is stopped or removed"
+                        f"Closing WebSocket - workflow {workflow_id} is stopped or removed"
                     )
-                    break
-
-                try:
-                    data = await asyncio.wait_for(websocket.receive_json(), timeout=1.0)
-                    if should_exit:
-                        break
-
-                    if data.get("type") == "pong":
-                        # Heartbeat is handled internally by WebSocketManager
-                        continue
-                except asyncio.TimeoutError:
-                    # Timeout is normal, verify client state is not disconnected, continue the loop to check conditions again
-                    if websocket.client_state == WebSocketState.DISCONNECTED:
-                        print(f"Client disconnected for workflow {workflow_id}")
-                        break
-                    continue
-                except Exception as e:
-                    print(f"Error handling WebSocket message: {e}")
-                    if (
-                        "disconnect" in str(e).lower()
-                        or "not connected" in str(e).lower()
-                    ):
-                        print(
-                            f"Connection broken for workflow {workflow_id}, exiting loop"
-                        )
-                        break
 
         except Exception as e:
             print(f"WebSocket error for workflow {workflow_id}: {e}")
@@ -555,6 +564,106 @@ class LocalExecutionBackend(ExecutionBackend):
             print(f"Error saving config file: {str(e)}\n{error_traceback}")
             return {"error": str(e), "traceback": error_traceback}
 
+    async def get_memory_stats(self) -> Dict[str, Any]:
+        """
+        Report how much the backend keeps in memory: its peak resident memory,
+        and counts of what the registries hold.
+        """
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {
+            "workflows": dict(
+                Counter(data["status"] for data in self.active_workflows.values())
+            ),
+            "message_counts": message_dict.counts(),
+            "resource_counts": resource_dict.counts(),
+            "websockets": self.app.state.websocket_manager.stats(),
+            # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+            "max_rss_bytes": max_rss if sys.platform == "darwin" else max_rss * 1024,
+        }
+
+    def _close_workflow(self, workflow_id: str, workflow) -> None:
+        """Release a finished workflow, so its messages can be archived."""
+        try:
+            workflow.close()
+        except Exception as e:
+            print(f"Error closing workflow {workflow_id}: {e}")
+
+    def _on_workflow_archived(self, workflow_id: str) -> None:
+        # The message registry archived the workflow, drop the last references
+        self.active_workflows.pop(workflow_id, None)
+        self._notify_status_changed(workflow_id)
+
+    def _set_status(self, workflow_id: str, status: str) -> None:
+        workflow_data = self.active_workflows.get(workflow_id)
+        if workflow_data is not None:
+            workflow_data["status"] = status
+        self._notify_status_changed(workflow_id)
+
+    def _notify_status_changed(self, workflow_id: str) -> None:
+        changed = self._status_changed.pop(workflow_id, None)
+        if changed is not None:
+            changed.set()
+
+    async def _wait_until_stopped(self, workflow_id: str) -> None:
+        """Return once the workflow is stopped or no longer active."""
+        while (
+            workflow_id in self.active_workflows
+            and self.active_workflows[workflow_id].get("status") != "stopped"
+        ):
+            changed = self._status_changed.setdefault(workflow_id, asyncio.Event())
+            await changed.wait()
+
+    async def _receive_messages(self, workflow_id: str, websocket) -> None:
+        """Read client messages until it disconnects."""
+        while True:
+            try:
+                data = await websocket.receive_json()
+                if data.get("type") == "pong":
+                    # Heartbeat is handled internally by WebSocketManager
+                    continue
+            except WebSocketDisconnect:
+                print(f"Client disconnected for workflow {workflow_id}")
+                return
+            except Exception as e:
+                print(f"Error handling WebSocket message: {e}")
+                if "disconnect" in str(e).lower() or "not connected" in str(e).lower():
+                    print(f"Connection broken for workflow {workflow_id}, exiting loop")
+                    return
+
+    async def _send_archived_workflow(
+        self, workflow_id: str, websocket, websocket_manager
+    ) -> None:
+        """Replay an archived workflow to a client, it can no longer run."""
+        try:
+            archived = message_dict.load_archived(workflow_id)
+        except Exception as e:
+            print(f"Error loading archived workflow {workflow_id}: {e}")
+            archived = None
+        if archived is None:
+            await websocket_manager.send(
+                workflow_id,
+                websocket,
+                {
+                    "message_type": "workflow_status",
+                    "status": "error",
+                    "error": f"Archived workflow {workflow_id} could not be loaded",
+                    "can_execute": False,
+                },
+            )
+            return
+
+        for phase_message in archived["phase_messages"]:
+            await websocket_manager.send(workflow_id, websocket, phase_message)
+        await websocket_manager.send(
+            workflow_id,
+            websocket,
+            {
+                "message_type": "workflow_status",
+                "status": "completed" if archived["complete"] else "stopped",
+                "can_execute": False,
+            },
+        )
+
     async def _run_workflow(self, workflow_id: str, websocket_manager, should_exit):
         """
         Internal method to run a workflow.
@@ -568,7 +677,7 @@ class LocalExecutionBackend(ExecutionBackend):
 
         try:
             # Update status to running after initial start
-            workflow_data["status"] = "running"
+            self._set_status(workflow_id, "running")
             await websocket_manager.broadcast(
                 workflow_id, {"message_type": "workflow_status", "status": "running"}
             )
@@ -580,7 +689,7 @@ class LocalExecutionBackend(ExecutionBackend):
 
             # Handle successful completion
             if not should_exit:
-                workflow_data["status"] = "completed"
+                self._set_status(workflow_id, "completed")
                 await websocket_manager.broadcast(
                     workflow_id,
                     {
@@ -594,7 +703,7 @@ class LocalExecutionBackend(ExecutionBackend):
             # Handle errors
             if not should_exit:
                 print(f"Workflow error: {e}")
-                workflow_data["status"] = "error"
+                self._set_status(workflow_id, "error")
                 await websocket_manager.broadcast(
                     workflow_id,
                     {
@@ -606,6 +715,11 @@ class LocalExecutionBackend(ExecutionBackend):
                 )
                 print(f"Broadcasted error status for {workflow_id}")
 
+        # A workflow that failed stays open, so it can still be edited and run
+        # again, and is closed when it is stopped
+        if not should_exit and workflow_data["status"] == "completed":
+            self._close_workflow(workflow_id, workflow)
+
     async def _rerun_workflow(self, workflow_id: str, websocket_manager, should_exit):
         """
         Internal method to rerun a workflow.
@@ -619,7 +733,7 @@ class LocalExecutionBackend(ExecutionBackend):
 
         try:
             # Update status to running after initial start
-            workflow_data["status"] = "running"
+            self._set_status(workflow_id, "running")
             await websocket_manager.broadcast(
                 workflow_id, {"message_type": "workflow_status", "status": "running"}
             )
@@ -631,7 +745,7 @@ class LocalExecutionBackend(ExecutionBackend):
 
             # Handle successful completion
             if not should_exit:
-                workflow_data["status"] = "completed"
+                self._set_status(workflow_id, "completed")
                 await websocket_manager.broadcast(
                     workflow_id,
                     {
@@ -644,7 +758,7 @@ class LocalExecutionBackend(ExecutionBackend):
             # Handle errors
             if not should_exit:
                 print(f"Workflow error: {e}")
-                workflow_data["status"] = "error"
+                self._set_status(workflow_id, "error")
                 await websocket_manager.broadcast(
                     workflow_id,
                     {
@@ -655,6 +769,11 @@ class LocalExecutionBackend(ExecutionBackend):
                 )
                 print(f"Broadcasted error status for {workflow_id}")
 
+        # A workflow that failed stays open, so it can still be edited and run
+        # again, and is closed when it is stopped
+        if not should_exit and workflow_data["status"] == "completed":
+            self._close_workflow(workflow_id, workflow)
+
     async def _next_iteration(self, workflow_id: str) -> Dict[str, Any]:
         """
         Internal method to trigger the next iteration of a workflow.
@@ -670,3 +789,11 @@ class LocalExecutionBackend(ExecutionBackend):
             return {"status": "next iteration triggered"}
         else:
             return {"error": "Workflow is not in interactive mode"}
+
+
+def _since_query_param(websocket) -> int:
+    """Sequence number a reconnecting client resumes from, 0 for a new one."""
+    try:
+        return max(int(websocket.query_params.get("since", 0)), 0)
+    except (AttributeError, TypeError, ValueError):
+        return 0
@@ -5,7 +5,9 @@ import uvicorn
 from fastapi import FastAPI
 
 from backend.execution_backends import LocalExecutionBackend
+from backend.responses import MessageJSONResponse
 from backend.server import Server
+from messages.message_dict import DEFAULT_MAX_CLOSED_WORKFLOWS, message_dict
 from utils.websocket_manager import WebSocketManager, websocket_manager
 from workflows.detect_patch_workflow import DetectPatchWorkflow
 from workflows.detect_workflow import DetectWorkflow
@@ -35,7 +37,14 @@ def create_app(
     if backend_type is None:
         backend_type = os.environ.get("EXECUTION_BACKEND", "local")
 
-    app = FastAPI()
+    # Finished workflows kept in memory before the oldest is archived to disk
+    message_dict.configure(
+        max_closed_workflows=int(
+            os.environ.get("MAX_CLOSED_WORKFLOWS", DEFAULT_MAX_CLOSED_WORKFLOWS)
+        )
+    )
+
+    app = FastAPI(default_response_class=MessageJSONResponse)
 
     # Create the appropriate execution backend
     if backend_type.lower() == "kubernetes":
@@ -51,4 +60,6 @@ def create_app(
 app = create_app()
 
 if __name__ == "__main__":
+    # uvicorn negotiates permessage-deflate by default, which compresses the
+    # message updates sent over /ws/{workflow_id}
     uvicorn.run("backend.main:app", host="0.0.0.0", port=7999, reload=False)
@@ -0,0 +1,12 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from messages.serialization import serializer
+
+
+class MessageJSONResponse(JSONResponse):
+    """JSON response encoded by the message serializer."""
+
+    def render(self, content: Any) -> bytes:
+        return serializer.dumps(content)
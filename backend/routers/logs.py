@@ -3,7 +3,11 @@ from pathlib import Path
 from typing import Dict
 
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from backend.responses import MessageJSONResponse
+from messages.event_log import normalize_message_record
+from messages.serialization import serializer
 
 logs_router = APIRouter()
 
@@ -12,6 +16,16 @@ LOG_DIR = BASE_DIR / "logs"
 FILENAME_TO_PATH_CACHE: Dict[str, Path] = {}
 
 
+def load_log(file_path: Path) -> dict:
+    """
+    Read a workflow log, with the messages of logs written by older versions
+    brought to the current format.
+    """
+    with open(file_path, "rb") as f:
+        log = serializer.loads(f.read())
+    return normalize_message_record(log)
+
+
 def parse_log_metadata(file_path):
     try:
         with open(file_path, "r") as f:
@@ -83,7 +97,7 @@ async def list_logs():
                     logs_data.append(meta)
                     FILENAME_TO_PATH_CACHE[f.name] = f.resolve()
 
-        return JSONResponse(content=logs_data)
+        return MessageJSONResponse(content=logs_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -98,6 +112,6 @@ async def get_log(filename: str):
     if not file_path.exists() or not file_path.suffix == ".json":
         raise HTTPException(status_code=404, detail="Log file not found")
     try:
-        return FileResponse(file_path)
+        return MessageJSONResponse(content=await run_in_threadpool(load_log, file_path))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
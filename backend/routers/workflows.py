@@ -53,6 +53,17 @@ async def list_active_workflows(request: Request):
         return {"error": str(e)}
 
 
+@workflows_router.get("/workflow/memory")
+async def get_memory_stats(request: Request):
+    execution_backend: ExecutionBackend = request.app.state.execution_backend
+    try:
+        return await execution_backend.get_memory_stats()
+    except Exception as e:
+        error_traceback = traceback.format_exc()
+        print(f"Error getting memory stats: {str(e)}\n{error_traceback}")
+        return {"error": str(e)}
+
+
 @workflows_router.post("/workflow/start")
 async def start_workflow(workflow_data: StartWorkflowInput, request: Request):
     try:
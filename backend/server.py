@@ -1,8 +1,14 @@
-import asyncio
 from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
 from backend.execution_backends import ExecutionBackend
 
+
 class Server:
+    # Responses smaller than this are sent uncompressed
+    GZIP_MINIMUM_SIZE = 1024
+    # Logs are large and repetitive, higher levels barely shrink them further
+    GZIP_COMPRESS_LEVEL = 6
+
     def __init__(self, app, websocket_manager, execution_backend: ExecutionBackend):
         self.app = app
         self.execution_backend = execution_backend
@@ -27,6 +33,13 @@ class Server:
             allow_methods=["*"],
             allow_headers=["*"],
         )
+        # Compresses responses for clients that accept gzip, such as full
+        # workflow logs from /logs/{filename}; WebSockets are not affected
+        self.app.add_middleware(
+            GZipMiddleware,
+            minimum_size=self.GZIP_MINIMUM_SIZE,
+            compresslevel=self.GZIP_COMPRESS_LEVEL,
+        )
 
     def setup_routes(self):
         from backend.routers.api_service import api_service_router
@@ -50,12 +63,5 @@ class Server:
                 except Exception as e:
                     print(f"Error closing connection: {e}")
 
-        # Cancel heartbeat tasks
-        for task in self.websocket_manager.heartbeat_tasks:
-            task.cancel()
-            try:
-                await task
-            except asyncio.CancelledError:
-                pass  # intentionally passing when shutting down
-            except Exception as e:
-                raise e
+        # Cancel the heartbeat
+        await self.websocket_manager.stop_heartbeat()
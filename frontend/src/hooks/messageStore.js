@@ -0,0 +1,70 @@
+// Messages of a workflow received over the WebSocket, by id. Delta updates
+// send each message as a node that lists its current children by id, and full
+// messages, with their children embedded, are split into the same nodes.
+export const createMessageStore = () => ({ nodes: {}, seq: 0 });
+
+const toNodes = (message, nodes = []) => {
+  const children = message.current_children;
+  if (Array.isArray(children) && children.some(child => typeof child === 'object')) {
+    nodes.push({ ...message, current_children: children.map(child => child.current_id) });
+    children.forEach(child => toNodes(child, nodes));
+  } else {
+    nodes.push(message);
+  }
+  return nodes;
+};
+
+const phaseIdOf = (store, id) => {
+  let node = store.nodes[id];
+  while (node && node.message_type !== 'PhaseMessage') {
+    node = store.nodes[node.parent];
+  }
+  return node ? node.current_id : null;
+};
+
+// Add a delta update or a full message to the store. Returns the phases it
+// changed, in the order they were first changed, and for each whether the
+// phase itself was sent, rather than only messages below it.
+export const applyUpdate = (store, update) => {
+  const nodes = update.message_type === 'delta' ? update.nodes : toNodes(update);
+  if (update.seq) {
+    store.seq = Math.max(store.seq, update.seq);
+  }
+
+  nodes.forEach(node => {
+    store.nodes[node.current_id] = node;
+  });
+
+  const phases = [];
+  nodes.forEach(node => {
+    const phaseId = phaseIdOf(store, node.current_id);
+    if (!phaseId) {
+      return;
+    }
+    const phase = phases.find(p => p.phaseId === phaseId);
+    const isPhase = phaseId === node.current_id;
+    if (phase) {
+      phase.includesPhase = phase.includesPhase || isPhase;
+    } else {
+      phases.push({ phaseId, includesPhase: isPhase });
+    }
+  });
+  return phases;
+};
+
+// The message with its current children embedded, as the components expect.
+export const resolveMessage = (store, id) => {
+  const node = store.nodes[id];
+  if (!node) {
+    return null;
+  }
+  if (!Array.isArray(node.current_children)) {
+    return node;
+  }
+  return {
+    ...node,
+    current_children: node.current_children
+      .map(childId => resolveMessage(store, childId))
+      .filter(child => child !== null),
+  };
+};
@@ -0,0 +1,70 @@
+import { applyUpdate, createMessageStore, resolveMessage } from './messageStore';
+
+const phase = { message_type: 'PhaseMessage', current_id: '1', phase_id: 'phase' };
+const agent = { message_type: 'AgentMessage', current_id: '2', parent: '1', message: '' };
+const action = { message_type: 'ActionMessage', current_id: '3', parent: '2', message: 'ls' };
+
+describe('messageStore', () => {
+  test('builds the phase tree from delta nodes', () => {
+    const store = createMessageStore();
+    const phases = applyUpdate(store, {
+      message_type: 'delta',
+      seq: 7,
+      nodes: [
+        { ...phase, current_children: ['2'], seq: 7 },
+        { ...agent, current_children: ['3'], seq: 6 },
+        { ...action, seq: 5 },
+      ],
+    });
+
+    expect(phases).toEqual([{ phaseId: '1', includesPhase: true }]);
+    expect(store.seq).toBe(7);
+    expect(resolveMessage(store, '1')).toEqual({
+      ...phase,
+      seq: 7,
+      current_children: [
+        { ...agent, seq: 6, current_children: [{ ...action, seq: 5 }] },
+      ],
+    });
+  });
+
+  test('applies changes below a phase without resending it', () => {
+    const store = createMessageStore();
+    applyUpdate(store, {
+      message_type: 'delta',
+      seq: 7,
+      nodes: [
+        { ...phase, current_children: ['2'], seq: 7 },
+        { ...agent, current_children: ['3'], seq: 6 },
+        { ...action, seq: 5 },
+      ],
+    });
+
+    const phases = applyUpdate(store, {
+      message_type: 'delta',
+      seq: 9,
+      nodes: [
+        { ...agent, current_children: ['3', '4'], seq: 9 },
+        { message_type: 'ActionMessage', current_id: '4', parent: '2', prev: '3', message: 'cat', seq: 8 },
+      ],
+    });
+
+    expect(phases).toEqual([{ phaseId: '1', includesPhase: false }]);
+    expect(store.seq).toBe(9);
+    const actions = resolveMessage(store, '1').current_children[0].current_children;
+    expect(actions.map(a => a.message)).toEqual(['ls', 'cat']);
+  });
+
+  test('splits full messages into nodes', () => {
+    const store = createMessageStore();
+    const phases = applyUpdate(store, {
+      ...phase,
+      current_children: [{ ...agent, current_children: [action] }],
+    });
+
+    expect(phases).toEqual([{ phaseId: '1', includesPhase: true }]);
+    expect(store.nodes['1'].current_children).toEqual(['2']);
+    expect(store.nodes['2'].current_children).toEqual(['3']);
+    expect(store.seq).toBe(0);
+  });
+});
@@ -1,6 +1,7 @@
 import { useState, useEffect, useCallback, useRef } from 'react';
 
 import { WS_BASE_URL } from '../config'; 
+import { applyUpdate, createMessageStore, resolveMessage } from './messageStore';
 
 export const useWorkflowWebSocket = (workflowId, reconnect) => {
   const [isConnected, setIsConnected] = useState(false);
@@ -16,6 +17,7 @@ export const useWorkflowWebSocket = (workflowId, reconnect) => {
   const heartbeatInterval = useRef(null);
   const connectionTimeout = useRef(null);
   const connectionEstablished = useRef(false);
+  const messageStore = useRef(createMessageStore());
 
   const handleUpdatePhaseMessage = useCallback((updatedPhaseMessage) => {
     setCurrentPhase(updatedPhaseMessage);
@@ -45,84 +47,27 @@ export const useWorkflowWebSocket = (workflowId, reconnect) => {
     });
   }, [])
 
-  const handleUpdatedAgentMessage = useCallback((updatedAgentMessage) => {
-    const updatedMessages = Array.isArray(updatedAgentMessage) ? updatedAgentMessage : [updatedAgentMessage];
-    if (!updatedMessages[0].parent) {
-      console.error("Agent should already have parent set");
-      return;
-    }
-
-    setPhaseMessages(prevPhaseMessages => {
-      return prevPhaseMessages.map(phase => {
-        if (phase.current_id === updatedMessages[0].parent) {
-          let updatedAgentMessages = [...(phase.current_children || [])];
-          
-          const newMessage = updatedMessages[0];
-          if (newMessage.prev && updatedAgentMessages.length > 0){
-            const prevIndex = updatedAgentMessages.findIndex(am => am.current_id === newMessage.prev);
-            if (prevIndex !== -1) {
-              // Keep messages up to and including the prev message, then append the new message
-              updatedAgentMessages = [...updatedAgentMessages.slice(0, prevIndex + 1), newMessage];
-            } else {
-              // If prev not found, log for now, this isn't a reasonable scenario
-              console.log(`No prev found for ${newMessage}`);
-            }
-          } else {
-            // If no prev, replace all messages with the new message
-            updatedAgentMessages = [newMessage];
-          }
-          
-          return {
-            ...phase,
-            current_children: updatedAgentMessages
-          };
-        }
-        return phase;
-      });
-    });
+  // Messages below a phase changed: the phase is shown again in place
+  const handleUpdatedChildMessages = useCallback((updatedPhaseMessage) => {
+    setCurrentPhase(prevPhase =>
+      prevPhase?.current_id === updatedPhaseMessage.current_id ? updatedPhaseMessage : prevPhase
+    );
+    setPhaseMessages(prevPhaseMessages => prevPhaseMessages.map(phase =>
+      phase.current_id === updatedPhaseMessage.current_id ? updatedPhaseMessage : phase
+    ));
   }, []);
 
-  const handleUpdatedActionMessage = useCallback((updatedActionMessage) => {
-    const updatedMessages = Array.isArray(updatedActionMessage) ? updatedActionMessage : [updatedActionMessage];
-    if (!updatedMessages[0].parent) {
-      console.error("Action message should already have parent set");
-      return;
-    }
-  
-    setPhaseMessages(prevPhaseMessages => {
-      return prevPhaseMessages.map(phase => {
-        return {
-          ...phase,
-          current_children: (phase.current_children || []).map(agentMessage => {
-            if (agentMessage.current_id === updatedMessages[0].parent) {
-              let updatedActionMessages = [...(agentMessage.current_children || [])];
-              
-              const newMessage = updatedMessages[0];
-              if (newMessage.prev) {
-                const prevIndex = updatedActionMessages.findIndex(am => am.current_id === newMessage.prev);
-                if (prevIndex !== -1) {
-                  // Keep messages up to and including the prev message, then append the new message
-                  updatedActionMessages = [...updatedActionMessages.slice(0, prevIndex + 1), newMessage];
-                } else {
-                  // If prev not found, log for now, this isn't a reasonable scenario
-                  console.log(`No prev found for ${newMessage}`);
-                }
-              } else {
-                // If no prev, replace all messages with the new message
-                updatedActionMessages = [newMessage];
-              }
-              
-              return {
-                ...agentMessage,
-                current_children: updatedActionMessages
-              };
-            }
-            return agentMessage;
-          })
-        };
-      });
+  const handleMessageUpdate = useCallback((update) => {
+    const phases = applyUpdate(messageStore.current, update);
+    phases.forEach(({ phaseId, includesPhase }) => {
+      const phase = resolveMessage(messageStore.current, phaseId);
+      if (includesPhase) {
+        handleUpdatePhaseMessage(phase);
+      } else {
+        handleUpdatedChildMessages(phase);
+      }
     });
-  }, []);
+  }, [handleUpdatePhaseMessage, handleUpdatedChildMessages]);
 
   const handleWebSocketMessage = useCallback((event) => {
     try {
@@ -162,16 +107,11 @@ export const useWorkflowWebSocket = (workflowId, reconnect) => {
             }
             break;
 
+          case 'delta':
           case 'PhaseMessage':
-            handleUpdatePhaseMessage(message);
-            break;
-
           case 'AgentMessage':
-            handleUpdatedAgentMessage(message);
-            break;
-
           case 'ActionMessage':
-            handleUpdatedActionMessage(message);
+            handleMessageUpdate(message);
             break;
 
           case 'workflow_completed':
@@ -187,7 +127,7 @@ export const useWorkflowWebSocket = (workflowId, reconnect) => {
       console.error('Error processing WebSocket message:', err);
       setError('Failed to process workflow update: ' + err.message);
     }
-  }, [handleUpdatePhaseMessage, handleUpdatedAgentMessage, handleUpdatedActionMessage]);
+  }, [handleMessageUpdate]);
 
   const cleanupConnection = useCallback(() => {
     if (heartbeatInterval.current) {
@@ -213,7 +153,9 @@ export const useWorkflowWebSocket = (workflowId, reconnect) => {
     }
     const backoff = Math.min(1000 * Math.pow(2, reconnectAttempts.current), 30000);
     connectionTimeout.current = setTimeout(() => {
-      const wsUrl = `${WS_BASE_URL}/ws/${workflowId}`;
+      // After a reconnect, only what changed since the last update is sent
+      const since = messageStore.current.seq;
+      const wsUrl = `${WS_BASE_URL}/ws/${workflowId}` + (since > 0 ? `?since=${since}` : '');
       ws.current = new WebSocket(wsUrl);
 
       ws.current.onopen = () => {
@@ -223,7 +165,9 @@ export const useWorkflowWebSocket = (workflowId, reconnect) => {
       };
 
       ws.current.onclose = (event) => {
-        if (!event.wasClean) {
+        // 1013: the backend closed a client that fell too far behind, it
+        // catches up on the next connection
+        if (!event.wasClean || event.code === 1013) {
           reconnectAttempts.current += 1;
           connect();
         }
@@ -250,6 +194,7 @@ export const useWorkflowWebSocket = (workflowId, reconnect) => {
 
   useEffect(() => {
     if (workflowId) {
+      messageStore.current = createMessageStore();
       connect();
       return () => {
         cleanupConnection();
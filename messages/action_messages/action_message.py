@@ -4,6 +4,14 @@ from messages.message import Message
 
 
 class ActionMessage(Message):
+    __slots__ = (
+        "_resource_id",
+        "_message",
+        "_additional_metadata",
+        "_memory",
+        "_memory_num_tokens",
+    )
+
     def __init__(
         self,
         resource_id: str,
@@ -19,6 +27,7 @@ class ActionMessage(Message):
             else {}
         )
         self._memory = None
+        self._memory_num_tokens = None
 
         super().__init__(prev)
 
@@ -41,6 +50,7 @@ class ActionMessage(Message):
         Setter for message property.
         """
         self._message = value
+        self._mark_changed()
 
     @property
     def message_type(self) -> str:
@@ -65,6 +75,17 @@ class ActionMessage(Message):
     def memory(self, x: str):
         """This should only be set by the MemoryResource."""
         self._memory = x
+        self._memory_num_tokens = None
+
+    @property
+    def memory_num_tokens(self):
+        """Token count of memory, if the MemoryResource fitted it to a budget."""
+        return self._memory_num_tokens
+
+    @memory_num_tokens.setter
+    def memory_num_tokens(self, x: int):
+        """This should only be set by the MemoryResource, after memory."""
+        self._memory_num_tokens = x
 
     def action_dict(self) -> dict:
         action_dict = {
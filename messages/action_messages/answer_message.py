@@ -4,6 +4,8 @@ from messages.parse_message import parse_field
 
 
 class AnswerMessage(AnswerMessageInterface, ActionMessage):
+    __slots__ = ("_answer",)
+
     def __init__(self, message: str) -> None:
         super().__init__(resource_id="", message=message)
         self._answer = self._parse_answer()
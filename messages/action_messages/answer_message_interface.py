@@ -2,6 +2,8 @@ from abc import ABC
 
 
 class AnswerMessageInterface(ABC):
+    __slots__ = ()
+
     @classmethod
     def __subclasshook__(cls, subclass):
         if cls is AnswerMessageInterface:
@@ -6,6 +6,10 @@ from messages.parse_message import extract_command
 
 
 class CommandMessage(CommandMessageInterface, ActionMessage):
+    # No slots of its own, so that cast_action_to_command can turn an
+    # ActionMessage into a CommandMessage in place
+    __slots__ = ()
+
     def __init__(
         self,
         resource_id: str,
@@ -14,11 +18,12 @@ class CommandMessage(CommandMessageInterface, ActionMessage):
         prev: Optional["ActionMessage"] = None,
     ) -> None:
         super().__init__(resource_id, message, additional_metadata, prev)
-        self._command = self._parse_command()
+        # Fail early if the message has no command
+        self._parse_command()
 
     @property
     def command(self) -> str:
-        return self._command
+        return self._parse_command()
 
     def _parse_command(self) -> str:
         return extract_command(self.message, STOP_TOKEN)
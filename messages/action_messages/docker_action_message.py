@@ -5,6 +5,8 @@ from messages.action_messages.script_action_message import ScriptActionMessage
 
 
 class DockerActionMessage(ScriptActionMessage):
+    __slots__ = ()
+
     def __init__(
         self,
         resource_id: str,
@@ -4,6 +4,8 @@ from messages.action_messages.action_message import ActionMessage
 
 
 class ErrorActionMessage(ActionMessage):
+    __slots__ = ()
+
     def __init__(
         self,
         resource_id: str,
@@ -5,6 +5,17 @@ from messages.message import Message
 
 
 class AgentMessage(Message):
+    __slots__ = (
+        "_message",
+        "_iteration",
+        "_iteration_time_ms",
+        "_complete",
+        "_agent_id",
+        "_action_messages",
+        "_memory",
+        "_memory_num_tokens",
+        "_memory_summary",
+    )
 
     def __init__(
         self,
@@ -19,6 +30,8 @@ class AgentMessage(Message):
         self._agent_id = agent_id
         self._action_messages = []
         self._memory = None
+        self._memory_num_tokens = None
+        self._memory_summary = None
         super().__init__(prev=prev)
 
     @property
@@ -30,6 +43,7 @@ class AgentMessage(Message):
         Setter for message property.
         """
         self._message = value
+        self._mark_changed()
 
     @property
     def iteration(self) -> int:
@@ -82,17 +96,33 @@ class AgentMessage(Message):
             current_message = current_message.get_latest_version()
 
             current_actions.append(current_message)
+            next_message = self.next_child(current_message)
             while (
-                current_message.next
-                and current_message.next.prev
-                and current_message.next.prev.id == current_message.id
+                next_message
+                and next_message.prev
+                and next_message.prev.id == current_message.id
             ):
-                current_message = current_message.next
-                current_message = current_message.get_latest_version()
+                current_message = next_message.get_latest_version()
                 current_actions.append(current_message)
+                next_message = self.next_child(current_message)
 
         return current_actions
 
+    def next_child(self, action_message: ActionMessage) -> Optional[ActionMessage]:
+        """
+        The action after action_message in this agent's chain. Edited versions of
+        an agent share the actions before the edit with the previous version, so
+        the next link of a shared action may lead into the previous version, and
+        this agent's own action following it takes precedence.
+        """
+        next_message = action_message.next
+        if next_message is None or next_message.parent is self:
+            return next_message
+        for child in reversed(self._action_messages):
+            if child.prev is action_message:
+                return child
+        return next_message
+
     @property
     def memory(self):
         return self._memory
@@ -101,24 +131,50 @@ class AgentMessage(Message):
     def memory(self, x: str):
         """This should only be set by the MemoryResource."""
         self._memory = x
+        self._memory_num_tokens = None
+
+    @property
+    def memory_num_tokens(self):
+        """Token count of memory, if the MemoryResource fitted it to a budget."""
+        return self._memory_num_tokens
+
+    @memory_num_tokens.setter
+    def memory_num_tokens(self, x: int):
+        """This should only be set by the MemoryResource, after memory."""
+        self._memory_num_tokens = x
+
+    @property
+    def memory_summary(self) -> Optional[str]:
+        """Summary of the entries memory truncation dropped, if it was compacted."""
+        return self._memory_summary
+
+    @memory_summary.setter
+    def memory_summary(self, x: Optional[str]):
+        """This should only be set by the MemoryResource."""
+        self._memory_summary = x
 
     def add_child_message(self, action_message: ActionMessage):
         self._action_messages.append(action_message)
         action_message.set_parent(self)
         from messages.message_utils import log_message
 
-        log_message(action_message)
+        log_message(action_message, broadcast=False)
         log_message(self)
 
+    def add_shared_child_messages(self, action_messages: List[ActionMessage]):
+        """
+        Add actions of a previous version of this agent. They are shared rather
+        than copied, and keep their parent.
+        """
+        self._action_messages.extend(action_messages)
+        self._mark_changed()
+
     def to_broadcast_dict(self) -> dict:
         base_dict = super().to_broadcast_dict()
         broadcast_dict = {
             "agent_id": self.agent_id,
             "message": self.message,
-            "current_children": [
-                action_message.to_broadcast_dict()
-                for action_message in self.current_children
-            ],
+            "current_children": self._broadcast_children(self.current_children),
             "iteration": self.iteration,
             "iteration_time_ms": self.iteration_time_ms,
         }
@@ -142,5 +198,7 @@ class AgentMessage(Message):
             "iteration_time_ms": self.iteration_time_ms,
             "complete": self.complete,
         }
+        if self.memory_summary is not None:
+            log_dict["memory_summary"] = self.memory_summary
         log_dict.update(base_dict)
         return log_dict
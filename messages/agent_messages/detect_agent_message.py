@@ -2,6 +2,11 @@ from messages.agent_messages.agent_message import AgentMessage
 
 
 class DetectAgentMessage(AgentMessage):
+    __slots__ = (
+        "_success",
+        "_submission",
+    )
+
     def __init__(
         self,
         agent_id: str,
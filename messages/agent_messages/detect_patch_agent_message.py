@@ -2,6 +2,12 @@ from messages.agent_messages.agent_message import AgentMessage
 
 
 class DetectPatchAgentMessage(AgentMessage):
+    __slots__ = (
+        "_success",
+        "_patch_files_dir",
+        "_submission",
+    )
+
     def __init__(
         self,
         agent_id: str,
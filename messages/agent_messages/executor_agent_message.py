@@ -3,6 +3,8 @@ from messages.agent_messages.agent_message import AgentMessage
 
 
 class ExecutorAgentMessage(AgentMessage):
+    __slots__ = ("_submission",)
+
     def __init__(
         self,
         agent_id: str,
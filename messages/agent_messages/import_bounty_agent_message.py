@@ -2,6 +2,12 @@ from typing import Any, Dict, List
 from messages.agent_messages.agent_message import AgentMessage
 
 class ImportBountyMessage(AgentMessage):
+    __slots__ = (
+        "_success",
+        "_bounty_links",
+        "_bounty_dirs",
+    )
+
     def __init__(
         self,
         agent_id: str,
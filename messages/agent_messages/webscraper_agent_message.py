@@ -2,6 +2,11 @@ from messages.agent_messages.agent_message import AgentMessage
 from typing import List
 
 class WebscraperMessage(AgentMessage):
+    __slots__ = (
+        "_bounty_links",
+        "_website",
+    )
+
     def __init__(self, agent_id: str, message: str, website: str, bounty_links: List[str], prev: AgentMessage = None) -> None:
         if bounty_links is None:
             raise ValueError("bounty_links cannot be None")
@@ -4,6 +4,13 @@ from messages.message import Message
 
 
 class ErrorMessage(Message):
+    __slots__ = (
+        "_message",
+        "_answer",
+        "_error",
+        "_metadata",
+    )
+
     def __init__(
         self, answer: str, error: bool, metadata: Optional[dict] = None
     ) -> None:
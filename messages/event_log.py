@@ -0,0 +1,106 @@
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, Optional
+
+from messages.message import Message
+from messages.serialization import serializer
+
+# Child lists that are logged as ids, since each child has events of its own
+CHILD_LIST_KEYS = ("phase_messages", "agent_messages")
+# Keys of a message record that refer to other messages by id
+MESSAGE_LINK_KEYS = (
+    "current_id",
+    "prev",
+    "next",
+    "version_prev",
+    "version_next",
+    "parent",
+)
+
+
+class MessageEventLog:
+    """
+    Append-only JSONL log of the messages of a workflow.
+
+    Every time a message is created or changes, one line with its current state
+    is appended, so each write costs the size of that message rather than the
+    size of the whole run. Phase messages list the ids of their agent messages,
+    which have lines of their own. The last line of a message id is its latest
+    state, and the nested workflow log is materialized from the message tree by
+    WorkflowMessage.save at the end of the run.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        header: Optional[Callable[[], Dict[str, Any]]] = None,
+    ):
+        self.path = Path(path)
+        self.header = header
+        self.bytes_written = 0
+        self._file: Optional[IO[bytes]] = None
+
+    def append(self, message: Message) -> None:
+        record = message.to_log_dict()
+        for key in CHILD_LIST_KEYS:
+            if record.get(key):
+                record[key] = [child["current_id"] for child in record[key]]
+        if message.parent is not None:
+            record["parent"] = message.parent.id
+        self._write({"event": "message", "message": record})
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, event: Dict[str, Any]) -> None:
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "ab")
+            if self.header is not None:
+                self._write_line({"event": "workflow", "workflow": self.header()})
+        self._write_line(event)
+
+    def _write_line(self, event: Dict[str, Any]) -> None:
+        line = serializer.dumps(event) + b"\n"
+        self._file.write(line)
+        # Flushed per event, so a crashed run keeps everything logged so far
+        self._file.flush()
+        self.bytes_written += len(line)
+
+
+def read_events(path: Path) -> Iterator[Dict[str, Any]]:
+    """Events of an event log, skipping a last line cut short by a crash."""
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                yield serializer.loads(line)
+            except ValueError:
+                if line.endswith(b"\n"):
+                    raise
+
+
+def normalize_message_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Bring a logged message record, and the records nested in it, to the current
+    format in place. Older logs wrote version links as the integer id() of the
+    linked message, whose string form was that message's current_id.
+    """
+    for key in MESSAGE_LINK_KEYS:
+        if isinstance(record.get(key), int):
+            record[key] = str(record[key])
+    for key in CHILD_LIST_KEYS + ("action_messages",):
+        for child in record.get(key) or ():
+            if isinstance(child, dict):
+                normalize_message_record(child)
+    return record
+
+
+def latest_message_records(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Latest logged state of each message in an event log, by message id."""
+    records = {}
+    for event in read_events(path):
+        if event["event"] == "message":
+            record = normalize_message_record(event["message"])
+            records[record["current_id"]] = record
+    return records
@@ -2,6 +2,11 @@ from messages.message import Message
 
 
 class FailureMessage(Message):
+    __slots__ = (
+        "_failure_reason",
+        "_message",
+    )
+
     def __init__(self, message: str) -> None:
         self._failure_reason = message
         self._message = "Failure Message"
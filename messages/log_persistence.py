@@ -0,0 +1,214 @@
+import asyncio
+import itertools
+import os
+import tempfile
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from concurrent.futures import wait as wait_futures
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from messages.serialization import serializer
+from utils.logger import get_main_logger
+
+logger = get_main_logger(__name__)
+
+DEFAULT_MAX_LOG_STALENESS = 5.0  # Seconds a change may wait before it is saved
+# How often the worker checks for a stop while the event loop takes a snapshot
+SNAPSHOT_POLL_INTERVAL = 0.1
+
+# A snapshot of the log and its number, later snapshots have larger numbers
+Snapshot = Tuple[int, Dict[str, Any]]
+
+_persisters: "weakref.WeakSet[LogPersister]" = weakref.WeakSet()
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """
+    Write data to path through a temporary file and a rename, so that path
+    always holds either the previous or the new complete log.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+class LogPersister:
+    """
+    Background worker that saves the latest state of a workflow log.
+
+    request() only marks the log as changed. At most max_staleness seconds
+    later a snapshot of the log is taken on the event loop that made the
+    change, the only thread that modifies the message tree, and the worker
+    thread serializes and writes it. Any number of changes in between cost one
+    snapshot and one write. Without an event loop, e.g. in scripts, request()
+    takes the snapshot itself. flush() saves pending changes right away, in
+    the calling thread, e.g. at the end of a run.
+    """
+
+    def __init__(
+        self,
+        get_path: Callable[[], Path],
+        get_snapshot: Callable[[], Dict[str, Any]],
+        max_staleness: float = DEFAULT_MAX_LOG_STALENESS,
+    ):
+        self.get_path = get_path
+        self.get_snapshot = get_snapshot
+        self.max_staleness = max_staleness
+        self.saves = 0
+
+        self._condition = threading.Condition()
+        self._dirty_since: Optional[float] = None
+        # The event loop of the latest request, snapshots are taken on it
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Taken by request() while there is no event loop
+        self._snapshot: Optional[Snapshot] = None
+        self._snapshot_numbers = itertools.count(1)
+        self._written = 0
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        # One save at a time. Reentrant, as a signal handler may flush while
+        # the main thread is saving
+        self._save_lock = threading.RLock()
+        _persisters.add(self)
+
+    def request(self) -> None:
+        """Schedule a save of the current state."""
+        loop = _running_loop()
+        snapshot = None
+        if loop is None and self._loop is None:
+            snapshot = self._take_snapshot()
+        with self._condition:
+            if loop is not None:
+                self._loop = loop
+            if snapshot is not None:
+                self._snapshot = snapshot
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+            if self._stopped:
+                # Saved by the next flush
+                return
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="log-persister", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def flush(self) -> None:
+        """Save pending changes now."""
+        with self._save_lock:
+            with self._condition:
+                pending = self._dirty_since is not None
+                self._dirty_since = None
+                self._snapshot = None
+            if pending:
+                self._write(self._take_snapshot())
+
+    def stop(self) -> None:
+        """Save pending changes and stop the worker."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._dirty_since is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                # Let changes coalesce until the oldest one is max_staleness old
+                deadline = self._dirty_since + self.max_staleness
+                while not self._stopped and self._dirty_since is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._stopped:
+                    return
+                if self._dirty_since is None:
+                    # Flushed in the meantime
+                    continue
+                loop = self._loop
+                snapshot = self._snapshot
+                if loop is None:
+                    self._dirty_since = None
+                    self._snapshot = None
+            try:
+                if loop is not None:
+                    snapshot = self._snapshot_on(loop)
+                if snapshot is not None:
+                    self._write(snapshot)
+            except Exception as e:
+                logger.error(f"Failed to save workflow log: {e}")
+
+    def _snapshot_on(self, loop: asyncio.AbstractEventLoop) -> Optional[Snapshot]:
+        """Take a snapshot of pending changes on loop, and wait for it."""
+        result: Future = Future()
+
+        def take() -> None:
+            if not result.set_running_or_notify_cancel():
+                return
+            try:
+                with self._condition:
+                    pending = self._dirty_since is not None
+                    self._dirty_since = None
+                result.set_result(self._take_snapshot() if pending else None)
+            except BaseException as e:
+                result.set_exception(e)
+
+        if loop.is_closed():
+            # Nothing changes the message tree any more
+            take()
+        else:
+            loop.call_soon_threadsafe(take)
+        while not wait_futures([result], timeout=SNAPSHOT_POLL_INTERVAL).done:
+            if (self._stopped or loop.is_closed()) and result.cancel():
+                # Pending changes are saved by the next flush
+                return None
+        return result.result()
+
+    def _take_snapshot(self) -> Snapshot:
+        return next(self._snapshot_numbers), self.get_snapshot()
+
+    def _write(self, snapshot: Snapshot) -> None:
+        number, log = snapshot
+        with self._save_lock:
+            if number < self._written:
+                # A later snapshot was flushed in the meantime
+                return
+            write_atomic(self.get_path(), serializer.dumps(log, indent=True))
+            self._written = number
+            self.saves += 1
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def flush_all() -> None:
+    """Save the pending changes of every workflow log, e.g. on a signal."""
+    for persister in list(_persisters):
+        try:
+            persister.flush()
+        except Exception as e:
+            logger.error(f"Failed to save workflow log: {e}")
@@ -1,11 +1,89 @@
+import itertools
 import time
 from abc import ABC
-from typing import List
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+# Message ids are assigned in creation order and never reused, so the ids of a
+# workflow increase monotonically and stay unique across the workflows of a
+# process, unlike id(), which is recycled once a message is garbage collected
+_message_ids = itertools.count(1)
+
+
+def next_message_id() -> str:
+    return str(next(_message_ids))
+
+
+# Revisions are drawn from one counter, so that a revision is also a sequence
+# number: everything that changed after revision r has a larger revision, which
+# lets UI clients catch up from the last revision they saw
+_revisions = itertools.count(1)
+
+
+# Set while to_node_dict runs, messages then list their children by id
+_children_as_ids: ContextVar[bool] = ContextVar("children_as_ids", default=False)
+
+
+class VersionLineage:
+    """
+    The versions of a message, oldest first, shared by all of them, so that the
+    latest version and the version ids are found without walking the chain.
+    Messages that were never edited have no lineage.
+
+    Editing an older version starts a new lineage for the versions reachable
+    from the edit. All lineages of one version tree share ``tree``.
+    """
+
+    __slots__ = ("messages", "ids", "tree")
+
+    def __init__(
+        self,
+        messages: List["Message"],
+        tree: Optional[List["VersionLineage"]] = None,
+    ) -> None:
+        self.messages = messages
+        self.ids = [message.id for message in messages]
+        self.tree = tree if tree is not None else []
+        self.tree.append(self)
+
+    @property
+    def latest(self) -> "Message":
+        return self.messages[-1]
+
+    def append(self, message: "Message") -> None:
+        self.messages.append(message)
+        self.ids.append(message.id)
+
+    def prepend(self, messages: List["Message"]) -> None:
+        self.messages[:0] = messages
+        self.ids[:0] = [message.id for message in messages]
 
 
 class Message(ABC):
+    # Messages are created for every model call and command output, so they are
+    # slotted, and subclasses declare __slots__ for the attributes they add
+    __slots__ = (
+        "_revision",
+        "_changed_children",
+        "_prev",
+        "_next",
+        "_version_prev",
+        "_version_next",
+        "_lineage",
+        "_parent",
+        "_created_at",
+        "_id",
+        "__weakref__",
+    )
 
     def __init__(self, prev: "Message" = None) -> None:
+        # Bumped whenever this message or anything below it changes, see _mark_changed
+        self._revision = next(_revisions)
+        # Allocated on the first changed child, most messages are leaves
+        self._changed_children = None
+
         self._prev = prev
         if prev is not None and hasattr(prev, "set_next"):
             prev.set_next(self)
@@ -13,10 +91,12 @@ class Message(ABC):
         self._next = None
         self._version_prev = None
         self._version_next = None
+        self._lineage = None
         self._parent = None
 
-        self.timestamp = time.strftime("%Y-%m-%dT%H:%M:%S%z")
-        self._id = str(id(self))
+        # Kept as a float and only formatted when the message is serialized
+        self._created_at = time.time()
+        self._id = next_message_id()
         self._set_parent_from_context()
 
     def _set_parent_from_context(self):
@@ -44,45 +124,119 @@ class Message(ABC):
         return self._version_next
 
     def get_latest_version(self):
-        message = self
-        while message.version_next:
-            message = message.version_next
-        return message
+        if self._lineage is None:
+            return self
+        return self._lineage.latest
 
     @property
     def id(self) -> str:
         return self._id
 
+    @property
+    def created_at(self) -> float:
+        return self._created_at
+
+    @property
+    def timestamp(self) -> str:
+        return time.strftime(TIMESTAMP_FORMAT, time.localtime(self._created_at))
+
     @property
     def parent(self) -> str:
         return self._parent
 
     def set_parent(self, parent: "Message") -> None:
+        old_parent = self._parent
         self._parent = parent
+        if old_parent is not None and old_parent is not parent:
+            old_parent._mark_changed(self)
+        if parent is not None:
+            parent._mark_changed(self)
 
     def set_prev(self, prev: "Message") -> None:
         self._prev = prev
 
     def set_next(self, next: "Message") -> None:
         self._next = next
+        self._mark_changed()
 
     def set_version_prev(self, version_prev: "Message") -> None:
         self._version_prev = version_prev
         version_prev._version_next = self
+        self._update_lineage(version_prev)
+        version_prev._mark_changed()
+        self._mark_changed()
+
+    def _update_lineage(self, version_prev: "Message") -> None:
+        lineage = version_prev._lineage
+        if lineage is None:
+            lineage = version_prev._lineage = VersionLineage([version_prev])
+        if self._lineage is None and lineage.latest is version_prev:
+            # A new latest version, the common case
+            lineage.append(self)
+            self._lineage = lineage
+            return
+
+        # Versions after version_prev are cut off from it and keep their
+        # lineage, which still matches their own links
+        prefix = lineage.messages[: _index_of(lineage.messages, version_prev) + 1]
+        old_lineage = lineage
+        if self._lineage is None:
+            # Branching off an older version
+            lineage = VersionLineage(prefix + [self], lineage.tree)
+            self._lineage = lineage
+        else:
+            # Linking the start of another version tree: all of its branches
+            # now continue the versions up to version_prev
+            tree = lineage.tree
+            for branch in self._lineage.tree:
+                branch.prepend(prefix)
+                branch.tree = tree
+                tree.append(branch)
+            lineage = self._lineage
+        # Earlier versions that were already edited elsewhere keep their lineage
+        for message in prefix:
+            if message._lineage is old_lineage:
+                message._lineage = lineage
+
+    @property
+    def revision(self) -> int:
+        return self._revision
+
+    def changed_children_since(self, revision: int) -> List["Message"]:
+        """
+        Children that changed after revision, oldest change first. Readers such
+        as the memory index keep the revision of this message they last saw.
+        """
+        if not self._changed_children:
+            return []
+        changed = []
+        # Ordered by last change, so the children changed after revision are
+        # at the end
+        for child, child_revision in reversed(self._changed_children.items()):
+            if child_revision <= revision:
+                break
+            changed.append(child)
+        changed.reverse()
+        return changed
+
+    def _mark_changed(self, child: "Message" = None) -> None:
+        """Record a change to this message, or to child, and notify the ancestors."""
+        self._revision = next(_revisions)
+        if child is not None:
+            # One entry per child, however often it changes
+            if self._changed_children is None:
+                self._changed_children = {}
+            self._changed_children.pop(child, None)
+            self._changed_children[child] = self._revision
+        if self._parent is not None:
+            self._parent._mark_changed(self)
 
     @property
     def versions(self) -> List[str]:
-        message = self
-        versions = [message.id]
-        while message.version_prev:
-            message = message.version_prev
-            versions.insert(0, message.id)
-        message = self
-        while message.version_next:
-            message = message.version_next
-            versions.append(message.id)
-
-        return versions
+        """Ids of all versions of this message, oldest first. Do not modify."""
+        if self._lineage is None:
+            return [self.id]
+        return self._lineage.ids
 
     @property
     def message_type(self) -> str:
@@ -103,9 +257,9 @@ class Message(ABC):
         if self.next is not None:
             result["next"] = self.next.id
         if self.version_prev is not None:
-            result["version_prev"] = id(self.version_prev)
+            result["version_prev"] = self.version_prev.id
         if self.version_next is not None:
-            result["version_next"] = id(self.version_next)
+            result["version_next"] = self.version_next.id
         result["timestamp"] = self.timestamp
         return result
 
@@ -113,11 +267,32 @@ class Message(ABC):
         base_dict = self.to_base_dict()
         if self.parent is not None:
             base_dict["parent"] = self.parent.id
-        if len(self.versions) > 1:
+        if self._lineage is not None:
             base_dict["versions"] = self.versions
 
         return base_dict
 
+    def to_node_dict(self) -> dict:
+        """
+        to_broadcast_dict without the subtree: the current children of the
+        message are listed by id rather than embedded, for delta updates.
+        """
+        token = _children_as_ids.set(True)
+        try:
+            return self.to_broadcast_dict()
+        finally:
+            _children_as_ids.reset(token)
+
+    def _broadcast_children(self, children: List["Message"]) -> list:
+        if _children_as_ids.get():
+            return [child.id for child in children]
+        return [child.to_broadcast_dict() for child in children]
+
     def to_log_dict(self) -> dict:
         log_dict = self.to_base_dict()
         return log_dict
+
+
+def _index_of(messages: List[Message], message: Message) -> int:
+    # By identity, messages do not define __eq__ but may in subclasses
+    return next(i for i, other in enumerate(messages) if other is message)
@@ -0,0 +1,83 @@
+from typing import Dict, Iterable, List
+
+from messages.message import Message
+from messages.message_dict import message_dict
+
+DELTA_MESSAGE_TYPE = "delta"
+
+
+def _children(message: Message) -> List[Message]:
+    return getattr(message, "current_children", None) or []
+
+
+def delta_frame(nodes: List[dict]) -> dict:
+    """
+    A delta update: the nodes of the message tree that are new or changed, see
+    Message.to_node_dict, and the sequence number clients resume from.
+    """
+    return {
+        "message_type": DELTA_MESSAGE_TYPE,
+        "seq": max((node["seq"] for node in nodes), default=0),
+        "nodes": nodes,
+    }
+
+
+def node_dict(message: Message) -> dict:
+    node = message.to_node_dict()
+    node["seq"] = message.revision
+    return node
+
+
+class DeltaTracker:
+    """
+    Revisions of the messages of one workflow last sent to its clients, so that
+    an update only carries the part of a subtree that changed since.
+    """
+
+    def __init__(self):
+        self._sent: Dict[str, int] = {}
+
+    def build(self, message: Message) -> dict:
+        """Delta update for message, and whatever changed below it."""
+        nodes = []
+        self._collect(message, nodes, force=True)
+        return delta_frame(nodes)
+
+    def _collect(self, message: Message, nodes: List[dict], force: bool) -> None:
+        # A change anywhere below a message bumps its revision, so subtrees
+        # whose root is unchanged are skipped whole
+        if not force and self._sent.get(message.id) == message.revision:
+            return
+        nodes.append(node_dict(message))
+        self._sent[message.id] = message.revision
+        for child in _children(message):
+            self._collect(child, nodes, force=False)
+
+
+def catch_up(roots: Iterable[Message], since: int = 0) -> dict:
+    """
+    Delta update for a client that has seen everything up to sequence number
+    since, with everything below roots that changed after it.
+    """
+    nodes = []
+    stack = list(reversed(list(roots)))
+    while stack:
+        message = stack.pop()
+        if message.revision <= since:
+            continue
+        nodes.append(node_dict(message))
+        stack.extend(reversed(_children(message)))
+    return delta_frame(nodes)
+
+
+_trackers: Dict[str, DeltaTracker] = {}
+
+
+def delta_tracker(workflow_id: str) -> DeltaTracker:
+    tracker = _trackers.get(workflow_id)
+    if tracker is None:
+        tracker = _trackers[workflow_id] = DeltaTracker()
+    return tracker
+
+
+message_dict.add_eviction_listener(lambda workflow_id: _trackers.pop(workflow_id, None))
@@ -1,6 +1,167 @@
-from typing import Dict
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, MutableMapping, Optional, Tuple
 
+from messages.log_persistence import write_atomic
 from messages.message import Message
+from messages.serialization import serializer
+from utils.logger import get_main_logger
 
-# Dict of workflow_id -> Dict of message_id -> Message
-message_dict: Dict[str, Dict[str, Message]] = {}
+logger = get_main_logger(__name__)
+
+# Closed workflows kept in memory before the least recently used is archived
+DEFAULT_MAX_CLOSED_WORKFLOWS = 16
+DEFAULT_ARCHIVE_DIR = Path("logs") / "archived_workflows"
+
+
+class MessageRegistry(MutableMapping):
+    """
+    Dict of workflow_id -> Dict of message_id -> Message, with a lifecycle.
+
+    Workflows are open while they run. Once close_workflow is called they can
+    no longer change, and when more than max_closed_workflows are closed, the
+    least recently used one is archived: what the UI shows of it is written to
+    archive_dir, and its messages are dropped from memory. load_archived reads
+    an archived workflow back when the UI asks for it.
+    """
+
+    def __init__(
+        self,
+        max_closed_workflows: int = DEFAULT_MAX_CLOSED_WORKFLOWS,
+        archive_dir: Path = DEFAULT_ARCHIVE_DIR,
+    ):
+        self.max_closed_workflows = max_closed_workflows
+        self.archive_dir = Path(archive_dir)
+        self._workflows: Dict[str, Dict[str, Message]] = {}
+        # Closed workflows, least recently used first
+        self._closed: "OrderedDict[str, None]" = OrderedDict()
+        self._archived: Dict[str, Path] = {}
+        # Size of each archive, recorded when it is written
+        self._archive_bytes: Dict[str, int] = {}
+        self._eviction_listeners: List[Callable[[str], None]] = []
+        self._lock = threading.RLock()
+
+    def configure(
+        self,
+        max_closed_workflows: Optional[int] = None,
+        archive_dir: Optional[Path] = None,
+    ) -> None:
+        with self._lock:
+            if max_closed_workflows is not None:
+                self.max_closed_workflows = max_closed_workflows
+            if archive_dir is not None:
+                self.archive_dir = Path(archive_dir)
+            self._evict()
+
+    def __getitem__(self, workflow_id: str) -> Dict[str, Message]:
+        with self._lock:
+            messages = self._workflows[workflow_id]
+            if workflow_id in self._closed:
+                self._closed.move_to_end(workflow_id)
+            return messages
+
+    def __setitem__(self, workflow_id: str, messages: Dict[str, Message]) -> None:
+        with self._lock:
+            self._closed.pop(workflow_id, None)
+            self._archived.pop(workflow_id, None)
+            self._archive_bytes.pop(workflow_id, None)
+            self._workflows[workflow_id] = messages
+
+    def __delitem__(self, workflow_id: str) -> None:
+        with self._lock:
+            del self._workflows[workflow_id]
+            self._closed.pop(workflow_id, None)
+
+    def __iter__(self) -> Iterator[str]:
+        # Over a copy, workflows may be added or archived meanwhile
+        with self._lock:
+            return iter(list(self._workflows))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._workflows)
+
+    def add_eviction_listener(self, listener: Callable[[str], None]) -> None:
+        """Call listener with the workflow id of every workflow archived."""
+        self._eviction_listeners.append(listener)
+
+    def close_workflow(self, workflow_id: str) -> None:
+        """Mark a workflow as finished, so that it may be archived."""
+        with self._lock:
+            if workflow_id not in self._workflows:
+                return
+            self._closed[workflow_id] = None
+            self._closed.move_to_end(workflow_id)
+            self._evict()
+
+    def reopen_workflow(self, workflow_id: str) -> bool:
+        """Keep a closed workflow in memory again, e.g. when it is restarted."""
+        with self._lock:
+            self._closed.pop(workflow_id, None)
+            return workflow_id in self._workflows
+
+    def is_closed(self, workflow_id: str) -> bool:
+        return workflow_id in self._closed
+
+    def is_archived(self, workflow_id: str) -> bool:
+        return workflow_id in self._archived
+
+    def load_archived(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        """The archived view of a workflow, see _archive, if it was archived."""
+        path = self._archived.get(workflow_id)
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            return serializer.loads(f.read())
+
+    def counts(self) -> Dict[str, int]:
+        """Number of workflows in each state, of messages, and archive size."""
+        with self._lock:
+            return {
+                "open_workflows": len(self._workflows) - len(self._closed),
+                "closed_workflows": len(self._closed),
+                "archived_workflows": len(self._archived),
+                "messages": sum(len(messages) for messages in self._workflows.values()),
+                "archive_bytes": sum(self._archive_bytes.values()),
+            }
+
+    def _evict(self) -> None:
+        failed = []
+        while len(self._closed) > self.max_closed_workflows:
+            workflow_id, _ = self._closed.popitem(last=False)
+            try:
+                path, size = self._archive(workflow_id)
+            except Exception as e:
+                logger.error(f"Failed to archive workflow {workflow_id}: {e}")
+                failed.append(workflow_id)
+                continue
+            self._archived[workflow_id] = path
+            self._archive_bytes[workflow_id] = size
+            del self._workflows[workflow_id]
+            for listener in self._eviction_listeners:
+                listener(workflow_id)
+        # Kept in memory and closed, as the least recently used, so archiving
+        # them is tried again first on the next eviction
+        for workflow_id in reversed(failed):
+            self._closed[workflow_id] = None
+            self._closed.move_to_end(workflow_id, last=False)
+
+    def _archive(self, workflow_id: str) -> Tuple[Path, int]:
+        workflow_message = self._workflows[workflow_id].get(workflow_id)
+        phase_messages = getattr(workflow_message, "phase_messages", [])
+        archived = {
+            "workflow_id": workflow_id,
+            "complete": getattr(workflow_message, "complete", False),
+            "success": getattr(workflow_message, "success", False),
+            "phase_messages": [
+                phase_message.to_broadcast_dict() for phase_message in phase_messages
+            ],
+        }
+        path = self.archive_dir / f"{workflow_id}.json"
+        data = serializer.dumps(archived)
+        write_atomic(path, data)
+        return path, len(data)
+
+
+message_dict = MessageRegistry()
@@ -1,5 +1,6 @@
 import inspect
-from typing import Optional
+from functools import lru_cache
+from typing import List, Optional, Tuple
 
 from agents.agent_manager import AgentManager
 from messages.action_messages.action_message import ActionMessage
@@ -12,6 +13,14 @@ from utils.logger import get_main_logger
 logger = get_main_logger(__name__)
 
 
+@lru_cache(maxsize=None)
+def _constructor_params(cls: type) -> Tuple[str, ...]:
+    """Constructor parameters of a message class, which clones copy from its slots."""
+    return tuple(
+        name for name in inspect.signature(cls.__init__).parameters if name != "self"
+    )
+
+
 class MessageHandler:
     def __init__(self, agent_manager: AgentManager, resource_manager: ResourceManager):
         self.agent_manager = agent_manager
@@ -37,13 +46,12 @@ class MessageHandler:
         self, old_message: ActionMessage, input_message: Message
     ) -> Message:
         # Ensure we start with the "latest version" of old_message
-        while old_message.version_next:
-            old_message = old_message.version_next
+        old_message = old_message.get_latest_version()
 
         # Also grab the final version of the parent, if it has one
         parent_message = old_message.parent
-        while parent_message and parent_message.version_next:
-            parent_message = parent_message.version_next
+        if parent_message:
+            parent_message = parent_message.get_latest_version()
 
         # Run the resource again
         resource = self.resource_manager.get_resource(old_message.resource_id)
@@ -90,14 +98,13 @@ class MessageHandler:
     ) -> Message:
         if not old_message:
             raise ValueError("Trying to clone None Messasge")
-        dic = old_message.__dict__
         cls = type(old_message)
-        init_method = cls.__init__
-        signature = inspect.signature(init_method)
         params = {}
-        for name, param in signature.parameters.items():
-            if "_" + name in dic:
-                params[name] = dic["_" + name]
+        # Messages are slotted, so attributes are looked up rather than read
+        # from __dict__
+        for name in _constructor_params(cls):
+            if hasattr(old_message, "_" + name):
+                params[name] = getattr(old_message, "_" + name)
 
         params["prev"] = prev
         params["message"] = edit if edit else params["message"]
@@ -117,23 +124,26 @@ class MessageHandler:
         self.update_version_links(parent_message, new_parent_message)
         logger.info(f"new_parent_message next: {parent_message.next}")
 
-        new_prev_action = self._clone_action_chain(
-            parent_message.current_children, old_message, new_parent_message
-        )
-        new_message = self._clone_message(old_message, edit=edit, prev=new_prev_action)
+        # The actions before the edited one are unchanged, so the new version of
+        # the agent shares them with the old one, and only the edit is new
+        shared_actions = self._preceding_actions(parent_message, old_message)
+        new_parent_message.add_shared_child_messages(shared_actions)
+        new_message = self._clone_message(old_message, edit=edit)
+        # Linked back only, the shared action keeps its next in the old version
+        new_message.set_prev(shared_actions[-1] if shared_actions else None)
 
         # Maintain the next link so workflow can handle the run message
         if old_message.next:
             new_message.set_next(old_message.next)
-        logger.info(
-            f"new_parent_message current children: {new_parent_message.current_children}"
-        )
         self.update_version_links(
             old_message,
             new_message,
             set_version=False,
             parent_message=new_parent_message,
         )
+        logger.info(
+            f"new_parent_message current children: {new_parent_message.current_children}"
+        )
 
         logger.info(
             f"Parent AgentMessage edited, ID: {old_message.id} to ID: {new_message.id}"
@@ -141,40 +151,25 @@ class MessageHandler:
         logger.info(f"new_message: {new_message}")
         return new_message
 
-    def _clone_action_chain(
-        self,
-        actions_list: list[ActionMessage],
-        old_message: ActionMessage,
-        new_parent: AgentMessage,
-    ) -> Message:
-        if not actions_list:
-            return None
-
-        prev_action = actions_list[0]
-        if prev_action == old_message:
-            return None
-
-        new_prev_action = self._clone_message(prev_action)
-        self.update_version_links(
-            prev_action, new_prev_action, set_version=False, parent_message=new_parent
-        )
+    def _preceding_actions(
+        self, parent_message: AgentMessage, old_message: ActionMessage
+    ) -> List[ActionMessage]:
+        preceding_actions = []
+        for action in parent_message.current_children:
+            if action is old_message:
+                break
+            preceding_actions.append(action)
+        return preceding_actions
 
-        while prev_action.next and prev_action.next != old_message:
-            new_action = self._clone_message(prev_action.next, prev=new_prev_action)
-            self.update_version_links(
-                prev_action.next,
-                new_action,
-                set_version=False,
-                parent_message=new_parent,
-            )
-            prev_action = prev_action.next
-            new_prev_action = new_prev_action.next
+    async def edit_message(self, old_message: Message, edit: str) -> Message:
+        from messages.message_utils import batch_broadcasts
 
-        return new_prev_action
+        # An edit links several messages, the phase is broadcast once at the end
+        with batch_broadcasts():
+            return self._edit_message(old_message, edit)
 
-    async def edit_message(self, old_message: Message, edit: str) -> Message:
-        while old_message.version_next:
-            old_message = old_message.version_next
+    def _edit_message(self, old_message: Message, edit: str) -> Message:
+        old_message = old_message.get_latest_version()
 
         logger.info(f"Latest version before edit: {old_message.id}")
 
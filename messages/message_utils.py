@@ -1,8 +1,11 @@
-import asyncio
-from typing import List
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from typing import Dict, Optional
 
 from messages.config import MessageType, set_logging_level, should_log
 from messages.message import Message
+from messages.message_delta import delta_tracker
 from messages.message_dict import message_dict
 from utils.logger import get_main_logger
 from utils.websocket_manager import websocket_manager
@@ -13,36 +16,66 @@ logger = get_main_logger(__name__)
 set_logging_level(MessageType.AGENT)
 
 
-def broadcast_update(messages):
-    """Send an update over WebSocket."""
-    if not isinstance(messages, list):
-        messages = [messages]
+# Messages broadcast inside a batch_broadcasts block, by id, sent when it exits
+_broadcast_batch: ContextVar[Optional[Dict[str, Message]]] = ContextVar(
+    "broadcast_batch", default=None
+)
 
-    data_list = [msg.to_broadcast_dict() for msg in messages]
-    # Assume all messages are for the same workflow
-    workflow_id = messages[0].workflow_id
 
+@contextmanager
+def batch_broadcasts():
+    """
+    Collect the updates broadcast inside the block and send each message once,
+    in its final state, when the outermost block exits.
+    """
+    if _broadcast_batch.get() is not None:
+        yield
+        return
+
+    batch = {}
+    token = _broadcast_batch.set(batch)
     try:
-        loop = asyncio.get_running_loop()
-
-        if not loop.is_running():
-            result = asyncio.run(_broadcast_update_async(workflow_id, data_list))
-            return result
-        else:
-            task = asyncio.create_task(_broadcast_update_async(workflow_id, data_list))
-            return task
-    except Exception as e:
-        logger.error(f"Exception: {e}")
+        yield
+    finally:
+        _broadcast_batch.reset(token)
+        by_workflow = {}
+        for message in batch.values():
+            by_workflow.setdefault(message.workflow_id, []).append(message)
+        for messages in by_workflow.values():
+            broadcast_update(messages)
 
 
-async def _broadcast_update_async(workflow_id: str, data_list: List[dict]):
+def broadcast_update(messages):
+    """
+    Send an update over WebSocket. Updates are coalesced per message and sent
+    in batches, see WebSocketManager.queue_broadcast, and carry only what
+    changed since the last update, see DeltaTracker.
+    """
+    if not isinstance(messages, list):
+        messages = [messages]
+
+    batch = _broadcast_batch.get()
+    if batch is not None:
+        for message in messages:
+            batch[message.id] = message
+        return
+
     try:
-        await websocket_manager.broadcast(workflow_id, data_list)
+        for message in messages:
+            websocket_manager.queue_broadcast(
+                message.workflow_id,
+                message.id,
+                partial(delta_tracker(message.workflow_id).build, message),
+            )
     except Exception as e:
         logger.error(f"Exception: {e}")
 
 
-def log_message(message: Message):
+def log_message(message: Message, broadcast: bool = True):
+    """
+    Register message with its workflow and log it. Pass broadcast=False when an
+    ancestor is logged right after, since its update includes message.
+    """
     if not message.workflow_id:
         logger.debug(
             f"No associated workflow for {type(message)} message {message.id}, skipping logging"
@@ -55,10 +88,11 @@ def log_message(message: Message):
 
     message_dict[message.workflow_id][message.id] = message
 
-    broadcast_update(message)
+    if broadcast:
+        broadcast_update(message)
     if should_log(message):
         workflow_id = message.workflow_id
-        message_dict[workflow_id][workflow_id].save()
+        message_dict[workflow_id][workflow_id].log_event(message)
 
 
 def generate_subtree(message: Message) -> dict:
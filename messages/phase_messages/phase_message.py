@@ -9,9 +9,44 @@ QUERY_TIME_TAKEN_IN_MS = "query_time_taken_in_ms"
 INPUT_TOKEN = "input_token"
 OUTPUT_TOKEN = "output_token"
 TOTAL_ITERATION_TIME_MS = "total_iteration_time_ms"
+CACHE_HITS = "cache_hits"
+CACHE_MISSES = "cache_misses"
+CACHED_INPUT_TOKEN = "cached_input_token"
+CACHE_WRITE_INPUT_TOKEN = "cache_write_input_token"
+HEDGE_LOSER_INPUT_TOKEN = "hedge_loser_input_token"
+HEDGE_LOSER_OUTPUT_TOKEN = "hedge_loser_output_token"
+HEDGE_MODEL_INPUT_TOKEN = "hedge_model_input_token"
+HEDGE_MODEL_OUTPUT_TOKEN = "hedge_model_output_token"
+
+# Token counts that only some providers or features report, keyed by the action
+# metadata field they are summed from. They appear in usage only when reported.
+OPTIONAL_TOKEN_USAGE = {
+    "cached_input_tokens": CACHED_INPUT_TOKEN,
+    "cache_write_input_tokens": CACHE_WRITE_INPUT_TOKEN,
+    "hedge_loser_input_tokens": HEDGE_LOSER_INPUT_TOKEN,
+    "hedge_loser_output_tokens": HEDGE_LOSER_OUTPUT_TOKEN,
+    "hedge_model_input_tokens": HEDGE_MODEL_INPUT_TOKEN,
+    "hedge_model_output_tokens": HEDGE_MODEL_OUTPUT_TOKEN,
+}
 
 
 class PhaseMessage(Message):
+    __slots__ = (
+        "_phase_id",
+        "_max_iterations",
+        "_phase_idx",
+        "_success",
+        "_submit",
+        "_complete",
+        "_summary",
+        "_agent_messages",
+        "_phase_summary",
+        "_memory",
+        "_memory_num_tokens",
+        "_memory_summary",
+        "usage",
+    )
+
     def __init__(
         self,
         phase_id: str,
@@ -28,6 +63,9 @@ class PhaseMessage(Message):
         self._summary = "incomplete"
         self._agent_messages = []
         self._phase_summary = None
+        self._memory = None
+        self._memory_num_tokens = None
+        self._memory_summary = None
         self.usage = {
             INPUT_TOKEN: 0,
             OUTPUT_TOKEN: 0,
@@ -109,6 +147,36 @@ class PhaseMessage(Message):
 
         return current_agents
 
+    @property
+    def memory(self):
+        return self._memory
+
+    @memory.setter
+    def memory(self, x: str):
+        """This should only be set by the MemoryResource."""
+        self._memory = x
+        self._memory_num_tokens = None
+
+    @property
+    def memory_num_tokens(self):
+        """Token count of memory, if the MemoryResource fitted it to a budget."""
+        return self._memory_num_tokens
+
+    @memory_num_tokens.setter
+    def memory_num_tokens(self, x: int):
+        """This should only be set by the MemoryResource, after memory."""
+        self._memory_num_tokens = x
+
+    @property
+    def memory_summary(self) -> Optional[str]:
+        """Summary of the entries memory truncation dropped, if it was compacted."""
+        return self._memory_summary
+
+    @memory_summary.setter
+    def memory_summary(self, x: Optional[str]):
+        """This should only be set by the MemoryResource."""
+        self._memory_summary = x
+
     def set_success(self):
         self._success = True
 
@@ -127,7 +195,7 @@ class PhaseMessage(Message):
         from messages.message_utils import log_message
 
         for action_message in agent_message.action_messages:
-            log_message(action_message)
+            log_message(action_message, broadcast=False)
         log_message(agent_message)
 
     def calculate_total_usages(self):
@@ -135,6 +203,11 @@ class PhaseMessage(Message):
         total_output_tokens = 0
         total_query_time_taken_in_ms = 0
         total_iteration_time_ms = 0
+        # Only reported when the model response cache was enabled
+        cache_hits = 0
+        cache_misses = 0
+        cache_enabled = False
+        optional_token_usage = {}
 
         for agent_message in self._agent_messages:
             total_iteration_time_ms += (
@@ -155,6 +228,18 @@ class PhaseMessage(Message):
                         total_input_tokens += metadata["input_tokens"]
                         total_output_tokens += metadata["output_tokens"]
                         total_query_time_taken_in_ms += metadata["time_taken_in_ms"]
+                    for metadata_key, usage_key in OPTIONAL_TOKEN_USAGE.items():
+                        if metadata_key in metadata:
+                            optional_token_usage[usage_key] = (
+                                optional_token_usage.get(usage_key, 0)
+                                + metadata[metadata_key]
+                            )
+                    if metadata.get("cache_hit") is not None:
+                        cache_enabled = True
+                        if metadata["cache_hit"]:
+                            cache_hits += 1
+                        else:
+                            cache_misses += 1
 
         self.usage = {
             INPUT_TOKEN: total_input_tokens,
@@ -162,6 +247,10 @@ class PhaseMessage(Message):
             QUERY_TIME_TAKEN_IN_MS: total_query_time_taken_in_ms,
             TOTAL_ITERATION_TIME_MS: total_iteration_time_ms,
         }
+        if cache_enabled:
+            self.usage[CACHE_HITS] = cache_hits
+            self.usage[CACHE_MISSES] = cache_misses
+        self.usage.update(optional_token_usage)
 
         return self.usage
 
@@ -170,10 +259,7 @@ class PhaseMessage(Message):
         broadcast_dict = {
             "phase_id": self.phase_id,
             "phase_summary": self.summary,
-            "current_children": [
-                agent_message.to_broadcast_dict()
-                for agent_message in self.current_children
-            ],
+            "current_children": self._broadcast_children(self.current_children),
         }
         broadcast_dict.update(base_dict)
         return broadcast_dict
@@ -195,5 +281,7 @@ class PhaseMessage(Message):
                 else None
             ),
         }
+        if self.memory_summary is not None:
+            log_dict["memory_summary"] = self.memory_summary
         log_dict.update(base_dict)
         return log_dict
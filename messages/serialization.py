@@ -0,0 +1,133 @@
+import dataclasses
+import json
+from datetime import date, datetime
+from enum import Enum
+from pathlib import PurePath
+from typing import Any, Callable, Dict, Optional, Type
+
+from messages.message import Message
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional, falls back to json
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional, only needed for packb
+    msgpack = None
+
+
+class MessageSerializer:
+    """
+    Serializes log dicts and message trees to JSON, or to msgpack for a
+    compact binary form.
+
+    Values that are not plain JSON types are converted by the converter
+    registered for their type, or the closest of its base classes. orjson is
+    used when it is installed, and json otherwise, with the same output.
+    """
+
+    def __init__(self):
+        self._converters: Dict[Type, Callable[[Any], Any]] = {}
+        # Converter found for each concrete type, including misses
+        self._resolved: Dict[Type, Optional[Callable[[Any], Any]]] = {}
+
+    def register(self, type_: Type, converter: Callable[[Any], Any]) -> None:
+        """Convert values of type_, and its subclasses, with converter."""
+        self._converters[type_] = converter
+        self._resolved.clear()
+
+    def default(self, obj: Any) -> Any:
+        """Convert obj into something the JSON or msgpack encoder can handle."""
+        cls = type(obj)
+        try:
+            converter = self._resolved[cls]
+        except KeyError:
+            converter = next(
+                (
+                    self._converters[base]
+                    for base in cls.__mro__
+                    if base in self._converters
+                ),
+                None,
+            )
+            self._resolved[cls] = converter
+        if converter is not None:
+            return converter(obj)
+        if dataclasses.is_dataclass(obj):
+            return _dataclass_dict(obj)
+        # Unregistered objects are logged by their attributes, or as strings
+        if hasattr(obj, "__dict__"):
+            return dict(vars(obj))
+        return str(obj)
+
+    def dumps(self, obj: Any, indent: bool = False) -> bytes:
+        """JSON encoding of obj, indented by four spaces if indent is set."""
+        if orjson is not None:
+            if not indent:
+                return orjson.dumps(
+                    obj, default=self.default, option=orjson.OPT_NON_STR_KEYS
+                )
+            data = orjson.dumps(
+                obj,
+                default=self.default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2,
+            )
+            # orjson only indents by two spaces
+            return _double_indent(data)
+        return json.dumps(
+            obj,
+            default=self.default,
+            indent=4 if indent else None,
+            separators=None if indent else (",", ":"),
+            ensure_ascii=False,
+        ).encode()
+
+    def dumps_str(self, obj: Any, indent: bool = False) -> str:
+        return self.dumps(obj, indent=indent).decode()
+
+    def loads(self, data: bytes | str) -> Any:
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+    def packb(self, obj: Any) -> bytes:
+        """msgpack encoding of obj."""
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed, run `pip install msgpack`")
+        return msgpack.packb(obj, default=self.default)
+
+    def unpackb(self, data: bytes) -> Any:
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed, run `pip install msgpack`")
+        return msgpack.unpackb(data, strict_map_key=False)
+
+
+def _double_indent(data: bytes) -> bytes:
+    """
+    Indent JSON indented by two spaces by four. Newlines within strings are
+    escaped, so the leading spaces of every line are indentation.
+    """
+    lines = data.split(b"\n")
+    for i, line in enumerate(lines):
+        indent = len(line) - len(line.lstrip(b" "))
+        if indent:
+            lines[i] = line[:indent] + line
+    return b"\n".join(lines)
+
+
+def _dataclass_dict(obj: Any) -> dict:
+    # Shallow, nested values go through the serializer again
+    return {field.name: getattr(obj, field.name) for field in dataclasses.fields(obj)}
+
+
+serializer = MessageSerializer()
+serializer.register(Message, lambda message: message.to_log_dict())
+serializer.register(PurePath, str)
+serializer.register(Enum, lambda value: value.value)
+serializer.register(datetime, lambda value: value.isoformat())
+serializer.register(date, lambda value: value.isoformat())
+serializer.register(set, list)
+serializer.register(frozenset, list)
+serializer.register(tuple, list)
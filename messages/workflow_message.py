@@ -1,8 +1,10 @@
-import json
+import uuid
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from messages.event_log import MessageEventLog
+from messages.log_persistence import DEFAULT_MAX_LOG_STALENESS, LogPersister
 from messages.message import Message
 from messages.phase_messages.phase_message import PhaseMessage
 from utils.git_utils import git_get_codebase_version
@@ -19,6 +21,14 @@ logger = get_main_logger(__name__)
 QUERY_TIME_TAKEN_IN_MS = "query_time_taken_in_ms"
 INPUT_TOKEN = "input_token"
 OUTPUT_TOKEN = "output_token"
+CACHE_HITS = "cache_hits"
+CACHE_MISSES = "cache_misses"
+CACHED_INPUT_TOKEN = "cached_input_token"
+CACHE_WRITE_INPUT_TOKEN = "cache_write_input_token"
+HEDGE_LOSER_INPUT_TOKEN = "hedge_loser_input_token"
+HEDGE_LOSER_OUTPUT_TOKEN = "hedge_loser_output_token"
+HEDGE_MODEL_INPUT_TOKEN = "hedge_model_input_token"
+HEDGE_MODEL_OUTPUT_TOKEN = "hedge_model_output_token"
 
 
 class WorkflowMessage(Message):
@@ -30,7 +40,10 @@ class WorkflowMessage(Message):
         additional_metadata: Optional[Dict[str, Any]] = None,
         logs_dir: str = "logs",
         model_name: Optional[str] = "",
+        max_log_staleness: float = DEFAULT_MAX_LOG_STALENESS,
     ) -> None:
+        super().__init__()
+
         # Core
         self._success = False
         self._complete = False
@@ -47,7 +60,11 @@ class WorkflowMessage(Message):
         self._start_time = datetime.now().isoformat()
         self._end_time = None
         self._phase_status = {}
-        self._workflow_id = workflow_id if workflow_id else str(id(self))
+        # Workflow ids name resources such as the Kali container, so unlike
+        # message ids they have to be unique across processes
+        self._workflow_id = workflow_id if workflow_id else uuid.uuid4().hex[:10]
+        # The workflow message is registered under the workflow id
+        self._id = self._workflow_id
         from messages.message_utils import message_dict
 
         message_dict[self.workflow_id] = {}
@@ -83,8 +100,14 @@ class WorkflowMessage(Message):
             self._full_log_dir_path
             / f"{self.model_name}_{self.workflow_name}_{self._task_components}_{self.workflow_id}_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"
         )
-
-        super().__init__()
+        self.event_log = self._create_event_log()
+        # Saves the json log in the background, at most max_log_staleness
+        # seconds after a message is logged
+        self.persister = LogPersister(
+            lambda: self.log_file,
+            self._log_snapshot,
+            max_staleness=max_log_staleness,
+        )
 
     def _set_parent_from_context(self):
         # WorkflowMessage is the top-level message, so it doesn't have a parent.
@@ -146,6 +169,33 @@ class WorkflowMessage(Message):
             "total_output_tokens": total_output_tokens,
             "total_query_time_taken_in_ms": total_time,
         }
+        cached_phases = [
+            phase_message
+            for phase_message in self._phase_messages
+            if CACHE_HITS in phase_message.usage
+        ]
+        if cached_phases:
+            usage_dict["total_cache_hits"] = sum(
+                phase_message.usage[CACHE_HITS] for phase_message in cached_phases
+            )
+            usage_dict["total_cache_misses"] = sum(
+                phase_message.usage[CACHE_MISSES] for phase_message in cached_phases
+            )
+        for key, total_key in [
+            (CACHED_INPUT_TOKEN, "total_cached_input_tokens"),
+            (CACHE_WRITE_INPUT_TOKEN, "total_cache_write_input_tokens"),
+            (HEDGE_LOSER_INPUT_TOKEN, "total_hedge_loser_input_tokens"),
+            (HEDGE_LOSER_OUTPUT_TOKEN, "total_hedge_loser_output_tokens"),
+            (HEDGE_MODEL_INPUT_TOKEN, "total_hedge_model_input_tokens"),
+            (HEDGE_MODEL_OUTPUT_TOKEN, "total_hedge_model_output_tokens"),
+        ]:
+            reported = [
+                phase_message.usage[key]
+                for phase_message in self._phase_messages
+                if key in phase_message.usage
+            ]
+            if reported:
+                usage_dict[total_key] = sum(reported)
         self.usage = usage_dict
         return usage_dict
 
@@ -191,15 +241,39 @@ class WorkflowMessage(Message):
             "task_codebase_version": self.task_codebase_version,
         }
 
-    def save(self):
-        self._end_time = datetime.now().isoformat()
-        self.log_file.parent.mkdir(parents=True, exist_ok=True)
+    def log_event(self, message: Message) -> None:
+        """
+        Append the current state of message to the workflow's event log, and
+        schedule a save of the json log.
+        """
+        self.event_log.append(message)
+        self.persister.request()
+
+    def _create_event_log(self) -> MessageEventLog:
+        return MessageEventLog(
+            self.log_file.with_suffix(".jsonl"),
+            header=self._event_log_header,
+        )
+
+    def _event_log_header(self) -> dict:
+        return {
+            "workflow_metadata": self.metadata_dict(),
+            "start_time": self._start_time,
+            "workflow_id": self.workflow_id,
+            "additional_metadata": self.additional_metadata,
+            "codebase_version": self.codebase_version,
+            "task_codebase_version": self.task_codebase_version,
+        }
 
-        logs = self.to_log_dict()
+    def _log_snapshot(self) -> dict:
+        self._end_time = datetime.now().isoformat()
+        return self.to_log_dict()
 
-        with open(self.log_file, "w") as f:
-            json.dump(logs, f, indent=4, default=self._json_serializable)
-            logger.status(f"Saved log to: {self.log_file}")
+    def save(self):
+        # Written through a temporary file, so a crash never leaves a partial log
+        self.persister.request()
+        self.persister.flush()
+        logger.status(f"Saved log to: {self.log_file}")
 
         # Archive the log file
         archive_path = (
@@ -223,10 +297,14 @@ class WorkflowMessage(Message):
         logger_config.restart()
 
     def on_exit(self):
-        # Save the json log file
+        # Materialize the json log file from the message tree
         self.save()
+        self.persister.stop()
+        self.event_log.close()
 
     def new_log(self):
+        # Finish the current log before switching files
+        self.persister.flush()
         components = []
         if self.task:
             for _, value in self.task.items():
@@ -244,25 +322,6 @@ class WorkflowMessage(Message):
             / f"{self.model_name}_{self.workflow_name}_{self._task_components}_{self.workflow_id}_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"
         )
         logger.status(f"Creating new log file at: {self.log_file}")
+        self.event_log.close()
+        self.event_log = self._create_event_log()
         self.save()
-
-    def _json_serializable(self, obj: Any) -> Any:
-        if isinstance(obj, Path):
-            return str(obj)
-        elif hasattr(obj, "__dict__"):
-            # For objects with a __dict__ attribute (like Message),
-            # we'll convert them to a dictionary
-            return {
-                key: self._json_serializable(value)
-                for key, value in obj.__dict__.items()
-            }
-        elif isinstance(obj, (list, tuple)):
-            return [self._json_serializable(item) for item in obj]
-        elif isinstance(obj, dict):
-            return {key: self._json_serializable(value) for key, value in obj.items()}
-        elif hasattr(obj, "__str__"):
-            # For any other objects, we'll use their string representation
-            return str(obj)
-        raise TypeError(
-            f"Object of type {obj.__class__.__name__} is not JSON serializable"
-        )
@@ -11,6 +11,8 @@ from messages.message_utils import log_message
 from messages.phase_messages.phase_message import PhaseMessage
 from messages.workflow_message import WorkflowMessage
 from resources.base_resource import BaseResourceConfig
+from resources.memory_resource.memory_compaction import HistoryCompactor
+from resources.memory_resource.memory_resource import MemoryResourceConfig
 from resources.resource_type import ResourceType
 from utils.logger import get_main_logger
 
@@ -83,6 +85,15 @@ class BasePhase(ABC):
         """
         pass
 
+    def memory_resource_config(self) -> MemoryResourceConfig:
+        """
+        Config of the memory resource of the phase. With the compact_memory
+        param, the entries memory truncation drops are summarized.
+        """
+        return MemoryResourceConfig(
+            compactor=HistoryCompactor() if self.params.get("compact_memory") else None
+        )
+
     def get_phase_resources(self) -> Dict[str, Any]:
         """
         Get the resources required for all agents in this phase.
@@ -12,7 +12,6 @@ from resources.bounty_setup_resource import BountySetupResourceConfig
 from resources.docker_resource import DockerResourceConfig
 from resources.init_files_resource import InitFilesResourceConfig
 from resources.kali_env_resource import KaliEnvResourceConfig
-from resources.memory_resource.memory_resource import MemoryResourceConfig
 from resources.model_resource.model_resource import ModelResourceConfig
 from resources.repo_setup_resource import RepoSetupResourceConfig
 from resources.resource_type import ResourceType
@@ -89,6 +88,17 @@ class ExploitPhase(BountyPhase):
                     use_mock_model=self.use_mock_model,
                     max_input_tokens=self.params.get("max_input_tokens"),
                     max_output_tokens=self.params.get("max_output_tokens"),
+                    use_streaming=self.params.get("use_streaming"),
+                    requests_per_minute=self.params.get("requests_per_minute"),
+                    tokens_per_minute=self.params.get("tokens_per_minute"),
+                    rate_limit_dir=self.params.get("rate_limit_dir"),
+                    use_batch=self.params.get("use_batch"),
+                    batch_size=self.params.get("batch_size"),
+                    local_batch_dir=self.params.get("local_batch_dir"),
+                    hedge_percentile=self.params.get("hedge_percentile"),
+                    hedge_model=self.params.get("hedge_model"),
+                    response_cache_mode=self.params.get("response_cache_mode"),
+                    response_cache_path=self.params.get("response_cache_path"),
                 ),
             ),
             (
@@ -117,7 +127,7 @@ class ExploitPhase(BountyPhase):
                 ),
             ),
             (ResourceType.DOCKER, DockerResourceConfig()),
-            (ResourceType.MEMORY, MemoryResourceConfig()),
+            (ResourceType.MEMORY, self.memory_resource_config()),
         ]
 
         resource_configs += get_setup_resources(
@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from resources.memory_resource.memory_function import TRUNCATION_ALERT
+from resources.model_resource.tokenizer_registry import Tokenizer
+
+DEFAULT_TOKEN_CACHE_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class MemoryTokenBudget:
+    """Token budget, and the model's tokenizer, that memory has to fit in."""
+
+    max_tokens: int
+    tokenizer: Tokenizer
+
+
+class CachedTokenizer:
+    """
+    Tokenizer that remembers the tokens of recently encoded texts.
+
+    Memory entries are rendered once per message version and then repeat on every
+    model call until they fall out of the memory window, so each one is encoded
+    only once.
+    """
+
+    def __init__(self, tokenizer: Tokenizer, maxsize: int = DEFAULT_TOKEN_CACHE_SIZE):
+        self.tokenizer = tokenizer
+        self.maxsize = maxsize
+        self._tokens: "OrderedDict[str, List[int]]" = OrderedDict()
+
+    def encode(self, text: str) -> List[int]:
+        tokens = self._tokens.get(text)
+        if tokens is None:
+            tokens = self.tokenizer.encode(text)
+            self._tokens[text] = tokens
+            if len(self._tokens) > self.maxsize:
+                self._tokens.popitem(last=False)
+        else:
+            self._tokens.move_to_end(text)
+        return tokens
+
+    def decode(self, tokens: List[int]) -> str:
+        return self.tokenizer.decode(tokens)
+
+    def count(self, text: str) -> int:
+        return len(self.encode(text))
+
+    def truncate_middle(self, text: str, max_tokens: int) -> Tuple[str, int]:
+        """
+        Keep the first and last tokens of text, with TRUNCATION_ALERT in between,
+        so that the result has at most max_tokens tokens.
+        """
+        tokens = self.encode(text)
+        if len(tokens) <= max_tokens:
+            return text, len(tokens)
+        if max_tokens <= self.count(TRUNCATION_ALERT):
+            return self.decode(tokens[:max_tokens]), max_tokens
+        keep = max_tokens - self.count(TRUNCATION_ALERT)
+        head, tail = keep - keep // 2, keep // 2
+        truncated = self.decode(tokens[:head]) + TRUNCATION_ALERT
+        if tail:
+            truncated += self.decode(tokens[-tail:])
+        return truncated, head + self.count(TRUNCATION_ALERT) + tail
+
+
+def fit_memory(
+    system_message: str,
+    history_header: str,
+    lines: List[Tuple[Optional[str], str]],
+    tokenizer: CachedTokenizer,
+    max_tokens: int,
+) -> Tuple[str, int]:
+    """
+    Lay out memory as system_message, history_header and the history lines, one
+    per line, within max_tokens tokens. Returns the memory and its token count.
+
+    Each line is a (prefix, entry) pair, e.g. ("3) ", "[agent] ..."), counted
+    from the cached tokens of its parts, so only new entries are encoded. The
+    parts always meet at whitespace or punctuation, where the tokenizer splits
+    anyway, so the sum of their counts bounds the count of the whole memory.
+
+    When the history does not fit, the oldest lines are dropped behind a
+    truncation alert, and the newest line is shortened if it alone is too long.
+    The system prompt is only cut if it does not fit on its own.
+    """
+    num_system_tokens = tokenizer.count(system_message)
+    if not lines or num_system_tokens >= max_tokens:
+        memory, num_tokens = tokenizer.truncate_middle(system_message, max_tokens)
+        return memory, num_tokens
+
+    newline_tokens = tokenizer.count("\n")
+    line_tokens = [_count_line(tokenizer, prefix, entry) for prefix, entry in lines]
+    num_history_tokens = (
+        tokenizer.count(history_header)
+        + sum(line_tokens)
+        + newline_tokens * (len(lines) - 1)
+    )
+    if num_system_tokens + num_history_tokens <= max_tokens:
+        memory = history_header + "\n".join(
+            (prefix or "") + entry for prefix, entry in lines
+        )
+        return system_message + memory, num_system_tokens + num_history_tokens
+
+    # history_header ends with a newline, so this reads as TRUNCATION_ALERT
+    alert = TRUNCATION_ALERT.lstrip("\n")
+    available = (
+        max_tokens
+        - num_system_tokens
+        - tokenizer.count(history_header)
+        - tokenizer.count(alert)
+    )
+    kept = []
+    for (prefix, entry), num_line_tokens in zip(reversed(lines), reversed(line_tokens)):
+        separator_tokens = newline_tokens if kept else 0
+        if num_line_tokens + separator_tokens > available:
+            break
+        kept.append((prefix or "") + entry)
+        available -= num_line_tokens + separator_tokens
+
+    if not kept:
+        # Even the newest entry alone is too long, keep what fits of it
+        prefix, entry = lines[-1]
+        available -= tokenizer.count(prefix) if prefix else 0
+        if available <= tokenizer.count(TRUNCATION_ALERT):
+            return system_message, num_system_tokens
+        entry, num_entry_tokens = tokenizer.truncate_middle(entry, available)
+        kept.append((prefix or "") + entry)
+        available -= num_entry_tokens
+
+    memory = history_header + alert + "\n".join(reversed(kept))
+    return system_message + memory, max_tokens - available
+
+
+def _count_line(tokenizer: CachedTokenizer, prefix: Optional[str], entry: str) -> int:
+    return (tokenizer.count(prefix) if prefix else 0) + tokenizer.count(entry)
@@ -0,0 +1,129 @@
+import re
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+SUMMARY_HEADER = "[history summary] Condensed from earlier iterations:"
+DEFAULT_COMPACTION_INTERVAL = 6  # Entries folded into the summary per step
+DEFAULT_SUMMARY_CACHE_SIZE = 1024
+
+# Most recent items of each kind kept in the summary, so its size is bounded
+SUMMARY_CAPS = {"command": 20, "file": 20, "error": 10}
+MAX_SUMMARY_ITEM_CHARS = 200
+
+_ENTRY_ID = re.compile(r"^\[[^\]]*\] ")
+_ERROR_LINE = re.compile(
+    r"error|exception|traceback|denied|not found|no such file|failed", re.IGNORECASE
+)
+_PATH = re.compile(
+    r"^(?:~|\.{1,2})?/?[\w.@-]+(?:/[\w.@-]*)+$|^[\w-]+\.[A-Za-z]\w{0,4}$"
+)
+_SUMMARY_ITEM = re.compile(r"^- (command|file|error): (.*)$")
+
+
+def extract_history_summary(previous_summary: str, entries: Sequence[str]) -> str:
+    """
+    Deterministic summarizer: fold the commands run, files touched and errors
+    seen in entries into previous_summary, keeping the most recent SUMMARY_CAPS
+    items of each kind.
+    """
+    items = _parse_summary(previous_summary)
+    for entry in entries:
+        text = _ENTRY_ID.sub("", entry, count=1)
+        if "Command:" in text:
+            command = text.rsplit("Command:", 1)[1].strip().splitlines()
+            if not command:
+                continue
+            _add(items["command"], command[0])
+            for word in command[0].split():
+                word = word.strip("'\"`;,()")
+                if "://" not in word and not word.startswith("-") and _PATH.match(word):
+                    _add(items["file"], word)
+        else:
+            for line in text.splitlines():
+                if _ERROR_LINE.search(line):
+                    _add(items["error"], line.strip())
+
+    lines = [SUMMARY_HEADER]
+    for kind, cap in SUMMARY_CAPS.items():
+        lines.extend(f"- {kind}: {item}" for item in list(items[kind])[-cap:])
+    return "\n".join(lines)
+
+
+def _parse_summary(summary: str) -> Dict[str, "OrderedDict[str, None]"]:
+    items = {kind: OrderedDict() for kind in SUMMARY_CAPS}
+    for line in summary.splitlines():
+        match = _SUMMARY_ITEM.match(line)
+        if match:
+            items[match.group(1)][match.group(2)] = None
+    return items
+
+
+def _add(items: "OrderedDict[str, None]", item: str) -> None:
+    item = item[:MAX_SUMMARY_ITEM_CHARS]
+    if not item:
+        return
+    # Move repeated items to the end, so the most recent ones are kept
+    items.pop(item, None)
+    items[item] = None
+
+
+class HistoryCompactor:
+    """
+    Condenses the memory entries that segment truncation drops into a rolling
+    summary, so that long runs keep the gist of older iterations at a fixed
+    token cost.
+
+    Dropped entries are folded into the summary interval entries at a time by
+    summarize_fn(previous_summary, entries), e.g. extract_history_summary or a
+    call to a cheap model. Every step is cached on its inputs, so on each model
+    call only the newly dropped entries are summarized, and editing a message
+    recomputes the summary from the first chunk whose entries changed.
+    """
+
+    def __init__(
+        self,
+        summarize_fn: Callable[[str, Sequence[str]], str] = extract_history_summary,
+        interval: int = DEFAULT_COMPACTION_INTERVAL,
+        cache_size: int = DEFAULT_SUMMARY_CACHE_SIZE,
+    ):
+        if interval < 1:
+            raise ValueError(f"Compaction interval must be positive, got {interval}")
+        self.summarize_fn = summarize_fn
+        self.interval = interval
+        self.cache_size = cache_size
+        self._summaries: "OrderedDict[Tuple[str, Tuple[str, ...]], str]" = OrderedDict()
+
+    def summarize(self, entries: Sequence[str]) -> Optional[str]:
+        """Summary of entries, or None if there is nothing to summarize."""
+        summary = ""
+        for i in range(0, len(entries), self.interval):
+            summary = self._fold(summary, tuple(entries[i : i + self.interval]))
+        return summary or None
+
+    def summarize_dropped(
+        self, segment: List[str], trunc_segment: List[str]
+    ) -> Tuple[Optional[str], int]:
+        """
+        Summary of the entries of segment that segment truncation dropped, and
+        the number of entries at the end of trunc_segment it kept. The summary
+        takes the place of the other entries of trunc_segment, e.g. "...".
+        """
+        kept = 0
+        while (
+            kept < min(len(segment), len(trunc_segment))
+            and trunc_segment[-1 - kept] is segment[-1 - kept]
+        ):
+            kept += 1
+        return self.summarize(segment[: len(segment) - kept]), kept
+
+    def _fold(self, summary: str, chunk: Tuple[str, ...]) -> str:
+        key = (summary, chunk)
+        folded = self._summaries.get(key)
+        if folded is None:
+            folded = self.summarize_fn(summary, chunk)
+            self._summaries[key] = folded
+            if len(self._summaries) > self.cache_size:
+                self._summaries.popitem(last=False)
+        else:
+            self._summaries.move_to_end(key)
+        return folded
@@ -1,5 +1,8 @@
+from functools import lru_cache
+
 ITERATIONS_TO_KEEP = 3
 MSG_TOKEN_LIMIT = [1536, 512, 128]  # r_t, o_k_t, o_p_t
+TRUNCATION_ALERT = "\n...TRUNCATED...\n"
 
 
 class MemoryCollationFunctions:
@@ -62,9 +65,13 @@ class MemoryTruncationFunctions:
 
     @staticmethod
     def memory_fn_by_message_token(
-        segments, msg_token_limit=MSG_TOKEN_LIMIT
+        segments, msg_token_limit=MSG_TOKEN_LIMIT, tokenizer=None
     ):
-        trunc_token = "\n...TRUNCATED...\n"
+        """
+        Truncate the middle of long messages, cycling through msg_token_limit.
+        Tokens are approximated by words, unless the model's tokenizer is given.
+        """
+        trunc_token = TRUNCATION_ALERT
         msg_per_iteration = len(msg_token_limit)
 
         truncated = []
@@ -79,29 +86,41 @@ class MemoryTruncationFunctions:
                 offset = msg_per_iteration - offset
 
             for j, msg in enumerate(segment):
-                tokens = msg.split()
-                cnt = len(tokens)
-                
                 # Apply the offset to ensure correct token limit is used
                 pattern_index = (j + offset) % msg_per_iteration
                 max_message_input_tokens = msg_token_limit[pattern_index] // 2
 
-                if cnt > max_message_input_tokens:
-                    # Calculate how many tokens to keep from start and end
-                    half_tokens = max_message_input_tokens // 2
-                    start_tokens = tokens[:half_tokens]
-                    end_tokens = tokens[-half_tokens:]
-
-                    # Combine with truncation token in the middle
-                    truncated_msg = (
-                        " ".join(start_tokens)
-                        + trunc_token
-                        + " ".join(end_tokens)
+                if tokenizer is not None:
+                    truncated_msg, _ = tokenizer.truncate_middle(
+                        msg, max_message_input_tokens
                     )
-                    trunc_segment.append(truncated_msg)
                 else:
-                    trunc_segment.append(msg)
+                    truncated_msg = _truncate_message(
+                        msg, max_message_input_tokens, trunc_token
+                    )
+                trunc_segment.append(truncated_msg)
 
             truncated.append(trunc_segment)
 
         return truncated
+
+
+@lru_cache(maxsize=1024)
+def _truncate_message(msg, max_message_input_tokens, trunc_token):
+    """
+    Keep the first and last tokens of msg within max_message_input_tokens.
+    Memoized because the same recent messages are truncated on every model call.
+    """
+    tokens = msg.split()
+    cnt = len(tokens)
+
+    if cnt <= max_message_input_tokens:
+        return msg
+
+    # Calculate how many tokens to keep from start and end
+    half_tokens = max_message_input_tokens // 2
+    start_tokens = tokens[:half_tokens]
+    end_tokens = tokens[-half_tokens:]
+
+    # Combine with truncation token in the middle
+    return " ".join(start_tokens) + trunc_token + " ".join(end_tokens)
@@ -0,0 +1,192 @@
+import weakref
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from messages.agent_messages.agent_message import AgentMessage
+from messages.message import Message
+
+
+@dataclass
+class _RenderedNode:
+    """
+    Rendered memory entries of one message and the chain of its children.
+
+    children holds the latest version of each child in chain order, and body the
+    concatenated entries of their subtrees, with child i starting at starts[i].
+    """
+
+    header: List[str] = field(default_factory=list)
+    header_message: Optional[str] = None
+    header_parent: Optional[Message] = None
+    children: List[Message] = field(default_factory=list)
+    positions: Dict[int, int] = field(default_factory=dict)
+    starts: List[int] = field(default_factory=list)
+    body: List[str] = field(default_factory=list)
+    system_messages: List[Tuple[int, str]] = field(default_factory=list)
+    # Children parented elsewhere do not report changes here, so their
+    # revisions are compared on every refresh instead
+    foreign: Dict[int, int] = field(default_factory=dict)
+    # Revision of the message when its changed children were last read
+    seen_revision: int = 0
+    initialized: bool = False
+
+
+class MemoryIndex:
+    """
+    Incremental index of the memory entries rendered by MemoryResource.go_down.
+
+    Every message keeps its rendered entries, and refreshes them from the
+    children that changed since it was last rendered (see
+    Message.changed_children_since).
+    Adding a message to the end of a chain re-renders only that message, and a
+    version edit re-renders the chain from the edited message onwards, so
+    building memory no longer walks the whole run on every model call.
+    """
+
+    def __init__(self, memory_resource):
+        self.memory_resource = memory_resource
+        self._nodes: "weakref.WeakKeyDictionary[Message, _RenderedNode]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def render(
+        self, msg_node: Message, stop_instance: Optional[Message] = None
+    ) -> Tuple[List[str], Set[str]]:
+        """
+        Return the entries and system messages go_down(msg_node, stop_instance)
+        would produce. The returned list is a fresh copy the caller may extend.
+        """
+        if self.memory_resource.is_initial_prompt(msg_node):
+            return [], {msg_node._message}
+
+        node = self._refresh(msg_node)
+        end = len(node.children)
+        if stop_instance is not None:
+            position = node.positions.get(id(stop_instance))
+            if position is not None and node.children[position] is stop_instance:
+                end = position
+
+        if end == len(node.children):
+            entries = node.header + node.body
+        else:
+            entries = node.header + node.body[: node.starts[end]]
+        system_messages = {
+            message for position, message in node.system_messages if position < end
+        }
+        return entries, system_messages
+
+    def _refresh(self, msg_node: Message) -> _RenderedNode:
+        node = self._nodes.get(msg_node)
+        if node is None:
+            node = _RenderedNode()
+            self._nodes[msg_node] = node
+
+        if (
+            not node.initialized
+            or node.header_message is not getattr(msg_node, "_message", None)
+            or node.header_parent is not msg_node.parent
+        ):
+            node.header = self._render_header(msg_node)
+            node.header_message = getattr(msg_node, "_message", None)
+            node.header_parent = msg_node.parent
+
+        if not self._renders_children(msg_node):
+            node.initialized = True
+            return node
+
+        dirty = None if node.initialized else 0
+        for child in msg_node.changed_children_since(node.seen_revision):
+            position = self._locate(node, child)
+            dirty = position if dirty is None else min(dirty, position)
+        node.seen_revision = msg_node.revision
+        for position, revision in node.foreign.items():
+            if node.children[position].revision != revision:
+                dirty = position if dirty is None else min(dirty, position)
+
+        node.initialized = True
+        if dirty is not None:
+            self._render_children(msg_node, node, dirty)
+        return node
+
+    def _locate(self, node: _RenderedNode, child: Message) -> int:
+        """Position in node's chain from which a change to child takes effect."""
+        version = child
+        while version is not None:
+            position = node.positions.get(id(version))
+            if position is not None and node.children[position] is version:
+                return position
+            version = version.version_prev
+
+        # A new message links into the chain right after its prev
+        prev = child.prev
+        if isinstance(prev, Message):
+            position = node.positions.get(id(prev))
+            if position is not None and node.children[position] is prev:
+                return position + 1
+        return 0
+
+    def _render_children(
+        self, msg_node: Message, node: _RenderedNode, start: int
+    ) -> None:
+        start = min(start, len(node.children))
+        for child in node.children[start:]:
+            node.positions.pop(id(child), None)
+        body_start = (
+            node.starts[start] if start < len(node.children) else len(node.body)
+        )
+        del node.children[start:]
+        del node.starts[start:]
+        del node.body[body_start:]
+        node.system_messages = [
+            (position, message)
+            for position, message in node.system_messages
+            if position < start
+        ]
+        node.foreign = {
+            position: revision
+            for position, revision in node.foreign.items()
+            if position < start
+        }
+
+        if start == 0:
+            children = self.memory_resource.extract_children(msg_node)
+            child = children[0].get_latest_version() if children else None
+        else:
+            child = self.memory_resource.next_child(msg_node, node.children[start - 1])
+
+        while child is not None and id(child) not in node.positions:
+            position = len(node.children)
+            node.children.append(child)
+            node.positions[id(child)] = position
+            node.starts.append(len(node.body))
+            if child.parent is not msg_node:
+                node.foreign[position] = child.revision
+
+            if self.memory_resource.is_initial_prompt(child):
+                node.system_messages.append((position, child._message))
+            else:
+                child_node = self._refresh(child)
+                node.body.extend(child_node.header)
+                node.body.extend(child_node.body)
+                node.system_messages.extend(
+                    (position, message) for _, message in child_node.system_messages
+                )
+
+            child = self.memory_resource.next_child(msg_node, child)
+
+    def _render_header(self, msg_node: Message) -> List[str]:
+        # Executor agent messages repeat their action messages, so they are
+        # left out to avoid duplicates
+        if not hasattr(msg_node, "_message") or (
+            isinstance(msg_node, AgentMessage) and msg_node.agent_id == "executor_agent"
+        ):
+            return []
+        header = []
+        self.memory_resource.add_to_segment(msg_node, header)
+        return header
+
+    def _renders_children(self, msg_node: Message) -> bool:
+        return (
+            not isinstance(msg_node, AgentMessage)
+            or msg_node.agent_id == "executor_agent"
+        )
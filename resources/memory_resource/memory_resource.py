@@ -1,18 +1,26 @@
 import inspect
 from dataclasses import dataclass, field
 from functools import partial
-from typing import Callable, List
+from typing import Callable, Dict, List, Optional
 
 from messages.agent_messages.agent_message import ActionMessage, AgentMessage
 from messages.phase_messages.phase_message import PhaseMessage
 from messages.workflow_message import WorkflowMessage
 from resources.base_resource import BaseResource, BaseResourceConfig
+from resources.memory_resource.memory_budget import (
+    CachedTokenizer,
+    MemoryTokenBudget,
+    fit_memory,
+)
+from resources.memory_resource.memory_compaction import HistoryCompactor
 from resources.memory_resource.memory_function import (
     MemoryCollationFunctions,
     MemoryTruncationFunctions,
 )
+from resources.memory_resource.memory_index import MemoryIndex
 from resources.memory_resource.memory_prompt import MemoryPrompts
 from resources.memory_resource.memory_scope import MemoryScope
+from resources.model_resource.tokenizer_registry import Tokenizer
 from utils.logger import get_main_logger
 
 logger = get_main_logger(__name__)
@@ -33,6 +41,8 @@ class MemoryResourceConfig(BaseResourceConfig):
     memory_trunc_fn: Callable[[List], List] = field(
         default=MemoryTruncationFunctions.memory_fn_by_message_token
     )
+    # Summarizes the entries segment_trunc_fn drops instead of losing them
+    compactor: Optional[HistoryCompactor] = None
 
     def validate(self) -> None:
         """Validate LLMResource configuration"""
@@ -62,8 +72,21 @@ class MemoryResource(BaseResource):
 
         self.segment_trunc_fn = self._resource_config.segment_trunc_fn
         self.memory_trunc_fn = self._resource_config.memory_trunc_fn
+        self.compactor = self._resource_config.compactor
+
+        self.index = MemoryIndex(self)
+
+        # Truncation functions that accept the model's tokenizer count real tokens
+        self._memory_trunc_fn_takes_tokenizer = (
+            "tokenizer" in inspect.signature(self.memory_trunc_fn).parameters
+        )
+        self._cached_tokenizers: Dict[Tokenizer, CachedTokenizer] = {}
 
-    def parse_message(self, message: ActionMessage | AgentMessage | PhaseMessage):
+    def parse_message(
+        self,
+        message: ActionMessage | AgentMessage | PhaseMessage,
+        tokenizer: Optional[CachedTokenizer] = None,
+    ):
         """Given a message, parse into prev_{phase | agent | action} messages.
 
         Example traversal if scope is workflow, and given message is action_message
@@ -75,7 +98,26 @@ class MemoryResource(BaseResource):
              stopping at given action message
 
         This way, we can segment memory into prev_phase, prev_agent, and prev_action
+
+        The traversals are served from self.index, which keeps the rendered
+        entries of every message and only re-renders messages that changed.
         """
+        trunc_segments, system_messages = self._parse_segments(message, tokenizer)
+        start = 1
+        collated_segments = []
+        for segment in trunc_segments:
+            collated_segment = self.collate_fn(segment, start=start)
+            collated_segments.append(collated_segment)
+            start += len(segment)
+
+        return collated_segments, system_messages
+
+    def _parse_segments(
+        self,
+        message: ActionMessage | AgentMessage | PhaseMessage,
+        tokenizer: Optional[CachedTokenizer] = None,
+    ):
+        """Truncated, but not yet collated, segments of parse_message."""
         assert isinstance(
             message, (ActionMessage, AgentMessage, PhaseMessage)
         ), f"Invalid message type {type(message)} passed to memory"
@@ -87,11 +129,9 @@ class MemoryResource(BaseResource):
         system_messages = set()
         while not isinstance(message, stop_cls):
             root, down_stop = self.go_up(message, stop_cls)
-            segments.append(
-                self.go_down(
-                    root, sys_messages=system_messages, stop_instance=down_stop
-                )
-            )
+            segment, segment_system_messages = self.index.render(root, down_stop)
+            segments.append(segment)
+            system_messages.update(segment_system_messages)
             stop_cls = self.message_hierarchy[stop_cls]
 
         if self.is_initial_prompt(message):
@@ -101,32 +141,52 @@ class MemoryResource(BaseResource):
                 self.add_to_segment(message, segments[-1])
 
         # truncate each segment
-        trunc_segments = [
-            self.segment_trunc_fn(segment) for segment in segments
-        ]
+        trunc_segments = [self.segment_trunc_fn(segment) for segment in segments]
+        summaries = []
+        if self.compactor is not None:
+            summaries = [
+                self.compactor.summarize_dropped(segment, trunc_segment)
+                for segment, trunc_segment in zip(segments, trunc_segments)
+            ]
+        # Kept on the message the memory is for, so that it is logged
+        if hasattr(message, "memory_summary"):
+            message.memory_summary = (
+                "\n".join(summary for summary, _ in summaries if summary) or None
+            )
         # truncate all memory
-        trunc_segments = self.memory_trunc_fn(trunc_segments)
-        start = 1
-        collated_segments = []
-        for segment in trunc_segments:
-            collated_segment = self.collate_fn(segment, start=start)
-            collated_segments.append(collated_segment)
-            start += len(segment)
+        if tokenizer is not None and self._memory_trunc_fn_takes_tokenizer:
+            trunc_segments = self.memory_trunc_fn(trunc_segments, tokenizer=tokenizer)
+        else:
+            trunc_segments = self.memory_trunc_fn(trunc_segments)
+        # summaries are bounded already, so they go in after memory truncation
+        if self.compactor is not None:
+            trunc_segments = [
+                (
+                    [summary] + trunc_segment[len(trunc_segment) - kept :]
+                    if summary is not None
+                    else trunc_segment
+                )
+                for (summary, kept), trunc_segment in zip(summaries, trunc_segments)
+            ]
+        return trunc_segments, system_messages
+
+    def get_memory(
+        self,
+        message: ActionMessage | AgentMessage | PhaseMessage,
+        token_budget: Optional[MemoryTokenBudget] = None,
+    ):
+        """
+        Set message.memory to the initial prompt followed by the memory segments.
 
-        return collated_segments, system_messages
+        With a token_budget, memory is fitted to the model's input budget here,
+        counting tokens of each message once, and message.memory_num_tokens is
+        set so that the model resource can skip truncating the whole prompt.
+        """
+        if token_budget is not None:
+            return self._get_budgeted_memory(message, token_budget)
 
-    def get_memory(self, message: ActionMessage | AgentMessage | PhaseMessage):
         messages, system_messages = self.parse_message(message)
-
-        assert len(system_messages) == 1, (
-            f"Current memory implementation only supports single initial prompt.\n"
-            f"Found {len(system_messages)} initial prompts (system messages)"
-            + f":\n\t{[msg[:25] + '...' for msg in system_messages]}\n"
-            if system_messages
-            else ""
-        )
-
-        system_message = system_messages.pop()
+        system_message = self._get_system_message(system_messages)
 
         kwargs = ["prev_phase_messages", "prev_agent_messages", "prev_action_messages"][
             self.scope.value :
@@ -154,6 +214,56 @@ class MemoryResource(BaseResource):
         message.memory = f"{system_message}\n\n{memory_str}"
         return message
 
+    def _get_budgeted_memory(
+        self,
+        message: ActionMessage | AgentMessage | PhaseMessage,
+        token_budget: MemoryTokenBudget,
+    ):
+        """
+        Same layout as get_memory, with every segment entry collated on its own
+        line so that its tokens can be counted once and reused across calls.
+        """
+        tokenizer = self._cached_tokenizers.get(token_budget.tokenizer)
+        if tokenizer is None:
+            tokenizer = CachedTokenizer(token_budget.tokenizer)
+            self._cached_tokenizers[token_budget.tokenizer] = tokenizer
+
+        segments, system_messages = self._parse_segments(message, tokenizer)
+        system_message = self._get_system_message(system_messages)
+
+        lines = []
+        start = 1
+        for segment in segments:
+            for i, entry in enumerate(segment):
+                line = self.collate_fn([entry], start=start + i)
+                if line.endswith(entry):
+                    lines.append((line[: len(line) - len(entry)], entry))
+                else:
+                    lines.append((None, line))
+            start += len(segment)
+
+        memory, num_tokens = fit_memory(
+            system_message,
+            f"\n\n{MemoryPrompts._DEFAULT_SEGUE}\n",
+            lines,
+            tokenizer,
+            token_budget.max_tokens,
+        )
+        message.memory = memory
+        message.memory_num_tokens = num_tokens
+        return message
+
+    def _get_system_message(self, system_messages) -> str:
+        assert len(system_messages) == 1, (
+            f"Current memory implementation only supports single initial prompt.\n"
+            f"Found {len(system_messages)} initial prompts (system messages)"
+            + f":\n\t{[msg[:25] + '...' for msg in system_messages]}\n"
+            if system_messages
+            else ""
+        )
+
+        return system_messages.pop()
+
     def stop(self):
         logger.debug(
             f"Stopping Memory resource {self.resource_id} (no cleanup required)"
@@ -187,6 +297,11 @@ class MemoryResource(BaseResource):
             ),
             "memory_trunc_fn": get_function_repr(self._resource_config.memory_trunc_fn),
             "scope": self._resource_config.scope.name,
+            "compactor": (
+                get_function_repr(self.compactor.summarize_fn)
+                if self.compactor is not None
+                else None
+            ),
         }
 
     def is_initial_prompt(self, msg_node):
@@ -253,13 +368,23 @@ class MemoryResource(BaseResource):
             ):
                 return segment
             child = children[0].get_latest_version()
-            while child.next:
+            next_child = self.next_child(msg_node, child)
+            while next_child:
                 if child is stop_instance:
                     break
                 segment.extend(self.go_down(child, sys_messages, stop_instance))
-                child = child.next.get_latest_version()
+                child = next_child
+                next_child = self.next_child(msg_node, child)
 
             if child is not stop_instance:
                 segment.extend(self.go_down(child, sys_messages, stop_instance))
 
         return segment
+
+    def next_child(self, msg_node, child):
+        """Latest version of the message after child in msg_node's chain."""
+        if isinstance(msg_node, AgentMessage):
+            next_message = msg_node.next_child(child)
+        else:
+            next_message = child.next
+        return next_message.get_latest_version() if next_message else None
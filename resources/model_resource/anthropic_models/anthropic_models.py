@@ -1,11 +1,16 @@
 from datetime import datetime
-from typing import List
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 
-import tiktoken
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic
 
 from resources.model_resource.model_provider import ModelProvider
-from resources.model_resource.model_response import ModelResponse
+from resources.model_resource.model_response import (
+    BatchRequest,
+    ModelResponse,
+    StreamChunk,
+)
+from resources.model_resource.model_utils import split_prompt_prefix
+from resources.model_resource.tokenizer_registry import get_tiktoken_encoding
 
 EXTENDED_THINKING_SUFFIX = "-extended-thinking"
 DEFAULT_THINKING_BUDGET = 1024  # Minimum budget for extended thinking in tokens
@@ -18,6 +23,9 @@ class AnthropicModels(ModelProvider):
     def create_client(self) -> Anthropic:
         return Anthropic(api_key=self._api_key())
 
+    def create_async_client(self) -> AsyncAnthropic:
+        return AsyncAnthropic(api_key=self._api_key())
+
     def request(
         self,
         model: str,
@@ -27,76 +35,250 @@ class AnthropicModels(ModelProvider):
         stop_sequences: List[str],
     ) -> ModelResponse:
         start_time = datetime.now()
-        status_code = None
 
         try:
-            clean_model_name = self.clean_model_name(model)
-            is_thinking: bool = clean_model_name.endswith(EXTENDED_THINKING_SUFFIX)
-            if not is_thinking:
-                response = self.client.messages.create(
-                    model=clean_model_name,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    messages=[{"role": "user", "content": message}],
-                    stop_sequences=stop_sequences,
-                )
-                full_response = response.content[0].text
-            else:
-                # https://docs.anthropic.com/en/docs/build-with-claude/prompt-engineering/extended-thinking-tips#technical-considerations-for-extended-thinking
-                # - Thinking tokens have a minimum budget of 1024 tokens.
-                # - We recommend that you start with the minimum thinking budget and incrementally increase to adjust based on your needs and task complexity.
-                clean_model_name = clean_model_name[: -len(EXTENDED_THINKING_SUFFIX)]
-                response = self.client.messages.create(
-                    model=clean_model_name,
-                    max_tokens=max_tokens,
-                    temperature=1,  # `temperature` may only be set to 1 when thinking is enabled
-                    messages=[{"role": "user", "content": message}],
-                    stop_sequences=stop_sequences,
-                    thinking={
-                        "type": "enabled",
-                        "budget_tokens": max(int(max_tokens * 0.1), 1024),
-                    },
-                )
-
-                thinking_block = response.content[0].thinking
-                text_block = response.content[1].text
-                full_response = (
-                    "<think>\n" + thinking_block + "\n</think>\n\n" + text_block
-                )
-
-            # For successful responses, we don't typically get HTTP status code
-            # from Anthropic client, but could try to extract if available
-            if hasattr(response, "response") and hasattr(
-                response.response, "status_code"
-            ):
-                status_code = response.response.status_code
-
-            end_time = datetime.now()
-            response_request_duration = (end_time - start_time).total_seconds() * 1000
-            return ModelResponse(
-                content=full_response,
-                input_tokens=response.usage.input_tokens,
-                output_tokens=response.usage.output_tokens,
-                time_taken_in_ms=response_request_duration,
-                status_code=status_code,
+            params = self._request_params(
+                model, message, temperature, max_tokens, stop_sequences
+            )
+            response = self.client.messages.create(**params)
+            return self._to_model_response(
+                response, start_time, is_thinking="thinking" in params
             )
         except Exception as e:
-            # Extract status code from Anthropic errors
-            try:
-                # Anthropic client exceptions might have status_code attribute
-                # or the error might be contained in e.response.status_code
-                if hasattr(e, "status_code"):
-                    status_code = e.status_code
-                elif hasattr(e, "response") and hasattr(e.response, "status_code"):
-                    status_code = e.response.status_code
-            except:
-                pass  # If we can't extract the code, just continue
-
-            # Attach status code to the exception
-            if status_code is not None:
-                e.status_code = status_code
+            self._attach_status_code(e)
             raise
 
+    async def request_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> ModelResponse:
+        start_time = datetime.now()
+
+        try:
+            params = self._request_params(
+                model, message, temperature, max_tokens, stop_sequences
+            )
+            response = await self.get_async_client().messages.create(**params)
+            return self._to_model_response(
+                response, start_time, is_thinking="thinking" in params
+            )
+        except Exception as e:
+            self._attach_status_code(e)
+            raise
+
+    async def request_stream_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> AsyncIterator[StreamChunk]:
+        try:
+            params = self._request_params(
+                model, message, temperature, max_tokens, stop_sequences
+            )
+            stream = await self.get_async_client().messages.create(
+                **params, stream=True
+            )
+            # Thinking is wrapped in a <think> block, as in _to_model_response
+            thinking_index = None
+            async with stream:
+                async for event in stream:
+                    if event.type == "message_start":
+                        yield self._input_usage_chunk(event.message.usage)
+                    elif event.type == "content_block_start":
+                        if event.content_block.type == "thinking":
+                            thinking_index = event.index
+                            yield StreamChunk(text="<think>\n")
+                    elif event.type == "content_block_delta":
+                        if event.delta.type == "thinking_delta":
+                            yield StreamChunk(text=event.delta.thinking)
+                        elif event.delta.type == "text_delta":
+                            yield StreamChunk(text=event.delta.text)
+                    elif event.type == "content_block_stop":
+                        if event.index == thinking_index:
+                            yield StreamChunk(text="\n</think>\n\n")
+                    elif event.type == "message_delta":
+                        yield StreamChunk(output_tokens=event.usage.output_tokens)
+        except Exception as e:
+            self._attach_status_code(e)
+            raise
+
+    async def submit_batch_async(self, requests: List[BatchRequest]) -> str:
+        try:
+            batch = await self.get_async_client().messages.batches.create(
+                requests=[
+                    {
+                        "custom_id": request.custom_id,
+                        "params": self._request_params(
+                            request.model,
+                            request.message,
+                            request.temperature,
+                            request.max_tokens,
+                            request.stop_sequences,
+                        ),
+                    }
+                    for request in requests
+                ]
+            )
+            return batch.id
+        except Exception as e:
+            self._attach_status_code(e)
+            raise
+
+    async def poll_batch_async(
+        self, batch_id: str
+    ) -> Optional[Dict[str, Union[ModelResponse, Exception]]]:
+        client = self.get_async_client()
+        try:
+            batch = await client.messages.batches.retrieve(batch_id)
+            if batch.processing_status != "ended":
+                return None
+
+            results = {}
+            async for entry in await client.messages.batches.results(batch_id):
+                results[entry.custom_id] = self._batch_result(entry.result)
+            return results
+        except Exception as e:
+            self._attach_status_code(e)
+            raise
+
+    def _batch_result(self, result) -> Union[ModelResponse, Exception]:
+        if result.type != "succeeded":
+            # errored, canceled or expired
+            error = getattr(result, "error", None)
+            return Exception(f"Batch request {result.type}: {error}")
+        message = result.message
+        is_thinking = bool(message.content) and message.content[0].type == "thinking"
+        # The batch scheduler reports the time spent waiting for the batch
+        return self._to_model_response(message, datetime.now(), is_thinking)
+
+    def _request_params(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> dict:
+        clean_model_name = self.clean_model_name(model)
+        is_thinking: bool = clean_model_name.endswith(EXTENDED_THINKING_SUFFIX)
+        if not is_thinking:
+            return {
+                "model": clean_model_name,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "messages": [{"role": "user", "content": self._user_content(message)}],
+                "stop_sequences": stop_sequences,
+            }
+
+        # https://docs.anthropic.com/en/docs/build-with-claude/prompt-engineering/extended-thinking-tips#technical-considerations-for-extended-thinking
+        # - Thinking tokens have a minimum budget of 1024 tokens.
+        # - We recommend that you start with the minimum thinking budget and incrementally increase to adjust based on your needs and task complexity.
+        clean_model_name = clean_model_name[: -len(EXTENDED_THINKING_SUFFIX)]
+        return {
+            "model": clean_model_name,
+            "max_tokens": max_tokens,
+            "temperature": 1,  # `temperature` may only be set to 1 when thinking is enabled
+            "messages": [{"role": "user", "content": self._user_content(message)}],
+            "stop_sequences": stop_sequences,
+            "thinking": {
+                "type": "enabled",
+                "budget_tokens": max(int(max_tokens * 0.1), 1024),
+            },
+        }
+
+    def _user_content(self, message: str) -> List[dict]:
+        """
+        Mark the end of the initial prompt as a cache breakpoint, so that later
+        calls with the same prompt read it from Anthropic's prompt cache.
+        """
+        prefix, rest = split_prompt_prefix(message)
+        content = [
+            {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}}
+        ]
+        if rest:
+            content.append({"type": "text", "text": rest})
+        return content
+
+    def _input_usage(self, usage) -> Tuple[int, int, int]:
+        """
+        Returns (input_tokens, cached_input_tokens, cache_write_input_tokens).
+        Anthropic reports cache reads and writes separately from input_tokens,
+        so they are added back to give the full input size.
+        """
+        cached_input_tokens = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write_input_tokens = (
+            getattr(usage, "cache_creation_input_tokens", None) or 0
+        )
+        input_tokens = (
+            usage.input_tokens + cached_input_tokens + cache_write_input_tokens
+        )
+        return input_tokens, cached_input_tokens, cache_write_input_tokens
+
+    def _input_usage_chunk(self, usage) -> StreamChunk:
+        input_tokens, cached_input_tokens, cache_write_input_tokens = self._input_usage(
+            usage
+        )
+        return StreamChunk(
+            input_tokens=input_tokens,
+            cached_input_tokens=cached_input_tokens,
+            cache_write_input_tokens=cache_write_input_tokens,
+        )
+
+    def _to_model_response(
+        self, response, start_time: datetime, is_thinking: bool
+    ) -> ModelResponse:
+        status_code = None
+        if is_thinking:
+            thinking_block = response.content[0].thinking
+            text_block = response.content[1].text
+            full_response = "<think>\n" + thinking_block + "\n</think>\n\n" + text_block
+        else:
+            full_response = response.content[0].text
+
+        # For successful responses, we don't typically get HTTP status code
+        # from Anthropic client, but could try to extract if available
+        if hasattr(response, "response") and hasattr(response.response, "status_code"):
+            status_code = response.response.status_code
+
+        end_time = datetime.now()
+        response_request_duration = (end_time - start_time).total_seconds() * 1000
+        input_tokens, cached_input_tokens, cache_write_input_tokens = self._input_usage(
+            response.usage
+        )
+        return ModelResponse(
+            content=full_response,
+            input_tokens=input_tokens,
+            output_tokens=response.usage.output_tokens,
+            time_taken_in_ms=response_request_duration,
+            status_code=status_code,
+            cached_input_tokens=cached_input_tokens,
+            cache_write_input_tokens=cache_write_input_tokens,
+        )
+
+    def _attach_status_code(self, e: Exception) -> None:
+        status_code = None
+        # Extract status code from Anthropic errors
+        try:
+            # Anthropic client exceptions might have status_code attribute
+            # or the error might be contained in e.response.status_code
+            if hasattr(e, "status_code"):
+                status_code = e.status_code
+            elif hasattr(e, "response") and hasattr(e.response, "status_code"):
+                status_code = e.response.status_code
+        except:
+            pass  # If we can't extract the code, just continue
+
+        # Attach status code to the exception
+        if status_code is not None:
+            e.status_code = status_code
+
     def clean_model_name(self, model_name: str) -> str:
         prefix = "anthropic/"
         if model_name.startswith(prefix):
@@ -105,14 +287,14 @@ class AnthropicModels(ModelProvider):
 
     def tokenize(self, model: str, message: str) -> List[int]:
         # Note: Anthropic doesn't have a public tokenizer, here we use the tiktoken encoding to get a rough estimate
-        encoding = tiktoken.encoding_for_model("gpt-4o")
+        encoding = get_tiktoken_encoding()
         return encoding.encode(message)
 
     def decode(self, model: str, tokens: List[int]) -> str:
         # Note: Anthropic doesn't have a public tokenizer, here we use the tiktoken encoding to get a rough estimate
-        encoding = tiktoken.encoding_for_model("gpt-4o")
+        encoding = get_tiktoken_encoding()
         return encoding.decode(tokens)
 
     def get_num_tokens(self, model: str, message: str) -> int:
-        encoding = tiktoken.encoding_for_model("gpt-4o")
+        encoding = get_tiktoken_encoding()
         return len(encoding.encode(message))
@@ -0,0 +1,279 @@
+import asyncio
+import json
+import time
+import uuid
+import weakref
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from resources.model_resource.model_provider import ModelProvider
+from resources.model_resource.model_response import BatchRequest, ModelResponse
+from utils.logger import get_main_logger
+
+logger = get_main_logger(__name__)
+
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_BATCH_MAX_WAIT = 5.0  # Seconds to wait for more requests before submitting
+DEFAULT_BATCH_POLL_INTERVAL = 30.0
+DEFAULT_BATCH_TIMEOUT = 24 * 60 * 60.0  # Providers complete batches within 24h
+
+
+class BatchScheduler:
+    """
+    Collects model requests from concurrent callers into provider batches.
+
+    Callers await request(), which queues the request and suspends until its
+    result is available, so other workflows on the same event loop keep running
+    meanwhile. A batch is submitted once batch_size requests are queued or the
+    oldest one has waited max_wait seconds, and is then polled every
+    poll_interval seconds until the provider reports it has ended.
+    """
+
+    def __init__(
+        self,
+        provider: ModelProvider,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_wait: float = DEFAULT_BATCH_MAX_WAIT,
+        poll_interval: float = DEFAULT_BATCH_POLL_INTERVAL,
+    ):
+        if not provider.supports_batch:
+            raise ValueError(
+                f"{provider.__class__.__name__} does not support batch requests"
+            )
+        self.provider = provider
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self._pending: List[Tuple[BatchRequest, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks = set()
+
+    async def request(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+        timeout: float = DEFAULT_BATCH_TIMEOUT,
+    ) -> ModelResponse:
+        """
+        Queue a request for the next batch and wait for its response.
+        The reported time_taken_in_ms covers the whole wait, including queueing.
+        """
+        loop = asyncio.get_running_loop()
+        start_time = time.time()
+        future = loop.create_future()
+        batch_request = BatchRequest(
+            custom_id=uuid.uuid4().hex,
+            model=model,
+            message=message,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stop_sequences=list(stop_sequences),
+        )
+        self._pending.append((batch_request, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+
+        try:
+            model_response = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError as e:
+            raise TimeoutError(
+                f"Batch request timed out after {timeout} seconds"
+            ) from e
+        return replace(
+            model_response, time_taken_in_ms=(time.time() - start_time) * 1000
+        )
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        # Requests whose caller already gave up are not worth submitting
+        batch = [
+            (request, future) for request, future in self._pending if not future.done()
+        ]
+        self._pending = []
+        if not batch:
+            return
+        task = asyncio.create_task(self._run_batch(batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[BatchRequest, asyncio.Future]]):
+        futures = {request.custom_id: future for request, future in batch}
+        try:
+            batch_id = await self.provider.submit_batch_async(
+                [request for request, _ in batch]
+            )
+            logger.info(
+                f"Submitted batch {batch_id} with {len(batch)} requests to "
+                f"{self.provider.__class__.__name__}"
+            )
+            while True:
+                await asyncio.sleep(self.poll_interval)
+                results = await self.provider.poll_batch_async(batch_id)
+                if results is not None:
+                    break
+                if all(future.done() for future in futures.values()):
+                    logger.warning(
+                        f"Abandoning batch {batch_id}, no caller is waiting for it"
+                    )
+                    return
+                logger.debug(f"Batch {batch_id} is still running")
+        except Exception as e:
+            logger.error(f"Batch request failed: {e}")
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        logger.info(f"Batch {batch_id} ended with {len(results)} results")
+        for custom_id, future in futures.items():
+            if future.done():
+                continue
+            result = results.get(custom_id)
+            if result is None:
+                result = RuntimeError(f"Batch {batch_id} returned no result")
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+# Schedulers hold futures and timers of one event loop, so they are kept per loop
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_batch_scheduler(
+    provider: ModelProvider,
+    model: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_wait: float = DEFAULT_BATCH_MAX_WAIT,
+    poll_interval: float = DEFAULT_BATCH_POLL_INTERVAL,
+) -> BatchScheduler:
+    """
+    Return the scheduler for (provider, model) on the running event loop, so that
+    concurrent workflows share batches. The first caller's provider is used.
+    """
+    loop_schedulers = _schedulers.setdefault(asyncio.get_running_loop(), {})
+    key = (provider.__class__.__name__, model)
+    scheduler = loop_schedulers.get(key)
+    if scheduler is None:
+        scheduler = BatchScheduler(provider, batch_size, max_wait, poll_interval)
+        loop_schedulers[key] = scheduler
+    return scheduler
+
+
+class LocalBatchModels(ModelProvider):
+    """
+    File-based stand-in for a provider batch API, for testing batch mode.
+
+    Submitted requests are written to <batch_dir>/<batch_id>.requests.jsonl. The
+    first poll answers them with the wrapped provider's regular requests and
+    writes <batch_id>.results.jsonl, which later polls return, so a batch takes
+    at least two polls to end just like a real one. Any other request goes
+    straight to the wrapped provider.
+    """
+
+    def __init__(self, provider: ModelProvider, batch_dir: Union[str, Path]):
+        self.provider = provider
+        self.batch_dir = Path(batch_dir)
+        self.batch_dir.mkdir(parents=True, exist_ok=True)
+
+    def create_client(self):
+        return None
+
+    def request(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> ModelResponse:
+        return self.provider.request(
+            model, message, temperature, max_tokens, stop_sequences
+        )
+
+    async def request_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> ModelResponse:
+        return await self.provider.request_async(
+            model, message, temperature, max_tokens, stop_sequences
+        )
+
+    async def submit_batch_async(self, requests: List[BatchRequest]) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        lines = [json.dumps(request.to_dict()) for request in requests]
+        self._path(batch_id, "requests").write_text("\n".join(lines) + "\n")
+        return batch_id
+
+    async def poll_batch_async(
+        self, batch_id: str
+    ) -> Optional[Dict[str, Union[ModelResponse, Exception]]]:
+        results_path = self._path(batch_id, "results")
+        if not results_path.exists():
+            await self._process_batch(batch_id)
+            return None
+
+        results = {}
+        for line in results_path.read_text().splitlines():
+            record = json.loads(line)
+            if "error" in record:
+                results[record["custom_id"]] = RuntimeError(record["error"])
+            else:
+                results[record["custom_id"]] = ModelResponse.from_dict(
+                    record["response"]
+                )
+        return results
+
+    async def _process_batch(self, batch_id: str) -> None:
+        requests = [
+            BatchRequest.from_dict(json.loads(line))
+            for line in self._path(batch_id, "requests").read_text().splitlines()
+        ]
+
+        async def answer(request: BatchRequest) -> dict:
+            try:
+                model_response = await self.provider.request_async(
+                    request.model,
+                    request.message,
+                    request.temperature,
+                    request.max_tokens,
+                    request.stop_sequences,
+                )
+            except Exception as e:
+                return {"custom_id": request.custom_id, "error": str(e)}
+            return {
+                "custom_id": request.custom_id,
+                "response": model_response.to_dict(),
+            }
+
+        records = await asyncio.gather(*(answer(request) for request in requests))
+        self._path(batch_id, "results").write_text(
+            "".join(json.dumps(record) + "\n" for record in records)
+        )
+
+    def _path(self, batch_id: str, kind: str) -> Path:
+        return self.batch_dir / f"{batch_id}.{kind}.jsonl"
+
+    def tokenize(self, model: str, message: str) -> List[int]:
+        return self.provider.tokenize(model, message)
+
+    def decode(self, model: str, tokens: List[int]) -> str:
+        return self.provider.decode(model, tokens)
+
+    def get_num_tokens(self, model: str, message: str) -> int:
+        return self.provider.get_num_tokens(model, message)
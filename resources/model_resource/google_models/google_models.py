@@ -1,10 +1,10 @@
 from datetime import datetime
-from typing import List
+from typing import AsyncIterator, List
 
 import google.generativeai as gemini
 
 from resources.model_resource.model_provider import ModelProvider
-from resources.model_resource.model_response import ModelResponse
+from resources.model_resource.model_response import ModelResponse, StreamChunk
 
 
 class GoogleModels(ModelProvider):
@@ -27,56 +27,128 @@ class GoogleModels(ModelProvider):
             self.client = self.create_client(model)
 
         start_time = datetime.now()
-        status_code = None
 
         try:
             response = self.client.generate_content(
                 contents=message,
-                generation_config=gemini.types.GenerationConfig(
-                    temperature=temperature,
-                    stop_sequences=stop_sequences,
-                    max_output_tokens=max_tokens,
+                generation_config=self._generation_config(
+                    temperature, max_tokens, stop_sequences
+                ),
+            )
+            input_tokens = self.client.count_tokens(message).total_tokens
+            return self._to_model_response(response, input_tokens, start_time)
+        except Exception as e:
+            self._attach_status_code(e)
+            raise
+
+    async def request_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> ModelResponse:
+        # GenerativeModel exposes both sync and async methods on the same client
+        if self.client is None or self.client.model_name != model:
+            self.client = self.create_client(model)
+
+        start_time = datetime.now()
+
+        try:
+            response = await self.client.generate_content_async(
+                contents=message,
+                generation_config=self._generation_config(
+                    temperature, max_tokens, stop_sequences
                 ),
             )
+            input_tokens = (await self.client.count_tokens_async(message)).total_tokens
+            return self._to_model_response(response, input_tokens, start_time)
+        except Exception as e:
+            self._attach_status_code(e)
+            raise
 
-            # For successful responses, check if we can extract status code
-            if hasattr(response, "response") and hasattr(
-                response.response, "status_code"
-            ):
-                status_code = response.response.status_code
-
-            end_time = datetime.now()
-            response_request_duration = (end_time - start_time).total_seconds() * 1000
-
-            return ModelResponse(
-                content=response.text,
-                input_tokens=self.client.count_tokens(message).total_tokens,
-                output_tokens=response.usage_metadata.candidates_token_count,
-                time_taken_in_ms=response_request_duration,
-                status_code=status_code,
+    async def request_stream_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> AsyncIterator[StreamChunk]:
+        if self.client is None or self.client.model_name != model:
+            self.client = self.create_client(model)
+
+        try:
+            response = await self.client.generate_content_async(
+                contents=message,
+                generation_config=self._generation_config(
+                    temperature, max_tokens, stop_sequences
+                ),
+                stream=True,
             )
+            async for chunk in response:
+                # Every chunk carries the usage so far
+                usage = chunk.usage_metadata
+                yield StreamChunk(
+                    text="".join(part.text for part in chunk.parts),
+                    input_tokens=usage.prompt_token_count,
+                    output_tokens=usage.candidates_token_count,
+                )
         except Exception as e:
-            # Extract status code from Google API errors
-            try:
-                # Google API exceptions might have status_code attribute
-                if hasattr(e, "status_code"):
-                    status_code = e.status_code
-                elif hasattr(e, "response") and hasattr(e.response, "status_code"):
-                    status_code = e.response.status_code
-                # Sometimes errors are included in error.details
-                elif hasattr(e, "details") and isinstance(e.details, list):
-                    for detail in e.details:
-                        if hasattr(detail, "status") and detail.status.isdigit():
-                            status_code = int(detail.status)
-                            break
-            except:
-                pass  # If we can't extract the code, just continue
-
-            # Attach status code to the exception
-            if status_code is not None:
-                e.status_code = status_code
+            self._attach_status_code(e)
             raise
 
+    def _generation_config(
+        self, temperature: float, max_tokens: int, stop_sequences: List[str]
+    ) -> gemini.types.GenerationConfig:
+        return gemini.types.GenerationConfig(
+            temperature=temperature,
+            stop_sequences=stop_sequences,
+            max_output_tokens=max_tokens,
+        )
+
+    def _to_model_response(
+        self, response, input_tokens: int, start_time: datetime
+    ) -> ModelResponse:
+        status_code = None
+        # For successful responses, check if we can extract status code
+        if hasattr(response, "response") and hasattr(response.response, "status_code"):
+            status_code = response.response.status_code
+
+        end_time = datetime.now()
+        response_request_duration = (end_time - start_time).total_seconds() * 1000
+
+        return ModelResponse(
+            content=response.text,
+            input_tokens=input_tokens,
+            output_tokens=response.usage_metadata.candidates_token_count,
+            time_taken_in_ms=response_request_duration,
+            status_code=status_code,
+        )
+
+    def _attach_status_code(self, e: Exception) -> None:
+        status_code = None
+        # Extract status code from Google API errors
+        try:
+            # Google API exceptions might have status_code attribute
+            if hasattr(e, "status_code"):
+                status_code = e.status_code
+            elif hasattr(e, "response") and hasattr(e.response, "status_code"):
+                status_code = e.response.status_code
+            # Sometimes errors are included in error.details
+            elif hasattr(e, "details") and isinstance(e.details, list):
+                for detail in e.details:
+                    if hasattr(detail, "status") and detail.status.isdigit():
+                        status_code = int(detail.status)
+                        break
+        except:
+            pass  # If we can't extract the code, just continue
+
+        # Attach status code to the exception
+        if status_code is not None:
+            e.status_code = status_code
+
     def tokenize(self, model: str, message: str) -> List[int]:
         raise NotImplementedError("Tokenization is not supported for Gemini models")
 
@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+from resources.model_resource.model_response import ModelResponse
+from utils.logger import get_main_logger
+
+logger = get_main_logger(__name__)
+
+DEFAULT_HEDGE_INITIAL_DELAY = 60.0  # Seconds, used until enough latencies are seen
+MIN_LATENCY_SAMPLES = 10
+LATENCY_WINDOW = 200
+
+
+class LatencyTracker:
+    """Sliding window of recent request latencies for one model."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Nearest-rank percentile of the window, or None with too few samples."""
+        with self._lock:
+            if len(self._latencies) < MIN_LATENCY_SAMPLES:
+                return None
+            latencies = sorted(self._latencies)
+        rank = max(
+            0, min(len(latencies) - 1, round(percentile / 100 * len(latencies)) - 1)
+        )
+        return latencies[rank]
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(model: str) -> LatencyTracker:
+    """Return the process-wide latency tracker for a model."""
+    with _trackers_lock:
+        tracker = _trackers.get(model)
+        if tracker is None:
+            tracker = LatencyTracker()
+            _trackers[model] = tracker
+    return tracker
+
+
+@dataclass(frozen=True)
+class HedgeOutcome:
+    """
+    Result of a hedged request. loser_response is only set when the losing
+    request also completed before it could be cancelled.
+    """
+
+    response: ModelResponse
+    hedged: bool = False
+    hedge_won: bool = False
+    loser_response: Optional[ModelResponse] = None
+
+
+def is_valid_response(response: ModelResponse) -> bool:
+    return bool(response.content and response.content.strip())
+
+
+async def hedge_request(
+    primary: Callable[[], Awaitable[ModelResponse]],
+    hedge: Callable[[], Awaitable[ModelResponse]],
+    delay: float,
+    latency_tracker: Optional[LatencyTracker] = None,
+) -> HedgeOutcome:
+    """
+    Run primary, and if it has not returned a valid response after delay
+    seconds, start hedge as well. The first valid response wins and the other
+    request is cancelled. If both fail, the primary's exception is raised.
+
+    The primary's latency is recorded in latency_tracker. When it is cancelled,
+    the time it ran is recorded as a lower bound, so slow calls still push the
+    percentile up instead of dropping out of the window.
+    """
+    start_time = time.time()
+    primary_task = asyncio.ensure_future(primary())
+    hedge_task: Optional[asyncio.Task] = None
+    try:
+        done, _ = await asyncio.wait({primary_task}, timeout=delay)
+        if done and _succeeded(primary_task):
+            _record(latency_tracker, start_time)
+            return HedgeOutcome(response=primary_task.result())
+
+        if not done:
+            logger.info(
+                f"No response after {delay:.1f}s, sending a hedged duplicate request"
+            )
+            hedge_task = asyncio.ensure_future(hedge())
+        pending = {primary_task} | ({hedge_task} if hedge_task else set())
+        pending = {task for task in pending if not task.done()}
+        winner = None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            # Prefer the primary if both finished at once
+            for task in sorted(done, key=lambda task: task is not primary_task):
+                if _succeeded(task):
+                    winner = task
+                    break
+    except asyncio.CancelledError:
+        for task in (primary_task, hedge_task):
+            if task is not None:
+                task.cancel()
+        raise
+
+    _record(latency_tracker, start_time)
+    if winner is None:
+        # Neither request produced a valid response, report the primary's outcome
+        if primary_task.exception() is not None:
+            raise primary_task.exception()
+        return HedgeOutcome(
+            response=primary_task.result(), hedged=hedge_task is not None
+        )
+
+    loser = hedge_task if winner is primary_task else primary_task
+    loser_response = None
+    if loser is not None:
+        if loser.done():
+            if _succeeded(loser):
+                loser_response = loser.result()
+        else:
+            loser.cancel()
+    if winner is hedge_task:
+        logger.info("Hedged request returned first")
+    return HedgeOutcome(
+        response=winner.result(),
+        hedged=hedge_task is not None,
+        hedge_won=winner is hedge_task,
+        loser_response=loser_response,
+    )
+
+
+def _succeeded(task: asyncio.Future) -> bool:
+    return (
+        not task.cancelled()
+        and task.exception() is None
+        and is_valid_response(task.result())
+    )
+
+
+def _record(latency_tracker: Optional[LatencyTracker], start_time: float) -> None:
+    if latency_tracker is not None:
+        latency_tracker.record(time.time() - start_time)
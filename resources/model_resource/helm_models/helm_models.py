@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 from helm.common.authentication import Authentication
 from helm.common.request import Request, RequestResult
@@ -14,12 +14,20 @@ from messages.action_messages.action_message import ActionMessage
 from resources.model_resource.model_mapping import ModelRegistry
 from resources.model_resource.model_provider import ModelProvider
 from resources.model_resource.model_response import ModelResponse
+from resources.model_resource.tokenizer_registry import (
+    get_local_helm_tokenizer,
+    helm_remote_tokenization_enabled,
+)
 
 
 class HelmModels(ModelProvider):
-    def __init__(self):
+    def __init__(self, remote_tokenization: Optional[bool] = None):
         self.authentication = Authentication(api_key=self._api_key())
         self.client = self.create_client()
+        # Tokenize locally unless exact remote tokenization is requested
+        if remote_tokenization is None:
+            remote_tokenization = helm_remote_tokenization_enabled()
+        self.remote_tokenization = remote_tokenization
 
     def create_client(self) -> RemoteService:
         remote_service = RemoteService("https://crfm-models.stanford.edu")
@@ -89,6 +97,7 @@ class HelmModels(ModelProvider):
                 ),
                 time_taken_in_ms=response_request_duration,
                 status_code=status_code,
+                tokens_estimated=self.tokens_estimated(model),
             )
         except Exception as e:
             # Extract status code from Helm API errors
@@ -108,8 +117,16 @@ class HelmModels(ModelProvider):
                 e.status_code = status_code
             raise
 
+    def tokens_estimated(self, model: str) -> bool:
+        """Whether token counts of model are estimates, see FALLBACK_ENCODING."""
+        if self.remote_tokenization:
+            return False
+        return get_local_helm_tokenizer(ModelRegistry.get_tokenizer(model)).estimated
+
     def tokenize(self, model: str, message: str) -> List[int]:
         tokenizer = ModelRegistry.get_tokenizer(model)
+        if not self.remote_tokenization:
+            return get_local_helm_tokenizer(tokenizer).encode(message)
         request = TokenizationRequest(tokenizer=tokenizer, text=message, encode=True)
         tokenization_result = self.client.tokenize(
             auth=self.authentication, request=request
@@ -118,12 +135,16 @@ class HelmModels(ModelProvider):
 
     def decode(self, model: str, tokens: List[int]) -> str:
         tokenizer = ModelRegistry.get_tokenizer(model)
+        if not self.remote_tokenization:
+            return get_local_helm_tokenizer(tokenizer).decode(tokens)
         request = DecodeRequest(tokens=tokens, tokenizer=tokenizer)
         decoding_result = self.client.decode(auth=self.authentication, request=request)
         return decoding_result.text
 
     def get_num_tokens(self, model: str, message: str) -> int:
         tokenizer_name = ModelRegistry.get_tokenizer(model)
+        if not self.remote_tokenization:
+            return get_local_helm_tokenizer(tokenizer_name).count(message)
         request = TokenizationRequest(tokenizer=tokenizer_name, text=message)
         tokenization_result: TokenizationRequestResult = self.client.tokenize(
             auth=self.authentication, request=request
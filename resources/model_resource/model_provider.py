@@ -1,14 +1,20 @@
+import asyncio
 import os
 import threading
 import time
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, wait
 from pathlib import Path
-from time import sleep
-from typing import List
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
 
 from dotenv import find_dotenv, load_dotenv
 
-from resources.model_resource.model_response import ModelResponse
+from resources.model_resource.model_response import (
+    BatchRequest,
+    ModelResponse,
+    StreamChunk,
+)
+from resources.model_resource.tokenizer_registry import get_tiktoken_encoding
 from utils.logger import get_main_logger
 
 logger = get_main_logger(__name__)
@@ -82,6 +88,26 @@ class ModelProvider(ABC):
         """
         pass
 
+    def create_async_client(self):
+        """
+        Create an asyncio-native client for the model provider.
+        Providers whose SDK has no async client return None and fall back to
+        running the synchronous request in a worker thread.
+        """
+        return None
+
+    def get_async_client(self):
+        """
+        Return the async client bound to the running event loop, creating it on
+        first use. Async HTTP clients hold loop-bound connection pools, so a new
+        client is created if the provider is used from a different event loop.
+        """
+        loop = asyncio.get_running_loop()
+        if getattr(self, "_async_client_loop", None) is not loop:
+            self.async_client = self.create_async_client()
+            self._async_client_loop = loop
+        return self.async_client
+
     def make_request(
         self,
         model: str,
@@ -94,52 +120,354 @@ class ModelProvider(ABC):
     ) -> ModelResponse:
         """
         A method that:
-            - Spawns a thread to run the request method.
-            - Logs a message while waiting for the request to finish.
-            - Returns the ModelResponse once the thread is done.
+            - Spawns a daemon thread to run the request method.
+            - Logs a heartbeat on a separate timer while waiting for the request.
+            - Returns the ModelResponse as soon as the request completes.
+            - Cancels the in-flight request via cancel_request() on timeout.
         """
         start_time = time.time()
-
-        done_flag = [False]  # Shared boolean to signal completion
-        response_holder = [None]  # Holds the ModelResponse when done
-        error_holder = [None]  # Holds exception info if something goes wrong
+        future: Future = Future()
 
         def run_request():
+            if not future.set_running_or_notify_cancel():
+                return
             try:
                 response = self.request(
                     model, message, temperature, max_tokens, stop_sequences
                 )
-                response_holder[0] = response
-            except Exception as e:
-                error_holder[0] = e
-            finally:
-                done_flag[0] = True
+                future.set_result(response)
+            except BaseException as e:
+                future.set_exception(e)
 
-        # Start the child-class _request logic in a separate thread
-        request_thread = threading.Thread(target=run_request)
+        # Start the child-class request logic in a separate thread. The thread is a
+        # daemon so that a hung provider call can never block interpreter shutdown.
+        request_thread = threading.Thread(
+            target=run_request, name=f"{self.__class__.__name__}-request", daemon=True
+        )
         request_thread.start()
 
-        # Periodically log heartbeat until request completes or fails
-        while not done_flag[0]:
-            elapsed = time.time() - start_time
-            if elapsed > timeout:
-                logger.warning(f"Timeout of {timeout}s reached. Cancelling request.")
-                raise TimeoutError(f"Model request timed out after {timeout} seconds")
-            logger.debug(
-                f"{elapsed:.1f}s has passed. Still waiting for LLM provider to respond..."
-            )
-            sleep(logging_interval)
+        heartbeat_stop = self._start_heartbeat(start_time, logging_interval)
+        try:
+            # Wakes up as soon as the future resolves, or once the timeout expires
+            wait([future], timeout=timeout)
+        finally:
+            heartbeat_stop.set()
+
+        if not future.done():
+            logger.warning(f"Timeout of {timeout}s reached. Cancelling request.")
+            future.cancel()
+            self.cancel_request()
+            raise TimeoutError(f"Model request timed out after {timeout} seconds")
 
         # If the child thread encountered an error, re-raise it
-        if error_holder[0] is not None:
-            exception = error_holder[0]
+        exception = future.exception()
+        if exception is not None:
             # Log the status code if available
             if hasattr(exception, "status_code"):
                 logger.error(f"API error with status code: {exception.status_code}")
             raise exception
 
         # Otherwise, return the response from the child
-        return response_holder[0]
+        return future.result()
+
+    async def request_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> ModelResponse:
+        """
+        Request a response from a model without blocking the event loop.
+        Providers with an async SDK client override this. The default runs the
+        synchronous request in a worker thread, and cancels it through
+        cancel_request() if the awaiting task is cancelled.
+        """
+        try:
+            return await asyncio.to_thread(
+                self.request, model, message, temperature, max_tokens, stop_sequences
+            )
+        except asyncio.CancelledError:
+            self.cancel_request()
+            raise
+
+    async def make_request_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+        logging_interval: float = 10.0,
+        timeout: float = 300.0,
+    ) -> ModelResponse:
+        """
+        Async counterpart of make_request:
+            - Awaits request_async on the running event loop.
+            - Logs a heartbeat from a separate task while waiting.
+            - Cancels the request task on timeout.
+        """
+        return await self._await_with_timeout(
+            self.request_async(model, message, temperature, max_tokens, stop_sequences),
+            logging_interval,
+            timeout,
+        )
+
+    def request_stream_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> AsyncIterator[StreamChunk]:
+        """
+        Stream a response from a model as StreamChunks.
+        Providers that support streaming override this with an async generator.
+        Closing the generator early must abort generation on the provider side.
+        """
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support streaming"
+        )
+
+    @property
+    def supports_streaming(self) -> bool:
+        return type(self).request_stream_async is not ModelProvider.request_stream_async
+
+    async def submit_batch_async(self, requests: List[BatchRequest]) -> str:
+        """
+        Submit requests to the provider's batch API, which answers them offline
+        at a lower price. Providers with a batch API override this together with
+        poll_batch_async.
+        Returns:
+            str: The provider's id for the batch.
+        """
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support batch requests"
+        )
+
+    async def poll_batch_async(
+        self, batch_id: str
+    ) -> Optional[Dict[str, Union[ModelResponse, Exception]]]:
+        """
+        Check on a submitted batch.
+        Returns:
+            None while the batch is still running. Once it has ended, the result of
+            every request that completed, keyed by custom_id: a ModelResponse, or
+            the exception describing why the request failed.
+        """
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support batch requests"
+        )
+
+    @property
+    def supports_batch(self) -> bool:
+        return type(self).submit_batch_async is not ModelProvider.submit_batch_async
+
+    async def make_streaming_request_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+        stop_at: Optional[Callable[[str], Optional[int]]] = None,
+        stop_overlap: int = 0,
+        logging_interval: float = 10.0,
+        timeout: float = 300.0,
+    ) -> ModelResponse:
+        """
+        Streaming counterpart of make_request_async:
+            - Passes every text chunk to stop_at, with up to stop_overlap
+              characters received before it, so that a stop marker split across
+              chunks is found. Once stop_at returns an index into that text, the
+              stream is closed and the content cut there.
+            - Records the time to the first text chunk.
+            - Falls back to make_request_async if the provider cannot stream.
+        Token counts the provider did not report, e.g. because the stream was
+        closed before its final usage event, are estimated locally.
+        """
+        if not self.supports_streaming:
+            return await self.make_request_async(
+                model,
+                message,
+                temperature,
+                max_tokens,
+                stop_sequences,
+                logging_interval=logging_interval,
+                timeout=timeout,
+            )
+
+        async def consume_stream() -> ModelResponse:
+            start_time = time.time()
+            chunks = []
+            # Length of the text received before the current chunk, and its end
+            length = 0
+            tail = ""
+            content = None
+            time_to_first_token_ms = None
+            input_tokens = None
+            output_tokens = None
+            cached_input_tokens = None
+            cache_write_input_tokens = None
+            generated = None
+
+            stream = self.request_stream_async(
+                model, message, temperature, max_tokens, stop_sequences
+            )
+            try:
+                async for chunk in stream:
+                    if chunk.input_tokens is not None:
+                        input_tokens = chunk.input_tokens
+                    if chunk.output_tokens is not None:
+                        output_tokens = chunk.output_tokens
+                    if chunk.cached_input_tokens is not None:
+                        cached_input_tokens = chunk.cached_input_tokens
+                    if chunk.cache_write_input_tokens is not None:
+                        cache_write_input_tokens = chunk.cache_write_input_tokens
+                    if not chunk.text:
+                        continue
+                    if time_to_first_token_ms is None:
+                        time_to_first_token_ms = (time.time() - start_time) * 1000
+                    chunks.append(chunk.text)
+                    if stop_at is None:
+                        continue
+
+                    # Only the new text is scanned, rescanning everything received
+                    # would be quadratic in the length of the response
+                    window = tail + chunk.text
+                    cut = stop_at(window)
+                    if cut is not None:
+                        generated = "".join(chunks)
+                        logger.info(
+                            f"Stopping stream early after {len(generated)} characters"
+                        )
+                        content = generated[: length - len(tail) + cut]
+                        break
+                    length += len(chunk.text)
+                    tail = window[-stop_overlap:] if stop_overlap > 0 else ""
+            finally:
+                await stream.aclose()
+
+            if content is None:
+                content = "".join(chunks)
+
+            tokens_estimated = input_tokens is None or output_tokens is None
+            if input_tokens is None:
+                input_tokens = self._estimate_num_tokens(message)
+            if output_tokens is None:
+                output_tokens = self._estimate_num_tokens(generated or content)
+            return ModelResponse(
+                content=content,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                time_taken_in_ms=(time.time() - start_time) * 1000,
+                time_to_first_token_ms=time_to_first_token_ms,
+                cached_input_tokens=cached_input_tokens,
+                cache_write_input_tokens=cache_write_input_tokens,
+                tokens_estimated=tokens_estimated,
+            )
+
+        return await self._await_with_timeout(
+            consume_stream(), logging_interval, timeout
+        )
+
+    def _estimate_num_tokens(self, text: str) -> int:
+        return len(get_tiktoken_encoding().encode(text, disallowed_special=()))
+
+    async def _await_with_timeout(
+        self,
+        request: Awaitable[ModelResponse],
+        logging_interval: float,
+        timeout: float,
+    ) -> ModelResponse:
+        """
+        Await a request while logging a heartbeat, cancelling it on timeout.
+        """
+        start_time = time.time()
+        request_task = asyncio.ensure_future(request)
+        heartbeat_task = asyncio.create_task(
+            self._heartbeat_async(start_time, logging_interval)
+        )
+        try:
+            done, _ = await asyncio.wait({request_task}, timeout=timeout)
+        except asyncio.CancelledError:
+            request_task.cancel()
+            raise
+        finally:
+            heartbeat_task.cancel()
+
+        if not done:
+            logger.warning(f"Timeout of {timeout}s reached. Cancelling request.")
+            request_task.cancel()
+            try:
+                await request_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            raise TimeoutError(f"Model request timed out after {timeout} seconds")
+
+        exception = request_task.exception()
+        if exception is not None:
+            # Log the status code if available
+            if hasattr(exception, "status_code"):
+                logger.error(f"API error with status code: {exception.status_code}")
+            raise exception
+
+        return request_task.result()
+
+    async def _heartbeat_async(self, start_time: float, logging_interval: float):
+        while True:
+            await asyncio.sleep(logging_interval)
+            elapsed = time.time() - start_time
+            logger.debug(
+                f"{elapsed:.1f}s has passed. Still waiting for LLM provider to respond..."
+            )
+
+    def _start_heartbeat(
+        self, start_time: float, logging_interval: float
+    ) -> threading.Event:
+        """
+        Start a timer thread that periodically logs how long we have been waiting
+        on the provider. Returns the event used to stop the heartbeat.
+        """
+        stop_event = threading.Event()
+
+        def heartbeat():
+            while not stop_event.wait(logging_interval):
+                elapsed = time.time() - start_time
+                logger.debug(
+                    f"{elapsed:.1f}s has passed. Still waiting for LLM provider to respond..."
+                )
+
+        threading.Thread(
+            target=heartbeat,
+            name=f"{self.__class__.__name__}-heartbeat",
+            daemon=True,
+        ).start()
+        return stop_event
+
+    def cancel_request(self) -> None:
+        """
+        Abort any in-flight request on this provider.
+        By default, closes the underlying client (which aborts pending HTTP calls in
+        the worker thread) and replaces it with a fresh one for subsequent requests.
+        Providers whose clients cannot be closed leave the request to finish in the
+        background; its result is discarded.
+        """
+        client = getattr(self, "client", None)
+        close = getattr(client, "close", None)
+        if not callable(close):
+            logger.debug(
+                f"{self.__class__.__name__} client does not support cancellation"
+            )
+            return
+
+        try:
+            close()
+        except Exception as e:
+            logger.debug(f"Error closing {self.__class__.__name__} client: {e}")
+        self.client = self.create_client()
 
     @abstractmethod
     def tokenize(self, model: str, message: str) -> List[int]:
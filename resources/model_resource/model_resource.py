@@ -1,21 +1,55 @@
+import asyncio
 import re
 from dataclasses import dataclass, field
 from typing import Any, List, Optional
 
-import tiktoken
-
 from messages.action_messages.action_message import ActionMessage
 from messages.message import Message
 from prompts.prompts import STOP_TOKEN
 from resources.base_resource import BaseResourceConfig
+from resources.memory_resource.memory_budget import MemoryTokenBudget
 from resources.model_resource.anthropic_models.anthropic_models import (
     DEFAULT_THINKING_BUDGET,
     EXTENDED_THINKING_SUFFIX,
 )
+from resources.model_resource.batch_inference import (
+    DEFAULT_BATCH_POLL_INTERVAL,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_BATCH_TIMEOUT,
+    LocalBatchModels,
+    get_batch_scheduler,
+)
+from resources.model_resource.hedging import (
+    DEFAULT_HEDGE_INITIAL_DELAY,
+    HedgeOutcome,
+    get_latency_tracker,
+    hedge_request,
+)
 from resources.model_resource.helm_models.helm_models import HelmModels
+from resources.model_resource.model_mapping import get_model_info
 from resources.model_resource.model_provider import ModelProvider
-from resources.model_resource.model_utils import truncate_input_to_max_tokens
+from resources.model_resource.model_response import ModelResponse
+from resources.model_resource.model_utils import (
+    get_num_tokens,
+    get_tokenizer,
+    truncate_input_to_max_tokens,
+)
+from resources.model_resource.rate_limiter import (
+    RateLimit,
+    RateLimiter,
+    get_rate_limiter,
+    get_retry_after,
+)
+from resources.model_resource.response_cache import (
+    DEFAULT_CACHE_PATH,
+    DEFAULT_MAX_CACHE_MB,
+    ResponseCache,
+    ResponseCacheMiss,
+    ResponseCacheMode,
+    get_response_cache,
+)
 from resources.model_resource.services.api_key_service import verify_and_auth_api_key
+from resources.model_resource.tokenizer_registry import get_tiktoken_encoding
 from resources.runnable_base_resource import RunnableBaseResource
 from utils.logger import get_main_logger
 
@@ -28,6 +62,13 @@ HALLUCINATION_STRINGS = [
     "----------</assistant",
     "----------Message from agent",
 ]
+AGENT_HEADER = "----------Message from agent----------"
+# Text received before a streamed chunk that find_stream_stop looks at with it,
+# enough for a marker that starts before the chunk and for the agent header
+# around it
+STREAM_STOP_OVERLAP = len(AGENT_HEADER) + max(
+    len(marker) for marker in [STOP_TOKEN] + HALLUCINATION_STRINGS
+)
 
 
 @dataclass
@@ -45,6 +86,35 @@ class ModelResourceConfig(BaseResourceConfig):
     budget_tokens: Optional[int] = field(
         default=None
     )  # Claude 3.7 extended thinking budget_tokens
+    use_streaming: bool = field(
+        default=False
+    )  # Stream responses in run_async and stop at the stop token/hallucinations
+    response_cache_mode: Optional[str] = field(
+        default=None
+    )  # One of ResponseCacheMode; None disables the response cache
+    response_cache_path: str = field(default=str(DEFAULT_CACHE_PATH))
+    response_cache_max_mb: int = field(default=DEFAULT_MAX_CACHE_MB)
+    requests_per_minute: Optional[int] = field(default=None)
+    tokens_per_minute: Optional[int] = field(default=None)
+    rate_limit_dir: Optional[str] = field(
+        default=None
+    )  # Shares the rate limit budget with other processes through this directory
+    use_batch: bool = field(
+        default=False
+    )  # Send run_async requests through the provider's batch API
+    batch_size: int = field(default=DEFAULT_BATCH_SIZE)
+    batch_poll_interval: float = field(default=DEFAULT_BATCH_POLL_INTERVAL)
+    batch_timeout: float = field(default=DEFAULT_BATCH_TIMEOUT)
+    local_batch_dir: Optional[str] = field(
+        default=None
+    )  # Use a file-based stand-in for the batch API in this directory
+    hedge_percentile: Optional[float] = field(
+        default=None
+    )  # Send a duplicate request once a call is slower than this latency percentile
+    hedge_model: Optional[str] = field(
+        default=None
+    )  # Model for the duplicate request; defaults to the same model
+    hedge_initial_delay: float = field(default=DEFAULT_HEDGE_INITIAL_DELAY)
 
     @classmethod
     def create(cls, **kwargs):
@@ -79,8 +149,40 @@ class ModelResourceConfig(BaseResourceConfig):
             raise ValueError("max_input_tokens must be positive")
         if self.max_output_tokens <= 0:
             raise ValueError("max_output_tokens must be positive")
-        if not self.use_mock_model:
+        if self.response_cache_mode is not None:
+            try:
+                ResponseCacheMode(self.response_cache_mode)
+            except ValueError as err:
+                raise ValueError(
+                    f"Invalid response_cache_mode: {self.response_cache_mode}"
+                ) from err
+            if self.response_cache_max_mb <= 0:
+                raise ValueError("response_cache_max_mb must be positive")
+        if self.requests_per_minute is not None and self.requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        if self.tokens_per_minute is not None and self.tokens_per_minute <= 0:
+            raise ValueError("tokens_per_minute must be positive")
+        if self.use_batch:
+            if self.use_streaming:
+                raise ValueError("use_batch and use_streaming cannot be combined")
+            if self.batch_size <= 0:
+                raise ValueError("batch_size must be positive")
+        if self.hedge_percentile is not None:
+            if not 0 < self.hedge_percentile < 100:
+                raise ValueError("hedge_percentile must be between 0 and 100")
+            if self.use_batch:
+                raise ValueError("use_batch and hedging cannot be combined")
+            if self.hedge_model is not None:
+                # Raises ValueError for models missing from model_mapping
+                get_model_info(self.hedge_model, self.use_helm)
+        if not self.use_mock_model and not self.is_replay:
             verify_and_auth_api_key(self.model, self.use_helm)
+            if self.hedge_model is not None and self.hedge_percentile is not None:
+                verify_and_auth_api_key(self.hedge_model, self.use_helm)
+
+    @property
+    def is_replay(self) -> bool:
+        return self.response_cache_mode == ResponseCacheMode.REPLAY
 
 
 class ModelResponseFailure(Exception):
@@ -89,9 +191,11 @@ class ModelResponseFailure(Exception):
     Carries the original exception and the input associated with the failure.
     """
 
-    def __init__(self, exception=None, input=None):
+    def __init__(self, exception=None, input=None, retry_after=None):
         self.exception = exception
         self.input = input
+        # Seconds the provider asked us to wait before retrying, if it said so
+        self.retry_after = retry_after
 
         # Create a message that includes information about the original exception
         exception_msg = str(self.exception) if self.exception else "Unknown error"
@@ -113,17 +217,64 @@ class ModelResource(RunnableBaseResource):
         self.stop_sequences = self._resource_config.stop_sequences
         self.use_mock_model = self._resource_config.use_mock_model
         self.timeout = self._resource_config.timeout
-        if not self.use_mock_model:
+        self.use_streaming = self._resource_config.use_streaming
+        self.response_cache_mode: Optional[ResponseCacheMode] = None
+        self.response_cache: Optional[ResponseCache] = None
+        if self._resource_config.response_cache_mode and not self.use_mock_model:
+            self.response_cache_mode = ResponseCacheMode(
+                self._resource_config.response_cache_mode
+            )
+            self.response_cache = get_response_cache(
+                self._resource_config.response_cache_path,
+                self._resource_config.response_cache_max_mb,
+            )
+        self.use_batch = self._resource_config.use_batch
+        self.hedge_percentile = self._resource_config.hedge_percentile
+        # Replays are served entirely from the cache, so no provider is needed
+        if not self.use_mock_model and not self._resource_config.is_replay:
             self.model_provider: ModelProvider = self.get_model_provider()
+            if self.use_batch and self._resource_config.local_batch_dir:
+                self.model_provider = LocalBatchModels(
+                    self.model_provider, self._resource_config.local_batch_dir
+                )
+            if self.use_batch and not self.model_provider.supports_batch:
+                raise ValueError(f"Batch requests are not supported for {self.model}")
+            if self._resource_config.hedge_percentile is not None:
+                # A separate provider, so cancelling the loser cannot affect the winner
+                self.hedge_model = self._resource_config.hedge_model or self.model
+                self.hedge_model_provider: ModelProvider = self.get_model_provider(
+                    self.hedge_model
+                )
+                self.hedge_rate_limiter: RateLimiter = get_rate_limiter(
+                    provider="helm" if self.helm else self.hedge_model.split("/")[0],
+                    model=self.hedge_model,
+                    limit=RateLimit(
+                        requests_per_minute=self._resource_config.requests_per_minute,
+                        tokens_per_minute=self._resource_config.tokens_per_minute,
+                    ),
+                    state_dir=self._resource_config.rate_limit_dir,
+                )
+            self.rate_limiter: RateLimiter = get_rate_limiter(
+                provider="helm" if self.helm else self.model.split("/")[0],
+                model=self.model,
+                limit=RateLimit(
+                    requests_per_minute=self._resource_config.requests_per_minute,
+                    tokens_per_minute=self._resource_config.tokens_per_minute,
+                ),
+                state_dir=self._resource_config.rate_limit_dir,
+            )
         self.budget_tokens = (
             self._resource_config.budget_tokens
             if self._resource_config.budget_tokens is not None
             else None
         )
 
-    def get_model_provider(self) -> ModelProvider:
+    def get_model_provider(self, model: Optional[str] = None) -> ModelProvider:
         """
         Get the appropriate model provider based on the model type.
+        Args:
+            model (str, optional): The model to get a provider for. Defaults to
+                this resource's model.
         Returns:
             ModelProvider: An instance of the appropriate model provider class.
         """
@@ -133,7 +284,8 @@ class ModelResource(RunnableBaseResource):
             model_provider = HelmModels()
         else:
             # Select provider based on model name prefix
-            model_prefix = self.model.split("/")[0].lower() if "/" in self.model else ""
+            model = model or self.model
+            model_prefix = model.split("/")[0].lower() if "/" in model else ""
 
             if model_prefix == "anthropic":
                 from resources.model_resource.anthropic_models.anthropic_models import (
@@ -169,17 +321,40 @@ class ModelResource(RunnableBaseResource):
 
                 model_provider = XAIModels()
             else:
-                raise Exception(f"Unknown model type: {self.model}")
+                raise Exception(f"Unknown model type: {model}")
         return model_provider
 
     def remove_hallucinations(self, response: str):
-        response = response.replace("----------Message from agent----------", "")
+        response = response.replace(AGENT_HEADER, "")
         for hallucination in HALLUCINATION_STRINGS:
             hallucination_index = response.find(hallucination)
             if hallucination_index != -1:
                 response = response[:hallucination_index]
         return response.strip()
 
+    def find_stream_stop(self, response: str) -> Optional[int]:
+        """
+        Return where to cut the text of a streamed response once it contains the
+        stop token or a hallucination marker, or None to keep streaming. Streams
+        pass the latest chunk with STREAM_STOP_OVERLAP characters before it. The
+        marker is kept so that remove_hallucinations and remove_stop_token see the
+        same text as they would for the full response.
+        """
+        # remove_hallucinations drops full agent headers before searching, so blank
+        # them out here (keeping indices aligned) rather than stopping at them
+        search_text = response.replace(AGENT_HEADER, " " * len(AGENT_HEADER))
+        cut = None
+        for marker in [STOP_TOKEN] + HALLUCINATION_STRINGS:
+            index = search_text.find(marker)
+            if index == -1:
+                continue
+            # A trailing partial agent header may still complete into a full one
+            if AGENT_HEADER.startswith(search_text[index:]):
+                continue
+            end = index + len(marker)
+            cut = end if cut is None else min(cut, end)
+        return cut
+
     def remove_stop_token(self, response: str):
         response = response.replace(STOP_TOKEN, "")
         return response.strip()
@@ -209,7 +384,7 @@ class ModelResource(RunnableBaseResource):
         try:
             return self.model_provider.tokenize(model=self.model, message=message)
         except (NotImplementedError, KeyError):
-            encoding = tiktoken.encoding_for_model("gpt-4")
+            encoding = get_tiktoken_encoding("gpt-4")
             return encoding.encode(message)
 
     def decode(self, tokens: List[int]) -> str:
@@ -223,7 +398,7 @@ class ModelResource(RunnableBaseResource):
         try:
             return self.model_provider.decode(model=self.model, tokens=tokens)
         except (NotImplementedError, KeyError):
-            encoding = tiktoken.encoding_for_model("gpt-4")
+            encoding = get_tiktoken_encoding("gpt-4")
             return encoding.decode(tokens)
 
     def run(self, input_message: Message) -> ActionMessage:
@@ -234,46 +409,297 @@ class ModelResource(RunnableBaseResource):
         Returns:
             ActionMessage: The response generated by the model.
         """
-        prev_action_message = None
-        if isinstance(input_message, ActionMessage):
-            prev_action_message = input_message
+        if self.use_mock_model:
+            return self._mock_action_message(input_message)
 
-        assert (
-            input_message.memory is not None
-        ), "Message to model.run() should contain memory."
-        model_input = input_message.memory
+        model_input = self._prepare_model_input(input_message)
+
+        model_response = self._get_cached_response(model_input)
+        if model_response is not None:
+            return self._to_action_message(
+                input_message, model_input, model_response, cache_hit=True
+            )
+
+        reserved_tokens = self._rate_limit_tokens(model_input)
+        self.rate_limiter.acquire(reserved_tokens)
+        try:
+            model_response = self.model_provider.make_request(
+                model=self.model,
+                message=model_input,
+                temperature=self.temperature,
+                max_tokens=self.max_output_tokens,
+                stop_sequences=self.stop_sequences,
+                timeout=self.timeout,
+            )
+        except Exception as e:
+            raise self._request_failure(e, model_input, reserved_tokens) from e
+
+        self._record_rate_limit_usage(reserved_tokens, model_response)
+        self._store_response(model_input, model_response)
+        return self._to_action_message(
+            input_message, model_input, model_response, cache_hit=False
+        )
+
+    async def run_async(self, input_message: Message) -> ActionMessage:
+        """
+        Async version of run that awaits the provider's async client on the
+        running event loop instead of occupying a worker thread per request.
+        Args:
+            input_message (ActionMessage): The input message to send to the model.
+        Returns:
+            ActionMessage: The response generated by the model.
+        """
         if self.use_mock_model:
-            return ActionMessage(
-                resource_id=self.resource_id,
-                message=input_message.message,
-                additional_metadata=None,
-                prev=prev_action_message,
+            return self._mock_action_message(input_message)
+
+        if self.helm:
+            # HELM tokenization is a remote call, keep it off the event loop
+            model_input = await asyncio.to_thread(
+                self._prepare_model_input, input_message
             )
+        else:
+            model_input = self._prepare_model_input(input_message)
 
-        model_input = truncate_input_to_max_tokens(
-            max_input_tokens=self.max_input_tokens,
-            model_input=model_input,
-            model=self.model,
-            use_helm=self.helm,
+        model_response = self._get_cached_response(model_input)
+        if model_response is not None:
+            return self._to_action_message(
+                input_message, model_input, model_response, cache_hit=True
+            )
+
+        if self.use_batch:
+            model_response = await self._batch_request_async(model_input)
+            self._store_response(model_input, model_response)
+            return self._to_action_message(
+                input_message, model_input, model_response, cache_hit=False
+            )
+
+        reserved_tokens = self._rate_limit_tokens(model_input)
+        await self.rate_limiter.acquire_async(reserved_tokens)
+        hedge_outcome = None
+        try:
+            if self.hedge_percentile is not None:
+                hedge_outcome = await self._hedged_request_async(model_input)
+                model_response = hedge_outcome.response
+            else:
+                model_response = await self._request_async(
+                    self.model_provider, self.model, model_input
+                )
+        except Exception as e:
+            raise self._request_failure(e, model_input, reserved_tokens) from e
+
+        self._record_rate_limit_usage(reserved_tokens, model_response)
+        self._store_response(model_input, model_response)
+        return self._to_action_message(
+            input_message,
+            model_input,
+            model_response,
+            cache_hit=False,
+            hedge_outcome=hedge_outcome,
+        )
+
+    async def _request_async(
+        self, model_provider: ModelProvider, model: str, model_input: str
+    ) -> ModelResponse:
+        if self.use_streaming:
+            return await model_provider.make_streaming_request_async(
+                model=model,
+                message=model_input,
+                temperature=self.temperature,
+                max_tokens=self.max_output_tokens,
+                stop_sequences=self.stop_sequences,
+                stop_at=self.find_stream_stop,
+                stop_overlap=STREAM_STOP_OVERLAP,
+                timeout=self.timeout,
+            )
+        return await model_provider.make_request_async(
+            model=model,
+            message=model_input,
+            temperature=self.temperature,
+            max_tokens=self.max_output_tokens,
+            stop_sequences=self.stop_sequences,
+            timeout=self.timeout,
         )
-        logger.info(f"Model input (truncated if over max tokens):\n{model_input}")
 
+    async def _hedged_request_async(self, model_input: str) -> HedgeOutcome:
+        """
+        Send the request, and once it is slower than hedge_percentile of this
+        model's recent latencies, send a duplicate to hedge_model. The first valid
+        response is used and the other request is cancelled.
+        """
+        latency_tracker = get_latency_tracker(self.model)
+        delay = latency_tracker.percentile(self.hedge_percentile)
+        if delay is None:
+            delay = self._resource_config.hedge_initial_delay
+        delay = min(delay, self.timeout)
+
+        async def send_hedge() -> ModelResponse:
+            # The duplicate only counts against the requests/minute budget
+            await self.hedge_rate_limiter.acquire_async()
+            return await self._request_async(
+                self.hedge_model_provider, self.hedge_model, model_input
+            )
+
+        return await hedge_request(
+            primary=lambda: self._request_async(
+                self.model_provider, self.model, model_input
+            ),
+            hedge=send_hedge,
+            delay=delay,
+            latency_tracker=latency_tracker,
+        )
+
+    async def _batch_request_async(self, model_input: str) -> ModelResponse:
+        """
+        Queue the request for the next provider batch and suspend until the batch
+        has ended, letting other workflows on the event loop run meanwhile.
+        Batch APIs have their own limits, so the rate limiter is bypassed.
+        """
+        scheduler = get_batch_scheduler(
+            self.model_provider,
+            self.model,
+            batch_size=self._resource_config.batch_size,
+            poll_interval=self._resource_config.batch_poll_interval,
+        )
         try:
-            model_response = self.model_provider.make_request(
+            return await scheduler.request(
                 model=self.model,
                 message=model_input,
                 temperature=self.temperature,
                 max_tokens=self.max_output_tokens,
                 stop_sequences=self.stop_sequences,
-                timeout=self.timeout,
+                timeout=self._resource_config.batch_timeout,
             )
         except Exception as e:
-            # Wrap and raise custom exception that carries the input and error
-            raise ModelResponseFailure(
-                exception=e,
-                input=model_input,
-            ) from e
+            raise ModelResponseFailure(exception=e, input=model_input) from e
+
+    def _mock_action_message(self, input_message: Message) -> ActionMessage:
+        assert (
+            input_message.memory is not None
+        ), "Message to model.run() should contain memory."
+        return ActionMessage(
+            resource_id=self.resource_id,
+            message=input_message.message,
+            additional_metadata=None,
+            prev=self._get_prev_action_message(input_message),
+        )
+
+    def _get_prev_action_message(
+        self, input_message: Message
+    ) -> Optional[ActionMessage]:
+        if isinstance(input_message, ActionMessage):
+            return input_message
+        return None
+
+    def get_memory_token_budget(self) -> Optional[MemoryTokenBudget]:
+        """
+        Budget to pass to MemoryResource.get_memory, so that memory is fitted to
+        max_input_tokens with this model's tokenizer and needs no truncation
+        here. None for the mock model, whose input is not truncated.
+        """
+        if self.use_mock_model:
+            return None
+        tokenizer = get_tokenizer(self.model, self.helm)
+        return MemoryTokenBudget(
+            max_tokens=tokenizer.usable_tokens(self.max_input_tokens),
+            tokenizer=tokenizer,
+        )
+
+    def _prepare_model_input(self, input_message: Message) -> str:
+        assert (
+            input_message.memory is not None
+        ), "Message to model.run() should contain memory."
+
+        num_memory_tokens = getattr(input_message, "memory_num_tokens", None)
+        if num_memory_tokens is not None and num_memory_tokens <= self.max_input_tokens:
+            # Memory was already fitted to get_memory_token_budget()
+            model_input = input_message.memory
+        else:
+            model_input = truncate_input_to_max_tokens(
+                max_input_tokens=self.max_input_tokens,
+                model_input=input_message.memory,
+                model=self.model,
+                use_helm=self.helm,
+            )
+        logger.info(f"Model input (truncated if over max tokens):\n{model_input}")
+        return model_input
+
+    def _rate_limit_tokens(self, model_input: str) -> int:
+        """
+        Tokens to reserve against the tokens/minute budget: the input plus the
+        full output allowance, which providers also count up front.
+        """
+        if not self.rate_limiter.limit.tokens_per_minute:
+            return 0
+        num_input_tokens = get_num_tokens(model_input, self.model, self.helm)
+        return num_input_tokens + self.max_output_tokens
+
+    def _record_rate_limit_usage(
+        self, reserved_tokens: int, model_response: ModelResponse
+    ) -> None:
+        self.rate_limiter.record_usage(
+            reserved_tokens, model_response.input_tokens + model_response.output_tokens
+        )
+
+    def _request_failure(
+        self, e: Exception, model_input: str, reserved_tokens: int
+    ) -> ModelResponseFailure:
+        """
+        Wrap a provider error in a ModelResponseFailure that carries the input and
+        error. Rate limit errors with a retry hint pause the shared rate limiter.
+        """
+        # Failed requests do not count against the token budget
+        self.rate_limiter.record_usage(reserved_tokens, 0)
+        retry_after = get_retry_after(e)
+        if getattr(e, "status_code", None) == 429 and retry_after is not None:
+            self.rate_limiter.block_for(retry_after)
+        return ModelResponseFailure(
+            exception=e, input=model_input, retry_after=retry_after
+        )
+
+    def _response_cache_key(self, model_input: str) -> str:
+        return ResponseCache.make_key(
+            model=self.model,
+            model_input=model_input,
+            temperature=self.temperature,
+            max_output_tokens=self.max_output_tokens,
+            stop_sequences=self.stop_sequences,
+        )
 
+    def _get_cached_response(self, model_input: str) -> Optional[ModelResponse]:
+        """
+        Look up a previous response for this input. Returns None when the cache is
+        disabled, in record mode, or on a miss outside of replay mode.
+        Raises:
+            ResponseCacheMiss: In replay mode when no response was recorded.
+        """
+        if self.response_cache is None:
+            return None
+        if self.response_cache_mode == ResponseCacheMode.RECORD:
+            return None
+
+        key = self._response_cache_key(model_input)
+        model_response = self.response_cache.get(key)
+        if model_response is None and self.response_cache_mode == (
+            ResponseCacheMode.REPLAY
+        ):
+            raise ResponseCacheMiss(
+                f"No recorded response for {self.model} (cache key {key})"
+            )
+        return model_response
+
+    def _store_response(self, model_input: str, model_response: ModelResponse) -> None:
+        if self.response_cache is None:
+            return
+        self.response_cache.put(self._response_cache_key(model_input), model_response)
+
+    def _to_action_message(
+        self,
+        input_message: Message,
+        model_input: str,
+        model_response: ModelResponse,
+        cache_hit: Optional[bool] = None,
+        hedge_outcome: Optional[HedgeOutcome] = None,
+    ) -> ActionMessage:
         log_message = "Unparsed LM Response:\n"
         log_message += "\n\n".join(
             [f"{key}:\n{value}" for key, value in model_response.to_dict().items()]
@@ -300,15 +726,61 @@ class ModelResource(RunnableBaseResource):
         }
         if self.budget_tokens is not None:
             metadata["budget_tokens"] = self.budget_tokens
+        if model_response.time_to_first_token_ms is not None:
+            metadata["time_to_first_token_ms"] = model_response.time_to_first_token_ms
+        if model_response.cached_input_tokens is not None:
+            metadata["cached_input_tokens"] = model_response.cached_input_tokens
+        if model_response.cache_write_input_tokens is not None:
+            metadata["cache_write_input_tokens"] = (
+                model_response.cache_write_input_tokens
+            )
+        if model_response.tokens_estimated:
+            metadata["tokens_estimated"] = True
+        if self.response_cache is not None:
+            metadata["cache_hit"] = cache_hit
+        if hedge_outcome is not None and hedge_outcome.hedged:
+            metadata.update(self._hedge_metadata(model_input, hedge_outcome))
         metadata = (metadata,)
 
         return ActionMessage(
             resource_id=self.resource_id,
             message=lm_response,
             additional_metadata=metadata,
-            prev=prev_action_message,
+            prev=self._get_prev_action_message(input_message),
         )
 
+    def _hedge_metadata(self, model_input: str, hedge_outcome: HedgeOutcome) -> dict:
+        """
+        Describe a hedged request, including what the losing request cost. A loser
+        that was cancelled mid-flight is charged its estimated input tokens, since
+        providers bill the prompt once processing starts. The tokens of the request
+        sent to hedge_model, whether it won or lost, are recorded separately, so
+        that they are priced at that model's rates.
+        """
+        loser_model = self.model if hedge_outcome.hedge_won else self.hedge_model
+        loser_response = hedge_outcome.loser_response
+        if loser_response is not None:
+            loser_input_tokens = loser_response.input_tokens
+            loser_output_tokens = loser_response.output_tokens
+        else:
+            loser_input_tokens = get_num_tokens(model_input, loser_model, self.helm)
+            loser_output_tokens = 0
+        if hedge_outcome.hedge_won:
+            hedge_input_tokens = hedge_outcome.response.input_tokens
+            hedge_output_tokens = hedge_outcome.response.output_tokens
+        else:
+            hedge_input_tokens = loser_input_tokens
+            hedge_output_tokens = loser_output_tokens
+        return {
+            "hedged": True,
+            "hedge_won": hedge_outcome.hedge_won,
+            "hedge_model": self.hedge_model,
+            "hedge_loser_input_tokens": loser_input_tokens,
+            "hedge_loser_output_tokens": loser_output_tokens,
+            "hedge_model_input_tokens": hedge_input_tokens,
+            "hedge_model_output_tokens": hedge_output_tokens,
+        }
+
     def stop(self) -> None:
         """
         Stop/cleanup method for LLM resource.
@@ -335,6 +807,9 @@ class ModelResource(RunnableBaseResource):
                 "stop_sequences": self.stop_sequences,
                 "use_mock_model": self.use_mock_model,
             }
+            if self.hedge_percentile is not None:
+                # Needed to price the requests sent to it
+                base_dict["config"]["hedge_model"] = self.hedge_model
             # if self.budget_tokens is not None:
             #     base_dict["config"]["budget_tokens"] = self.budget_tokens
         else:
@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
 
 HALLUCINATION_STRINGS = [
     "----------Message from assistant----------",
@@ -21,6 +21,14 @@ class ModelResponse:
     output_tokens: int
     time_taken_in_ms: float
     status_code: Optional[int] = None
+    # Only set for streamed responses
+    time_to_first_token_ms: Optional[float] = None
+    # Portion of input_tokens read from / written to the provider's prompt cache,
+    # when the provider reports it
+    cached_input_tokens: Optional[int] = None
+    cache_write_input_tokens: Optional[int] = None
+    # Set when the token counts are local estimates, not the provider's usage
+    tokens_estimated: bool = False
 
     def remove_hallucinations(self):
         response = self.content
@@ -39,6 +47,10 @@ class ModelResponse:
             d["output_tokens"],
             d["time_taken_in_ms"],
             d.get("status_code"),
+            d.get("time_to_first_token_ms"),
+            d.get("cached_input_tokens"),
+            d.get("cache_write_input_tokens"),
+            d.get("tokens_estimated", False),
         )
 
     def to_dict(self):
@@ -50,4 +62,48 @@ class ModelResponse:
         }
         if self.status_code is not None:
             result["status_code"] = self.status_code
+        if self.time_to_first_token_ms is not None:
+            result["time_to_first_token_ms"] = self.time_to_first_token_ms
+        if self.cached_input_tokens is not None:
+            result["cached_input_tokens"] = self.cached_input_tokens
+        if self.cache_write_input_tokens is not None:
+            result["cache_write_input_tokens"] = self.cache_write_input_tokens
+        if self.tokens_estimated:
+            result["tokens_estimated"] = True
         return result
+
+
+@dataclass(frozen=True)
+class StreamChunk:
+    """
+    A piece of a streamed model response. Providers yield text deltas as they
+    arrive, and token usage whenever the API reports it (usually at the end).
+    """
+
+    text: str = ""
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    cached_input_tokens: Optional[int] = None
+    cache_write_input_tokens: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class BatchRequest:
+    """
+    One request of a provider batch. custom_id matches it to its result, since
+    batch APIs do not return results in submission order.
+    """
+
+    custom_id: str
+    model: str
+    message: str
+    temperature: float
+    max_tokens: int
+    stop_sequences: List[str] = field(default_factory=list)
+
+    @staticmethod
+    def from_dict(d: dict) -> "BatchRequest":
+        return BatchRequest(**d)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
@@ -1,6 +1,8 @@
 import http
+import threading
 import tokenize
-from typing import List
+from functools import partial
+from typing import Dict, List, Tuple
 
 from requests.exceptions import ConnectionError, HTTPError, Timeout
 from tenacity import (
@@ -10,28 +12,92 @@ from tenacity import (
     wait_exponential,
 )
 
+from resources.memory_resource.memory_prompt import MemoryPrompts
 from resources.model_resource.helm_models.helm_models import HelmModels
+from resources.model_resource.model_mapping import ModelRegistry
 from resources.model_resource.model_provider import ModelProvider
 from resources.model_resource.openai_models.openai_models import OpenAIModels
+from resources.model_resource.tokenizer_registry import (
+    Tokenizer,
+    get_local_helm_tokenizer,
+    get_tiktoken_encoding,
+    helm_remote_tokenization_enabled,
+)
 from utils.logger import get_main_logger
 
 logger = get_main_logger(__name__)
 
+TRUNCATION_ALERT = "\n...TRUNCATED...\n"
+HISTORY_SEPARATOR = f"\n\n{MemoryPrompts._DEFAULT_SEGUE}"
+
+# Process-wide caches, filled lazily. Building a provider creates an HTTP client
+# and reads the .env file, so it should happen once per process, not per call.
+_providers: Dict[str, ModelProvider] = {}
+_tokenizers: Dict[Tuple[str, str], Tokenizer] = {}
+_truncation_alert_tokens: Dict[Tuple[str, str], List[int]] = {}
+_cache_lock = threading.Lock()
+
+
+def _provider_name(use_helm: bool) -> str:
+    return "helm" if use_helm else "openai"
+
 
 def get_model_provider(use_helm: bool = False) -> ModelProvider:
     """
     Get the appropriate model provider based on the model type.
+    The provider is created on first use and shared for the rest of the process.
     Returns:
         ModelProvider: An instance of the appropriate model provider class.
     """
     # TODO: Support Different Model Providers (Also handle Azure case)
-    if use_helm:
-        model_provider = HelmModels()
-    else:
-        model_provider = OpenAIModels()
+    name = _provider_name(use_helm)
+    model_provider = _providers.get(name)
+    if model_provider is None:
+        with _cache_lock:
+            model_provider = _providers.get(name)
+            if model_provider is None:
+                model_provider = HelmModels() if use_helm else OpenAIModels()
+                _providers[name] = model_provider
     return model_provider
 
 
+def get_tokenizer(model: str, use_helm: bool = False) -> Tokenizer:
+    """
+    Get the shared tokenizer for the given model, keyed by (provider, model).
+    Models are tokenized locally with tiktoken and never construct a provider
+    client, unless remote HELM tokenization is opted into.
+    """
+    key = (_provider_name(use_helm), model)
+    tokenizer = _tokenizers.get(key)
+    if tokenizer is not None:
+        return tokenizer
+
+    if use_helm and not helm_remote_tokenization_enabled():
+        tokenizer = get_local_helm_tokenizer(ModelRegistry.get_tokenizer(model))
+    elif use_helm:
+        model_provider = get_model_provider(use_helm)
+        tokenizer = Tokenizer(
+            encode=partial(model_provider.tokenize, model),
+            decode=partial(model_provider.decode, model),
+        )
+    else:
+        # Matches OpenAIModels.tokenize/decode, which always use the gpt-4o encoding
+        encoding = get_tiktoken_encoding()
+        tokenizer = Tokenizer(encode=encoding.encode, decode=encoding.decode)
+
+    with _cache_lock:
+        return _tokenizers.setdefault(key, tokenizer)
+
+
+def clear_model_caches() -> None:
+    """Drop all cached providers and tokenizers (mainly for tests)."""
+    with _cache_lock:
+        _providers.clear()
+        _tokenizers.clear()
+        _truncation_alert_tokens.clear()
+    get_local_helm_tokenizer.cache_clear()
+
+
 def get_num_tokens(model_input: str, model: str, use_helm: bool = False) -> int:
     """
     Returns the number of tokens for the given model input.
@@ -44,7 +110,7 @@ def get_num_tokens(model_input: str, model: str, use_helm: bool = False) -> int:
     Returns:
     int: The number of tokens in the model input.
     """
-    return get_model_provider(use_helm).get_num_tokens(model, model_input)
+    return get_tokenizer(model, use_helm).count(model_input)
 
 
 @retry(
@@ -67,7 +133,7 @@ def tokenize_input(model_input: str, model: str, use_helm: bool = False) -> List
     Returns:
     List[int]: A list of token IDs representing the tokenized input.
     """
-    return get_model_provider(use_helm).tokenize(model, model_input)
+    return get_tokenizer(model, use_helm).encode(model_input)
 
 
 @retry(
@@ -92,16 +158,52 @@ def decode_tokenized_inputs(
     Returns:
     str: The decoded string from the token IDs.
     """
-    return get_model_provider(use_helm).decode(model, tokens)
+    return get_tokenizer(model, use_helm).decode(tokens)
+
+
+def get_truncation_alert_tokens(model: str, use_helm: bool = False) -> List[int]:
+    """
+    Returns the token IDs of the truncation alert, tokenized once per model.
+    """
+    key = (_provider_name(use_helm), model)
+    tokens = _truncation_alert_tokens.get(key)
+    if tokens is None:
+        tokens = tokenize_input(TRUNCATION_ALERT, model, use_helm)
+        _truncation_alert_tokens[key] = tokens
+    return list(tokens)
+
+
+def split_prompt_prefix(model_input: str) -> Tuple[str, str]:
+    """
+    Split a model input laid out by MemoryResource.get_memory into the initial
+    prompt, which every call of a workflow starts with, and the history after it.
+    The prefix also ends where truncation cut the input, so that it stays
+    identical from call to call and can be served from a provider's prompt cache.
+    Returns:
+        Tuple[str, str]: (prefix, rest), where rest is empty for a bare prompt.
+    """
+    ends = [
+        index
+        for index in (
+            model_input.find(HISTORY_SEPARATOR),
+            model_input.find(TRUNCATION_ALERT),
+        )
+        if index != -1
+    ]
+    if not ends:
+        return model_input, ""
+    end = min(ends)
+    return model_input[:end], model_input[end:]
 
 
 def truncate_input_to_max_tokens(
     max_input_tokens: int, model_input: str, model: str, use_helm: bool = False
 ) -> str:
+    # Estimated token counts keep a safety margin below the limit
+    max_input_tokens = get_tokenizer(model, use_helm).usable_tokens(max_input_tokens)
     input_tokens = tokenize_input(model_input, model, use_helm)
     num_input_tokens = len(input_tokens)
-    truncation_alert = "\n...TRUNCATED...\n"
-    truncation_alert_tokens = tokenize_input(truncation_alert, model, use_helm)
+    truncation_alert_tokens = get_truncation_alert_tokens(model, use_helm)
     num_tokens_in_truncation_alert = len(truncation_alert_tokens)
 
     if num_input_tokens >= max_input_tokens - num_tokens_in_truncation_alert:
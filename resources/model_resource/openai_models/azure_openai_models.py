@@ -2,7 +2,7 @@ import os
 from pathlib import Path
 
 from dotenv import load_dotenv
-from openai import AzureOpenAI
+from openai import AsyncAzureOpenAI, AzureOpenAI
 
 from resources.model_resource.openai_models.openai_models import OpenAIModels
 
@@ -36,3 +36,10 @@ class AzureOpenAIModels(OpenAIModels):
             azure_endpoint=self._endpoint(),
             api_version="2024-06-01",
         )
+
+    def create_async_client(self) -> AsyncAzureOpenAI:
+        return AsyncAzureOpenAI(
+            api_key=self._api_key(),
+            azure_endpoint=self._endpoint(),
+            api_version="2024-06-01",
+        )
@@ -1,17 +1,25 @@
-from datetime import datetime
+import json
 from time import time
-from typing import List
+from typing import AsyncIterator, Dict, List, Optional, Union
 
-import tiktoken
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+from openai.types.responses import Response
 
 from resources.model_resource.model_provider import ModelProvider
-from resources.model_resource.model_response import ModelResponse
+from resources.model_resource.model_response import (
+    BatchRequest,
+    ModelResponse,
+    StreamChunk,
+)
+from resources.model_resource.tokenizer_registry import get_tiktoken_encoding
 from utils.logger import get_main_logger
 
 logger = get_main_logger(__name__)
 
 REASONING_MODELS = ("o1", "o3", "o4")
+BATCH_ENDPOINT = "/v1/responses"
+BATCH_RUNNING_STATUSES = ("validating", "in_progress", "finalizing", "cancelling")
+
 
 class OpenAIModels(ModelProvider):
     def __init__(self):
@@ -20,6 +28,9 @@ class OpenAIModels(ModelProvider):
     def create_client(self) -> OpenAI:
         return OpenAI(api_key=self._api_key())
 
+    def create_async_client(self) -> AsyncOpenAI:
+        return AsyncOpenAI(api_key=self._api_key())
+
     def request(
         self,
         model: str,
@@ -29,95 +40,222 @@ class OpenAIModels(ModelProvider):
         # Unused by new responses api
         stop_sequences: List[str],
     ) -> ModelResponse:
+        try:
+            params = self._request_params(model, message, temperature, max_tokens)
+            response = self.client.responses.create(**params)
+            return self._to_model_response(response, params["model"], max_tokens)
+        except Exception as e:
+            self._attach_status_code(e)
+            raise
 
-        start_time = datetime.now()
-        status_code = None
-
+    async def request_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        # Unused by new responses api
+        stop_sequences: List[str],
+    ) -> ModelResponse:
         try:
-            # Extract base model name
-            model_name = model.split("/")[1]
-            reasoning_effort = None
-
-            # Check for reasoning effort suffixes in o1, o3, o4 models
-            if model_name.startswith(REASONING_MODELS):
-                if model_name.endswith("-high-reasoning-effort"):
-                    reasoning_effort = "high"
-                    model_name = model_name[: -len("-high-reasoning-effort")]
-                elif model_name.endswith("-low-reasoning-effort"):
-                    reasoning_effort = "low"
-                    model_name = model_name[: -len("-low-reasoning-effort")]
-
-            # Prepare common parameters for all models
-            params = {
-                "model": model_name,
-                "input": message,
-                "max_output_tokens": max_tokens,
-            }
-
-            # Add temperature for non-o models (like gpt-4, etc.)
-            if not model_name.startswith(REASONING_MODELS):
-                params["temperature"] = temperature
-
-            # Add reasoning_effort parameter for o1, o3, o4 models if specified
-            if reasoning_effort and model_name.startswith(REASONING_MODELS):
-                params["reasoning"] = {"effort": reasoning_effort}
+            params = self._request_params(model, message, temperature, max_tokens)
+            response = await self.get_async_client().responses.create(**params)
+            return self._to_model_response(response, params["model"], max_tokens)
+        except Exception as e:
+            self._attach_status_code(e)
+            raise
 
-            response = self.client.responses.create(**params)
+    async def request_stream_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        # Unused by new responses api
+        stop_sequences: List[str],
+    ) -> AsyncIterator[StreamChunk]:
+        try:
+            params = self._request_params(model, message, temperature, max_tokens)
+            stream = await self.get_async_client().responses.create(
+                **params, stream=True
+            )
+            async with stream:
+                async for event in stream:
+                    if event.type == "response.output_text.delta":
+                        yield StreamChunk(text=event.delta)
+                    elif event.type == "response.completed":
+                        usage = event.response.usage
+                        yield StreamChunk(
+                            input_tokens=usage.input_tokens,
+                            output_tokens=self._output_tokens(usage, params["model"]),
+                            cached_input_tokens=self._cached_input_tokens(usage),
+                        )
+        except Exception as e:
+            self._attach_status_code(e)
+            raise
 
-            # For successful responses, we don't typically get HTTP status code
-            # from OpenAI client, but could try to extract if available
-            if hasattr(response, "response") and hasattr(
-                response.response, "status_code"
-            ):
-                status_code = response.response.status_code
-
-            output_tokens = response.usage.output_tokens
-            if model_name.startswith(REASONING_MODELS):
-                reasoning_tokens = response.usage.output_tokens_details.reasoning_tokens
-                logger.info(f"reasoning tokens: {reasoning_tokens}")
-                output_tokens += reasoning_tokens
-
-            logger.info(
-                f"max output tokens: {max_tokens} - total output tokens: {output_tokens}"
+    async def submit_batch_async(self, requests: List[BatchRequest]) -> str:
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": request.custom_id,
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": self._request_params(
+                        request.model,
+                        request.message,
+                        request.temperature,
+                        request.max_tokens,
+                    ),
+                }
             )
-            return ModelResponse(
-                content=response.output_text,
-                input_tokens=response.usage.input_tokens,
-                output_tokens=output_tokens,
-                time_taken_in_ms=float(time()) - response.created_at,
+            for request in requests
+        ]
+        client = self.get_async_client()
+        try:
+            batch_file = await client.files.create(
+                file=("batch.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch",
             )
+            batch = await client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint=BATCH_ENDPOINT,
+                completion_window="24h",
+            )
+            return batch.id
         except Exception as e:
-            # Extract status code from OpenAI errors
-            try:
-                # OpenAI client exceptions often have status_code attribute
-                # or the error might be contained in e.response.status_code
-                if hasattr(e, "status_code"):
-                    status_code = e.status_code
-                elif hasattr(e, "response") and hasattr(e.response, "status_code"):
-                    status_code = e.response.status_code
-                # If error is in the message as "Error code: XXX"
-                elif "Error code:" in str(e):
-                    error_parts = str(e).split("Error code:")
-                    if len(error_parts) > 1:
-                        code_part = error_parts[1].strip().split(" ")[0]
-                        if code_part.isdigit():
-                            status_code = int(code_part)
-            except:
-                pass  # If we can't extract the code, just continue
-
-            # Attach status code to the exception
-            if status_code is not None:
-                e.status_code = status_code
+            self._attach_status_code(e)
             raise
 
+    async def poll_batch_async(
+        self, batch_id: str
+    ) -> Optional[Dict[str, Union[ModelResponse, Exception]]]:
+        client = self.get_async_client()
+        try:
+            batch = await client.batches.retrieve(batch_id)
+            if batch.status in BATCH_RUNNING_STATUSES:
+                return None
+
+            results = {}
+            # Expired and cancelled batches still return their finished requests
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id is None:
+                    continue
+                content = await client.files.content(file_id)
+                for line in content.text.splitlines():
+                    record = json.loads(line)
+                    results[record["custom_id"]] = self._batch_result(record)
+            return results
+        except Exception as e:
+            self._attach_status_code(e)
+            raise
+
+    def _batch_result(self, record: dict) -> Union[ModelResponse, Exception]:
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            error = record.get("error") or response.get("body", {}).get("error")
+            exception = Exception(f"Batch request failed: {error}")
+            if response.get("status_code") is not None:
+                exception.status_code = response["status_code"]
+            return exception
+        body = Response.model_validate(response["body"])
+        return self._to_model_response(body, body.model, body.max_output_tokens)
+
+    def _request_params(
+        self, model: str, message: str, temperature: float, max_tokens: int
+    ) -> dict:
+        # Extract base model name
+        model_name = model.split("/")[1]
+        reasoning_effort = None
+
+        # Check for reasoning effort suffixes in o1, o3, o4 models
+        if model_name.startswith(REASONING_MODELS):
+            if model_name.endswith("-high-reasoning-effort"):
+                reasoning_effort = "high"
+                model_name = model_name[: -len("-high-reasoning-effort")]
+            elif model_name.endswith("-low-reasoning-effort"):
+                reasoning_effort = "low"
+                model_name = model_name[: -len("-low-reasoning-effort")]
+
+        # Prepare common parameters for all models
+        params = {
+            "model": model_name,
+            "input": message,
+            "max_output_tokens": max_tokens,
+        }
+
+        # Add temperature for non-o models (like gpt-4, etc.)
+        if not model_name.startswith(REASONING_MODELS):
+            params["temperature"] = temperature
+
+        # Add reasoning_effort parameter for o1, o3, o4 models if specified
+        if reasoning_effort and model_name.startswith(REASONING_MODELS):
+            params["reasoning"] = {"effort": reasoning_effort}
+
+        return params
+
+    def _output_tokens(self, usage, model_name: str) -> int:
+        output_tokens = usage.output_tokens
+        if model_name.startswith(REASONING_MODELS):
+            reasoning_tokens = usage.output_tokens_details.reasoning_tokens
+            logger.info(f"reasoning tokens: {reasoning_tokens}")
+            output_tokens += reasoning_tokens
+        return output_tokens
+
+    def _cached_input_tokens(self, usage) -> Optional[int]:
+        # OpenAI caches prompt prefixes automatically; the input must simply keep
+        # the same leading bytes from call to call, which MemoryResource ensures
+        details = getattr(usage, "input_tokens_details", None)
+        return getattr(details, "cached_tokens", None)
+
+    def _to_model_response(
+        self, response, model_name: str, max_tokens: int
+    ) -> ModelResponse:
+        output_tokens = self._output_tokens(response.usage, model_name)
+
+        logger.info(
+            f"max output tokens: {max_tokens} - total output tokens: {output_tokens}"
+        )
+        return ModelResponse(
+            content=response.output_text,
+            input_tokens=response.usage.input_tokens,
+            output_tokens=output_tokens,
+            time_taken_in_ms=float(time()) - response.created_at,
+            cached_input_tokens=self._cached_input_tokens(response.usage),
+        )
+
+    def _attach_status_code(self, e: Exception) -> None:
+        status_code = None
+        # Extract status code from OpenAI errors
+        try:
+            # OpenAI client exceptions often have status_code attribute
+            # or the error might be contained in e.response.status_code
+            if hasattr(e, "status_code"):
+                status_code = e.status_code
+            elif hasattr(e, "response") and hasattr(e.response, "status_code"):
+                status_code = e.response.status_code
+            # If error is in the message as "Error code: XXX"
+            elif "Error code:" in str(e):
+                error_parts = str(e).split("Error code:")
+                if len(error_parts) > 1:
+                    code_part = error_parts[1].strip().split(" ")[0]
+                    if code_part.isdigit():
+                        status_code = int(code_part)
+        except:
+            pass  # If we can't extract the code, just continue
+
+        # Attach status code to the exception
+        if status_code is not None:
+            e.status_code = status_code
+
     def tokenize(self, model: str, message: str) -> List[int]:
-        encoding = tiktoken.encoding_for_model("gpt-4o")
+        encoding = get_tiktoken_encoding()
         return encoding.encode(message)
 
     def decode(self, model: str, tokens: List[int]) -> str:
-        encoding = tiktoken.encoding_for_model("gpt-4o")
+        encoding = get_tiktoken_encoding()
         return encoding.decode(tokens)
 
     def get_num_tokens(self, model: str, message: str) -> int:
-        encoding = tiktoken.encoding_for_model("gpt-4o")
+        encoding = get_tiktoken_encoding()
         return len(encoding.encode(message))
@@ -0,0 +1,237 @@
+import asyncio
+import fcntl
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from utils.logger import get_main_logger
+
+logger = get_main_logger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Per-minute budgets for one (provider, model). None means unlimited."""
+
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter shared by every caller of one (provider, model).
+
+    Callers reserve capacity up front and then sleep until their reservation is
+    due. Reservations are handed out in arrival order, so waiting callers are
+    served first-come, first-served instead of racing each other on retries.
+    A server retry hint (Retry-After) blocks all callers until it has passed.
+
+    The bucket state lives in memory; FileRateLimiter shares it across processes.
+    """
+
+    def __init__(self, provider: str, model: str, limit: RateLimit):
+        self.provider = provider
+        self.model = model
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._state: Optional[dict] = None
+
+    def _new_state(self, now: float) -> dict:
+        return {
+            "requests": self.limit.requests_per_minute or 0.0,
+            "tokens": self.limit.tokens_per_minute or 0.0,
+            "updated": now,
+            "blocked_until": 0.0,
+        }
+
+    def _transact(self, update: Callable[[dict, float], float]) -> float:
+        """Apply update to the bucket state atomically and return its result."""
+        with self._lock:
+            now = time.time()
+            if self._state is None:
+                self._state = self._new_state(now)
+            return update(self._state, now)
+
+    def _refill(self, state: dict, now: float) -> None:
+        elapsed = max(0.0, now - state["updated"])
+        if self.limit.requests_per_minute:
+            state["requests"] = min(
+                self.limit.requests_per_minute,
+                state["requests"] + elapsed * self.limit.requests_per_minute / 60,
+            )
+        if self.limit.tokens_per_minute:
+            state["tokens"] = min(
+                self.limit.tokens_per_minute,
+                state["tokens"] + elapsed * self.limit.tokens_per_minute / 60,
+            )
+        state["updated"] = max(state["updated"], now)
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Reserve one request and the given number of tokens.
+        Returns:
+            float: Seconds the caller must wait before sending the request.
+        """
+
+        def update(state: dict, now: float) -> float:
+            self._refill(state, now)
+            wait = max(0.0, state["blocked_until"] - now)
+            if self.limit.requests_per_minute:
+                state["requests"] -= 1
+                wait = max(
+                    wait, -state["requests"] * 60 / self.limit.requests_per_minute
+                )
+            if self.limit.tokens_per_minute:
+                # A request larger than the whole budget can never fit; let it
+                # through once a full minute of budget has accumulated
+                state["tokens"] -= min(tokens, self.limit.tokens_per_minute)
+                wait = max(wait, -state["tokens"] * 60 / self.limit.tokens_per_minute)
+            return wait
+
+        return self._transact(update)
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until one request of the given size may be sent."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.info(
+                f"Rate limit for {self.provider}/{self.model}: waiting {wait:.1f}s"
+            )
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """Async counterpart of acquire that sleeps without blocking the loop."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.info(
+                f"Rate limit for {self.provider}/{self.model}: waiting {wait:.1f}s"
+            )
+            await asyncio.sleep(wait)
+        return wait
+
+    def record_usage(self, reserved_tokens: int, used_tokens: int) -> None:
+        """Return over-reserved tokens to the bucket, or charge for the overrun."""
+        if not self.limit.tokens_per_minute:
+            return
+
+        def update(state: dict, now: float) -> float:
+            self._refill(state, now)
+            state["tokens"] = min(
+                self.limit.tokens_per_minute,
+                state["tokens"] + reserved_tokens - used_tokens,
+            )
+            return 0.0
+
+        self._transact(update)
+
+    def block_for(self, retry_after: float) -> None:
+        """Hold back every caller for retry_after seconds (e.g. after a 429)."""
+
+        def update(state: dict, now: float) -> float:
+            state["blocked_until"] = max(state["blocked_until"], now + retry_after)
+            return 0.0
+
+        logger.warning(
+            f"Rate limited by {self.provider}/{self.model}, pausing requests for "
+            f"{retry_after:.1f}s"
+        )
+        self._transact(update)
+
+
+class FileRateLimiter(RateLimiter):
+    """
+    RateLimiter whose bucket state lives in a JSON file guarded by flock, so that
+    concurrent runner processes on the same host share one budget.
+    """
+
+    def __init__(self, provider: str, model: str, limit: RateLimit, state_dir: Path):
+        super().__init__(provider, model, limit)
+        state_dir = Path(state_dir)
+        state_dir.mkdir(parents=True, exist_ok=True)
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{provider}__{model}")
+        self.path = state_dir / f"{safe_name}.json"
+
+    def _transact(self, update: Callable[[dict, float], float]) -> float:
+        with self._lock, open(self.path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                contents = f.read()
+                now = time.time()
+                state = json.loads(contents) if contents else self._new_state(now)
+                result = update(state, now)
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+                f.flush()
+                return result
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+_limiters: Dict[Tuple[str, str, Optional[str]], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    provider: str,
+    model: str,
+    limit: RateLimit,
+    state_dir: Optional[str] = None,
+) -> RateLimiter:
+    """
+    Return the process-wide limiter for (provider, model), creating it on first
+    use. With state_dir set, the budget is shared with other processes as well.
+    """
+    key = (provider, model, str(state_dir) if state_dir else None)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            if state_dir:
+                limiter = FileRateLimiter(provider, model, limit, Path(state_dir))
+            else:
+                limiter = RateLimiter(provider, model, limit)
+            _limiters[key] = limiter
+        elif limiter.limit != limit:
+            logger.warning(
+                f"Rate limiter for {provider}/{model} already exists with "
+                f"{limiter.limit}, ignoring {limit}"
+            )
+    return limiter
+
+
+def get_retry_after(exception: BaseException) -> Optional[float]:
+    """
+    Extract the server's retry hint in seconds from a provider API error, using
+    the retry-after-ms or retry-after response headers. Returns None if absent.
+    """
+    response = getattr(exception, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        # Retry-After may also be an HTTP date
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
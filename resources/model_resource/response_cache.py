@@ -0,0 +1,164 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import replace
+from enum import Enum
+from pathlib import Path
+from typing import List, Optional
+
+from resources.model_resource.model_response import ModelResponse
+from utils.logger import get_main_logger
+
+logger = get_main_logger(__name__)
+
+DEFAULT_CACHE_PATH = Path("cache") / "model_responses.sqlite"
+DEFAULT_MAX_CACHE_MB = 512
+
+
+class ResponseCacheMode(str, Enum):
+    # Always query the provider and store the response, overwriting old entries
+    RECORD = "record"
+    # Serve only from the cache; a miss is an error and the provider is never called
+    REPLAY = "replay"
+    # Serve from the cache when possible, otherwise query the provider and store
+    READ_THROUGH = "read_through"
+
+
+class ResponseCacheMiss(KeyError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+class ResponseCache:
+    """
+    Content-addressed, size-bounded cache of model responses.
+
+    Entries live in a single SQLite file as zlib-compressed JSON, keyed by a
+    hash of (model, input hash, temperature, max_output_tokens, stop_sequences).
+    Once the stored payloads exceed max_bytes, the least recently used entries
+    are evicted.
+    """
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        max_bytes: int = DEFAULT_MAX_CACHE_MB * 1024 * 1024,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, "
+            "value BLOB NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_access "
+            "ON responses (last_access)"
+        )
+
+    @staticmethod
+    def make_key(
+        model: str,
+        model_input: str,
+        temperature: float,
+        max_output_tokens: int,
+        stop_sequences: List[str],
+    ) -> str:
+        input_hash = hashlib.sha256(model_input.encode("utf-8")).hexdigest()
+        key_material = json.dumps(
+            [model, input_hash, temperature, max_output_tokens, list(stop_sequences)],
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[ModelResponse]:
+        """
+        Return the stored response for key, or None. The returned response reports
+        the lookup time rather than the original query time.
+        """
+        start_time = time.perf_counter()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self.hits += 1
+        model_response = ModelResponse.from_dict(json.loads(zlib.decompress(row[0])))
+        return replace(
+            model_response,
+            time_taken_in_ms=(time.perf_counter() - start_time) * 1000,
+        )
+
+    def put(self, key: str, response: ModelResponse) -> None:
+        payload = json.dumps(response.to_dict(), separators=(",", ":"))
+        value = zlib.compress(payload.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time()),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ).fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        logger.debug(f"Evicted {len(evicted)} entries from response cache {self.path}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(
+    path: Path = DEFAULT_CACHE_PATH, max_mb: int = DEFAULT_MAX_CACHE_MB
+) -> ResponseCache:
+    """Return the process-wide cache for the given file, opening it on first use."""
+    resolved = Path(path).resolve()
+    with _caches_lock:
+        cache = _caches.get(resolved)
+        if cache is None:
+            cache = ResponseCache(resolved, max_bytes=max_mb * 1024 * 1024)
+            _caches[resolved] = cache
+    return cache
@@ -1,10 +1,10 @@
 from datetime import datetime
-from typing import List
+from typing import AsyncIterator, List
 
-from together import Together
+from together import AsyncTogether, Together
 
 from resources.model_resource.model_provider import ModelProvider
-from resources.model_resource.model_response import ModelResponse
+from resources.model_resource.model_response import ModelResponse, StreamChunk
 
 
 class TogetherModels(ModelProvider):
@@ -14,6 +14,9 @@ class TogetherModels(ModelProvider):
     def create_client(self) -> Together:
         return Together(api_key=self._api_key())
 
+    def create_async_client(self) -> AsyncTogether:
+        return AsyncTogether(api_key=self._api_key())
+
     def request(
         self,
         model: str,
@@ -22,53 +25,120 @@ class TogetherModels(ModelProvider):
         max_tokens: int,
         stop_sequences: List[str],
     ) -> ModelResponse:
-
         start_time = datetime.now()
-        status_code = None
 
         try:
             response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "user", "content": message},
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens,
-                stop=stop_sequences,
+                **self._request_params(
+                    model, message, temperature, max_tokens, stop_sequences
+                )
             )
+            return self._to_model_response(response, start_time)
+        except Exception as e:
+            self._attach_status_code(e)
+            raise
+
+    async def request_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> ModelResponse:
+        start_time = datetime.now()
 
-            # For successful responses, check if we can extract status code
-            if hasattr(response, "response") and hasattr(
-                response.response, "status_code"
-            ):
-                status_code = response.response.status_code
-
-            end_time = datetime.now()
-            response_request_duration = (end_time - start_time).total_seconds() * 1000
-
-            return ModelResponse(
-                content=response.choices[0].message.content,
-                input_tokens=response.usage.prompt_tokens,
-                output_tokens=response.usage.completion_tokens,
-                time_taken_in_ms=response_request_duration,
-                status_code=status_code,
+        try:
+            response = await self.get_async_client().chat.completions.create(
+                **self._request_params(
+                    model, message, temperature, max_tokens, stop_sequences
+                )
             )
+            return self._to_model_response(response, start_time)
         except Exception as e:
-            # Extract status code from Together API errors
-            try:
-                # Together client exceptions might have status_code attribute
-                if hasattr(e, "status_code"):
-                    status_code = e.status_code
-                elif hasattr(e, "response") and hasattr(e.response, "status_code"):
-                    status_code = e.response.status_code
-            except:
-                pass  # If we can't extract the code, just continue
-
-            # Attach status code to the exception
-            if status_code is not None:
-                e.status_code = status_code
+            self._attach_status_code(e)
             raise
 
+    async def request_stream_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> AsyncIterator[StreamChunk]:
+        try:
+            params = self._request_params(
+                model, message, temperature, max_tokens, stop_sequences
+            )
+            stream = await self.get_async_client().chat.completions.create(
+                **params, stream=True
+            )
+            async with stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield StreamChunk(text=chunk.choices[0].delta.content)
+                    # Usage is only reported on the final chunk
+                    if chunk.usage is not None:
+                        yield StreamChunk(
+                            input_tokens=chunk.usage.prompt_tokens,
+                            output_tokens=chunk.usage.completion_tokens,
+                        )
+        except Exception as e:
+            self._attach_status_code(e)
+            raise
+
+    def _request_params(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> dict:
+        return {
+            "model": model,
+            "messages": [
+                {"role": "user", "content": message},
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stop": stop_sequences,
+        }
+
+    def _to_model_response(self, response, start_time: datetime) -> ModelResponse:
+        status_code = None
+        # For successful responses, check if we can extract status code
+        if hasattr(response, "response") and hasattr(response.response, "status_code"):
+            status_code = response.response.status_code
+
+        end_time = datetime.now()
+        response_request_duration = (end_time - start_time).total_seconds() * 1000
+
+        return ModelResponse(
+            content=response.choices[0].message.content,
+            input_tokens=response.usage.prompt_tokens,
+            output_tokens=response.usage.completion_tokens,
+            time_taken_in_ms=response_request_duration,
+            status_code=status_code,
+        )
+
+    def _attach_status_code(self, e: Exception) -> None:
+        status_code = None
+        # Extract status code from Together API errors
+        try:
+            # Together client exceptions might have status_code attribute
+            if hasattr(e, "status_code"):
+                status_code = e.status_code
+            elif hasattr(e, "response") and hasattr(e.response, "status_code"):
+                status_code = e.response.status_code
+        except:
+            pass  # If we can't extract the code, just continue
+
+        # Attach status code to the exception
+        if status_code is not None:
+            e.status_code = status_code
+
     def tokenize(self, model: str, message: str) -> List[int]:
         raise NotImplementedError("Tokenization is not supported for Together models")
 
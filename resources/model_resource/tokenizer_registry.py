@@ -0,0 +1,86 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache, partial
+from typing import Callable, Dict, List
+
+import tiktoken
+
+DEFAULT_TIKTOKEN_MODEL = "gpt-4o"
+
+# Set to a truthy value to tokenize HELM models through the remote HELM service
+# instead of locally. Remote tokenization is exact but costs a network round trip.
+HELM_REMOTE_TOKENIZATION_ENV = "HELM_REMOTE_TOKENIZATION"
+
+# Local encodings for the tokenizer names used in HelmMapping. Only OpenAI's BPE
+# tokenizers are public; other families (Claude, Llama, Gemma, ...) fall back to
+# o200k_base as an estimate, as AnthropicModels already does for Claude.
+HELM_TOKENIZER_ENCODINGS: Dict[str, str] = {
+    "openai/o200k_base": "o200k_base",
+    "openai/cl100k_base": "cl100k_base",
+}
+FALLBACK_ENCODING = "o200k_base"
+# The fallback encoding can count fewer tokens than the model's own tokenizer,
+# so token budgets are divided by this margin when it is used
+FALLBACK_SAFETY_MARGIN = 1.25
+
+
+@lru_cache(maxsize=None)
+def get_tiktoken_encoding(model: str = DEFAULT_TIKTOKEN_MODEL) -> tiktoken.Encoding:
+    """
+    Return the tiktoken encoding for the given model, loading it at most once
+    per process. tiktoken.encoding_for_model resolves the model name and looks
+    up the encoding registry on every call, which is wasted work on hot paths.
+    """
+    return tiktoken.encoding_for_model(model)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str) -> tiktoken.Encoding:
+    """Return the tiktoken encoding with the given name, loaded once per process."""
+    return tiktoken.get_encoding(encoding_name)
+
+
+def helm_remote_tokenization_enabled() -> bool:
+    return os.getenv(HELM_REMOTE_TOKENIZATION_ENV, "").lower() in ("1", "true", "yes")
+
+
+@dataclass(frozen=True)
+class Tokenizer:
+    """
+    Bound encode/decode pair for a single (provider, model). Tokenizers that only
+    estimate the model's tokens have a safety_margin above 1.
+    """
+
+    encode: Callable[[str], List[int]]
+    decode: Callable[[List[int]], str]
+    safety_margin: float = 1.0
+
+    @property
+    def estimated(self) -> bool:
+        return self.safety_margin != 1.0
+
+    def count(self, text: str) -> int:
+        return len(self.encode(text))
+
+    def usable_tokens(self, max_tokens: int) -> int:
+        """Tokens of this tokenizer that are safe to send to a max_tokens limit."""
+        return int(max_tokens / self.safety_margin)
+
+
+@lru_cache(maxsize=None)
+def get_local_helm_tokenizer(helm_tokenizer: str) -> Tokenizer:
+    """
+    Return a local tokenizer for a HELM tokenizer name (see HelmMapping).
+    Special tokens are encoded as plain text, matching the remote service.
+    """
+    encoding_name = HELM_TOKENIZER_ENCODINGS.get(helm_tokenizer)
+    safety_margin = 1.0
+    if encoding_name is None:
+        encoding_name = FALLBACK_ENCODING
+        safety_margin = FALLBACK_SAFETY_MARGIN
+    encoding = get_encoding(encoding_name)
+    return Tokenizer(
+        encode=partial(encoding.encode, disallowed_special=()),
+        decode=encoding.decode,
+        safety_margin=safety_margin,
+    )
@@ -1,10 +1,10 @@
 from datetime import datetime
-from typing import List
+from typing import AsyncIterator, List, Optional
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 from resources.model_resource.model_provider import ModelProvider
-from resources.model_resource.model_response import ModelResponse
+from resources.model_resource.model_response import ModelResponse, StreamChunk
 
 XAI_BASE_URL = "https://api.x.ai/v1"
 
@@ -16,6 +16,9 @@ class XAIModels(ModelProvider):
     def create_client(self) -> OpenAI:
         return OpenAI(api_key=self._api_key(), base_url=XAI_BASE_URL)
 
+    def create_async_client(self) -> AsyncOpenAI:
+        return AsyncOpenAI(api_key=self._api_key(), base_url=XAI_BASE_URL)
+
     def request(
         self,
         model: str,
@@ -28,51 +31,131 @@ class XAIModels(ModelProvider):
             model = model.split("/")[-1]
 
         start_time = datetime.now()
-        status_code = None
 
         try:
             response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "user", "content": message},
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens,
-                stop=stop_sequences,
+                **self._request_params(
+                    model, message, temperature, max_tokens, stop_sequences
+                )
+            )
+            return self._to_model_response(response, start_time)
+        except Exception as e:
+            self._attach_status_code(e)
+            raise
+
+    async def request_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> ModelResponse:
+        if "/" in model:
+            model = model.split("/")[-1]
+
+        start_time = datetime.now()
+
+        try:
+            response = await self.get_async_client().chat.completions.create(
+                **self._request_params(
+                    model, message, temperature, max_tokens, stop_sequences
+                )
             )
+            return self._to_model_response(response, start_time)
+        except Exception as e:
+            self._attach_status_code(e)
+            raise
+
+    async def request_stream_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> AsyncIterator[StreamChunk]:
+        if "/" in model:
+            model = model.split("/")[-1]
 
-            # For successful responses, check if we can extract status code
-            if hasattr(response, "response") and hasattr(
-                response.response, "status_code"
-            ):
-                status_code = response.response.status_code
-
-            end_time = datetime.now()
-            response_request_duration = (end_time - start_time).total_seconds() * 1000
-
-            return ModelResponse(
-                content=response.choices[0].message.content,
-                input_tokens=response.usage.prompt_tokens,
-                output_tokens=response.usage.completion_tokens,
-                time_taken_in_ms=response_request_duration,
-                status_code=status_code,
+        try:
+            params = self._request_params(
+                model, message, temperature, max_tokens, stop_sequences
             )
+            stream = await self.get_async_client().chat.completions.create(
+                **params, stream=True, stream_options={"include_usage": True}
+            )
+            async with stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield StreamChunk(text=chunk.choices[0].delta.content)
+                    # Usage is only reported on the final chunk
+                    if chunk.usage is not None:
+                        yield StreamChunk(
+                            input_tokens=chunk.usage.prompt_tokens,
+                            output_tokens=chunk.usage.completion_tokens,
+                            cached_input_tokens=self._cached_input_tokens(chunk.usage),
+                        )
         except Exception as e:
-            # Extract status code from Together API errors
-            try:
-                # Together client exceptions might have status_code attribute
-                if hasattr(e, "status_code"):
-                    status_code = e.status_code
-                elif hasattr(e, "response") and hasattr(e.response, "status_code"):
-                    status_code = e.response.status_code
-            except:
-                pass  # If we can't extract the code, just continue
-
-            # Attach status code to the exception
-            if status_code is not None:
-                e.status_code = status_code
+            self._attach_status_code(e)
             raise
 
+    def _request_params(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> dict:
+        return {
+            "model": model,
+            "messages": [
+                {"role": "user", "content": message},
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stop": stop_sequences,
+        }
+
+    def _cached_input_tokens(self, usage) -> Optional[int]:
+        details = getattr(usage, "prompt_tokens_details", None)
+        return getattr(details, "cached_tokens", None)
+
+    def _to_model_response(self, response, start_time: datetime) -> ModelResponse:
+        status_code = None
+        # For successful responses, check if we can extract status code
+        if hasattr(response, "response") and hasattr(response.response, "status_code"):
+            status_code = response.response.status_code
+
+        end_time = datetime.now()
+        response_request_duration = (end_time - start_time).total_seconds() * 1000
+
+        return ModelResponse(
+            content=response.choices[0].message.content,
+            input_tokens=response.usage.prompt_tokens,
+            output_tokens=response.usage.completion_tokens,
+            time_taken_in_ms=response_request_duration,
+            status_code=status_code,
+            cached_input_tokens=self._cached_input_tokens(response.usage),
+        )
+
+    def _attach_status_code(self, e: Exception) -> None:
+        status_code = None
+        # Extract status code from Together API errors
+        try:
+            # Together client exceptions might have status_code attribute
+            if hasattr(e, "status_code"):
+                status_code = e.status_code
+            elif hasattr(e, "response") and hasattr(e.response, "status_code"):
+                status_code = e.response.status_code
+        except:
+            pass  # If we can't extract the code, just continue
+
+        # Attach status code to the exception
+        if status_code is not None:
+            e.status_code = status_code
+
     def tokenize(self, model: str, message: str) -> List[int]:
         raise NotImplementedError("Tokenization is not supported for Together models")
 
@@ -59,6 +59,20 @@ class ResourceDict:
                     del self.id_to_resource[workflow_id][resource_id]
             del self.resource_type_to_resources[workflow_id][resource_type]
 
+    def close_workflow(self, workflow_id: str) -> None:
+        """
+        Forget the resources of a workflow that has finished. Stopping them is
+        up to the ResourceManager of the workflow.
+        """
+        self.id_to_resource.pop(workflow_id, None)
+        self.resource_type_to_resources.pop(workflow_id, None)
+
+    def counts(self) -> dict:
+        return {
+            "workflows": self.count_workflows(),
+            "resources": self.count_total_resources_across_workflows(),
+        }
+
     def get(self, workflow_id: str, resource_id: str):
         """Retrieve a resource by workflow id and resource id."""
         if workflow_id not in self.id_to_resource:
@@ -324,10 +324,7 @@ class ResourceManager:
             self.workflow_id, {}
         ).values():
             resource.stop()
-        if self.workflow_id in self._resources.id_to_resource:
-            del self._resources.id_to_resource[self.workflow_id]
-        if self.workflow_id in self._resources.resource_type_to_resources:
-            del self._resources.resource_type_to_resources[self.workflow_id]
+        self._resources.close_workflow(self.workflow_id)
 
     def deallocate_all_resources(self):
         """Deallocate all resources for the current workflow."""
@@ -335,10 +332,7 @@ class ResourceManager:
             self._resources.id_to_resource.get(self.workflow_id, {}).values()
         ):
             resource.stop()
-        if self.workflow_id in self._resources.id_to_resource:
-            del self._resources.id_to_resource[self.workflow_id]
-        if self.workflow_id in self._resources.resource_type_to_resources:
-            del self._resources.resource_type_to_resources[self.workflow_id]
+        self._resources.close_workflow(self.workflow_id)
         self._resource_registration.clear()
         self._phase_resources.clear()
         self._resource_lifecycle.clear()
@@ -120,6 +120,11 @@ class ExperimentRunner:
             cmd.append("--use_helm")
         if use_mock_model:
             cmd.append("--use_mock_model")
+        # Sweeps are not interactive, so they can use the cheaper batch APIs.
+        # Each workflow runs in a runner process of its own, which sends one
+        # request at a time, so its batches never hold more than one request
+        if self.config.get("use_batch", False):
+            cmd.append("--use_batch")
         if vulnerability_type and workflow_type.startswith("detect_"):
             cmd.extend(["--vulnerability_type", vulnerability_type])
 
@@ -0,0 +1,104 @@
+"""
+Benchmark for workflow logging over a synthetic mock-model run.
+
+Builds a workflow with a phase of --iterations executor agent iterations (a
+model command and the Kali output each), logging every message as the agents
+do, and compares the bytes written and wall time of saving the whole workflow
+log on every message, as log_message did before, with appending to the event
+log and saving the workflow log once at the end.
+
+Usage:
+    python -m scripts.benchmark_event_log [--iterations] [--output_words]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from messages.action_messages.action_message import ActionMessage
+from messages.agent_messages.agent_message import AgentMessage
+from messages.message import Message
+from messages.phase_messages.phase_message import PhaseMessage
+from messages.workflow_message import WorkflowMessage
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark workflow logging")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument(
+        "--output_words",
+        type=int,
+        default=400,
+        help="Approximate size of each Kali output, in words",
+    )
+    return parser.parse_args()
+
+
+class SnapshotWorkflowMessage(WorkflowMessage):
+    """Saves the whole workflow log for every message, like log_message did."""
+
+    bytes_written = 0
+
+    def log_event(self, message: Message) -> None:
+        self.save()
+        self.bytes_written += os.path.getsize(self.log_file)
+
+
+def run(workflow_message: WorkflowMessage, iterations: int, output_words: int):
+    phase_message = PhaseMessage(phase_id="benchmark_phase")
+    workflow_message.add_child_message(phase_message)
+    prev_agent_message = AgentMessage("system", "initial prompt")
+    phase_message.add_child_message(prev_agent_message)
+
+    for i in range(iterations):
+        agent_message = AgentMessage("executor_agent", prev=prev_agent_message)
+        phase_message.add_child_message(agent_message)
+        command = ActionMessage(
+            resource_id="model", message=f"Reflection: step {i}\nCommand: ls -la /app"
+        )
+        agent_message.add_child_message(command)
+        output = ActionMessage(
+            resource_id="kali_env",
+            message=f"output {i} " + "word " * output_words,
+            prev=command,
+        )
+        agent_message.add_child_message(output)
+        prev_agent_message = agent_message
+
+    workflow_message.on_exit()
+
+
+def report(label: str, seconds: float, bytes_written: int) -> None:
+    print(
+        f"{label:<10} {seconds * 1000:10.1f} ms   "
+        f"{bytes_written / 1e6:10.2f} MB written"
+    )
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # Keep the benchmark's own log lines out of the timings
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as logs_dir:
+        snapshot = SnapshotWorkflowMessage("benchmark", logs_dir=logs_dir)
+        start = time.perf_counter()
+        run(snapshot, args.iterations, args.output_words)
+        snapshot_seconds = time.perf_counter() - start
+        report("snapshot", snapshot_seconds, snapshot.bytes_written)
+
+        event_log = WorkflowMessage("benchmark", logs_dir=logs_dir)
+        start = time.perf_counter()
+        run(event_log, args.iterations, args.output_words)
+        event_log_seconds = time.perf_counter() - start
+        event_log_bytes = event_log.event_log.bytes_written + os.path.getsize(
+            event_log.log_file
+        )
+        report("event log", event_log_seconds, event_log_bytes)
+
+    print(
+        f"{snapshot.bytes_written / event_log_bytes:.1f}x fewer bytes, "
+        f"{snapshot_seconds / event_log_seconds:.1f}x less time"
+    )
@@ -0,0 +1,107 @@
+"""
+Benchmark for MemoryResource.get_memory over a synthetic executor agent run.
+
+Builds a phase of --iterations executor agent iterations (a model command and
+the Kali output each) and times the get_memory call made at the start of every
+iteration, with the incremental MemoryIndex and with a full traversal of the
+message tree on every call, as parse_message did before the index.
+
+Usage:
+    python -m scripts.benchmark_memory [--iterations] [--output_words]
+"""
+
+import argparse
+import logging
+import time
+
+from messages.action_messages.action_message import ActionMessage
+from messages.agent_messages.agent_message import AgentMessage
+from messages.phase_messages.phase_message import PhaseMessage
+from resources.memory_resource.memory_prompt import MemoryPrompts
+from resources.memory_resource.memory_resource import (
+    MemoryResource,
+    MemoryResourceConfig,
+)
+from resources.memory_resource.memory_scope import MemoryScope
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark MemoryResource.get_memory")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument(
+        "--output_words",
+        type=int,
+        default=400,
+        help="Approximate size of each Kali output, in words",
+    )
+    return parser.parse_args()
+
+
+class FullTraversal:
+    """Renders memory by walking the whole message tree, like go_down."""
+
+    def __init__(self, memory_resource: MemoryResource):
+        self.memory_resource = memory_resource
+
+    def render(self, msg_node, stop_instance=None):
+        system_messages = set()
+        segment = self.memory_resource.go_down(
+            msg_node, sys_messages=system_messages, stop_instance=stop_instance
+        )
+        return segment, system_messages
+
+
+def run(memory_resource: MemoryResource, iterations: int, output_words: int):
+    """Simulate an executor agent run, returning the time spent in get_memory."""
+    phase_message = PhaseMessage(phase_id="benchmark_phase")
+    prev_agent_message = AgentMessage("system", "initial prompt")
+    phase_message.add_child_message(prev_agent_message)
+
+    memory_seconds = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        memory_resource.get_memory(prev_agent_message)
+        memory_seconds.append(time.perf_counter() - start)
+
+        agent_message = AgentMessage("executor_agent", prev=prev_agent_message)
+        phase_message.add_child_message(agent_message)
+        command = ActionMessage(
+            resource_id="model", message=f"Reflection: step {i}\nCommand: ls -la /app"
+        )
+        agent_message.add_child_message(command)
+        output = ActionMessage(
+            resource_id="kali_env",
+            message=f"output {i} " + "word " * output_words,
+            prev=command,
+        )
+        agent_message.add_child_message(output)
+        prev_agent_message = agent_message
+    return memory_seconds
+
+
+def report(label: str, memory_seconds) -> float:
+    total_ms = sum(memory_seconds) * 1000
+    last_ms = sum(memory_seconds[-10:]) * 100
+    print(
+        f"{label:<10} total {total_ms:10.1f} ms   "
+        f"first {memory_seconds[0] * 1000:7.3f} ms/call   "
+        f"last 10 {last_ms:7.3f} ms/call"
+    )
+    return total_ms
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # Messages outside a workflow log a debug line each time they are added
+    logging.disable(logging.INFO)
+    config = MemoryResourceConfig(
+        scope=MemoryScope.PHASE, fmt=MemoryPrompts.DEFAULT_FMT_PHASE
+    )
+
+    full = MemoryResource("memory_full", config)
+    full.index = FullTraversal(full)
+    before = report("traversal", run(full, args.iterations, args.output_words))
+
+    indexed = MemoryResource("memory_indexed", config)
+    after = report("index", run(indexed, args.iterations, args.output_words))
+    print(f"get_memory time over the run: {before / after:.1f}x lower")
@@ -0,0 +1,140 @@
+"""
+Benchmark for serializing large workflow logs.
+
+Builds a synthetic log of --phases phases of --iterations executor agent
+iterations each, and measures the throughput of encoding it the way
+WorkflowMessage.save did before (json with indent=4 and a recursive __dict__
+default), and with the message serializer, using orjson and the json fallback,
+indented and compact, and msgpack when it is installed.
+
+Usage:
+    python -m scripts.benchmark_serialization [--phases] [--iterations]
+        [--output_words] [--repeat]
+"""
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Callable
+from unittest.mock import patch
+
+from messages import serialization
+from messages.action_messages.action_message import ActionMessage
+from messages.agent_messages.agent_message import AgentMessage
+from messages.phase_messages.phase_message import PhaseMessage
+from messages.serialization import serializer
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark log serialization")
+    parser.add_argument("--phases", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument(
+        "--output_words",
+        type=int,
+        default=400,
+        help="Approximate size of each Kali output, in words",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    return parser.parse_args()
+
+
+def legacy_default(obj: Any) -> Any:
+    """The default WorkflowMessage.save passed to json.dump before."""
+    if isinstance(obj, Path):
+        return str(obj)
+    elif hasattr(obj, "__dict__"):
+        return {key: legacy_default(value) for key, value in obj.__dict__.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [legacy_default(item) for item in obj]
+    elif isinstance(obj, dict):
+        return {key: legacy_default(value) for key, value in obj.items()}
+    return str(obj)
+
+
+def build_phases(phases: int, iterations: int, output_words: int):
+    phase_messages = []
+    for p in range(phases):
+        phase_message = PhaseMessage(phase_id=f"phase_{p}", phase_idx=p)
+        prev_agent_message = AgentMessage("system", "initial prompt")
+        phase_message.add_child_message(prev_agent_message)
+        for i in range(iterations):
+            agent_message = AgentMessage("executor_agent", prev=prev_agent_message)
+            phase_message.add_child_message(agent_message)
+            command = ActionMessage(
+                resource_id="model",
+                message=f"Reflection: step {i}\nCommand: ls -la /app",
+                additional_metadata={
+                    "input_tokens": 1000 + i,
+                    "output_tokens": 100,
+                    "time_taken_in_ms": 1234.5,
+                    "task_dir": Path("bountytasks/lunary"),
+                },
+            )
+            agent_message.add_child_message(command)
+            output = ActionMessage(
+                resource_id="kali_env",
+                message=f"output {i} " + "word " * output_words,
+                prev=command,
+            )
+            agent_message.add_child_message(output)
+            prev_agent_message = agent_message
+        phase_messages.append(phase_message)
+    return phase_messages
+
+
+def bench(label: str, encode: Callable[[], bytes], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = encode()
+        best = min(best, time.perf_counter() - start)
+    size_mb = len(data) / 1e6
+    print(
+        f"{label:<22} {best * 1000:9.1f} ms  {size_mb:8.2f} MB  "
+        f"{size_mb / best:9.1f} MB/s"
+    )
+    return best
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # Messages outside a workflow log a debug line each time they are added
+    logging.disable(logging.INFO)
+
+    phase_messages = build_phases(args.phases, args.iterations, args.output_words)
+    start = time.perf_counter()
+    log = {
+        "workflow_metadata": {"workflow_name": "benchmark"},
+        "phase_messages": [message.to_log_dict() for message in phase_messages],
+    }
+    print(f"{'to_log_dict':<22} {(time.perf_counter() - start) * 1000:9.1f} ms")
+
+    legacy = bench(
+        "json indent=4 (before)",
+        lambda: json.dumps(log, indent=4, default=legacy_default).encode(),
+        args.repeat,
+    )
+    results = {}
+    if serialization.orjson is not None:
+        results["orjson indent"] = bench(
+            "orjson indent", lambda: serializer.dumps(log, indent=True), args.repeat
+        )
+        results["orjson compact"] = bench(
+            "orjson compact", lambda: serializer.dumps(log), args.repeat
+        )
+    with patch.object(serialization, "orjson", None):
+        results["json fallback indent"] = bench(
+            "json fallback indent",
+            lambda: serializer.dumps(log, indent=True),
+            args.repeat,
+        )
+    if serialization.msgpack is not None:
+        results["msgpack"] = bench(
+            "msgpack", lambda: serializer.packb(log), args.repeat
+        )
+
+    for label, seconds in results.items():
+        print(f"{label}: {legacy / seconds:.1f}x faster than before")
@@ -0,0 +1,91 @@
+"""
+Micro-benchmark for the per-call overhead of truncate_input_to_max_tokens.
+
+Compares the old path, which built a fresh OpenAIModels (HTTP client + .env read)
+and looked up the tiktoken encoding on every tokenize/decode, against the cached
+registry in model_utils.
+
+Usage:
+    python -m scripts.benchmark_truncation [--iterations] [--input_tokens] [--max_tokens]
+"""
+
+import argparse
+import os
+import time
+
+import tiktoken
+
+from resources.model_resource.model_utils import (
+    TRUNCATION_ALERT,
+    clear_model_caches,
+    truncate_input_to_max_tokens,
+)
+from resources.model_resource.openai_models.openai_models import OpenAIModels
+
+MODEL = "openai/gpt-4o"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark truncate_input_to_max_tokens overhead"
+    )
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument(
+        "--input_tokens",
+        type=int,
+        default=2000,
+        help="Approximate size of the benchmark input, in tokens",
+    )
+    parser.add_argument("--max_tokens", type=int, default=1000)
+    return parser.parse_args()
+
+
+def uncached_truncate(max_input_tokens: int, model_input: str) -> str:
+    """The truncation path as it was before the registry was introduced."""
+
+    def tokenize(text):
+        OpenAIModels()
+        return tiktoken.encoding_for_model("gpt-4o").encode(text)
+
+    def decode(tokens):
+        OpenAIModels()
+        return tiktoken.encoding_for_model("gpt-4o").decode(tokens)
+
+    input_tokens = tokenize(model_input)
+    alert_tokens = tokenize(TRUNCATION_ALERT)
+    if len(input_tokens) >= max_input_tokens - len(alert_tokens):
+        half = (max_input_tokens - len(alert_tokens)) // 2
+        return decode(input_tokens[:half] + alert_tokens + input_tokens[-half:])
+    return model_input
+
+
+def bench(label: str, fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call_ms = (time.perf_counter() - start) * 1000 / iterations
+    print(f"{label:<10} {per_call_ms:8.3f} ms/call")
+    return per_call_ms
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # Constructing the client only needs a key to be present, not a valid one
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    model_input = "lorem ipsum " * (args.input_tokens // 2)
+
+    clear_model_caches()
+    # Warm up tiktoken's file cache so both paths measure steady-state cost
+    truncate_input_to_max_tokens(args.max_tokens, model_input, MODEL)
+
+    before = bench(
+        "uncached",
+        lambda: uncached_truncate(args.max_tokens, model_input),
+        args.iterations,
+    )
+    after = bench(
+        "cached",
+        lambda: truncate_input_to_max_tokens(args.max_tokens, model_input, MODEL),
+        args.iterations,
+    )
+    print(f"overhead removed: {before - after:.3f} ms/call ({before / after:.1f}x)")
@@ -7,7 +7,7 @@ import argparse
 import json
 import re
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
 import tqdm
 from api_cost import (
@@ -125,6 +125,70 @@ def get_helper(model: str):
     return INPUT_CACHE_HELPERS[provider]
 
 
+def get_reported_input_cost(workflow_usage: dict, model: str) -> Tuple[int, float]:
+    """
+    Computes the input cost from the cached and cache-write token counts that the
+    provider reported, instead of estimating them from the system prompt.
+    Returns the number of cached input tokens and the total input cost.
+    """
+    input_cost = COST_PER_MILLION_INPUT_TOKENS[model]
+    total_cached_input_tokens = workflow_usage["total_cached_input_tokens"]
+    total_cache_write_input_tokens = workflow_usage.get(
+        "total_cache_write_input_tokens", 0
+    )
+    regular_input_tokens = (
+        workflow_usage["total_input_tokens"]
+        - total_cached_input_tokens
+        - total_cache_write_input_tokens
+    )
+    total_input_cost = (
+        regular_input_tokens * input_cost
+        + total_cached_input_tokens * COST_PER_MILLION_CACHED_INPUT_TOKENS[model]
+        + total_cache_write_input_tokens
+        * COST_PER_MILLION_CACHE_WRITE.get(model, input_cost)
+    ) / MILLION
+    return total_cached_input_tokens, total_input_cost
+
+
+def get_hedge_model(log: dict) -> Optional[str]:
+    """
+    The model hedged requests were sent to, from the model resource config.
+    """
+    for resource in log.get("resources_used", {}).values():
+        hedge_model = resource.get("config", {}).get("hedge_model")
+        if hedge_model is not None:
+            return hedge_model
+    return None
+
+
+def get_hedge_cost(log: dict, model: str) -> Tuple[float, float]:
+    """
+    Computes the cost request hedging adds to the usage totals, which only count
+    the winning requests, at model's rates: the losing duplicates, and the
+    requests that ran on the hedge model, at the hedge model's rates.
+    Returns the extra input cost and the extra output cost.
+    """
+    workflow_usage = log["workflow_usage"]
+    hedge_model = get_hedge_model(log)
+    if hedge_model not in COST_PER_MILLION_INPUT_TOKENS:
+        if hedge_model is not None:
+            print(f"Hedge model {hedge_model} not found in cost dictionary")
+        hedge_model = model
+    costs = []
+    for token_type, rates in [
+        ("input", COST_PER_MILLION_INPUT_TOKENS),
+        ("output", COST_PER_MILLION_OUTPUT_TOKENS),
+    ]:
+        loser_tokens = workflow_usage.get(f"total_hedge_loser_{token_type}_tokens", 0)
+        hedge_tokens = workflow_usage.get(f"total_hedge_model_{token_type}_tokens", 0)
+        # Winners and losers less the hedge model's tokens ran on model
+        costs.append(
+            (loser_tokens - hedge_tokens) / MILLION * rates[model]
+            + hedge_tokens / MILLION * rates[hedge_model]
+        )
+    return costs[0], costs[1]
+
+
 if __name__ == "__main__":
     all_paths = list(LOG_DIR.rglob("**/*.json"))
     results = {}
@@ -157,7 +221,15 @@ if __name__ == "__main__":
             try:
                 total_input_tokens = log["workflow_usage"]["total_input_tokens"]
                 total_output_tokens = log["workflow_usage"]["total_output_tokens"]
-                if provider in USE_INPUT_CACHE and USE_INPUT_CACHE[provider]:
+                use_input_cache = False
+                if "total_cached_input_tokens" in log["workflow_usage"]:
+                    # Newer logs carry the cache usage reported by the provider
+                    use_input_cache = True
+                    total_cached_input_tokens, total_input_cost = (
+                        get_reported_input_cost(log["workflow_usage"], model)
+                    )
+                elif provider in USE_INPUT_CACHE and USE_INPUT_CACHE[provider]:
+                    use_input_cache = True
                     try:
                         system_prompt = get_system_prompt(full_log)
                         num_cache_hits = (
@@ -188,6 +260,10 @@ if __name__ == "__main__":
                     total_input_cost = (total_input_tokens / MILLION) * input_cost
 
                 total_output_cost = (total_output_tokens / MILLION) * output_cost
+                # Losing duplicates sent by request hedging are billed as well
+                hedge_input_cost, hedge_output_cost = get_hedge_cost(log, model)
+                total_input_cost += hedge_input_cost
+                total_output_cost += hedge_output_cost
                 total_cost = total_input_cost + total_output_cost
 
                 results[path] = {
@@ -198,10 +274,9 @@ if __name__ == "__main__":
                     "total_output_cost": total_output_cost,
                     "total_cost": total_cost,
                     "workflow_metadata": log.get("workflow_metadata", {}),
-                    "use_input_cache": False,
+                    "use_input_cache": use_input_cache,
                 }
-                if provider in USE_INPUT_CACHE and USE_INPUT_CACHE[provider]:
-                    results[path]["use_input_cache"] = True
+                if use_input_cache:
                     results[path][
                         "total_cached_input_tokens"
                     ] = total_cached_input_tokens
@@ -150,15 +150,19 @@ def test_update_phase_agents_models_has_executor():
         assert agent.resources.model.model == new_model
 
 
-def test_update_phase_agents_models_no_executor():
+def test_update_phase_agents_models_no_executor(monkeypatch):
     mock_model_resource_config = MagicMock()
     model_resource_mock = MagicMock(return_value=None)
 
-    ModelResourceConfig.create = MagicMock(return_value=mock_model_resource_config)
+    monkeypatch.setattr(
+        ModelResourceConfig,
+        "create",
+        MagicMock(return_value=mock_model_resource_config),
+    )
     mock_model_resource_config.copy_with_changes = MagicMock(
         return_value=mock_model_resource_config
     )
-    ModelResource.__init__ = model_resource_mock
+    monkeypatch.setattr(ModelResource, "__init__", model_resource_mock)
 
     am = AgentManager(workflow_id=1)
     am._phase_agents = {
@@ -50,14 +50,14 @@ async def test_call_lm_success(executor_agent):
     action_msg = ActionMessage("test_id", "command: pwd")
     expected_response = CommandMessage("test_id", "command: pwd")
 
-    executor_agent.resources.model.run = Mock(return_value=action_msg)
+    executor_agent.resources.model.run_async = AsyncMock(return_value=action_msg)
     executor_agent.resources.executor_agent_memory.get_memory = Mock(return_value=None)
     executor_agent.parse_response = Mock(return_value=expected_response)
 
     result = await executor_agent.call_lm()
 
     assert result == expected_response
-    executor_agent.resources.model.run.assert_called_once()
+    executor_agent.resources.model.run_async.assert_called_once()
     executor_agent.parse_response.assert_called_once_with(action_msg)
 
 
@@ -66,7 +66,9 @@ async def test_call_lm_failure(executor_agent):
     """Test failure of LM call after max retries"""
     executor_agent.last_executor_agent_message = Mock()
     executor_agent.last_executor_agent_message.add_child_message = Mock()
-    executor_agent.resources.model.run = Mock(side_effect=Exception("API error"))
+    executor_agent.resources.model.run_async = AsyncMock(
+        side_effect=Exception("API error")
+    )
     executor_agent.parse_response = Mock()
     executor_agent.resources.executor_agent_memory.get_memory = Mock(return_value=None)
     executor_agent.parse_response = Mock(return_value=None)
@@ -79,7 +81,7 @@ async def test_call_lm_failure(executor_agent):
         == "call_lm error: Max retries reached without valid response."
     )
     assert (
-        executor_agent.resources.model.run.call_count == MAX_RETRIES
+        executor_agent.resources.model.run_async.call_count == MAX_RETRIES
     )  # call_lm MAX_RETRIES
     assert executor_agent.parse_response.call_count == 0
 
@@ -89,7 +91,7 @@ async def test_call_lm_parse_errors_return_raw_response(executor_agent):
     """Test LM call succeeding but parse_response failing, returning raw response"""
     # Mock implementations
     action_msg = ActionMessage("test_id", "unparsable format")
-    executor_agent.resources.model.run = Mock(return_value=action_msg)
+    executor_agent.resources.model.run_async = AsyncMock(return_value=action_msg)
     executor_agent.resources.executor_agent_memory.get_memory = Mock(return_value=None)
     executor_agent.parse_response = Mock(side_effect=Exception("Parse error"))
     executor_agent.last_executor_agent_message = AgentMessage("agent_id")
@@ -100,8 +102,8 @@ async def test_call_lm_parse_errors_return_raw_response(executor_agent):
     # Verify we got back the last raw response
     assert not isinstance(result, CommandMessage)
 
-    # Verify the model.run and parse_response were called correct number of times
-    assert executor_agent.resources.model.run.call_count == MAX_RETRIES
+    # Verify the model.run_async and parse_response were called correct number of times
+    assert executor_agent.resources.model.run_async.call_count == MAX_RETRIES
     assert executor_agent.parse_response.call_count == MAX_RETRIES
 
 
@@ -110,7 +112,7 @@ async def test_call_lm_parse_errors_gets_modified_reminder_prompt(executor_agent
     """Test LM call succeeding but parse_response failing, returning raw response"""
     # Mock implementations
     action_msg = ActionMessage("test_id", "unparsable format")
-    executor_agent.resources.model.run = Mock(return_value=action_msg)
+    executor_agent.resources.model.run_async = AsyncMock(return_value=action_msg)
     executor_agent.parse_response = Mock(side_effect=Exception("Parse error"))
     executor_agent.last_executor_agent_message = AgentMessage("agent_id")
     prev_agent_message = AgentMessage("prev_agent_id")
@@ -128,8 +130,8 @@ async def test_call_lm_parse_errors_gets_modified_reminder_prompt(executor_agent
     # Verify we got back the last raw response
     assert not isinstance(result, CommandMessage)
 
-    # Verify the model.run and parse_response were called correct number of times
-    assert executor_agent.resources.model.run.call_count == MAX_RETRIES
+    # Verify the model.run_async and parse_response were called correct number of times
+    assert executor_agent.resources.model.run_async.call_count == MAX_RETRIES
     assert executor_agent.parse_response.call_count == MAX_RETRIES
 
 
@@ -144,7 +146,7 @@ async def test_call_lm_mixed_errors_return_raw_response(executor_agent):
 
     # First call: API error, Second: success but parse error,
     # Third: success but parse error again
-    executor_agent.resources.model.run = Mock(
+    executor_agent.resources.model.run_async = AsyncMock(
         side_effect=[api_error, action_msg1, action_msg2]
     )
     executor_agent.resources.executor_agent_memory.get_memory = Mock(return_value=None)
@@ -159,7 +161,7 @@ async def test_call_lm_mixed_errors_return_raw_response(executor_agent):
         assert "second response" in result.message
 
         # Verify correct call counts
-        assert executor_agent.resources.model.run.call_count == 3
+        assert executor_agent.resources.model.run_async.call_count == 3
         assert (
             executor_agent.parse_response.call_count == 2
         )  # Only called when API succeeds
@@ -175,7 +177,7 @@ async def test_call_lm_eventual_success(executor_agent):
     action_msg = ActionMessage("test_id", "valid command")
     expected_command_msg = CommandMessage("test_id", "command: ls")
 
-    executor_agent.resources.model.run = Mock(
+    executor_agent.resources.model.run_async = AsyncMock(
         side_effect=[api_error, action_msg, action_msg]
     )
     executor_agent.resources.executor_agent_memory.get_memory = Mock(return_value=None)
@@ -188,7 +190,7 @@ async def test_call_lm_eventual_success(executor_agent):
     result = await executor_agent.call_lm()
 
     assert result is expected_command_msg
-    assert executor_agent.resources.model.run.call_count == 3
+    assert executor_agent.resources.model.run_async.call_count == 3
     assert executor_agent.parse_response.call_count == 2
 
 
@@ -203,13 +205,15 @@ async def test_invalid_prompt_error(executor_agent):
             self.status_code = status_code
 
     quota_error = ApiError("Invalid prompt", 400)
-    executor_agent.resources.model.run = Mock(side_effect=quota_error)
+    executor_agent.resources.model.run_async = AsyncMock(side_effect=quota_error)
     executor_agent.resources.executor_agent_memory.get_memory = Mock(return_value=None)
 
     with pytest.raises(Exception) as exc_info:
         await executor_agent.call_lm()
 
-    assert executor_agent.resources.model.run.call_count == MAX_RETRIES  # should retry
+    assert (
+        executor_agent.resources.model.run_async.call_count == MAX_RETRIES
+    )  # should retry
 
 
 @pytest.mark.asyncio
@@ -313,7 +317,7 @@ async def test_call_lm_error_history_tracking(executor_agent):
     api_error2 = Exception("Temporary server error")
     action_msg = ActionMessage("test_id", "command: ls")
 
-    executor_agent.resources.model.run = Mock(
+    executor_agent.resources.model.run_async = AsyncMock(
         side_effect=[api_error1, api_error2, action_msg]
     )
     executor_agent.resources.executor_agent_memory.get_memory = Mock(return_value=None)
@@ -355,7 +359,7 @@ async def test_call_lm_invalid_prompt_error_retry(executor_agent):
     success_msg = ActionMessage("test_id", "command: ls")
 
     # First call fails with invalid prompt, second succeeds
-    executor_agent.resources.model.run = Mock(
+    executor_agent.resources.model.run_async = AsyncMock(
         side_effect=[model_response_error, success_msg]
     )
     executor_agent.resources.executor_agent_memory.get_memory = Mock(return_value=None)
@@ -372,7 +376,7 @@ async def test_call_lm_invalid_prompt_error_retry(executor_agent):
 
     # Verify retry happened and we got a successful result
     assert isinstance(result, CommandMessage)
-    assert executor_agent.resources.model.run.call_count == 2
+    assert executor_agent.resources.model.run_async.call_count == 2
 
     # Verify error history was recorded
     assert "error_history" in success_msg.additional_metadata
@@ -391,25 +395,22 @@ async def test_call_lm_timeout_error(executor_agent):
     timeout_error = asyncio.TimeoutError()
     action_msg = ActionMessage("test_id", "command: ls")
 
-    # Patch asyncio.to_thread to simulate timeout
-    with patch(
-        "asyncio.to_thread", side_effect=[timeout_error, timeout_error, action_msg]
-    ):
-        executor_agent.resources.model.run = Mock(return_value=action_msg)
-        executor_agent.resources.executor_agent_memory.get_memory = Mock(
-            return_value=None
-        )
+    # Simulate the model call timing out twice before succeeding
+    executor_agent.resources.model.run_async = AsyncMock(
+        side_effect=[timeout_error, timeout_error, action_msg]
+    )
+    executor_agent.resources.executor_agent_memory.get_memory = Mock(return_value=None)
 
-        # Set up last_executor_agent_message
-        executor_agent.last_executor_agent_message = ExecutorAgentMessage(
-            agent_id=executor_agent.agent_id, prev=None
-        )
-        executor_agent._backoff_delay = AsyncMock()
+    # Set up last_executor_agent_message
+    executor_agent.last_executor_agent_message = ExecutorAgentMessage(
+        agent_id=executor_agent.agent_id, prev=None
+    )
+    executor_agent._backoff_delay = AsyncMock()
 
-        prev_agent_message = AgentMessage("prev_agent_id")
-        prev_agent_message.memory = ""
+    prev_agent_message = AgentMessage("prev_agent_id")
+    prev_agent_message.memory = ""
 
-        result = await executor_agent.call_lm(prev_agent_message)
+    result = await executor_agent.call_lm(prev_agent_message)
 
     # Verify error history contains timeout entries
     assert "error_history" in result.additional_metadata
@@ -425,7 +426,7 @@ async def test_call_lm_quota_error(executor_agent):
 
     quota_error = Exception("No quota remaining for GPT-4")
 
-    executor_agent.resources.model.run = Mock(side_effect=quota_error)
+    executor_agent.resources.model.run_async = AsyncMock(side_effect=quota_error)
     executor_agent.resources.executor_agent_memory.get_memory = Mock(return_value=None)
 
     # Set up last_executor_agent_message
@@ -470,7 +471,9 @@ async def test_real_world_openai_invalid_prompt_error(executor_agent):
     openai_error = OpenAIError(openai_error_message, 400)
     action_msg = ActionMessage("test_id", "command: ls")
 
-    executor_agent.resources.model.run = Mock(side_effect=[openai_error, action_msg])
+    executor_agent.resources.model.run_async = AsyncMock(
+        side_effect=[openai_error, action_msg]
+    )
     executor_agent.resources.executor_agent_memory.get_memory = Mock(return_value=None)
 
     # Set up last_executor_agent_message
@@ -482,7 +485,7 @@ async def test_real_world_openai_invalid_prompt_error(executor_agent):
 
     # Should retry on invalid prompt and succeed
     assert isinstance(result, CommandMessage)
-    assert executor_agent.resources.model.run.call_count == 2
+    assert executor_agent.resources.model.run_async.call_count == 2
 
     # Check error history
     assert "error_history" in result.additional_metadata
@@ -602,8 +605,8 @@ async def test_call_lm_timeout_retries(executor_agent):
     )
     executor_agent.last_executor_agent_message.memory = "context"
 
-    # Patch model.run to raise TimeoutError
-    executor_agent.resources.model.run = MagicMock(
+    # Patch model.run_async to raise TimeoutError
+    executor_agent.resources.model.run_async = AsyncMock(
         side_effect=TimeoutError("Test timeout")
     )
     executor_agent._backoff_delay = AsyncMock()
@@ -651,7 +654,7 @@ async def test_call_lm_rate_limit_error(executor_agent):
     success_msg = ActionMessage("test_id", "command: ls")
 
     # First and second call fails with rate limit error, third succeeds
-    executor_agent.resources.model.run = Mock(
+    executor_agent.resources.model.run_async = AsyncMock(
         side_effect=[model_response_error, model_response_error, success_msg]
     )
     executor_agent.resources.executor_agent_memory.get_memory = Mock(return_value=None)
@@ -669,7 +672,7 @@ async def test_call_lm_rate_limit_error(executor_agent):
 
     # Verify retry happened and we got a successful result
     assert isinstance(result, CommandMessage)
-    assert executor_agent.resources.model.run.call_count == 3
+    assert executor_agent.resources.model.run_async.call_count == 3
 
     # Verify error history was recorded
     assert "error_history" in success_msg.additional_metadata
@@ -243,3 +243,28 @@ def test_editing_and_running_preserves_iterations(message_handler, agent_manager
     assert message_1_edit.version_prev is message_1
     assert message_2.version_next is message_2_star_star
     assert message_2_star_star.version_prev is message_2
+
+
+@patch("messages.message_utils.broadcast_update")
+def test_edit_shares_preceding_actions(mock_broadcast_update, message_handler):
+    """
+    Editing an action creates a new version of the agent that shares the actions
+    before the edit, and leaves the chain of the old version unchanged.
+    """
+    agent_message = AgentMessage("test_id")
+    action_msg1 = ActionMessage("test_id1", "test_msg1")
+    action_msg2 = ActionMessage("test_id2", "test_msg2", prev=action_msg1)
+    action_msg3 = ActionMessage("test_id3", "test_msg3", prev=action_msg2)
+    for action_message in (action_msg1, action_msg2, action_msg3):
+        agent_message.add_child_message(action_message)
+
+    edited = asyncio.run(message_handler.edit_message(action_msg3, "edited"))
+    new_agent_message = edited.parent
+
+    assert new_agent_message.version_prev is agent_message
+    assert new_agent_message.action_messages == [action_msg1, action_msg2, edited]
+    assert action_msg1.parent is agent_message
+    assert action_msg2.next is action_msg3
+    assert edited.prev is action_msg2
+    assert new_agent_message.current_children == [action_msg1, action_msg2, edited]
+    assert agent_message.current_children == [action_msg1, action_msg2, action_msg3]
@@ -15,6 +15,10 @@ QUERY_TIME_TAKEN_IN_MS = "query_time_taken_in_ms"
 INPUT_TOKEN = "input_token"
 OUTPUT_TOKEN = "output_token"
 TOTAL_ITERATION_TIME_MS = "total_iteration_time_ms"
+CACHED_INPUT_TOKEN = "cached_input_token"
+CACHE_WRITE_INPUT_TOKEN = "cache_write_input_token"
+HEDGE_LOSER_INPUT_TOKEN = "hedge_loser_input_token"
+HEDGE_MODEL_INPUT_TOKEN = "hedge_model_input_token"
 
 
 @pytest.fixture
@@ -229,6 +233,68 @@ def test_calculate_total_usages(mocker):
     }
 
 
+def test_calculate_total_usages_prompt_cache():
+    """
+    Test that prompt cache usage is summed only over responses that report it.
+    """
+    phase_message = PhaseMessage("phase_1")
+    agent_message = MagicMock(spec=AgentMessage)
+    agent_message.iteration_time_ms = 100
+
+    reported = MagicMock(spec=ActionMessage)
+    reported._additional_metadata = {
+        "input_tokens": 1000,
+        "output_tokens": 50,
+        "time_taken_in_ms": 200,
+        "cached_input_tokens": 800,
+        "cache_write_input_tokens": 100,
+    }
+    unreported = MagicMock(spec=ActionMessage)
+    unreported._additional_metadata = {
+        "input_tokens": 500,
+        "output_tokens": 25,
+        "time_taken_in_ms": 100,
+    }
+    agent_message._action_messages = [reported, unreported]
+    phase_message._agent_messages = [agent_message]
+
+    usage = phase_message.calculate_total_usages()
+
+    assert usage[INPUT_TOKEN] == 1500
+    assert usage[CACHED_INPUT_TOKEN] == 800
+    assert usage[CACHE_WRITE_INPUT_TOKEN] == 100
+
+
+def test_calculate_total_usages_hedging():
+    """
+    Test that the tokens of hedged requests are summed apart from the winners.
+    """
+    phase_message = PhaseMessage("phase_1")
+    agent_message = MagicMock(spec=AgentMessage)
+    agent_message.iteration_time_ms = 100
+
+    hedged = MagicMock(spec=ActionMessage)
+    hedged._additional_metadata = {
+        "input_tokens": 1000,
+        "output_tokens": 50,
+        "time_taken_in_ms": 200,
+        "hedged": True,
+        "hedge_won": True,
+        "hedge_loser_input_tokens": 900,
+        "hedge_loser_output_tokens": 0,
+        "hedge_model_input_tokens": 1000,
+        "hedge_model_output_tokens": 50,
+    }
+    agent_message._action_messages = [hedged]
+    phase_message._agent_messages = [agent_message]
+
+    usage = phase_message.calculate_total_usages()
+
+    assert usage[INPUT_TOKEN] == 1000
+    assert usage[HEDGE_LOSER_INPUT_TOKEN] == 900
+    assert usage[HEDGE_MODEL_INPUT_TOKEN] == 1000
+
+
 def test_to_log_dict(mocker):
     """
     Test the to_log_dict method for PhaseMessage.
@@ -0,0 +1,144 @@
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+
+from messages.action_messages.action_message import ActionMessage
+from messages.agent_messages.agent_message import AgentMessage
+from messages.event_log import latest_message_records, read_events
+from messages.phase_messages.phase_message import PhaseMessage
+from messages.workflow_message import WorkflowMessage
+
+
+@pytest.fixture
+def workflow_message(tmp_path):
+    workflow_message = WorkflowMessage("test_workflow", logs_dir=str(tmp_path))
+    yield workflow_message
+    workflow_message.persister.stop()
+    workflow_message.event_log.close()
+
+
+def run_iterations(workflow_message, iterations):
+    phase_message = PhaseMessage("phase")
+    workflow_message.add_child_message(phase_message)
+    for i in range(iterations):
+        agent_message = AgentMessage("executor_agent", f"iteration {i}")
+        phase_message.add_child_message(agent_message)
+        agent_message.add_child_message(
+            ActionMessage(resource_id="model", message=f"Command: ls {i}")
+        )
+    return phase_message
+
+
+def test_messages_are_appended_without_saving(workflow_message):
+    with patch.object(WorkflowMessage, "save") as save:
+        phase_message = run_iterations(workflow_message, 3)
+
+    save.assert_not_called()
+    assert not workflow_message.log_file.exists()
+
+    events = list(read_events(workflow_message.event_log.path))
+    assert events[0]["event"] == "workflow"
+    assert events[0]["workflow"]["workflow_id"] == workflow_message.workflow_id
+
+    records = latest_message_records(workflow_message.event_log.path)
+    agent_message = phase_message.agent_messages[-1]
+    record = records[agent_message.id]
+    assert record["parent"] == phase_message.id
+    assert record["action_messages"][0]["message"] == "Command: ls 2"
+    # Agent messages are logged on their own, not inside every phase event
+    assert records[phase_message.id]["agent_messages"] is None
+
+
+def test_bytes_written_grow_linearly(workflow_message, tmp_path):
+    run_iterations(workflow_message, 10)
+    first_bytes = workflow_message.event_log.bytes_written
+
+    other = WorkflowMessage("test_workflow", logs_dir=str(tmp_path / "other"))
+    run_iterations(other, 100)
+    other.persister.stop()
+    other.event_log.close()
+
+    assert other.event_log.bytes_written < 12 * first_bytes
+
+
+def test_on_exit_materializes_the_log(workflow_message):
+    run_iterations(workflow_message, 2)
+
+    workflow_message.on_exit()
+
+    with open(workflow_message.log_file) as f:
+        log = json.load(f)
+    agent_messages = log["phase_messages"][0]["agent_messages"]
+    assert [message["message"] for message in agent_messages] == [
+        "iteration 0",
+        "iteration 1",
+    ]
+
+
+def test_read_events_skips_torn_last_line(tmp_path):
+    path = tmp_path / "events.jsonl"
+    path.write_text(
+        json.dumps({"event": "message", "message": {"current_id": "1"}})
+        + '\n{"event": "mess'
+    )
+
+    assert list(latest_message_records(path)) == ["1"]
+
+
+def test_logged_messages_are_saved_in_the_background(tmp_path):
+    workflow_message = WorkflowMessage(
+        "test_workflow", logs_dir=str(tmp_path), max_log_staleness=0.1
+    )
+    run_iterations(workflow_message, 2)
+
+    deadline = time.monotonic() + 5
+    while not workflow_message.log_file.exists():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    workflow_message.persister.stop()
+
+    with open(workflow_message.log_file) as f:
+        log = json.load(f)
+    assert len(log["phase_messages"][0]["agent_messages"]) == 2
+
+
+def test_new_log_switches_files(workflow_message):
+    run_iterations(workflow_message, 1)
+    old_log_file = workflow_message.log_file
+    old_event_log = workflow_message.event_log.path
+
+    with patch("messages.workflow_message.datetime") as mock_datetime:
+        mock_datetime.now.return_value.strftime.return_value = "later"
+        mock_datetime.now.return_value.isoformat.return_value = "later"
+        workflow_message.new_log()
+    run_iterations(workflow_message, 1)
+
+    assert old_log_file.exists()
+    assert workflow_message.log_file != old_log_file
+    assert workflow_message.event_log.path != old_event_log
+    assert workflow_message.log_file.exists()
+
+
+def test_latest_message_records_reads_integer_version_links(tmp_path):
+    # Logs written before message ids were assigned by a counter linked
+    # versions by the integer id() of the message
+    path = tmp_path / "old.jsonl"
+    old = {"message_type": "AgentMessage", "current_id": "140001", "message": "a"}
+    new = {
+        "message_type": "AgentMessage",
+        "current_id": "140002",
+        "message": "b",
+        "version_prev": 140001,
+        "action_messages": [{"current_id": "140003", "version_next": 140004}],
+    }
+    with open(path, "w") as f:
+        for record in (old, new):
+            f.write(json.dumps({"event": "message", "message": record}) + "\n")
+
+    records = latest_message_records(path)
+
+    assert records["140002"]["version_prev"] == "140001"
+    assert records["140002"]["version_prev"] in records
+    assert records["140002"]["action_messages"][0]["version_next"] == "140004"
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from messages.log_persistence import LogPersister, write_atomic
+
+
+class Counter:
+    """Snapshot source whose state changes on every request."""
+
+    def __init__(self):
+        self.value = 0
+        self.snapshots = 0
+
+    def snapshot(self):
+        self.snapshots += 1
+        return {"value": self.value}
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return tmp_path / "logs" / "workflow.json"
+
+
+def make_persister(log_path, counter, max_staleness=0.2):
+    return LogPersister(lambda: log_path, counter.snapshot, max_staleness=max_staleness)
+
+
+def test_requests_coalesce_into_one_save(log_path):
+    counter = Counter()
+    persister = make_persister(log_path, counter)
+
+    for value in range(50):
+        counter.value = value
+        persister.request()
+    assert persister.saves == 0
+
+    wait_for(lambda: persister.saves == 1)
+    assert json.loads(log_path.read_text()) == {"value": 49}
+    time.sleep(0.3)
+    assert persister.saves == 1
+    persister.stop()
+
+
+def test_max_staleness_bounds_delay(log_path):
+    counter = Counter()
+    persister = make_persister(log_path, counter, max_staleness=0.3)
+
+    start = time.monotonic()
+    persister.request()
+    # Later requests do not push the save back
+    while time.monotonic() - start < 0.2:
+        persister.request()
+        time.sleep(0.01)
+    wait_for(lambda: persister.saves == 1)
+
+    assert time.monotonic() - start < 1.0
+    persister.stop()
+
+
+def test_flush_saves_pending_changes_only(log_path):
+    counter = Counter()
+    persister = make_persister(log_path, counter, max_staleness=60)
+
+    persister.flush()
+    assert not log_path.exists()
+
+    counter.value = 1
+    persister.request()
+    persister.flush()
+    assert json.loads(log_path.read_text()) == {"value": 1}
+    assert persister.saves == 1
+    persister.stop()
+    assert persister.saves == 1
+
+
+def test_stop_saves_pending_changes(log_path):
+    counter = Counter()
+    persister = make_persister(log_path, counter, max_staleness=60)
+    persister.request()
+
+    persister.stop()
+
+    assert json.loads(log_path.read_text()) == {"value": 0}
+    assert not any(
+        thread.name == "log-persister" and thread is persister._thread
+        for thread in threading.enumerate()
+    )
+    # Saves after stopping happen on flush
+    counter.value = 2
+    persister.request()
+    persister.flush()
+    assert json.loads(log_path.read_text()) == {"value": 2}
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_taken_on_the_event_loop(log_path):
+    counter = Counter()
+    threads = []
+
+    def snapshot():
+        threads.append(threading.current_thread())
+        return counter.snapshot()
+
+    persister = LogPersister(lambda: log_path, snapshot, max_staleness=0.1)
+    for value in range(3):
+        counter.value = value
+        persister.request()
+
+    deadline = time.monotonic() + 5
+    while persister.saves == 0:
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+    assert threads == [threading.current_thread()]
+    assert json.loads(log_path.read_text()) == {"value": 2}
+    persister.stop()
+
+
+def test_failed_write_keeps_previous_log(log_path):
+    write_atomic(log_path, b'{"value": 1}')
+
+    with patch("messages.log_persistence.os.replace", side_effect=OSError("disk")):
+        with pytest.raises(OSError):
+            write_atomic(log_path, b'{"value": 2}')
+
+    assert json.loads(log_path.read_text()) == {"value": 1}
+    assert list(log_path.parent.iterdir()) == [log_path]
@@ -1,3 +1,5 @@
+import gc
+import time
 from unittest.mock import patch
 
 import pytest
@@ -7,8 +9,12 @@ from messages.action_messages.answer_message import AnswerMessage
 from messages.action_messages.answer_message_interface import AnswerMessageInterface
 from messages.action_messages.command_message import CommandMessage
 from messages.action_messages.command_message_interface import CommandMessageInterface
-from messages.message import Message
+from messages.agent_messages.agent_message import AgentMessage
+from messages.agent_messages.executor_agent_message import ExecutorAgentMessage
+from messages.convert_message_utils import cast_action_to_command
+from messages.message import TIMESTAMP_FORMAT, Message
 from messages.parse_message import parse_field
+from messages.phase_messages.phase_message import PhaseMessage
 from resources.base_resource import BaseResource
 
 
@@ -113,3 +119,156 @@ grep -R 'file=' codebase/gradio
 Command:
 grep -R 'file=' codebase/gradio"""
     )
+
+
+@patch("messages.message_utils.log_message")
+def test_messages_are_slotted(mock_log_message):
+    messages = [
+        ActionMessage("test_id", "hi"),
+        CommandMessage("test_id", "Command: ls"),
+        AnswerMessage("Answer: 42"),
+        AgentMessage("executor_agent"),
+        ExecutorAgentMessage("executor_agent"),
+        PhaseMessage("phase"),
+    ]
+    for message in messages:
+        assert not hasattr(message, "__dict__")
+        with pytest.raises(AttributeError):
+            message.unknown = True
+
+
+@patch("messages.message_utils.log_message")
+def test_message_ids_are_monotonic_and_not_reused(mock_log_message):
+    first = ActionMessage("test_id", "first")
+    first_id = int(first.id)
+    del first
+    gc.collect()
+
+    ids = [int(ActionMessage("test_id", "hi").id) for _ in range(100)]
+
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert first_id < ids[0]
+
+
+@patch("messages.message_utils.log_message")
+def test_timestamp_is_formatted_from_creation_time(mock_log_message):
+    with patch("messages.message.time.time", return_value=0.0):
+        message = ActionMessage("test_id", "hi")
+
+    assert message.created_at == 0.0
+    assert message.timestamp == time.strftime(TIMESTAMP_FORMAT, time.localtime(0.0))
+    assert message.to_base_dict()["timestamp"] == message.timestamp
+
+
+@patch("messages.message_utils.log_message")
+def test_version_links_are_logged_as_message_ids(mock_log_message):
+    old_message = ActionMessage("test_id", "old")
+    new_message = ActionMessage("test_id", "new")
+    new_message.set_version_prev(old_message)
+
+    assert old_message.to_base_dict()["version_next"] == new_message.id
+    assert new_message.to_base_dict()["version_prev"] == old_message.id
+
+
+@patch("messages.message_utils.log_message")
+def test_cast_action_to_command_in_place(mock_log_message):
+    message = ActionMessage("test_id", "Command: ls")
+
+    command_message = cast_action_to_command(message)
+
+    assert command_message is message
+    assert isinstance(message, CommandMessage)
+    assert message.command == "ls"
+    assert message.to_log_dict()["command"] == "ls"
+
+    with pytest.raises(Exception):
+        cast_action_to_command(ActionMessage("test_id", "Answer: 42"))
+
+
+def walk_versions(message):
+    """Versions of message found by following the version links."""
+    versions = [message.id]
+    current = message
+    while current.version_prev:
+        current = current.version_prev
+        versions.insert(0, current.id)
+    current = message
+    while current.version_next:
+        current = current.version_next
+        versions.append(current.id)
+    return versions, current
+
+
+@patch("messages.message_utils.log_message")
+def test_versions_of_a_linear_edit_history(mock_log_message):
+    messages = [ActionMessage("test_id", f"version {i}") for i in range(4)]
+    assert messages[0].versions == [messages[0].id]
+    assert messages[0].get_latest_version() is messages[0]
+    assert "versions" not in messages[0].to_broadcast_dict()
+
+    for prev, message in zip(messages, messages[1:]):
+        message.set_version_prev(prev)
+
+    for message in messages:
+        assert message.versions == [m.id for m in messages]
+        assert message.get_latest_version() is messages[-1]
+        assert message.to_broadcast_dict()["versions"] == message.versions
+
+
+@patch("messages.message_utils.log_message")
+def test_versions_match_version_links_after_branching(mock_log_message):
+    a, b, c, d, e, f = [ActionMessage("test_id", str(i)) for i in range(6)]
+    b.set_version_prev(a)
+    c.set_version_prev(b)
+    # Editing b again cuts c off the chain reachable from a
+    d.set_version_prev(b)
+    # Linking the start of another chain
+    f.set_version_prev(e)
+    e.set_version_prev(d)
+
+    for message in (a, b, c, d, e, f):
+        versions, latest = walk_versions(message)
+        assert message.versions == versions
+        assert message.get_latest_version() is latest
+
+
+@patch("messages.message_utils.log_message")
+def test_versions_match_version_links_after_linking_a_branched_chain(
+    mock_log_message,
+):
+    a, b, c, d, e, f, g = [ActionMessage("test_id", str(i)) for i in range(7)]
+    b.set_version_prev(a)
+    c.set_version_prev(b)
+    # Branch off a, then off b
+    d.set_version_prev(a)
+    e.set_version_prev(b)
+    # Linking a after f reaches every branch of a, then f is edited again
+    a.set_version_prev(f)
+    g.set_version_prev(f)
+
+    for message in (a, b, c, d, e, f, g):
+        versions, latest = walk_versions(message)
+        assert message.versions == versions
+        assert message.get_latest_version() is latest
+
+
+@patch("messages.message_utils.log_message")
+def test_changed_children_stay_bounded(mock_log_message):
+    agent_message = AgentMessage("test_agent")
+    first = ActionMessage("test_id", "first")
+    second = ActionMessage("test_id", "second", prev=first)
+    agent_message.add_child_message(first)
+    agent_message.add_child_message(second)
+    seen = agent_message.revision
+
+    for i in range(1000):
+        first.set_message(f"first {i}")
+    second.set_message("second changed")
+
+    assert len(agent_message._changed_children) == 2
+    assert agent_message.changed_children_since(seen) == [first, second]
+    seen = agent_message.revision
+    assert agent_message.changed_children_since(seen) == []
+    first.set_message("first again")
+    assert agent_message.changed_children_since(seen) == [first]
@@ -0,0 +1,59 @@
+from messages.action_messages.action_message import ActionMessage
+from messages.agent_messages.agent_message import AgentMessage
+from messages.message_delta import DeltaTracker, catch_up
+
+
+def build_agent(*commands):
+    agent_message = AgentMessage("test_agent")
+    actions = []
+    for command in commands:
+        action = ActionMessage(
+            "test_resource", command, prev=actions[-1] if actions else None
+        )
+        agent_message.add_child_message(action)
+        actions.append(action)
+    return agent_message, actions
+
+
+def test_node_dict_lists_children_by_id():
+    agent_message, actions = build_agent("ls", "cat")
+
+    node = agent_message.to_node_dict()
+
+    assert node["current_children"] == [action.id for action in actions]
+    full = agent_message.to_broadcast_dict()
+    assert full["current_children"][0]["message"] == "ls"
+
+
+def test_tracker_sends_only_changed_nodes():
+    agent_message, actions = build_agent("ls", "cat")
+    tracker = DeltaTracker()
+
+    first = tracker.build(agent_message)
+    assert [node["current_id"] for node in first["nodes"]] == [
+        agent_message.id,
+        actions[0].id,
+        actions[1].id,
+    ]
+
+    actions[1].set_message("cat README.md")
+    second = tracker.build(agent_message)
+
+    assert [node["current_id"] for node in second["nodes"]] == [
+        agent_message.id,
+        actions[1].id,
+    ]
+    assert second["nodes"][1]["message"] == "cat README.md"
+    assert second["seq"] == agent_message.revision > first["seq"]
+
+
+def test_catch_up_sends_what_changed_since():
+    agent_message, actions = build_agent("ls", "cat")
+    assert len(catch_up([agent_message])["nodes"]) == 3
+
+    since = agent_message.revision
+    assert catch_up([agent_message], since)["nodes"] == []
+
+    actions[0].set_message("ls -la")
+    nodes = catch_up([agent_message], since)["nodes"]
+    assert [node["current_id"] for node in nodes] == [agent_message.id, actions[0].id]
@@ -0,0 +1,145 @@
+import gc
+import weakref
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from messages.agent_messages.agent_message import AgentMessage
+from messages.message_dict import MessageRegistry
+from messages.phase_messages.phase_message import PhaseMessage
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return MessageRegistry(max_closed_workflows=1, archive_dir=tmp_path)
+
+
+def add_workflow(registry, workflow_id):
+    phase_message = PhaseMessage("phase")
+    agent_message = AgentMessage("executor_agent", f"{workflow_id} output")
+    phase_message.add_child_message(agent_message)
+    workflow_message = SimpleNamespace(
+        phase_messages=[phase_message], complete=True, success=False
+    )
+    registry[workflow_id] = {
+        workflow_id: workflow_message,
+        phase_message.id: phase_message,
+        agent_message.id: agent_message,
+    }
+    return weakref.ref(phase_message)
+
+
+def test_open_workflows_are_never_archived(registry):
+    add_workflow(registry, "a")
+    add_workflow(registry, "b")
+
+    assert set(registry) == {"a", "b"}
+    assert registry.counts()["open_workflows"] == 2
+
+
+def test_least_recently_used_closed_workflow_is_archived(registry):
+    registry.configure(max_closed_workflows=2)
+    phase_a = add_workflow(registry, "a")
+    add_workflow(registry, "b")
+    add_workflow(registry, "c")
+    evicted = []
+    registry.add_eviction_listener(evicted.append)
+
+    registry.close_workflow("a")
+    registry.close_workflow("b")
+    # Used since it was closed, so b is archived first
+    registry.get("a")
+    registry.close_workflow("c")
+
+    assert evicted == ["b"]
+    assert set(registry) == {"a", "c"}
+    assert registry.is_archived("b")
+
+    registry.configure(max_closed_workflows=0)
+    assert evicted == ["b", "a", "c"]
+
+    gc.collect()
+    assert phase_a() is None
+
+
+def test_archived_workflow_is_loaded_from_disk(registry):
+    phase_message = add_workflow(registry, "a")
+    expected = phase_message().to_broadcast_dict()
+    registry.close_workflow("a")
+    add_workflow(registry, "b")
+    registry.close_workflow("b")
+
+    archived = registry.load_archived("a")
+
+    assert "a" not in registry
+    assert archived["complete"] is True
+    assert archived["phase_messages"][0]["current_id"] == expected["current_id"]
+    assert archived["phase_messages"][0]["current_children"][0]["message"] == "a output"
+    assert registry.load_archived("b") is None
+
+
+def test_reopened_workflow_is_kept(registry):
+    add_workflow(registry, "a")
+    add_workflow(registry, "b")
+    registry.close_workflow("a")
+
+    assert registry.reopen_workflow("a")
+    registry.close_workflow("b")
+    registry.configure(max_closed_workflows=0)
+
+    assert set(registry) == {"a"}
+    assert not registry.is_closed("a")
+
+
+def test_counts(registry):
+    add_workflow(registry, "a")
+    add_workflow(registry, "b")
+    add_workflow(registry, "c")
+    registry.close_workflow("a")
+    registry.close_workflow("b")
+
+    stats = registry.counts()
+
+    assert stats["open_workflows"] == 1
+    assert stats["closed_workflows"] == 1
+    assert stats["archived_workflows"] == 1
+    assert stats["messages"] == 6
+    assert stats["archive_bytes"] > 0
+
+
+def test_archive_bytes_are_recorded_when_archived(registry):
+    add_workflow(registry, "a")
+    add_workflow(registry, "b")
+    registry.close_workflow("a")
+    registry.close_workflow("b")
+    path = registry.archive_dir / "a.json"
+    size = path.stat().st_size
+    path.unlink()
+
+    assert registry.counts()["archive_bytes"] == size
+
+    registry["a"] = []
+
+    assert registry.counts()["archive_bytes"] == 0
+
+
+def test_workflow_that_fails_to_archive_stays_in_memory(registry):
+    add_workflow(registry, "a")
+    add_workflow(registry, "b")
+    evicted = []
+    registry.add_eviction_listener(evicted.append)
+
+    registry.close_workflow("a")
+    with patch.object(registry, "_archive", side_effect=OSError("disk full")):
+        registry.close_workflow("b")
+
+    assert evicted == []
+    assert set(registry) == {"a", "b"}
+    assert registry.is_closed("a") and not registry.is_archived("a")
+
+    # Tried again first on the next eviction
+    add_workflow(registry, "c")
+    registry.close_workflow("c")
+    assert evicted == ["a", "b"]
+    assert set(registry) == {"c"}
@@ -0,0 +1,45 @@
+from unittest.mock import patch
+
+from messages.action_messages.action_message import ActionMessage
+from messages.agent_messages.agent_message import AgentMessage
+from messages.message_utils import batch_broadcasts, broadcast_update
+
+
+@patch("messages.message_utils.websocket_manager")
+def test_batch_broadcasts_sends_each_message_once(mock_websocket_manager):
+    message_1 = ActionMessage("test_id1", "test_msg1")
+    message_2 = ActionMessage("test_id2", "test_msg2")
+
+    with batch_broadcasts():
+        broadcast_update(message_1)
+        with batch_broadcasts():
+            broadcast_update([message_1, message_2])
+        message_1.set_message("changed")
+        broadcast_update(message_1)
+        mock_websocket_manager.queue_broadcast.assert_not_called()
+
+    calls = mock_websocket_manager.queue_broadcast.call_args_list
+    assert [call.args[1] for call in calls] == [message_1.id, message_2.id]
+    assert calls[0].args[2]()["nodes"][0]["message"] == "changed"
+
+
+@patch("messages.message_utils.should_log", return_value=False)
+@patch("messages.message_utils.message_dict", new_callable=dict)
+@patch("messages.message_utils.websocket_manager")
+def test_add_child_message_broadcasts_only_the_parent(
+    mock_websocket_manager, mock_message_dict, mock_should_log
+):
+    agent_message = AgentMessage("test_agent")
+    action_message = ActionMessage("test_id", "test_msg")
+    with (
+        patch.object(AgentMessage, "workflow_id", new="test_workflow"),
+        patch.object(ActionMessage, "workflow_id", new="test_workflow"),
+    ):
+        agent_message.add_child_message(action_message)
+
+    assert set(mock_message_dict["test_workflow"]) == {
+        agent_message.id,
+        action_message.id,
+    }
+    calls = mock_websocket_manager.queue_broadcast.call_args_list
+    assert [call.args[1] for call in calls] == [agent_message.id]
@@ -0,0 +1,111 @@
+import json
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from messages import serialization
+from messages.action_messages.action_message import ActionMessage
+from messages.serialization import MessageSerializer, serializer
+
+
+class Color(Enum):
+    RED = "red"
+
+
+@dataclass
+class Config:
+    path: Path
+    color: Color
+    retries: int = 3
+
+
+class Opaque:
+    __slots__ = ()
+
+    def __str__(self):
+        return "opaque"
+
+
+class Plain:
+    def __init__(self):
+        self.name = "plain"
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request):
+    """Run with orjson when it is installed, and with the json fallback."""
+    if request.param == "orjson":
+        if serialization.orjson is None:
+            pytest.skip("orjson is not installed")
+        yield
+    else:
+        with patch.object(serialization, "orjson", None):
+            yield
+
+
+def test_registered_types(backend):
+    message = ActionMessage(resource_id="model", message="Command: ls")
+    data = {
+        "path": Path("/tmp/log.json"),
+        "config": Config(Path("a/b"), Color.RED),
+        "tags": {"x"},
+        "pair": (1, 2),
+        "message": message,
+        "opaque": Opaque(),
+        "plain": Plain(),
+        1: "int key",
+    }
+
+    loaded = json.loads(serializer.dumps(data))
+
+    assert loaded["path"] == "/tmp/log.json"
+    assert loaded["config"] == {"path": "a/b", "color": "red", "retries": 3}
+    assert loaded["tags"] == ["x"]
+    assert loaded["pair"] == [1, 2]
+    assert loaded["message"] == json.loads(json.dumps(message.to_log_dict()))
+    assert loaded["opaque"] == "opaque"
+    assert loaded["plain"] == {"name": "plain"}
+    assert loaded["1"] == "int key"
+
+
+def test_backends_agree():
+    if serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    data = {"text": "ünïcode", "nested": [{"path": Path("x")}, None, 1.5, True]}
+
+    with patch.object(serialization, "orjson", None):
+        fallback = serializer.dumps(data)
+        fallback_indented = serializer.dumps(data, indent=True)
+
+    assert serializer.dumps(data) == fallback
+    assert serializer.dumps(data, indent=True) == fallback_indented
+
+
+def test_logs_are_indented_by_four_spaces():
+    data = {"a": [1, {"b": "line\n  not indentation"}]}
+
+    assert serializer.dumps(data, indent=True) == json.dumps(data, indent=4).encode()
+
+
+def test_register_overrides_base_class_converter():
+    custom = MessageSerializer()
+    custom.register(Path, str)
+    assert custom.dumps_str({"p": Path("x")}) == '{"p":"x"}'
+
+    custom.register(Path, lambda path: path.name.upper())
+    assert custom.dumps_str({"p": Path("a/x")}) == '{"p":"X"}'
+
+
+def test_packb_round_trip():
+    if serialization.msgpack is None:
+        with pytest.raises(RuntimeError):
+            serializer.packb({})
+        return
+    data = {"path": Path("x"), "values": (1, 2)}
+    assert serializer.unpackb(serializer.packb(data)) == {
+        "path": "x",
+        "values": [1, 2],
+    }
@@ -9,6 +9,7 @@ from messages.workflow_message import WorkflowMessage
 QUERY_TIME_TAKEN_IN_MS = "query_time_taken_in_ms"
 INPUT_TOKEN = "input_token"
 OUTPUT_TOKEN = "output_token"
+CACHED_INPUT_TOKEN = "cached_input_token"
 
 
 def test_get_total_usage():
@@ -42,6 +43,33 @@ def test_get_total_usage():
     assert workflow_message.usage == usage
 
 
+def test_get_total_usage_prompt_cache():
+    """
+    Test that prompt cache usage is totalled over the phases that report it.
+    """
+    phase_message_1 = MagicMock(spec=PhaseMessage)
+    phase_message_1.usage = {
+        INPUT_TOKEN: 300,
+        OUTPUT_TOKEN: 150,
+        QUERY_TIME_TAKEN_IN_MS: 500,
+        CACHED_INPUT_TOKEN: 200,
+    }
+    phase_message_2 = MagicMock(spec=PhaseMessage)
+    phase_message_2.usage = {
+        INPUT_TOKEN: 200,
+        OUTPUT_TOKEN: 100,
+        QUERY_TIME_TAKEN_IN_MS: 700,
+    }
+
+    workflow_message = WorkflowMessage("test_workflow")
+    workflow_message._phase_messages = [phase_message_1, phase_message_2]
+
+    usage = workflow_message.get_total_usage()
+
+    assert usage["total_cached_input_tokens"] == 200
+    assert "total_cache_write_input_tokens" not in usage
+
+
 def test_to_log_dict(mocker):
     """
     Test that to_log_dict includes workflow usage information.
@@ -98,3 +98,10 @@ async def test_run_iteration_success(base_phase):
 
 if __name__ == "__main__":
     pytest.main()
+
+
+def test_memory_resource_config_compacts_on_request(base_phase):
+    assert base_phase.memory_resource_config().compactor is None
+
+    base_phase.params["compact_memory"] = True
+    assert base_phase.memory_resource_config().compactor is not None
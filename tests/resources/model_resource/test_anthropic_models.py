@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from resources.memory_resource.memory_prompt import MemoryPrompts
+from resources.model_resource.anthropic_models.anthropic_models import AnthropicModels
+
+PROMPT = "You are a cybersecurity expert. Here is the writeup."
+HISTORY = f"\n\n{MemoryPrompts._DEFAULT_SEGUE}\n[executor_agent] Command: ls"
+
+
+class TestAnthropicModels(unittest.TestCase):
+    """Test prompt caching in the Anthropic models implementation"""
+
+    def setUp(self):
+        self.patcher = patch(
+            "resources.model_resource.anthropic_models.anthropic_models.Anthropic"
+        )
+        self.mock_anthropic = self.patcher.start()
+        self.mock_client = MagicMock()
+        self.mock_anthropic.return_value = self.mock_client
+
+        self.mock_response = MagicMock()
+        self.mock_response.content = [MagicMock(text="Command: ls")]
+        self.mock_response.usage = MagicMock(
+            input_tokens=20,
+            output_tokens=5,
+            cache_read_input_tokens=1000,
+            cache_creation_input_tokens=0,
+        )
+        self.mock_client.messages.create.return_value = self.mock_response
+
+        with patch.object(AnthropicModels, "_api_key", return_value="fake-api-key"):
+            self.anthropic_models = AnthropicModels()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def request(self, message: str):
+        return self.anthropic_models.request(
+            model="anthropic/claude-3-7-sonnet-20250219",
+            message=message,
+            temperature=0.5,
+            max_tokens=100,
+            stop_sequences=["<END>"],
+        )
+
+    def sent_content(self):
+        call_args = self.mock_client.messages.create.call_args[1]
+        return call_args["messages"][0]["content"]
+
+    def test_initial_prompt_is_cache_breakpoint(self):
+        """The prompt is sent as its own block marked for caching"""
+        self.request(PROMPT + HISTORY)
+
+        content = self.sent_content()
+        self.assertEqual(len(content), 2)
+        self.assertEqual(content[0]["text"], PROMPT)
+        self.assertEqual(content[0]["cache_control"], {"type": "ephemeral"})
+        self.assertEqual(content[1]["text"], HISTORY)
+        self.assertNotIn("cache_control", content[1])
+
+    def test_prefix_matches_first_call(self):
+        """The first call, without history, caches the same block as later calls"""
+        self.request(PROMPT)
+        first = self.sent_content()
+        self.request(PROMPT + HISTORY)
+
+        self.assertEqual(first, self.sent_content()[:1])
+
+    def test_cached_tokens_reported(self):
+        """Cache reads and writes are counted in input_tokens and reported apart"""
+        self.mock_response.usage.cache_creation_input_tokens = 300
+
+        response = self.request(PROMPT + HISTORY)
+
+        self.assertEqual(response.input_tokens, 1320)
+        self.assertEqual(response.cached_input_tokens, 1000)
+        self.assertEqual(response.cache_write_input_tokens, 300)
+
+    def test_batch_results(self):
+        """Batch entries become responses, or exceptions for failed requests"""
+        succeeded = MagicMock(type="succeeded", message=self.mock_response)
+        self.mock_response.content[0].type = "text"
+        errored = MagicMock(type="errored")
+
+        response = self.anthropic_models._batch_result(succeeded)
+
+        self.assertEqual(response.content, "Command: ls")
+        self.assertEqual(response.cached_input_tokens, 1000)
+        self.assertIsInstance(self.anthropic_models._batch_result(errored), Exception)
+
+
+if __name__ == "__main__":
+    unittest.main()
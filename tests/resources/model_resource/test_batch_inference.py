@@ -0,0 +1,215 @@
+import asyncio
+import tempfile
+import unittest
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from messages.action_messages.action_message import ActionMessage
+from resources.model_resource import model_resource
+from resources.model_resource.batch_inference import BatchScheduler, LocalBatchModels
+from resources.model_resource.model_resource import (
+    ModelResource,
+    ModelResourceConfig,
+    ModelResponseFailure,
+)
+from tests.resources.model_resource.test_model_provider import DummyModels
+
+
+class InMemoryBatchModels(DummyModels):
+    """Provider whose batches end after a set number of polls"""
+
+    def __init__(self, polls_until_done: int = 1, failing_messages=()):
+        super().__init__()
+        self.polls_until_done = polls_until_done
+        self.failing_messages = set(failing_messages)
+        self.batches = {}
+        self.polls = 0
+
+    async def submit_batch_async(self, requests):
+        batch_id = f"batch_{len(self.batches)}"
+        self.batches[batch_id] = requests
+        return batch_id
+
+    async def poll_batch_async(self, batch_id):
+        self.polls += 1
+        if self.polls < self.polls_until_done:
+            return None
+        results = {}
+        for request in self.batches[batch_id]:
+            if request.message in self.failing_messages:
+                results[request.custom_id] = RuntimeError("request failed")
+            else:
+                results[request.custom_id] = self.request(
+                    request.model,
+                    request.message,
+                    request.temperature,
+                    request.max_tokens,
+                    request.stop_sequences,
+                )
+        return results
+
+
+async def request_all(scheduler: BatchScheduler, messages):
+    return await asyncio.gather(
+        *(
+            scheduler.request(
+                model="dummy/model",
+                message=message,
+                temperature=0.5,
+                max_tokens=10,
+                stop_sequences=[],
+            )
+            for message in messages
+        ),
+        return_exceptions=True,
+    )
+
+
+class TestBatchScheduler(unittest.TestCase):
+    """Test how BatchScheduler groups requests and hands back results"""
+
+    def test_concurrent_requests_share_a_batch(self):
+        provider = InMemoryBatchModels(polls_until_done=3)
+        scheduler = BatchScheduler(provider, batch_size=3, poll_interval=0)
+
+        responses = asyncio.run(request_all(scheduler, ["a", "b", "c"]))
+
+        self.assertEqual([response.content for response in responses], ["a", "b", "c"])
+        self.assertEqual(len(provider.batches), 1)
+        self.assertEqual(provider.polls, 3)
+
+    def test_full_batches_are_split(self):
+        provider = InMemoryBatchModels()
+        scheduler = BatchScheduler(provider, batch_size=2, max_wait=0, poll_interval=0)
+
+        asyncio.run(request_all(scheduler, ["a", "b", "c"]))
+
+        self.assertEqual(
+            [len(requests) for requests in provider.batches.values()], [2, 1]
+        )
+
+    def test_single_request_batches_do_not_wait(self):
+        """With batch_size 1, as in the runner, nothing waits for more requests"""
+        provider = InMemoryBatchModels()
+        scheduler = BatchScheduler(provider, batch_size=1, max_wait=60, poll_interval=0)
+
+        start = time.monotonic()
+        asyncio.run(request_all(scheduler, ["a"]))
+
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_failed_request_only_fails_its_caller(self):
+        provider = InMemoryBatchModels(failing_messages=["b"])
+        scheduler = BatchScheduler(provider, batch_size=2, poll_interval=0)
+
+        first, second = asyncio.run(request_all(scheduler, ["a", "b"]))
+
+        self.assertEqual(first.content, "a")
+        self.assertIsInstance(second, RuntimeError)
+
+    def test_provider_without_batch_api(self):
+        with self.assertRaises(ValueError):
+            BatchScheduler(DummyModels())
+
+
+class TestLocalBatchModels(unittest.TestCase):
+    """Test the file-based stand-in for provider batch APIs"""
+
+    def test_batch_round_trip(self):
+        """Requests are answered from files after the batch has been processed"""
+        with tempfile.TemporaryDirectory() as batch_dir:
+            provider = LocalBatchModels(DummyModels(), batch_dir)
+            scheduler = BatchScheduler(provider, batch_size=2, poll_interval=0)
+
+            responses = asyncio.run(request_all(scheduler, ["a", "b"]))
+            files = sorted(
+                path.name.split(".")[1] for path in Path(batch_dir).iterdir()
+            )
+
+        self.assertEqual([response.content for response in responses], ["a", "b"])
+        self.assertEqual(files, ["requests", "results"])
+
+
+class TestModelResourceBatch(unittest.TestCase):
+    """Test batch mode in ModelResource.run_async"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        patchers = [
+            patch.object(model_resource, "verify_and_auth_api_key"),
+            patch.object(
+                model_resource,
+                "truncate_input_to_max_tokens",
+                side_effect=lambda model_input, **kwargs: model_input,
+            ),
+            patch.object(
+                ModelResource, "get_model_provider", return_value=DummyModels()
+            ),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_input(self, memory: str) -> ActionMessage:
+        message = ActionMessage(resource_id="agent", message="prompt")
+        message.memory = memory
+        return message
+
+    def test_workflows_suspend_on_shared_batch(self):
+        """Concurrent resources on one event loop are answered by one batch"""
+        config = ModelResourceConfig(
+            model="openai/gpt-4o",
+            use_batch=True,
+            batch_size=2,
+            batch_poll_interval=0,
+            local_batch_dir=self.tmp_dir.name,
+        )
+        resources = [ModelResource(f"model_{i}", config) for i in range(2)]
+        for resource in resources:
+            resource.rate_limiter = MagicMock()
+
+        async def run_workflows():
+            return await asyncio.gather(
+                resources[0].run_async(self.make_input("Command: ls")),
+                resources[1].run_async(self.make_input("Command: pwd")),
+            )
+
+        first, second = asyncio.run(run_workflows())
+
+        self.assertIn("Command: ls", first.message)
+        self.assertIn("Command: pwd", second.message)
+        self.assertEqual(len(list(Path(self.tmp_dir.name).glob("*.requests.jsonl"))), 1)
+        for resource in resources:
+            resource.rate_limiter.acquire_async.assert_not_called()
+
+    def test_batch_failure_raises_model_response_failure(self):
+        config = ModelResourceConfig(
+            model="openai/gpt-4o",
+            use_batch=True,
+            batch_size=1,
+            batch_poll_interval=0,
+            local_batch_dir=self.tmp_dir.name,
+        )
+        resource = ModelResource("model", config)
+        resource.model_provider.provider.error = RuntimeError("provider down")
+
+        with self.assertRaises(ModelResponseFailure):
+            asyncio.run(resource.run_async(self.make_input("Command: ls")))
+
+    def test_batch_requires_batch_api(self):
+        with self.assertRaises(ValueError):
+            ModelResource(
+                "model", ModelResourceConfig(model="openai/gpt-4o", use_batch=True)
+            )
+
+    def test_batch_and_streaming_are_exclusive(self):
+        with self.assertRaises(ValueError):
+            ModelResourceConfig(
+                model="openai/gpt-4o", use_batch=True, use_streaming=True
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
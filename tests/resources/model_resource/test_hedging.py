@@ -0,0 +1,200 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+from messages.action_messages.action_message import ActionMessage
+from resources.model_resource import model_resource
+from resources.model_resource.hedging import (
+    MIN_LATENCY_SAMPLES,
+    LatencyTracker,
+    hedge_request,
+)
+from resources.model_resource.model_resource import ModelResource, ModelResourceConfig
+from resources.model_resource.model_response import ModelResponse
+
+
+def make_response(content: str = "Command: ls") -> ModelResponse:
+    return ModelResponse(
+        content=content, input_tokens=100, output_tokens=10, time_taken_in_ms=1.0
+    )
+
+
+def delayed(delay: float, content: str = "Command: ls", error: Exception = None):
+    """Request factory that answers after delay seconds and records cancellation"""
+    state = {"cancelled": False, "started": False}
+
+    async def request():
+        state["started"] = True
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+        if error is not None:
+            raise error
+        return make_response(content)
+
+    return request, state
+
+
+async def run_hedged(primary, hedge, delay=0.05, latency_tracker=None):
+    outcome = await hedge_request(primary, hedge, delay, latency_tracker)
+    # Let cancellations of the losing request run
+    await asyncio.sleep(0)
+    return outcome
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_needs_enough_samples(self):
+        tracker = LatencyTracker()
+        for _ in range(MIN_LATENCY_SAMPLES - 1):
+            tracker.record(1.0)
+        self.assertIsNone(tracker.percentile(95))
+
+    def test_percentile(self):
+        tracker = LatencyTracker()
+        for seconds in range(1, 101):
+            tracker.record(float(seconds))
+        self.assertEqual(tracker.percentile(95), 95.0)
+        self.assertEqual(tracker.percentile(50), 50.0)
+
+    def test_window_drops_old_samples(self):
+        tracker = LatencyTracker(window=MIN_LATENCY_SAMPLES)
+        for _ in range(MIN_LATENCY_SAMPLES):
+            tracker.record(100.0)
+        for _ in range(MIN_LATENCY_SAMPLES):
+            tracker.record(1.0)
+        self.assertEqual(tracker.percentile(99), 1.0)
+
+
+class TestHedgeRequest(unittest.TestCase):
+    """Test racing a primary request against a delayed duplicate"""
+
+    def test_fast_primary_is_not_hedged(self):
+        primary, _ = delayed(0)
+        hedge, hedge_state = delayed(0)
+
+        outcome = asyncio.run(run_hedged(primary, hedge))
+
+        self.assertFalse(outcome.hedged)
+        self.assertFalse(hedge_state["started"])
+
+    def test_slow_primary_loses_to_hedge(self):
+        primary, primary_state = delayed(10, content="primary")
+        hedge, _ = delayed(0, content="hedge")
+        tracker = LatencyTracker()
+
+        outcome = asyncio.run(run_hedged(primary, hedge, latency_tracker=tracker))
+
+        self.assertTrue(outcome.hedged)
+        self.assertTrue(outcome.hedge_won)
+        self.assertEqual(outcome.response.content, "hedge")
+        self.assertIsNone(outcome.loser_response)
+        self.assertTrue(primary_state["cancelled"])
+        # The cancelled primary still counts as a slow sample
+        self.assertGreaterEqual(tracker._latencies[0], 0.05)
+
+    def test_primary_still_wins_if_first(self):
+        primary, _ = delayed(0.1, content="primary")
+        hedge, hedge_state = delayed(10, content="hedge")
+
+        outcome = asyncio.run(run_hedged(primary, hedge))
+
+        self.assertTrue(outcome.hedged)
+        self.assertFalse(outcome.hedge_won)
+        self.assertEqual(outcome.response.content, "primary")
+        self.assertTrue(hedge_state["cancelled"])
+
+    def test_invalid_response_does_not_win(self):
+        """An empty or failed response waits for the other request"""
+        primary, _ = delayed(0.1, content="  ")
+        hedge, _ = delayed(0.2, content="hedge")
+
+        outcome = asyncio.run(run_hedged(primary, hedge))
+
+        self.assertEqual(outcome.response.content, "hedge")
+
+    def test_both_fail_raises_primary_error(self):
+        primary, _ = delayed(0.1, error=ValueError("primary"))
+        hedge, _ = delayed(0.1, error=KeyError("hedge"))
+
+        with self.assertRaises(ValueError):
+            asyncio.run(run_hedged(primary, hedge))
+
+
+class TestModelResourceHedging(unittest.TestCase):
+    """Test hedging in ModelResource.run_async"""
+
+    def setUp(self):
+        patchers = [
+            patch.object(model_resource, "verify_and_auth_api_key"),
+            patch.object(
+                model_resource,
+                "truncate_input_to_max_tokens",
+                side_effect=lambda model_input, **kwargs: model_input,
+            ),
+            patch.object(model_resource, "get_num_tokens", return_value=42),
+            patch.object(
+                ModelResource,
+                "get_model_provider",
+                side_effect=lambda *args: MagicMock(),
+            ),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_resource(self, **kwargs) -> ModelResource:
+        config = ModelResourceConfig(
+            model="openai/gpt-4o-2024-11-20",
+            hedge_percentile=95,
+            hedge_initial_delay=0.05,
+            **kwargs,
+        )
+        resource = ModelResource("model", config)
+        resource.rate_limiter = MagicMock(acquire_async=MagicMock(side_effect=noop))
+        resource.hedge_rate_limiter = resource.rate_limiter
+        return resource
+
+    def make_input(self) -> ActionMessage:
+        message = ActionMessage(resource_id="agent", message="prompt")
+        message.memory = "full prompt"
+        return message
+
+    def test_hedge_metadata_tracks_loser_cost(self):
+        resource = self.make_resource(hedge_model="openai/gpt-4.1-2025-04-14")
+        primary, _ = delayed(10, content="primary")
+        hedge, _ = delayed(0, content="Command: hedge")
+        resource.model_provider.make_request_async = lambda **kwargs: primary()
+        resource.hedge_model_provider.make_request_async = lambda **kwargs: hedge()
+
+        result = asyncio.run(resource.run_async(self.make_input()))
+
+        metadata = result.additional_metadata
+        self.assertIn("Command: hedge", result.message)
+        self.assertTrue(metadata["hedged"])
+        self.assertTrue(metadata["hedge_won"])
+        self.assertEqual(metadata["hedge_model"], "openai/gpt-4.1-2025-04-14")
+        # The cancelled primary is charged its estimated input tokens
+        self.assertEqual(metadata["hedge_loser_input_tokens"], 42)
+        self.assertEqual(metadata["hedge_loser_output_tokens"], 0)
+        # The winning hedge is what ran on the hedge model
+        self.assertEqual(
+            metadata["hedge_model_input_tokens"],
+            result.additional_metadata["input_tokens"],
+        )
+        self.assertEqual(
+            resource.to_dict()["config"]["hedge_model"], "openai/gpt-4.1-2025-04-14"
+        )
+
+    def test_unknown_hedge_model(self):
+        with self.assertRaises(ValueError):
+            self.make_resource(hedge_model="openai/not-a-model")
+
+
+async def noop(*args, **kwargs):
+    return 0.0
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,355 @@
+import asyncio
+import threading
+import time
+import unittest
+from typing import AsyncIterator, List
+from unittest.mock import MagicMock, patch
+
+from resources.model_resource import model_provider
+from resources.model_resource.model_provider import ModelProvider
+from resources.model_resource.model_response import ModelResponse, StreamChunk
+
+
+class DummyModels(ModelProvider):
+    """Minimal provider whose request blocks for a configurable delay."""
+
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.release = threading.Event()
+        self.client = self.create_client()
+
+    def create_client(self):
+        client = MagicMock()
+        client.close.side_effect = self.release.set
+        return client
+
+    def request(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> ModelResponse:
+        # Closing the client releases the wait, mimicking an aborted HTTP call
+        self.release.wait(self.delay)
+        if self.error is not None:
+            raise self.error
+        return ModelResponse(
+            content=message,
+            input_tokens=1,
+            output_tokens=1,
+            time_taken_in_ms=self.delay * 1000,
+        )
+
+    def tokenize(self, model: str, message: str) -> List[int]:
+        return []
+
+    def decode(self, model: str, tokens: List[int]) -> str:
+        return ""
+
+    def get_num_tokens(self, model: str, message: str) -> int:
+        return 0
+
+
+def make_request(provider: ModelProvider, **kwargs) -> ModelResponse:
+    return provider.make_request(
+        model="dummy/model",
+        message="hello",
+        temperature=0.5,
+        max_tokens=10,
+        stop_sequences=[],
+        **kwargs,
+    )
+
+
+class TestModelProviderMakeRequest(unittest.TestCase):
+    """Test completion, timeout and cancellation in ModelProvider.make_request"""
+
+    def test_returns_before_logging_interval(self):
+        """A fast request should not wait for the heartbeat interval"""
+        provider = DummyModels(delay=0.05)
+
+        start = time.monotonic()
+        response = make_request(provider, logging_interval=10.0)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(response.content, "hello")
+        self.assertLess(elapsed, 1.0)
+
+    def test_request_error_is_reraised(self):
+        """Errors raised by the provider propagate to the caller"""
+        error = ValueError("API error")
+        error.status_code = 500
+        provider = DummyModels(error=error)
+
+        with self.assertRaises(ValueError) as context:
+            make_request(provider)
+
+        self.assertEqual(context.exception.status_code, 500)
+
+    def test_timeout_cancels_request(self):
+        """On timeout, the client is closed and replaced, and TimeoutError is raised"""
+        provider = DummyModels(delay=30.0)
+        original_client = provider.client
+
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            make_request(provider, logging_interval=0.05, timeout=0.2)
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 1.0)
+        original_client.close.assert_called_once()
+        self.assertIsNot(provider.client, original_client)
+        # The worker thread was released by closing the client
+        self.assertTrue(provider.release.is_set())
+
+    def test_cancel_request_without_closeable_client(self):
+        """Providers without a closeable client keep their client on cancel"""
+        provider = DummyModels()
+        provider.client = object()
+        client = provider.client
+
+        provider.cancel_request()
+
+        self.assertIs(provider.client, client)
+
+
+class AsyncDummyModels(DummyModels):
+    """Provider with a native async request path."""
+
+    async def request_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> ModelResponse:
+        self.async_calls = getattr(self, "async_calls", 0) + 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return ModelResponse(
+            content=message,
+            input_tokens=1,
+            output_tokens=1,
+            time_taken_in_ms=self.delay * 1000,
+        )
+
+
+def make_request_async(provider: ModelProvider, **kwargs):
+    return asyncio.run(
+        provider.make_request_async(
+            model="dummy/model",
+            message="hello",
+            temperature=0.5,
+            max_tokens=10,
+            stop_sequences=[],
+            **kwargs,
+        )
+    )
+
+
+class TestModelProviderMakeRequestAsync(unittest.TestCase):
+    """Test the asyncio request path in ModelProvider.make_request_async"""
+
+    def test_native_async_request(self):
+        """Providers with request_async are awaited on the event loop"""
+        provider = AsyncDummyModels(delay=0.05)
+
+        start = time.monotonic()
+        response = make_request_async(provider, logging_interval=10.0)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(response.content, "hello")
+        self.assertEqual(provider.async_calls, 1)
+        self.assertLess(elapsed, 1.0)
+
+    def test_sync_fallback(self):
+        """Providers without request_async fall back to the sync request"""
+        provider = DummyModels(delay=0.05)
+
+        response = make_request_async(provider)
+
+        self.assertEqual(response.content, "hello")
+
+    def test_async_request_error_is_reraised(self):
+        """Errors raised by the async request propagate to the caller"""
+        provider = AsyncDummyModels(error=ValueError("API error"))
+
+        with self.assertRaises(ValueError):
+            make_request_async(provider)
+
+    def test_async_timeout(self):
+        """On timeout, the request task is cancelled and TimeoutError is raised"""
+        provider = AsyncDummyModels(delay=30.0)
+
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            make_request_async(provider, logging_interval=0.05, timeout=0.2)
+
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_async_timeout_cancels_sync_fallback(self):
+        """Timing out the sync fallback closes the client to abort the thread"""
+        provider = DummyModels(delay=30.0)
+        original_client = provider.client
+
+        with self.assertRaises(TimeoutError):
+            make_request_async(provider, timeout=0.2)
+
+        original_client.close.assert_called_once()
+        self.assertTrue(provider.release.is_set())
+
+
+class StreamingDummyModels(DummyModels):
+    """Provider that streams a fixed list of chunks."""
+
+    def __init__(self, chunks: List[StreamChunk], delay: float = 0.0):
+        super().__init__(delay=delay)
+        self.chunks = chunks
+        self.chunks_sent = 0
+        self.stream_closed = False
+
+    async def request_stream_async(
+        self,
+        model: str,
+        message: str,
+        temperature: float,
+        max_tokens: int,
+        stop_sequences: List[str],
+    ) -> AsyncIterator[StreamChunk]:
+        try:
+            for chunk in self.chunks:
+                await asyncio.sleep(self.delay)
+                self.chunks_sent += 1
+                yield chunk
+        finally:
+            self.stream_closed = True
+
+
+class CharEncoding:
+    def encode(self, text, **kwargs):
+        return list(text)
+
+
+def make_streaming_request(provider: ModelProvider, **kwargs):
+    return asyncio.run(
+        provider.make_streaming_request_async(
+            model="dummy/model",
+            message="hello",
+            temperature=0.5,
+            max_tokens=10,
+            stop_sequences=[],
+            **kwargs,
+        )
+    )
+
+
+class TestModelProviderStreaming(unittest.TestCase):
+    """Test early stopping and usage reporting in make_streaming_request_async"""
+
+    def setUp(self):
+        patcher = patch.object(
+            model_provider, "get_tiktoken_encoding", return_value=CharEncoding()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_full_stream(self):
+        """Chunks are joined and reported usage is used as-is"""
+        provider = StreamingDummyModels(
+            [
+                StreamChunk(text="Command: "),
+                StreamChunk(text="ls"),
+                StreamChunk(input_tokens=7, output_tokens=3),
+            ]
+        )
+
+        response = make_streaming_request(provider)
+
+        self.assertEqual(response.content, "Command: ls")
+        self.assertEqual((response.input_tokens, response.output_tokens), (7, 3))
+        self.assertFalse(response.tokens_estimated)
+        self.assertIsNotNone(response.time_to_first_token_ms)
+        self.assertTrue(provider.stream_closed)
+
+    def test_stops_early(self):
+        """The stream is closed as soon as stop_at returns a cut index"""
+        provider = StreamingDummyModels(
+            [
+                StreamChunk(text="Command: ls <E"),
+                StreamChunk(text="ND> extra"),
+                StreamChunk(text="never sent"),
+                StreamChunk(input_tokens=7, output_tokens=100),
+            ]
+        )
+
+        def stop_at(text):
+            index = text.find("<END>")
+            return None if index == -1 else index + len("<END>")
+
+        response = make_streaming_request(
+            provider, stop_at=stop_at, stop_overlap=len("<END>") - 1
+        )
+
+        self.assertEqual(response.content, "Command: ls <END>")
+        self.assertEqual(provider.chunks_sent, 2)
+        self.assertTrue(provider.stream_closed)
+        # Usage was never reported, so it is estimated from what was generated
+        self.assertEqual(response.input_tokens, len("hello"))
+        self.assertEqual(response.output_tokens, len("Command: ls <END> extra"))
+        self.assertTrue(response.tokens_estimated)
+
+    def test_stop_at_sees_only_new_text(self):
+        """stop_at is given each chunk with stop_overlap characters before it"""
+        provider = StreamingDummyModels(
+            [StreamChunk(text="abcdef"), StreamChunk(text="gh"), StreamChunk(text="ij")]
+        )
+        windows = []
+
+        def stop_at(text):
+            windows.append(text)
+            index = text.find("hi")
+            return None if index == -1 else index + len("hi")
+
+        response = make_streaming_request(provider, stop_at=stop_at, stop_overlap=3)
+
+        self.assertEqual(windows, ["abcdef", "defgh", "fghij"])
+        self.assertEqual(response.content, "abcdefghi")
+
+    def test_time_to_first_token(self):
+        """Time to first token is measured to the first text chunk"""
+        provider = StreamingDummyModels(
+            [StreamChunk(text="a"), StreamChunk(text="b")], delay=0.1
+        )
+
+        response = make_streaming_request(provider)
+
+        self.assertLess(response.time_to_first_token_ms, response.time_taken_in_ms)
+        self.assertGreaterEqual(response.time_to_first_token_ms, 90)
+
+    def test_stream_timeout(self):
+        """A stalled stream is cancelled and closed on timeout"""
+        provider = StreamingDummyModels([StreamChunk(text="a")], delay=30.0)
+
+        with self.assertRaises(TimeoutError):
+            make_streaming_request(provider, timeout=0.2)
+
+        self.assertTrue(provider.stream_closed)
+
+    def test_non_streaming_fallback(self):
+        """Providers without streaming use the regular async request"""
+        provider = AsyncDummyModels()
+
+        self.assertFalse(provider.supports_streaming)
+        response = make_streaming_request(provider)
+
+        self.assertEqual(response.content, "hello")
+        self.assertEqual(provider.async_calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
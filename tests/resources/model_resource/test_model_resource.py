@@ -0,0 +1,144 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from messages.action_messages.action_message import ActionMessage
+from resources.model_resource import model_provider, model_resource
+from resources.model_resource.model_resource import (
+    AGENT_HEADER,
+    STREAM_STOP_OVERLAP,
+    ModelResource,
+    ModelResourceConfig,
+)
+from resources.model_resource.model_response import StreamChunk
+from tests.resources.model_resource.test_model_provider import (
+    CharEncoding,
+    StreamingDummyModels,
+)
+
+
+class TestFindStreamStop(unittest.TestCase):
+    """Test where ModelResource cuts a streamed response"""
+
+    def setUp(self):
+        with (
+            patch.object(model_resource, "verify_and_auth_api_key"),
+            patch.object(ModelResource, "get_model_provider"),
+        ):
+            self.resource = ModelResource(
+                "model", ModelResourceConfig(model="openai/gpt-4o", use_streaming=True)
+            )
+
+    def assert_same_as_full_response(self, full_response: str):
+        """Cutting at the stop point gives the same cleaned text as the full one"""
+        cut = self.resource.find_stream_stop(full_response)
+        self.assertIsNotNone(cut)
+        self.assertEqual(self.clean(full_response), self.clean(full_response[:cut]))
+
+    def clean(self, response: str) -> str:
+        return self.resource.remove_stop_token(
+            self.resource.remove_hallucinations(response)
+        )
+
+    def test_no_marker(self):
+        self.assertIsNone(self.resource.find_stream_stop("Command: ls -la"))
+
+    def test_stop_token(self):
+        text = "Command: ls\n<END>"
+        self.assertEqual(self.resource.find_stream_stop(text + " more"), len(text))
+
+    def test_hallucination_marker(self):
+        self.assert_same_as_full_response(
+            "Command: ls\n----------Message from system----------\nfake output"
+        )
+
+    def test_earliest_marker_wins(self):
+        text = "Command: ls\n----------Message from assistant"
+        self.assertEqual(
+            self.resource.find_stream_stop(text + "----------\n<END>"), len(text)
+        )
+
+    def test_agent_header_is_not_a_stop(self):
+        """Full agent headers are stripped, not treated as hallucinations"""
+        self.assertIsNone(
+            self.resource.find_stream_stop(AGENT_HEADER + "\nCommand: ls")
+        )
+
+    def test_partial_agent_header_waits(self):
+        """A trailing partial agent header waits for more text before stopping"""
+        partial = "Command: ls\n----------Message from agent"
+        self.assertIsNone(self.resource.find_stream_stop(partial + "---"))
+        self.assertEqual(
+            self.resource.find_stream_stop(partial + ": fake"), len(partial)
+        )
+
+    def test_streamed_in_small_chunks(self):
+        """Markers split across chunks are found as in the full response"""
+        response = (
+            "Command: ls\n" + AGENT_HEADER + "\nstill the agent\n"
+            "----------Message from system----------\nfake output"
+        )
+        chunks = [
+            StreamChunk(text=response[i : i + 3]) for i in range(0, len(response), 3)
+        ]
+
+        with patch.object(
+            model_provider, "get_tiktoken_encoding", return_value=CharEncoding()
+        ):
+            streamed = asyncio.run(
+                StreamingDummyModels(chunks).make_streaming_request_async(
+                    model="dummy/model",
+                    message="hello",
+                    temperature=0.5,
+                    max_tokens=10,
+                    stop_sequences=[],
+                    stop_at=self.resource.find_stream_stop,
+                    stop_overlap=STREAM_STOP_OVERLAP,
+                )
+            )
+
+        self.assertEqual(
+            streamed.content, response[: self.resource.find_stream_stop(response)]
+        )
+
+
+class TestPrepareModelInput(unittest.TestCase):
+    """Test when ModelResource truncates the memory it is given"""
+
+    def setUp(self):
+        with (
+            patch.object(model_resource, "verify_and_auth_api_key"),
+            patch.object(ModelResource, "get_model_provider"),
+        ):
+            self.resource = ModelResource(
+                "model",
+                ModelResourceConfig(model="openai/gpt-4o", max_input_tokens=100),
+            )
+        patcher = patch.object(
+            model_resource, "truncate_input_to_max_tokens", return_value="truncated"
+        )
+        self.mock_truncate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_input(self, memory_num_tokens=None) -> ActionMessage:
+        message = ActionMessage(resource_id="agent", message="prompt")
+        message.memory = "memory"
+        message.memory_num_tokens = memory_num_tokens
+        return message
+
+    def test_budgeted_memory_is_not_truncated_again(self):
+        model_input = self.resource._prepare_model_input(self.make_input(90))
+
+        self.assertEqual(model_input, "memory")
+        self.mock_truncate.assert_not_called()
+
+    def test_unbudgeted_or_oversized_memory_is_truncated(self):
+        for memory_num_tokens in [None, 101]:
+            model_input = self.resource._prepare_model_input(
+                self.make_input(memory_num_tokens)
+            )
+            self.assertEqual(model_input, "truncated")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from resources.model_resource import model_utils, tokenizer_registry
+from resources.model_resource.model_utils import (
+    HISTORY_SEPARATOR,
+    TRUNCATION_ALERT,
+    clear_model_caches,
+    get_model_provider,
+    get_tokenizer,
+    split_prompt_prefix,
+    truncate_input_to_max_tokens,
+)
+
+
+class CharEncoding:
+    """Character-level stand-in for a tiktoken encoding (no BPE files needed)."""
+
+    def encode(self, text, **kwargs):
+        return [ord(c) for c in text]
+
+    def decode(self, tokens):
+        return "".join(chr(t) for t in tokens)
+
+
+class TestModelUtilsCaches(unittest.TestCase):
+    """Test the process-wide provider and tokenizer caches in model_utils"""
+
+    def setUp(self):
+        clear_model_caches()
+        self.addCleanup(clear_model_caches)
+        patcher = patch.object(
+            model_utils, "get_tiktoken_encoding", return_value=CharEncoding()
+        )
+        self.mock_get_encoding = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch.object(model_utils, "OpenAIModels")
+    def test_provider_created_once(self, mock_openai_models):
+        """Repeated lookups share a single provider instance"""
+        first = get_model_provider()
+        second = get_model_provider()
+
+        self.assertIs(first, second)
+        mock_openai_models.assert_called_once()
+
+    @patch.object(model_utils, "OpenAIModels")
+    def test_truncation_does_not_build_provider(self, mock_openai_models):
+        """Local tokenization never constructs an OpenAIModels client"""
+        model_input = "word " * 500
+
+        for _ in range(3):
+            truncate_input_to_max_tokens(100, model_input, "openai/gpt-4o")
+
+        mock_openai_models.assert_not_called()
+        self.mock_get_encoding.assert_called_once()
+        self.assertIs(get_tokenizer("openai/gpt-4o"), get_tokenizer("openai/gpt-4o"))
+
+    def test_truncate_keeps_both_ends(self):
+        """Over-long inputs keep the start and end around the truncation alert"""
+        model_input = "start " + "middle " * 100 + "end"
+
+        truncated = truncate_input_to_max_tokens(100, model_input, "openai/gpt-4o")
+
+        self.assertTrue(truncated.startswith("start"))
+        self.assertTrue(truncated.endswith("end"))
+        self.assertIn(TRUNCATION_ALERT, truncated)
+        self.assertLessEqual(get_tokenizer("openai/gpt-4o").count(truncated), 100)
+
+    def test_short_input_unchanged(self):
+        """Inputs under the limit are returned as-is"""
+        self.assertEqual(
+            truncate_input_to_max_tokens(100, "hello", "openai/gpt-4o"), "hello"
+        )
+
+    @patch.object(tokenizer_registry, "get_encoding", return_value=CharEncoding())
+    @patch.object(model_utils, "HelmModels")
+    def test_helm_tokenizer_is_local(self, mock_helm_models, mock_get_encoding):
+        """HELM models are tokenized locally with the mapped tiktoken encoding"""
+        model_input = "word " * 500
+
+        truncated = truncate_input_to_max_tokens(
+            100, model_input, "openai/gpt-4-0613", use_helm=True
+        )
+
+        self.assertIn(TRUNCATION_ALERT, truncated)
+        mock_helm_models.assert_not_called()
+        mock_get_encoding.assert_called_once_with("cl100k_base")
+
+    @patch.object(tokenizer_registry, "get_encoding", return_value=CharEncoding())
+    def test_helm_tokenizer_falls_back_for_unknown_family(self, mock_get_encoding):
+        """Families without a public tokenizer use the fallback encoding"""
+        get_tokenizer("anthropic/claude-3-7-sonnet-20250219", use_helm=True)
+
+        mock_get_encoding.assert_called_once_with(tokenizer_registry.FALLBACK_ENCODING)
+
+    @patch.object(tokenizer_registry, "get_encoding", return_value=CharEncoding())
+    def test_fallback_tokenizer_keeps_safety_margin(self, mock_get_encoding):
+        """Inputs are truncated below the limit when tokens are only estimated"""
+        model = "anthropic/claude-3-7-sonnet-20250219"
+        tokenizer = get_tokenizer(model, use_helm=True)
+
+        truncated = truncate_input_to_max_tokens(
+            100, "word " * 500, model, use_helm=True
+        )
+
+        self.assertTrue(tokenizer.estimated)
+        self.assertFalse(get_tokenizer("openai/gpt-4-0613", use_helm=True).estimated)
+        self.assertLessEqual(
+            tokenizer.count(truncated),
+            100 / tokenizer_registry.FALLBACK_SAFETY_MARGIN,
+        )
+
+    @patch.dict(os.environ, {tokenizer_registry.HELM_REMOTE_TOKENIZATION_ENV: "1"})
+    @patch.object(model_utils, "HelmModels")
+    def test_helm_remote_tokenizer_uses_shared_provider(self, mock_helm_models):
+        """Opting into remote HELM tokenization goes through one shared provider"""
+        provider = MagicMock()
+        provider.tokenize.return_value = [1, 2, 3]
+        mock_helm_models.return_value = provider
+
+        tokenizer = get_tokenizer("openai/gpt-4o", use_helm=True)
+        tokenizer.encode("a")
+        get_tokenizer("openai/gpt-4o", use_helm=True).encode("b")
+
+        mock_helm_models.assert_called_once()
+        provider.tokenize.assert_called_with("openai/gpt-4o", "b")
+
+
+class TestSplitPromptPrefix(unittest.TestCase):
+    """Test splitting model inputs into a stable prefix and the rest"""
+
+    def test_prompt_only(self):
+        self.assertEqual(split_prompt_prefix("prompt"), ("prompt", ""))
+
+    def test_prompt_with_history(self):
+        history = f"{HISTORY_SEPARATOR}\n[agent] Command: ls"
+        self.assertEqual(split_prompt_prefix("prompt" + history), ("prompt", history))
+
+    def test_prefix_ends_at_truncation(self):
+        """Truncation cuts into the prompt, so the prefix stops where it did"""
+        rest = f"{TRUNCATION_ALERT}end of prompt{HISTORY_SEPARATOR}\nhistory"
+        self.assertEqual(split_prompt_prefix("start" + rest), ("start", rest))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
+import asyncio
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from resources.model_resource.openai_models.openai_models import OpenAIModels
 
@@ -143,6 +144,35 @@ class TestOpenAIModels(unittest.TestCase):
         self.assertEqual(call_args["max_output_tokens"], 100)
         self.assertEqual(call_args["input"], "Test message")
 
+    def test_request_async_uses_async_client(self):
+        """Test request_async sends the same parameters through the async client"""
+        mock_async_client = MagicMock()
+        mock_async_client.responses.create = AsyncMock(return_value=self.mock_response)
+
+        with patch.object(
+            self.openai_models, "create_async_client", return_value=mock_async_client
+        ):
+            response = asyncio.run(
+                self.openai_models.request_async(
+                    model="openai/o3-mini-2025-01-31-low-reasoning-effort",
+                    message="Test message",
+                    temperature=0.7,
+                    max_tokens=100,
+                    stop_sequences=["STOP"],
+                )
+            )
+
+        self.assertEqual(response.content, "Test response")
+        self.mock_client.responses.create.assert_not_called()
+        mock_async_client.responses.create.assert_awaited_once()
+        call_args = mock_async_client.responses.create.call_args[1]
+
+        self.assertEqual(call_args["model"], "o3-mini-2025-01-31")
+        self.assertNotIn("temperature", call_args)
+        self.assertEqual(call_args["reasoning"]["effort"], "low")
+        self.assertEqual(call_args["max_output_tokens"], 100)
+        self.assertEqual(call_args["input"], "Test message")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,129 @@
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from resources.model_resource import rate_limiter
+from resources.model_resource.rate_limiter import (
+    FileRateLimiter,
+    RateLimit,
+    RateLimiter,
+    get_rate_limiter,
+    get_retry_after,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test token-bucket reservations in RateLimiter"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = patch.object(rate_limiter.time, "time", side_effect=self.clock.time)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unlimited_never_waits(self):
+        limiter = RateLimiter("openai", "openai/gpt-4o", RateLimit())
+        self.assertEqual([limiter.reserve(10**6) for _ in range(100)], [0.0] * 100)
+
+    def test_requests_per_minute_queues_in_order(self):
+        """Callers past the burst are spaced out first-come, first-served"""
+        limiter = RateLimiter("openai", "m", RateLimit(requests_per_minute=2))
+
+        waits = [limiter.reserve() for _ in range(5)]
+
+        self.assertEqual(waits, [0.0, 0.0, 30.0, 60.0, 90.0])
+
+    def test_refill_over_time(self):
+        limiter = RateLimiter("openai", "m", RateLimit(requests_per_minute=60))
+        for _ in range(60):
+            limiter.reserve()
+        self.assertGreater(limiter.reserve(), 0)
+
+        self.clock.now += 60
+        self.assertEqual(limiter.reserve(), 0.0)
+
+    def test_tokens_per_minute_and_refund(self):
+        """Unused reserved tokens go back to the bucket"""
+        limiter = RateLimiter("openai", "m", RateLimit(tokens_per_minute=1000))
+
+        self.assertEqual(limiter.reserve(1000), 0.0)
+        limiter.record_usage(reserved_tokens=1000, used_tokens=400)
+
+        self.assertEqual(limiter.reserve(600), 0.0)
+        self.assertAlmostEqual(limiter.reserve(100), 6.0)
+
+    def test_block_for_retry_after(self):
+        """A retry hint holds back every caller until it has passed"""
+        limiter = RateLimiter("openai", "m", RateLimit())
+
+        limiter.block_for(12.5)
+
+        self.assertEqual(limiter.reserve(), 12.5)
+        self.clock.now += 20
+        self.assertEqual(limiter.reserve(), 0.0)
+
+    def test_acquire_async_sleeps_for_reservation(self):
+        limiter = RateLimiter("openai", "m", RateLimit())
+        limiter.block_for(5)
+
+        with patch.object(
+            rate_limiter.asyncio, "sleep", new_callable=AsyncMock
+        ) as mock_sleep:
+            waited = asyncio.run(limiter.acquire_async())
+
+        self.assertEqual(waited, 5)
+        mock_sleep.assert_called_once_with(5)
+
+    def test_file_limiter_shares_budget(self):
+        """Two limiters on the same state directory share one budget"""
+        with tempfile.TemporaryDirectory() as state_dir:
+            limit = RateLimit(requests_per_minute=2)
+            first = FileRateLimiter("openai", "openai/gpt-4o", limit, state_dir)
+            second = FileRateLimiter("openai", "openai/gpt-4o", limit, state_dir)
+
+            waits = [first.reserve(), second.reserve(), first.reserve()]
+
+        self.assertEqual(waits, [0.0, 0.0, 30.0])
+
+    def test_get_rate_limiter_is_shared(self):
+        limit = RateLimit(requests_per_minute=10)
+        first = get_rate_limiter("test-provider", "shared-model", limit)
+        self.assertIs(first, get_rate_limiter("test-provider", "shared-model", limit))
+        self.assertIsNot(first, get_rate_limiter("test-provider", "other", limit))
+
+
+class TestGetRetryAfter(unittest.TestCase):
+    """Test parsing of provider retry hints"""
+
+    def make_error(self, headers):
+        error = Exception("rate limited")
+        error.response = MagicMock(headers=headers)
+        return error
+
+    def test_seconds(self):
+        self.assertEqual(get_retry_after(self.make_error({"retry-after": "7"})), 7.0)
+
+    def test_milliseconds_take_precedence(self):
+        error = self.make_error({"retry-after-ms": "1500", "retry-after": "2"})
+        self.assertEqual(get_retry_after(error), 1.5)
+
+    def test_http_date(self):
+        error = self.make_error({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        self.assertEqual(get_retry_after(error), 0.0)
+
+    def test_missing(self):
+        self.assertIsNone(get_retry_after(Exception("no response")))
+        self.assertIsNone(get_retry_after(self.make_error({})))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from messages.action_messages.action_message import ActionMessage
+from resources.model_resource import model_resource
+from resources.model_resource.model_resource import ModelResource, ModelResourceConfig
+from resources.model_resource.model_response import ModelResponse
+from resources.model_resource.response_cache import (
+    ResponseCache,
+    ResponseCacheMiss,
+    ResponseCacheMode,
+)
+
+
+def make_response(content: str = "Command: ls") -> ModelResponse:
+    return ModelResponse(
+        content=content, input_tokens=10, output_tokens=5, time_taken_in_ms=1234.0
+    )
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test storage, lookup and eviction in ResponseCache"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = Path(self.tmp_dir.name) / "responses.sqlite"
+
+    def test_key_depends_on_request_parameters(self):
+        """Any change to the keyed parameters produces a different key"""
+        base = dict(
+            model="openai/gpt-4o",
+            model_input="hello",
+            temperature=0.5,
+            max_output_tokens=100,
+            stop_sequences=["<END>"],
+        )
+        key = ResponseCache.make_key(**base)
+
+        self.assertEqual(key, ResponseCache.make_key(**base))
+        for field, value in [
+            ("model", "openai/o3"),
+            ("model_input", "hello!"),
+            ("temperature", 0.7),
+            ("max_output_tokens", 200),
+            ("stop_sequences", []),
+        ]:
+            self.assertNotEqual(key, ResponseCache.make_key(**{**base, field: value}))
+
+    def test_round_trip_and_persistence(self):
+        """Stored responses survive reopening the cache file"""
+        cache = ResponseCache(self.path)
+        self.assertIsNone(cache.get("key"))
+        cache.put("key", make_response())
+        cache.close()
+
+        reopened = ResponseCache(self.path)
+        response = reopened.get("key")
+
+        self.assertEqual(response.content, "Command: ls")
+        self.assertEqual(response.input_tokens, 10)
+        self.assertLess(response.time_taken_in_ms, 1234.0)
+        self.assertEqual((reopened.hits, reopened.misses), (1, 0))
+        reopened.close()
+
+    def test_lru_eviction(self):
+        """The least recently used entries are evicted past max_bytes"""
+        cache = ResponseCache(self.path, max_bytes=10**9)
+        cache.put("a", make_response("a" * 50))
+        cache.put("b", make_response("b" * 50))
+        (entry_size,) = cache._conn.execute(
+            "SELECT MAX(size) FROM responses"
+        ).fetchone()
+        cache.max_bytes = entry_size * 2
+
+        cache.get("a")  # "b" becomes least recently used
+        cache.put("c", make_response("c" * 50))
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        cache.close()
+
+
+class TestModelResourceResponseCache(unittest.TestCase):
+    """Test record, replay and read-through modes in ModelResource.run"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.cache_path = str(Path(self.tmp_dir.name) / "responses.sqlite")
+
+        patchers = [
+            patch.object(model_resource, "verify_and_auth_api_key"),
+            patch.object(
+                model_resource,
+                "truncate_input_to_max_tokens",
+                side_effect=lambda model_input, **kwargs: model_input,
+            ),
+            patch.object(ModelResource, "get_model_provider"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_resource(self, mode: ResponseCacheMode) -> ModelResource:
+        config = ModelResourceConfig(
+            model="openai/gpt-4o",
+            response_cache_mode=mode.value,
+            response_cache_path=self.cache_path,
+        )
+        resource = ModelResource("model", config)
+        if mode != ResponseCacheMode.REPLAY:
+            resource.model_provider = MagicMock()
+            resource.model_provider.make_request.return_value = make_response()
+        return resource
+
+    def make_input(self) -> ActionMessage:
+        message = ActionMessage(resource_id="agent", message="prompt")
+        message.memory = "full prompt"
+        return message
+
+    def test_record_then_replay(self):
+        """A recorded run can be replayed without a provider"""
+        recorder = self.make_resource(ResponseCacheMode.RECORD)
+        recorded = recorder.run(self.make_input())
+        recorder.model_provider.make_request.assert_called_once()
+        self.assertFalse(recorded.additional_metadata["cache_hit"])
+
+        replayer = self.make_resource(ResponseCacheMode.REPLAY)
+        self.assertFalse(hasattr(replayer, "model_provider"))
+        replayed = replayer.run(self.make_input())
+
+        self.assertEqual(replayed.message, recorded.message)
+        self.assertTrue(replayed.additional_metadata["cache_hit"])
+
+    def test_replay_miss_raises(self):
+        """Replay never falls back to the provider"""
+        replayer = self.make_resource(ResponseCacheMode.REPLAY)
+
+        with self.assertRaises(ResponseCacheMiss):
+            replayer.run(self.make_input())
+
+    def test_read_through(self):
+        """Read-through queries the provider once and then serves from the cache"""
+        resource = self.make_resource(ResponseCacheMode.READ_THROUGH)
+
+        first = resource.run(self.make_input())
+        second = resource.run(self.make_input())
+
+        resource.model_provider.make_request.assert_called_once()
+        self.assertFalse(first.additional_metadata["cache_hit"])
+        self.assertTrue(second.additional_metadata["cache_hit"])
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            ModelResourceConfig(model="openai/gpt-4o", response_cache_mode="bogus")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import asyncio
 from functools import partial
 from unittest.mock import Mock, patch
 
@@ -5,14 +6,32 @@ import pytest
 
 from messages.action_messages.action_message import ActionMessage
 from messages.agent_messages.agent_message import AgentMessage
+from messages.message_handler import MessageHandler
 from messages.phase_messages.phase_message import PhaseMessage
 from messages.workflow_message import WorkflowMessage
-from resources.memory_resource.memory_function import MemoryTruncationFunctions
+from resources.memory_resource.memory_budget import CachedTokenizer, MemoryTokenBudget
+from resources.memory_resource.memory_compaction import (
+    SUMMARY_HEADER,
+    HistoryCompactor,
+    extract_history_summary,
+)
+from resources.memory_resource.memory_function import (
+    TRUNCATION_ALERT,
+    MemoryTruncationFunctions,
+)
 from resources.memory_resource.memory_prompt import MemoryPrompts
 from resources.memory_resource.memory_resource import (
     MemoryResource,
     MemoryResourceConfig,
 )
+from resources.memory_resource.memory_scope import MemoryScope
+from resources.model_resource.tokenizer_registry import Tokenizer
+
+# Character-level tokenizer, so that token counts are exact string lengths
+CHAR_TOKENIZER = Tokenizer(
+    encode=lambda text: [ord(c) for c in text],
+    decode=lambda tokens: "".join(chr(t) for t in tokens),
+)
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -265,7 +284,6 @@ def test_messages_with_version(message_tree):
     assert new_agent0.agent_id in memory
 
 
-
 def test_get_memory_from_message_with_next(message_tree):
     """
     Even if memory-generating message is not the latest message (i.e. has next),
@@ -284,3 +302,290 @@ def test_get_memory_from_message_with_next(message_tree):
     after_link = mem_resource.get_memory(last_agent_message).memory
 
     assert before_link == after_link
+
+
+def assert_index_matches_traversal(mem_resource, message):
+    """The index renders the same memory as walking the whole tree."""
+    node = message
+    while node is not None:
+        for stop_instance in [None, *mem_resource.extract_children(node)]:
+            expected_sys_messages = set()
+            expected = mem_resource.go_down(
+                node, sys_messages=expected_sys_messages, stop_instance=stop_instance
+            )
+            assert mem_resource.index.render(node, stop_instance) == (
+                expected,
+                expected_sys_messages,
+            )
+        node = node.parent
+
+
+def test_index_follows_appends_and_edits(message_tree):
+    (
+        last_action_message,
+        last_agent_message,
+        last_phase_message,
+        config,
+        mem_resource,
+    ) = message_tree
+    phase_message = last_agent_message.parent
+    assert_index_matches_traversal(mem_resource, last_action_message)
+
+    # A new iteration of the executor agent, filled in after it was linked
+    executor_message = AgentMessage("executor_agent", prev=last_agent_message)
+    assert_index_matches_traversal(mem_resource, last_agent_message)
+    phase_message.add_child_message(executor_message)
+    command = ActionMessage(resource_id="model", message="Command: ls")
+    executor_message.add_child_message(command)
+    assert_index_matches_traversal(mem_resource, command)
+    output = ActionMessage(resource_id="kali_env", message="file.txt", prev=command)
+    executor_message.add_child_message(output)
+    output.set_message("file.txt\nother.txt")
+    assert_index_matches_traversal(mem_resource, output)
+
+    # Editing an earlier agent message replaces it in every later memory
+    agent0 = last_agent_message.prev
+    new_agent0 = AgentMessage(agent0.agent_id, "edited")
+    new_agent0.set_prev(agent0.prev)
+    new_agent0.set_next(agent0.next)
+    phase_message.add_child_message(new_agent0)
+    new_agent0.set_version_prev(agent0)
+    assert_index_matches_traversal(mem_resource, output)
+    assert "edited" in mem_resource.get_memory(output).memory
+
+
+def test_index_follows_edits_that_share_actions(message_tree):
+    (
+        last_action_message,
+        last_agent_message,
+        last_phase_message,
+        config,
+        mem_resource,
+    ) = message_tree
+    phase_message = last_agent_message.parent
+    executor_message = AgentMessage("executor_agent", prev=last_agent_message)
+    phase_message.add_child_message(executor_message)
+    prev = None
+    for i in range(3):
+        prev = ActionMessage(resource_id="model", message=f"command {i}", prev=prev)
+        executor_message.add_child_message(prev)
+    assert_index_matches_traversal(mem_resource, prev)
+
+    message_handler = MessageHandler(Mock(), Mock())
+    edited = asyncio.run(message_handler.edit_message(prev, "edited command"))
+
+    assert edited.parent.action_messages[0] is executor_message.action_messages[0]
+    assert_index_matches_traversal(mem_resource, edited)
+    next_action = ActionMessage(resource_id="model", message="next", prev=edited)
+    edited.parent.add_child_message(next_action)
+    memory = mem_resource.get_memory(next_action).memory
+    assert "command 1" in memory
+    assert "edited command" in memory
+    assert "command 2" not in memory
+    assert_index_matches_traversal(mem_resource, next_action)
+
+
+def test_index_only_renders_changed_messages(message_tree):
+    (
+        last_action_message,
+        last_agent_message,
+        last_phase_message,
+        config,
+        mem_resource,
+    ) = message_tree
+    phase_message = last_agent_message.parent
+    mem_resource.get_memory(last_agent_message)
+
+    prev_agent = last_agent_message
+    with patch.object(
+        mem_resource, "add_to_segment", wraps=mem_resource.add_to_segment
+    ) as add_to_segment:
+        for i in range(20):
+            agent_message = AgentMessage(
+                f"agent_{i}", f"iteration {i}", prev=prev_agent
+            )
+            phase_message.add_child_message(agent_message)
+            mem_resource.get_memory(agent_message)
+            prev_agent = agent_message
+
+    # The new agent message, and the message memory is built for
+    assert add_to_segment.call_count == 2 * 20
+
+
+@pytest.fixture
+def long_phase():
+    """A phase of executor agent iterations with long command outputs."""
+    phase_message = PhaseMessage(phase_id="phase")
+    prev_agent = AgentMessage("system", "initial prompt " * 20)
+    phase_message.add_child_message(prev_agent)
+    for i in range(6):
+        agent_message = AgentMessage("executor_agent", prev=prev_agent)
+        phase_message.add_child_message(agent_message)
+        command = ActionMessage(resource_id="model", message=f"Command: step {i}")
+        agent_message.add_child_message(command)
+        output = ActionMessage(
+            resource_id="kali_env", message=f"output {i} " * 50, prev=command
+        )
+        agent_message.add_child_message(output)
+        prev_agent = agent_message
+    return phase_message, prev_agent
+
+
+def make_phase_memory(**kwargs):
+    return MemoryResource(
+        "memory",
+        MemoryResourceConfig(
+            scope=MemoryScope.PHASE, fmt=MemoryPrompts.DEFAULT_FMT_PHASE, **kwargs
+        ),
+    )
+
+
+def test_budgeted_memory_matches_layout(long_phase):
+    """Within budget, memory is laid out as before and its tokens are counted"""
+    _, last_agent = long_phase
+    mem_resource = make_phase_memory(
+        memory_trunc_fn=MemoryTruncationFunctions.memory_fn_noop
+    )
+
+    expected = mem_resource.get_memory(last_agent).memory
+    budget = MemoryTokenBudget(max_tokens=100000, tokenizer=CHAR_TOKENIZER)
+    memory = mem_resource.get_memory(last_agent, token_budget=budget).memory
+
+    assert memory == expected
+    assert last_agent.memory_num_tokens == len(memory)
+
+
+def test_budgeted_memory_fits_and_keeps_prompt(long_phase):
+    """Over budget, the oldest entries go and the system prompt stays whole"""
+    _, last_agent = long_phase
+    mem_resource = make_phase_memory()
+    budget = MemoryTokenBudget(max_tokens=1200, tokenizer=CHAR_TOKENIZER)
+
+    memory = mem_resource.get_memory(last_agent, token_budget=budget).memory
+
+    assert len(memory) == last_agent.memory_num_tokens <= 1200
+    assert memory.startswith("initial prompt " * 20)
+    assert TRUNCATION_ALERT in memory
+    assert "Command: step 4" in memory
+    assert "step 0" not in memory
+
+    # Changing memory afterwards drops the count, so the model truncates again
+    last_agent.memory += "reminder"
+    assert last_agent.memory_num_tokens is None
+
+
+def test_budgeted_memory_encodes_entries_once(long_phase):
+    """Entries are encoded once, not again on every call they stay in memory"""
+    phase_message, prev_agent = long_phase
+    mem_resource = make_phase_memory()
+    encode = Mock(side_effect=CHAR_TOKENIZER.encode)
+    budget = MemoryTokenBudget(
+        max_tokens=1200, tokenizer=Tokenizer(encode, CHAR_TOKENIZER.decode)
+    )
+
+    for i in range(5):
+        mem_resource.get_memory(prev_agent, token_budget=budget)
+        agent_message = AgentMessage("executor_agent", prev=prev_agent)
+        phase_message.add_child_message(agent_message)
+        agent_message.add_child_message(
+            ActionMessage(resource_id="model", message=f"Command: new {i}")
+        )
+        prev_agent = agent_message
+
+    encoded = [call.args[0] for call in encode.call_args_list]
+    assert len(encoded) == len(set(encoded))
+
+
+def test_message_token_truncation_counts_tokens():
+    tokenizer = CachedTokenizer(CHAR_TOKENIZER)
+    segments = [["x" * 1000, "y" * 100, "z" * 10]]
+
+    truncated = MemoryTruncationFunctions.memory_fn_by_message_token(
+        segments, tokenizer=tokenizer
+    )
+
+    # Limits are halved, as for the word-based estimate
+    assert [len(msg) for msg in truncated[0]] == [768, 100, 10]
+    assert TRUNCATION_ALERT in truncated[0][0]
+
+
+def test_extract_history_summary():
+    summary = extract_history_summary(
+        "",
+        [
+            "[executor_agent/model] Reflection: look around\nCommand: cat /app/x.py",
+            "[executor_agent/kali] line 1\nPermissionError: denied\nline 3",
+            "[executor_agent/model] Command: curl -s http://target:8080/api",
+        ],
+    )
+    assert summary == "\n".join(
+        [
+            SUMMARY_HEADER,
+            "- command: cat /app/x.py",
+            "- command: curl -s http://target:8080/api",
+            "- file: /app/x.py",
+            "- error: PermissionError: denied",
+        ]
+    )
+
+    # Folding more entries keeps the most recent commands, without repeats
+    entries = [f"[executor_agent/model] Command: ls {i}" for i in range(30)]
+    entries.append("[executor_agent/model] Command: cat /app/x.py")
+    summary = extract_history_summary(summary, entries)
+    commands = [line for line in summary.splitlines() if "- command:" in line]
+    assert len(commands) == 20
+    assert commands[-1] == "- command: cat /app/x.py"
+    assert "- error: PermissionError: denied" in summary
+
+
+def next_iteration(phase_message, prev_agent):
+    agent_message = AgentMessage("executor_agent", prev=prev_agent)
+    phase_message.add_child_message(agent_message)
+    return agent_message
+
+
+def test_compaction_summarizes_dropped_iterations(long_phase):
+    last_agent = next_iteration(*long_phase)
+    mem_resource = make_phase_memory(compactor=HistoryCompactor())
+
+    memory = mem_resource.get_memory(last_agent).memory
+
+    # The oldest iterations are summarized in place of the truncation marker
+    assert f"1) {SUMMARY_HEADER}\n- command: step 0\n- command: step 1" in memory
+    assert "1) ...\n" not in memory
+    assert "2) [executor_agent/kali] output 1" in memory
+    # The summary is logged with the message
+    assert last_agent.memory_summary.startswith(SUMMARY_HEADER)
+    assert last_agent.to_log_dict()["memory_summary"] == last_agent.memory_summary
+    # The iterations that are kept are unchanged
+    uncompacted = make_phase_memory().get_memory(last_agent).memory
+    assert uncompacted.split("2) ", 1)[1] == memory.split("2) ", 1)[1]
+    assert last_agent.memory_summary is None
+
+
+def test_compaction_reuses_summaries_until_edited(long_phase):
+    phase_message, _ = long_phase
+    last_agent = next_iteration(*long_phase)
+    summarize_fn = Mock(side_effect=extract_history_summary)
+    mem_resource = make_phase_memory(
+        compactor=HistoryCompactor(summarize_fn=summarize_fn, interval=2)
+    )
+
+    # Dropped: step 0, output 0 and step 1, summarized in two chunks
+    mem_resource.get_memory(last_agent)
+    assert summarize_fn.call_count == 2
+    mem_resource.get_memory(last_agent)
+    assert summarize_fn.call_count == 2
+
+    # Editing a message recomputes the summary from its chunk onwards
+    first_agent, second_agent = phase_message.agent_messages[1:3]
+    second_agent.action_messages[0].set_message("Command: edited 1")
+    memory = mem_resource.get_memory(last_agent).memory
+    assert summarize_fn.call_count == 3
+    assert "- command: edited 1" in memory
+
+    first_agent.action_messages[0].set_message("Command: edited 0")
+    memory = mem_resource.get_memory(last_agent).memory
+    assert summarize_fn.call_count == 5
+    assert "- command: edited 0" in memory
+    assert "- command: step 0" not in memory
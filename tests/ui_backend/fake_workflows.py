@@ -70,6 +70,10 @@ class FakeWorkflow:
         """Simulate finalizing workflow - saves workflow state."""
         self.status = "INCOMPLETE"
 
+    def close(self):
+        """Simulate releasing a finished workflow."""
+        self.status = "closed"
+
 
 # Define specific fake workflows if behavior varies
 class FakeDetectPatchWorkflow(FakeWorkflow):
@@ -1,9 +1,19 @@
+import asyncio
+import json
+from pathlib import Path
+from types import SimpleNamespace
 from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock
 
 import pytest
+import uvicorn
 from fastapi.testclient import TestClient
+from websockets.asyncio.client import connect
 
 from backend.main import create_app
+from backend.routers import logs
+from messages.message_dict import message_dict
+from messages.phase_messages.phase_message import PhaseMessage
 from tests.ui_backend.fake_workflows import (
     FakeDetectPatchWorkflow,
     FakeExploitPatchWorkflow,
@@ -601,3 +611,186 @@ async def test_websocket_receive_status_update(client):
         running_msg = websocket.receive_json()
         assert running_msg["message_type"] == "workflow_status"
         assert running_msg["status"] == "running"
+
+
+def test_memory_stats(client):
+    response = client.get("/workflow/memory")
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {
+        "workflows",
+        "message_counts",
+        "resource_counts",
+        "websockets",
+        "max_rss_bytes",
+    }
+    assert data["message_counts"]["archived_workflows"] >= 0
+    assert data["websockets"]["dropped_frames"] >= 0
+    assert data["max_rss_bytes"] > 0
+
+
+def test_websocket_replays_archived_workflow(client, tmp_path, monkeypatch):
+    """Archived workflows are no longer active, but can still be viewed."""
+    monkeypatch.setattr(message_dict, "archive_dir", tmp_path)
+    monkeypatch.setattr(message_dict, "max_closed_workflows", 0)
+    phase_message = PhaseMessage("phase")
+    workflow_message = SimpleNamespace(
+        phase_messages=[phase_message], complete=True, success=True
+    )
+    message_dict["archived-1"] = {"archived-1": workflow_message}
+    message_dict.close_workflow("archived-1")
+    assert message_dict.is_archived("archived-1")
+
+    with client.websocket_connect("/ws/archived-1") as websocket:
+        assert websocket.receive_json()["message_type"] == "connection_established"
+        replayed = websocket.receive_json()
+        assert replayed["current_id"] == phase_message.id
+        status_msg = websocket.receive_json()
+        assert status_msg["status"] == "completed"
+        assert status_msg["can_execute"] is False
+
+
+class IdleSocket:
+    """A connected browser that sends nothing."""
+
+    def __init__(self):
+        self.query_params = {}
+        self.client_state = 1
+        self.accept = AsyncMock()
+        self.close = AsyncMock()
+        self.send_text = AsyncMock()
+        self.receive_calls = 0
+
+    async def receive_json(self):
+        self.receive_calls += 1
+        await asyncio.Event().wait()
+
+
+@pytest.mark.asyncio
+async def test_websocket_handler_returns_when_workflow_stops(test_app):
+    """The handler waits for the status change, rather than polling for it."""
+    backend = test_app.state.execution_backend
+    workflow_message = SimpleNamespace(phase_messages=[])
+    backend.active_workflows["idle-1"] = {
+        "status": "running",
+        "workflow_message": workflow_message,
+    }
+    websocket = IdleSocket()
+
+    handler = asyncio.create_task(
+        backend.handle_websocket_connection("idle-1", websocket)
+    )
+    await asyncio.sleep(0.1)
+    assert not handler.done()
+
+    backend._set_status("idle-1", "stopped")
+    await asyncio.wait_for(handler, timeout=1)
+
+    assert websocket.receive_calls == 1
+    websocket.close.assert_awaited()
+    backend.active_workflows.pop("idle-1")
+    await test_app.state.websocket_manager.stop_heartbeat()
+
+
+def test_log_is_sent_compressed(client, tmp_path, monkeypatch):
+    log_file = tmp_path / "workflow.json"
+    content = {"phase_messages": [{"message": "ls -la " * 100}] * 20}
+    log_file.write_text(json.dumps(content))
+    monkeypatch.setitem(logs.FILENAME_TO_PATH_CACHE, log_file.name, log_file)
+
+    response = client.get(f"/logs/{log_file.name}", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == content
+
+
+def test_old_log_version_links_are_read_as_ids(client, tmp_path, monkeypatch):
+    # Logs written before message ids linked versions by the integer id()
+    log_file = tmp_path / "old_workflow.json"
+    old_action = {"current_id": "140001", "version_next": 140002}
+    new_action = {"current_id": "140002", "version_prev": 140001}
+    content = {
+        "phase_messages": [
+            {
+                "current_id": "140000",
+                "agent_messages": [
+                    {
+                        "current_id": "140003",
+                        "action_messages": [old_action, new_action],
+                    }
+                ],
+            }
+        ]
+    }
+    log_file.write_text(json.dumps(content))
+    monkeypatch.setitem(logs.FILENAME_TO_PATH_CACHE, log_file.name, log_file)
+
+    response = client.get(f"/logs/{log_file.name}")
+
+    assert response.status_code == 200
+    actions = response.json()["phase_messages"][0]["agent_messages"][0][
+        "action_messages"
+    ]
+    assert actions[0]["version_next"] == "140002"
+    assert actions[1]["version_prev"] == "140001"
+
+
+@pytest.mark.asyncio
+async def test_websocket_negotiates_deflate(test_app):
+    server = uvicorn.Server(
+        uvicorn.Config(test_app, host="127.0.0.1", port=0, log_level="warning")
+    )
+    serve_task = asyncio.create_task(server.serve())
+    try:
+        while not server.started:
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+
+        async with connect(f"ws://127.0.0.1:{port}/ws/deflate-test") as websocket:
+            extensions = websocket.response.headers["Sec-WebSocket-Extensions"]
+    finally:
+        server.should_exit = True
+        await serve_task
+        await test_app.state.websocket_manager.stop_heartbeat()
+
+    assert "permessage-deflate" in extensions
+
+
+class FailingWorkflow(FakePatchWorkflow):
+    async def run(self):
+        raise RuntimeError("model unavailable")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "workflow_class, status, closed",
+    [(FakePatchWorkflow, "completed", True), (FailingWorkflow, "error", False)],
+)
+async def test_only_completed_workflows_are_closed(
+    test_app, workflow_class, status, closed
+):
+    backend = test_app.state.execution_backend
+    workflow = workflow_class("tasks", 990, "", True, 1, "model", False, True, False)
+    workflow_id = workflow.workflow_message.workflow_id
+    backend.active_workflows[workflow_id] = {
+        "instance": workflow,
+        "status": "initializing",
+    }
+
+    await backend._run_workflow(
+        workflow_id, test_app.state.websocket_manager, should_exit=False
+    )
+
+    assert backend.active_workflows.pop(workflow_id)["status"] == status
+    assert (workflow.status == "closed") is closed
+
+
+def test_websocket_reports_archived_workflow_that_cannot_be_loaded(client, monkeypatch):
+    monkeypatch.setitem(message_dict._archived, "archived-2", Path("missing.json"))
+
+    with client.websocket_connect("/ws/archived-2") as websocket:
+        assert websocket.receive_json()["message_type"] == "connection_established"
+        status_msg = websocket.receive_json()
+        assert status_msg["status"] == "error"
+        assert status_msg["can_execute"] is False
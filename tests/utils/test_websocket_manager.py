@@ -0,0 +1,208 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+import pytest_asyncio
+
+from utils.websocket_manager import TRY_AGAIN_LATER, websocket_manager
+
+WORKFLOW_ID = "test_workflow"
+
+
+class FakeClient:
+    """A connected browser, recording the frames it receives."""
+
+    def __init__(self):
+        self.frames = []
+        self.client_state = 1
+        self.accept = AsyncMock()
+        self.close = AsyncMock()
+
+    async def send_text(self, text):
+        self.frames.append(json.loads(text))
+
+
+class SlowClient(FakeClient):
+    """A browser that stops reading until it is released."""
+
+    def __init__(self):
+        super().__init__()
+        self.released = asyncio.Event()
+
+    async def send_text(self, text):
+        await self.released.wait()
+        await super().send_text(text)
+
+
+@pytest_asyncio.fixture
+async def manager():
+    yield websocket_manager
+    for task in websocket_manager.flush_tasks.values():
+        task.cancel()
+    for sender in websocket_manager.senders.values():
+        await sender.close(drain=False)
+    websocket_manager.senders.clear()
+    websocket_manager.dropped_frames = 0
+    await websocket_manager.stop_heartbeat()
+    websocket_manager.active_connections.clear()
+    websocket_manager.last_heartbeat.clear()
+    websocket_manager.connection_status.clear()
+    websocket_manager.pending_broadcasts.clear()
+    websocket_manager.flush_tasks.clear()
+
+
+def add_clients(manager, count, client_class=FakeClient):
+    clients = [client_class() for _ in range(count)]
+    for client in clients:
+        manager._register(WORKFLOW_ID, client)
+    return clients
+
+
+async def settle():
+    """Let the senders of the clients run."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_queued_updates_are_coalesced_into_one_frame(manager):
+    (client,) = add_clients(manager, 1)
+    build_1 = Mock(return_value={"current_id": "1", "message": "latest"})
+    build_2 = Mock(return_value={"current_id": "2"})
+
+    manager.queue_broadcast(WORKFLOW_ID, "1", Mock())
+    manager.queue_broadcast(WORKFLOW_ID, "2", build_2)
+    manager.queue_broadcast(WORKFLOW_ID, "1", build_1)
+    assert client.frames == []
+    await asyncio.sleep(manager.BROADCAST_INTERVAL * 3)
+
+    assert client.frames == [[{"current_id": "2"}, build_1.return_value]]
+    build_1.assert_called_once()
+    build_2.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_broadcast_sends_queued_updates_first(manager):
+    (client,) = add_clients(manager, 1)
+    manager.queue_broadcast(WORKFLOW_ID, "1", lambda: {"current_id": "1"})
+    await manager.broadcast(WORKFLOW_ID, {"message_type": "workflow_status"})
+    await settle()
+
+    assert client.frames == [
+        [{"current_id": "1"}],
+        {"message_type": "workflow_status"},
+    ]
+    await asyncio.sleep(manager.BROADCAST_INTERVAL * 3)
+    assert len(client.frames) == 2
+
+
+@pytest.mark.asyncio
+async def test_updates_without_clients_are_not_queued(manager):
+    build = Mock()
+    manager.queue_broadcast(WORKFLOW_ID, "1", build)
+
+    assert WORKFLOW_ID not in manager.pending_broadcasts
+    assert WORKFLOW_ID not in manager.flush_tasks
+    build.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_load_50_clients(manager):
+    """
+    A workflow updating 20 messages 50 times each, watched by 50 clients, sends
+    one frame per interval to each client and builds each update once per frame.
+    """
+    clients = add_clients(manager, 50)
+    builds = 0
+
+    def build_for(key, version):
+        def build():
+            nonlocal builds
+            builds += 1
+            return {"current_id": key, "version": version}
+
+        return build
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for version in range(50):
+        for key in range(20):
+            manager.queue_broadcast(WORKFLOW_ID, str(key), build_for(str(key), version))
+        await asyncio.sleep(0.005)
+    await asyncio.sleep(manager.BROADCAST_INTERVAL * 3)
+    elapsed = loop.time() - start
+
+    max_frames = int(elapsed / manager.BROADCAST_INTERVAL) + 1
+    for client in clients:
+        assert 1 <= len(client.frames) <= max_frames
+        assert client.frames == clients[0].frames
+        latest = {}
+        for frame in client.frames:
+            for update in frame:
+                latest[update["current_id"]] = update["version"]
+        assert latest == {str(key): 49 for key in range(20)}
+    assert builds == sum(len(frame) for frame in clients[0].frames)
+    assert builds < 50 * 20
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_hold_up_others(manager):
+    (fast,) = add_clients(manager, 1)
+    (slow,) = add_clients(manager, 1, SlowClient)
+
+    for i in range(3):
+        await manager.broadcast(WORKFLOW_ID, {"message_type": "update", "i": i})
+    await settle()
+
+    assert [frame["i"] for frame in fast.frames] == [0, 1, 2]
+    assert slow.frames == []
+    assert manager.stats()["queued_frames"] == 2
+
+    slow.released.set()
+    await settle()
+    assert slow.frames == fast.frames
+    assert manager.stats()["queued_frames"] == 0
+
+
+@pytest.mark.asyncio
+async def test_client_that_falls_behind_is_dropped(manager, monkeypatch):
+    monkeypatch.setattr(manager, "MAX_QUEUED_FRAMES", 3)
+    (fast,) = add_clients(manager, 1)
+    (slow,) = add_clients(manager, 1, SlowClient)
+
+    for i in range(6):
+        await manager.broadcast(WORKFLOW_ID, {"message_type": "update", "i": i})
+        await settle()
+
+    # The first frame is in flight, three are queued, the fourth overflows
+    assert len(fast.frames) == 6
+    assert manager.stats()["dropped_frames"] == 5
+    slow.released.set()
+    await settle()
+
+    assert [frame["i"] for frame in slow.frames] == [0]
+    slow.close.assert_any_call(code=TRY_AGAIN_LATER)
+    assert manager.active_connections[WORKFLOW_ID] == [fast]
+    assert manager.stats() == {
+        "connections": 1,
+        "queued_frames": 0,
+        "max_queue_depth": 0,
+        "sent_frames": 6,
+        "dropped_frames": 5,
+    }
+
+
+@pytest.mark.asyncio
+async def test_one_heartbeat_pings_all_idle_clients(manager, monkeypatch):
+    monkeypatch.setattr(manager, "HEARTBEAT_INTERVAL", 0.01)
+    clients = [FakeClient() for _ in range(3)]
+    for client in clients:
+        await manager.connect(WORKFLOW_ID, client)
+    heartbeat = manager.heartbeat_task
+
+    await asyncio.sleep(0.05)
+
+    assert manager.heartbeat_task is heartbeat
+    for client in clients:
+        assert {"message_type": "ping"} in client.frames
@@ -3,6 +3,7 @@ from unittest.mock import AsyncMock, MagicMock, create_autospec, patch
 
 import pytest
 
+from messages.message_dict import message_dict
 from messages.phase_messages.phase_message import PhaseMessage
 from phases.base_phase import BasePhase
 from workflows.base_workflow import BaseWorkflow
@@ -111,3 +112,24 @@ async def test_stop_restart(base_workflow):
 
 if __name__ == "__main__":
     pytest.main()
+
+
+@pytest.mark.asyncio
+async def test_close_releases_workflow(base_workflow):
+    """
+    Tests that a closed workflow is finalized once and can be archived.
+    """
+    workflow_id = base_workflow.workflow_message.workflow_id
+
+    with patch.object(base_workflow.workflow_message, "on_exit") as mock_on_exit:
+        await base_workflow.stop()
+        base_workflow.close()
+        base_workflow._finalize_workflow()
+
+    mock_on_exit.assert_called_once()
+    assert message_dict.is_closed(workflow_id)
+
+    with patch.object(base_workflow.workflow_message, "new_log"):
+        await base_workflow.restart()
+    assert not message_dict.is_closed(workflow_id)
+    assert workflow_id in message_dict
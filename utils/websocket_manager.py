@@ -1,22 +1,134 @@
 import asyncio
 import logging
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Set
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
 
 from fastapi import WebSocket
-from fastapi.websockets import WebSocketDisconnect
 
+from messages.serialization import serializer
 from utils.logger import get_main_logger
 
 logger = get_main_logger(__name__)
 
 
+# Close code asking the client to reconnect later, see ConnectionSender
+TRY_AGAIN_LATER = 1013
+
+
+class ConnectionSender:
+    """
+    Outgoing frames of one WebSocket connection, sent in order by a task of its
+    own, so that a slow client only holds up itself and never the workflow or
+    the other clients.
+
+    At most max_queued frames wait to be sent. A client that falls further
+    behind has its queued frames dropped and is closed with TRY_AGAIN_LATER,
+    the UI then reconnects and catches up from the last update it applied.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_queued: int,
+        max_retry_attempts: int,
+        on_failure: Callable[[WebSocket], Awaitable[None]],
+    ):
+        self.websocket = websocket
+        self.max_queued = max_queued
+        self.max_retry_attempts = max_retry_attempts
+        self.frames: Deque[str] = deque()
+        self.sent = 0
+        self.dropped = 0
+        self.overflowed = False
+        self._closing = False
+        self._on_failure = on_failure
+        self._ready = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+
+    @property
+    def depth(self) -> int:
+        return len(self.frames)
+
+    def put(self, text: str) -> bool:
+        """Queue a frame, returns False if it was dropped."""
+        if self.overflowed or self._closing:
+            self.dropped += 1
+            return False
+        if len(self.frames) >= self.max_queued:
+            # The client misses updates either way, and catching up on
+            # reconnect is cheaper than sending everything it fell behind on
+            self.dropped += len(self.frames) + 1
+            self.frames.clear()
+            self.overflowed = True
+            self._ready.set()
+            return False
+        self.frames.append(text)
+        self._ready.set()
+        return True
+
+    async def close(self, drain: bool = True, timeout: float = 5.0) -> None:
+        """Stop sending, after the queued frames if drain is set."""
+        self._closing = True
+        self._ready.set()
+        if self.task is asyncio.current_task():
+            return
+        if not drain:
+            self.task.cancel()
+        try:
+            await asyncio.wait_for(self.task, timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            pass
+        except Exception as e:
+            logger.error(f"Error in WebSocket sender: {e}")
+
+    async def _run(self):
+        while True:
+            await self._ready.wait()
+            while self.frames:
+                if not await self._send(self.frames.popleft()):
+                    await self._on_failure(self.websocket)
+                    return
+                self.sent += 1
+            if self.overflowed:
+                logger.warning(
+                    f"WebSocket client fell behind by {self.max_queued} frames, closing it"
+                )
+                try:
+                    await self.websocket.close(code=TRY_AGAIN_LATER)
+                except Exception as e:
+                    logger.debug(f"Error closing slow WebSocket client: {e}")
+                await self._on_failure(self.websocket)
+                return
+            if self._closing:
+                return
+            self._ready.clear()
+
+    async def _send(self, text: str) -> bool:
+        for attempt in range(self.max_retry_attempts):
+            try:
+                await self.websocket.send_text(text)
+                return True
+            except Exception as e:
+                if attempt == self.max_retry_attempts - 1:
+                    logger.error(
+                        f"Failed to send message after {self.max_retry_attempts} attempts: {e}"
+                    )
+                else:
+                    await asyncio.sleep(0.5 * (attempt + 1))
+        return False
+
+
 class WebSocketManager:
     _instance = None
     _initialized = False
     HEARTBEAT_INTERVAL = 30  # seconds
     CONNECTION_TIMEOUT = 90  # seconds
     MAX_RETRY_ATTEMPTS = 3
+    # Queued updates are coalesced for this long before they are sent
+    BROADCAST_INTERVAL = 0.05  # seconds
+    # Frames waiting for a client before it is considered too slow
+    MAX_QUEUED_FRAMES = 100
 
     def __new__(cls):
         if cls._instance is None:
@@ -27,8 +139,16 @@ class WebSocketManager:
         if not WebSocketManager._initialized:
             self.active_connections: Dict[str, List[WebSocket]] = {}
             self.last_heartbeat: Dict[str, Dict[WebSocket, datetime]] = {}
-            self.heartbeat_tasks: Set[asyncio.Task] = set()
+            # One task pings all connections, see _heartbeat
+            self.heartbeat_task: Optional[asyncio.Task] = None
             self.connection_status: Dict[str, Dict[WebSocket, bool]] = {}
+            # Queued updates of each workflow by key, see queue_broadcast
+            self.pending_broadcasts: Dict[str, Dict[str, Callable[[], dict]]] = {}
+            self.flush_tasks: Dict[str, asyncio.Task] = {}
+            # Outgoing frames of each connection, see ConnectionSender
+            self.senders: Dict[WebSocket, ConnectionSender] = {}
+            # Frames dropped by connections that are gone
+            self.dropped_frames = 0
             self.lock = asyncio.Lock()
             WebSocketManager._initialized = True
             logger.debug("WebSocket Manager initialized")
@@ -37,23 +157,10 @@ class WebSocketManager:
         """Connect a new WebSocket client with heartbeat monitoring"""
         try:
             await websocket.accept()
+            self._register(workflow_id, websocket)
 
-            # Initialize workflow-specific dictionaries if needed
-            if workflow_id not in self.active_connections:
-                self.active_connections[workflow_id] = []
-                self.last_heartbeat[workflow_id] = {}
-                self.connection_status[workflow_id] = {}
-
-            self.active_connections[workflow_id].append(websocket)
-            self.last_heartbeat[workflow_id][websocket] = datetime.now()
-            self.connection_status[workflow_id][websocket] = True
-
-            # Start heartbeat monitoring
-            heartbeat_task = asyncio.create_task(
-                self._monitor_connection(workflow_id, websocket)
-            )
-            heartbeat_task.add_done_callback(self.heartbeat_tasks.discard)
-            self.heartbeat_tasks.add(heartbeat_task)
+            if self.heartbeat_task is None or self.heartbeat_task.done():
+                self.heartbeat_task = asyncio.create_task(self._heartbeat())
 
             logger.debug(f"WebSocket connected to workflow {workflow_id}")
 
@@ -62,11 +169,35 @@ class WebSocketManager:
             await self._handle_connection_error(workflow_id, websocket)
             raise
 
+    def _register(self, workflow_id: str, websocket: WebSocket):
+        # Initialize workflow-specific dictionaries if needed
+        if workflow_id not in self.active_connections:
+            self.active_connections[workflow_id] = []
+            self.last_heartbeat[workflow_id] = {}
+            self.connection_status[workflow_id] = {}
+
+        self.active_connections[workflow_id].append(websocket)
+        self.last_heartbeat[workflow_id][websocket] = datetime.now()
+        self.connection_status[workflow_id][websocket] = True
+        self.senders[websocket] = ConnectionSender(
+            websocket,
+            self.MAX_QUEUED_FRAMES,
+            self.MAX_RETRY_ATTEMPTS,
+            lambda ws: self._handle_connection_error(workflow_id, ws),
+        )
+
     async def disconnect(self, workflow_id: str, websocket: WebSocket):
         # Check if connection exists before cleanup
         if not websocket or workflow_id not in self.active_connections:
             return
 
+        sender = self.senders.pop(websocket, None)
+        if sender is not None:
+            # Frames already queued still go out to a healthy connection
+            healthy = self.connection_status[workflow_id].get(websocket, False)
+            await sender.close(drain=healthy)
+            self.dropped_frames += sender.dropped
+
         try:
             # Check connection state before closing
             if websocket.client_state != 2:  # 2 = ConnectionState.DISCONNECTED
@@ -88,70 +219,113 @@ class WebSocketManager:
                         del self.active_connections[workflow_id]
                         del self.last_heartbeat[workflow_id]
                         del self.connection_status[workflow_id]
+                        self.pending_broadcasts.pop(workflow_id, None)
 
                     logger.debug(f"WebSocket disconnected from workflow {workflow_id}")
 
+    def queue_broadcast(
+        self, workflow_id: str, key: str, build: Callable[[], dict]
+    ) -> None:
+        """
+        Queue an update for the clients of a workflow. Updates queued within
+        BROADCAST_INTERVAL are sent together as one list, and an update queued
+        again under the same key replaces the earlier one, so build is only
+        called once per interval, when the list is sent.
+
+        Must be called from the event loop.
+        """
+        if workflow_id not in self.active_connections:
+            return
+
+        pending = self.pending_broadcasts.setdefault(workflow_id, {})
+        # Re-queued updates move to the end, after the updates they follow
+        pending.pop(key, None)
+        pending[key] = build
+        if workflow_id not in self.flush_tasks:
+            self.flush_tasks[workflow_id] = asyncio.get_running_loop().create_task(
+                self._flush_after_interval(workflow_id)
+            )
+
+    async def _flush_after_interval(self, workflow_id: str):
+        try:
+            await asyncio.sleep(self.BROADCAST_INTERVAL)
+        finally:
+            self.flush_tasks.pop(workflow_id, None)
+        await self.flush(workflow_id)
+
+    async def flush(self, workflow_id: str):
+        """Send the queued updates of a workflow now."""
+        pending = self.pending_broadcasts.pop(workflow_id, None)
+        if not pending:
+            return
+
+        batch = []
+        for build in pending.values():
+            try:
+                batch.append(build())
+            except Exception as e:
+                logger.error(f"Failed to build update for workflow {workflow_id}: {e}")
+        if batch:
+            await self._send(workflow_id, batch)
+
     async def broadcast(self, workflow_id: str, message: dict):
         """Broadcast a message to all connected clients with retry mechanism"""
         if workflow_id not in self.active_connections:
             return
 
-        failed_connections = []
-        for connection in self.active_connections[workflow_id][
-            :
-        ]:  # Create a copy to iterate
+        # Updates queued before this message are sent first
+        await self.flush(workflow_id)
+        await self._send(workflow_id, message)
+
+    async def send(self, workflow_id: str, websocket: WebSocket, message: dict):
+        """Send a message to one client, after the frames queued for it."""
+        sender = self.senders.get(websocket)
+        if sender is None:
+            await websocket.send_text(serializer.dumps_str(message))
+            return
+        sender.put(serializer.dumps_str(message))
+
+    async def _send(self, workflow_id: str, message):
+        if workflow_id not in self.active_connections:
+            return
+
+        # Serialized once for all connections, and only queued, each connection
+        # sends at its own pace
+        text = serializer.dumps_str(message)
+        for connection in self.active_connections[workflow_id]:
             if not self.connection_status.get(workflow_id, {}).get(connection, False):
                 logger.warning(
                     f"Skipping broadcast to inactive connection in workflow {workflow_id}"
                 )
                 continue
-
-            success = False
-            for attempt in range(self.MAX_RETRY_ATTEMPTS):
-                try:
-                    await connection.send_json(message)
-                    success = True
-                    break
-                except Exception as e:
-                    if attempt == self.MAX_RETRY_ATTEMPTS - 1:
-                        logger.error(
-                            f"Failed to send message after {self.MAX_RETRY_ATTEMPTS} attempts: {e}"
-                        )
-                        failed_connections.append(connection)
-                    else:
-                        await asyncio.sleep(0.5 * (attempt + 1))
-
-            if not success:
-                logger.error(
-                    f"Failed to send message to connection in workflow {workflow_id}"
-                )
-
-        # Clean up failed connections
-        for connection in failed_connections:
-            try:
-                await self._handle_connection_error(workflow_id, connection)
-            except Exception as e:
-                logger.error(f"Error handling failed connection: {e}")
-
-    async def _monitor_connection(self, workflow_id: str, websocket: WebSocket):
+            sender = self.senders.get(connection)
+            if sender is not None:
+                sender.put(text)
+
+    async def _heartbeat(self):
+        """
+        Ping the connected clients every HEARTBEAT_INTERVAL, for as long as
+        there are any. A connection that no longer takes frames is closed by
+        its sender.
+        """
         try:
-            while self.connection_status[workflow_id].get(websocket, False):
+            while self.senders:
                 await asyncio.sleep(self.HEARTBEAT_INTERVAL)
 
-                # Only send ping without timeout checks
-                try:
-                    await websocket.send_json({"message_type": "ping"})
-                except (WebSocketDisconnect, RuntimeError):
-                    await self.disconnect(workflow_id, websocket)
-                    return
-
-        except asyncio.CancelledError as e:
-            logger.debug(f"Heartbeat monitor cancelled for workflow {workflow_id}")
-            raise e
+                # Any frame shows the connection is alive, so a client that
+                # has frames waiting gets no ping
+                ping = serializer.dumps_str({"message_type": "ping"})
+                for sender in list(self.senders.values()):
+                    if not sender.depth:
+                        sender.put(ping)
+        except asyncio.CancelledError:
+            logger.debug("Heartbeat cancelled")
+            raise
         except Exception as e:
-            logger.error(f"Error in heartbeat monitor: {e}")
+            logger.error(f"Error in heartbeat: {e}")
         finally:
-            await self._handle_connection_error(workflow_id, websocket)
+            if self.heartbeat_task is asyncio.current_task():
+                self.heartbeat_task = None
 
     async def _handle_connection_error(self, workflow_id: str, websocket: WebSocket):
         """Handle connection errors and cleanup"""
@@ -182,28 +356,56 @@ class WebSocketManager:
             for connection in list(self.active_connections[workflow_id]):
                 await self._handle_connection_error(workflow_id, connection)
 
-        # Cancel all heartbeat tasks
-        for task in self.heartbeat_tasks:
-            task.cancel()
-            try:
-                await task  # Await cancellation to ensure it properly exits
-            except asyncio.CancelledError:
-                pass  # Silently ignore CancelledError since it's expected
-            except Exception as e:
-                logger.error(f"Unhandled exception in heartbeat task: {e}")
+        await self.stop_heartbeat()
+
+        # Senders of connections that failed to close
+        for sender in list(self.senders.values()):
+            await sender.close(drain=False)
+            self.dropped_frames += sender.dropped
 
-        # Wait for all tasks to complete
-        if self.heartbeat_tasks:
-            await asyncio.gather(*self.heartbeat_tasks, return_exceptions=True)
+        # Queued updates have no one left to go to
+        flush_tasks = list(self.flush_tasks.values())
+        for task in flush_tasks:
+            task.cancel()
+        if flush_tasks:
+            await asyncio.gather(*flush_tasks, return_exceptions=True)
 
         # Clear all tracking dictionaries
         self.active_connections.clear()
         self.last_heartbeat.clear()
         self.connection_status.clear()
-        self.heartbeat_tasks.clear()
+        self.pending_broadcasts.clear()
+        self.flush_tasks.clear()
+        self.senders.clear()
 
         logger.info("All WebSocket connections closed")
 
+    async def stop_heartbeat(self):
+        """Cancel the heartbeat, it restarts with the next connection."""
+        task = self.heartbeat_task
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task  # Await cancellation to ensure it properly exits
+        except asyncio.CancelledError:
+            pass  # Silently ignore CancelledError since it's expected
+        except Exception as e:
+            logger.error(f"Unhandled exception in heartbeat task: {e}")
+        self.heartbeat_task = None
+
+    def stats(self) -> dict:
+        """Outgoing queues of the connected clients, and the frames they dropped."""
+        senders = list(self.senders.values())
+        return {
+            "connections": len(senders),
+            "queued_frames": sum(sender.depth for sender in senders),
+            "max_queue_depth": max((sender.depth for sender in senders), default=0),
+            "sent_frames": sum(sender.sent for sender in senders),
+            "dropped_frames": self.dropped_frames
+            + sum(sender.dropped for sender in senders),
+        }
+
     def get_active_connections(self):
         """Get dictionary of active connections"""
         return self.active_connections
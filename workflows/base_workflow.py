@@ -6,6 +6,8 @@ from enum import Enum
 from typing import Any, Dict, Type
 
 from agents.agent_manager import AgentManager
+from messages.log_persistence import DEFAULT_MAX_LOG_STALENESS
+from messages.message_dict import message_dict
 from messages.phase_messages.phase_message import PhaseMessage
 from messages.workflow_message import WorkflowMessage
 from phases.base_phase import BasePhase
@@ -39,6 +41,7 @@ class BaseWorkflow(ABC):
         self._phase_graph = {}  # Stores phase relationships
         self._root_phase = None
         self._current_phase = None
+        self._finalized = False
 
         self._initialize()
 
@@ -49,6 +52,9 @@ class BaseWorkflow(ABC):
             task=self.task,
             additional_metadata=self._get_metadata(),
             model_name=self.params.get("model", "").replace("/", "-"),
+            max_log_staleness=self.params.get(
+                "max_log_staleness", DEFAULT_MAX_LOG_STALENESS
+            ),
         )
 
         self._check_docker_desktop_availability()
@@ -64,6 +70,9 @@ class BaseWorkflow(ABC):
         atexit.register(self._finalize_workflow)
 
     def _finalize_workflow(self):
+        if self._finalized:
+            return
+        self._finalized = True
         self.workflow_message.on_exit()
 
     def _register_root_phase(self, phase: BasePhase):
@@ -260,7 +269,24 @@ class BaseWorkflow(ABC):
 
         self._finalize_workflow()
 
+    def close(self):
+        """
+        Release a workflow that will not run again. Its agents and resources
+        are deallocated, its log is finalized, and its messages may be archived
+        by the message registry once enough workflows are closed.
+        """
+        self.agent_manager.deallocate_all_agents()
+        self.resource_manager.deallocate_all_resources()
+        self._finalize_workflow()
+        # The atexit hook would keep the workflow alive until the process exits
+        atexit.unregister(self._finalize_workflow)
+        message_dict.close_workflow(self.workflow_message.workflow_id)
+
     async def restart(self):
+        message_dict.reopen_workflow(self.workflow_message.workflow_id)
+        self._finalized = False
+        atexit.unregister(self._finalize_workflow)
+        atexit.register(self._finalize_workflow)
         self._initialize()
 
         self._setup_resource_manager()
@@ -85,6 +85,18 @@ class ExploitPatchWorkflow(BountyWorkflow):
             + self.bounty_metadata.get("info", ""),
             "max_input_tokens": self.params.get("max_input_tokens"),
             "max_output_tokens": self.params.get("max_output_tokens"),
+            "use_streaming": self.params.get("use_streaming"),
+            "requests_per_minute": self.params.get("requests_per_minute"),
+            "tokens_per_minute": self.params.get("tokens_per_minute"),
+            "rate_limit_dir": self.params.get("rate_limit_dir"),
+            "use_batch": self.params.get("use_batch"),
+            "batch_size": self.params.get("batch_size"),
+            "local_batch_dir": self.params.get("local_batch_dir"),
+            "hedge_percentile": self.params.get("hedge_percentile"),
+            "hedge_model": self.params.get("hedge_model"),
+            "response_cache_mode": self.params.get("response_cache_mode"),
+            "response_cache_path": self.params.get("response_cache_path"),
+            "compact_memory": self.params.get("compact_memory"),
             "interactive": self.interactive,
             "max_iterations": self.params.get("phase_iterations"),
         }
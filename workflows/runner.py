@@ -11,6 +11,8 @@ from typing import Dict, Type
 from rich.console import Console
 from rich.traceback import Traceback
 
+from messages.log_persistence import flush_all
+from resources.model_resource.response_cache import ResponseCacheMode
 from utils.logger import get_main_logger, logger_config
 from workflows.base_workflow import BaseWorkflow
 from workflows.detect_patch_workflow import DetectPatchWorkflow
@@ -36,6 +38,8 @@ import signal
 
 def signal_handler(signum, frame):
     console.print(f"[bold red]Received signal {signum}. Exiting with error.[/]")
+    # Save workflow logs before anything else can go wrong on the way out
+    flush_all()
     sys.exit(1)
 
 
@@ -95,6 +99,78 @@ class WorkflowRunner:
         parser.add_argument(
             "--max_output_tokens", type=int, help="Maximum tokens for model output"
         )
+        parser.add_argument(
+            "--use_streaming",
+            action="store_true",
+            help="Stream model responses and stop at the stop token",
+        )
+        parser.add_argument(
+            "--requests_per_minute",
+            type=int,
+            help="Maximum model requests per minute, shared by all callers",
+        )
+        parser.add_argument(
+            "--tokens_per_minute",
+            type=int,
+            help="Maximum model tokens per minute, shared by all callers",
+        )
+        parser.add_argument(
+            "--rate_limit_dir",
+            type=str,
+            help="Directory used to share the rate limit across processes",
+        )
+        parser.add_argument(
+            "--use_batch",
+            action="store_true",
+            help="Send model requests through the provider batch API (cheaper, "
+            "slower: every request waits at least one batch poll, 30s)",
+        )
+        parser.add_argument(
+            "--batch_size",
+            type=int,
+            default=1,
+            help="Maximum number of model requests per batch. The runner runs one "
+            "workflow, which sends one request at a time, so larger batches are "
+            "never filled and only add the wait for more requests to each call",
+        )
+        parser.add_argument(
+            "--local_batch_dir",
+            type=str,
+            help="Use a local file-based stand-in for the batch API in this directory",
+        )
+        parser.add_argument(
+            "--hedge_percentile",
+            type=float,
+            help="Send a duplicate model request once a call is slower than this "
+            "percentile of recent latencies (e.g. 95)",
+        )
+        parser.add_argument(
+            "--hedge_model",
+            type=str,
+            help="Model for hedged duplicate requests (defaults to --model)",
+        )
+        parser.add_argument(
+            "--response_cache_mode",
+            type=str,
+            choices=[mode.value for mode in ResponseCacheMode],
+            help="Cache model responses on disk: record, replay or read_through",
+        )
+        parser.add_argument(
+            "--response_cache_path",
+            type=str,
+            help="SQLite file for the model response cache",
+        )
+        parser.add_argument(
+            "--compact_memory",
+            action="store_true",
+            help="Summarize iterations that drop out of memory instead of losing them",
+        )
+        parser.add_argument(
+            "--max_log_staleness",
+            type=float,
+            help="Maximum seconds before logged messages are saved to the "
+            "workflow log (default: 5)",
+        )
         parser.add_argument(
             "--disable_submit",
             action="store_true",
@@ -262,9 +338,15 @@ class WorkflowRunner:
                 f.write("Workflow Log File:\n")
                 f.write("-" * 50 + "\n")
                 log_file_path = Path(self.workflow.workflow_message.log_file)
+                # The json log is only written at the end of the run, until then
+                # the messages are in the event log
+                event_log_path = self.workflow.workflow_message.event_log.path
                 if log_file_path.exists():
                     with log_file_path.open("r") as log_file:
                         f.write(log_file.read())
+                elif event_log_path.exists():
+                    with event_log_path.open("r") as event_log:
+                        f.write(event_log.read())
                 else:
                     f.write(f"Log file not found: {log_file_path}\n")
                 f.write("\n" + "=" * 50 + "\n\n")